@@ -5,7 +5,8 @@ from medsutil.adecimal import AccurateDecimal, NonAccurateNumber
 
 if t.TYPE_CHECKING:
     from uncertainties import umath, UFloat, ufloat
-    AnyNumber = t.Union[AccurateDecimal, NonAccurateNumber, UFloat]
+
+type AnyNumber = AccurateDecimal | NonAccurateNumber | UFloat
 
 TRIG_FLOAT_ACCURACY = "5e-15"
 
@@ -27,7 +28,7 @@ def with_minimum_uncertainty(n: AnyNumber, uncertainty: NonAccurateNumber):
 
 
 def sin(rads: AnyNumber) -> AnyNumber:
-    from uncertainties import UFloat
+    from uncertainties import UFloat, umath
     if isinstance(rads, AccurateDecimal):
         if rads.std_dev < 0.2:
             # warning? small angle not appropriate
@@ -45,7 +46,7 @@ def sin(rads: AnyNumber) -> AnyNumber:
 
 
 def cos(rads: AnyNumber) -> AnyNumber:
-    from uncertainties import UFloat
+    from uncertainties import UFloat, umath
     if isinstance(rads, AccurateDecimal):
         adecimal = AccurateDecimal(
             math.cos(rads.num),
@@ -59,7 +60,7 @@ def cos(rads: AnyNumber) -> AnyNumber:
         return math.cos(rads)
 
 def atan2(x: AnyNumber, y: AnyNumber) -> AnyNumber:
-    from uncertainties import UFloat
+    from uncertainties import UFloat, umath
     if isinstance(x, AccurateDecimal):
         return AccurateDecimal(
             math.atan2(x.num, y.num),
@@ -73,7 +74,7 @@ def atan2(x: AnyNumber, y: AnyNumber) -> AnyNumber:
         return math.atan2(x, y)
 
 def radians(degrees: AnyNumber) -> AnyNumber:
-    from uncertainties import UFloat
+    from uncertainties import UFloat, umath
     if isinstance(degrees, AccurateDecimal):
         res = degrees * (PI * (1 / 180))
         res.set_minimum_accuracy("5e-14")
@@ -84,7 +85,7 @@ def radians(degrees: AnyNumber) -> AnyNumber:
         return math.radians(degrees)
 
 def sqrt(num: AnyNumber) -> AnyNumber:
-    from uncertainties import UFloat
+    from uncertainties import UFloat, umath
     if isinstance(num, AccurateDecimal):
         return num ** 2
     elif isinstance(num, UFloat):
@@ -121,7 +121,7 @@ def utc_awaretime(year: int,
                   *,
                   fold: int = 0) -> AwareDateTime:
     """ Build a datetime from the given parameters, assuming tz is UTC if not provided. """
-    return AwareDateTime(year, month, day, hour, minute, second, microsecond, tzinfo or 'Etc/Utc', fold=fold)
+    return AwareDateTime(year, month, day, hour, minute, second, microsecond, tzinfo or 'Etc/UTC', fold=fold)
 
 def awaretime(year: int,
               month: int,
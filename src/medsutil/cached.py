@@ -1,4 +1,21 @@
+"""Per-object caching of computed values.
+
+    CachedObjectMixin gives an object a cache for the results of its methods (via _with_cache() or
+    the cached_method decorator). By default, the cache keeps every value until it is cleared, which
+    is fine for short-lived objects. Long-lived objects can set a CachePolicy to bound it:
+
+        class MyHandle(CachedObjectMixin):
+            cache_policy = CachePolicy(max_entries=100, ttl_seconds=300, name='my_handle')
+
+    or call set_cache_policy() on an instance. Only values that can be rebuilt by calling the
+    cached function again should go in a bounded cache, since evicted values are recomputed on the
+    next access.
+"""
+import collections
+import dataclasses
 import functools
+import sys
+import time
 import typing as t
 
 CacheParameterType = t.Hashable | t.Iterable[t.Hashable]
@@ -11,58 +28,208 @@ def cached_method[**P, Q](func: t.Callable[P,Q] = None, *, limit_args: set[int]
             cached_list = []
             cached_list.extend(
                 (idx, arg) for idx, arg in enumerate(args[1:]) if limit_args is None or idx in limit_args)
-            cached_list.extend((name, kwargs[name]) for name in kwargs if limit_kwargs is None or name in kwargs[name])
+            cached_list.extend((name, kwargs[name]) for name in kwargs if limit_kwargs is None or name in limit_kwargs)
             return args[0]._with_cache(f"_function_{func.__name__}", func, *args, **kwargs, cache_parameters=cached_list)
         return wrapper
     else:
         return functools.partial(cached_method, limit_args=limit_args, limit_kwargs=limit_kwargs)
 
 
+@dataclasses.dataclass(frozen=True)
+class CachePolicy:
+    """Limits on the values kept in a cache.
+
+        Once there are more than max_entries values, or their estimated size (from size_of) is more
+        than max_bytes, the least recently used values are evicted. Values also expire ttl_seconds
+        after they were stored. Limits that are None are not applied. If the policy has a name, the
+        hits, misses and evictions are counted by name in the medsutil_cache_*_total metrics.
+    """
+
+    max_entries: t.Optional[int] = None
+    max_bytes: t.Optional[int] = None
+    ttl_seconds: t.Optional[float] = None
+    name: t.Optional[str] = None
+    size_of: t.Callable[[t.Any], int] = sys.getsizeof
+
+    @property
+    def is_bounded(self) -> bool:
+        return self.max_entries is not None or self.max_bytes is not None or self.ttl_seconds is not None
+
+    @staticmethod
+    def from_config(config: dict, name: t.Optional[str] = None) -> CachePolicy:
+        """Build a policy from a dictionary with max_entries, max_bytes and/or ttl_seconds."""
+        unknown = [x for x in config if x not in ('max_entries', 'max_bytes', 'ttl_seconds', 'name')]
+        if unknown:
+            raise ValueError(f'Unknown cache policy settings [{', '.join(unknown)}]')
+        policy = CachePolicy(
+            max_entries=int(config['max_entries']) if config.get('max_entries') is not None else None,
+            max_bytes=int(config['max_bytes']) if config.get('max_bytes') is not None else None,
+            ttl_seconds=float(config['ttl_seconds']) if config.get('ttl_seconds') is not None else None,
+            name=config.get('name') or name,
+        )
+        if any(x is not None and x <= 0 for x in (policy.max_entries, policy.max_bytes, policy.ttl_seconds)):
+            raise ValueError('Cache policy limits must be positive')
+        return policy
+
+
+_UNBOUNDED = CachePolicy()
+
+_metrics: dict[str, t.Any] = {}
+
+
+def _cache_metric(kind: str, policy_name: str):
+    if kind not in _metrics:
+        from medsutil.metrics import Counter
+        _metrics[kind] = Counter(
+            name=f'cache_{kind}_total',
+            documentation=f'Number of cache {kind}',
+            labelnames=('cache',),
+            namespace='medsutil',
+        )
+    return _metrics[kind].labels(cache=policy_name)
+
+
+class CacheStore:
+    """Values cached by key, with the limits of a CachePolicy."""
+
+    __slots__ = ('_policy', '_entries', '_total_bytes', 'hits', 'misses', 'evictions')
+
+    def __init__(self, policy: t.Optional[CachePolicy] = None):
+        self._policy = policy or _UNBOUNDED
+        # key -> (value, time stored, estimated size)
+        self._entries: collections.OrderedDict[t.Hashable, tuple[t.Any, float, int]] = collections.OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def policy(self) -> CachePolicy:
+        return self._policy
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated size of the cached values (only tracked when the policy has max_bytes)."""
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: t.Hashable) -> bool:
+        return self._lookup(key, False) is not None
+
+    def keys(self) -> list[t.Hashable]:
+        return list(self._entries.keys())
+
+    def get(self, key: t.Hashable) -> tuple[bool, t.Any]:
+        """Get a value (found, value), counting it as a hit or miss."""
+        entry = self._lookup(key, True)
+        if entry is None:
+            self._record('misses')
+            return False, None
+        self._record('hits')
+        return True, entry[0]
+
+    def set(self, key: t.Hashable, value: t.Any):
+        policy = self._policy
+        size = policy.size_of(value) if policy.max_bytes is not None else 0
+        self.remove(key)
+        self._entries[key] = (value, time.monotonic() if policy.ttl_seconds is not None else 0, size)
+        self._total_bytes += size
+        if policy.max_entries is not None or policy.max_bytes is not None:
+            self._evict_to_limits(key)
+
+    def remove(self, key: t.Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def remove_where(self, predicate: t.Callable[[t.Hashable], bool]):
+        for key in [x for x in self._entries if predicate(x)]:
+            self.remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _lookup(self, key: t.Hashable, touch: bool) -> t.Optional[tuple[t.Any, float, int]]:
+        entry = self._entries.get(key)
+        if entry is None or not self._policy.is_bounded:
+            return entry
+        if self._policy.ttl_seconds is not None and (time.monotonic() - entry[1]) > self._policy.ttl_seconds:
+            self.remove(key)
+            self._record('evictions')
+            return None
+        if touch:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+        return entry
+
+    def _evict_to_limits(self, newest_key: t.Hashable):
+        policy = self._policy
+        while len(self._entries) > 1 and (
+                (policy.max_entries is not None and len(self._entries) > policy.max_entries)
+                or (policy.max_bytes is not None and self._total_bytes > policy.max_bytes)):
+            oldest_key = next(iter(self._entries))
+            if oldest_key == newest_key:
+                break
+            self.remove(oldest_key)
+            self._record('evictions')
+
+    def _record(self, kind: str):
+        setattr(self, kind, getattr(self, kind) + 1)
+        if self._policy.name is not None:
+            _cache_metric(kind, self._policy.name).inc()
+
+
 class CachedObjectMixin:
 
+    cache_policy: t.ClassVar[t.Optional[CachePolicy]] = None
+
     def __init__(self, *args, **kwargs):
         super(CachedObjectMixin, self).__init__(*args, **kwargs)
-        self._cache: dict[t.Hashable, t.Any] = {}
-        self._cache_with_parameters: dict[t.Hashable, dict[int, t.Any]] = {}
+        self._cache: CacheStore = CacheStore(self.cache_policy)
+
+    @staticmethod
+    def _cache_key(key: t.Hashable, cache_parameters: CacheParameterType = None) -> tuple[t.Hashable, t.Optional[int]]:
+        if not cache_parameters:
+            return key, None
+        if isinstance(cache_parameters, t.Hashable):
+            return key, hash(cache_parameters)
+        return key, hash(tuple(x for x in t.cast(t.Iterable[t.Hashable], cache_parameters)))
 
     def _from_cache_only(self, key: t.Hashable, cache_parameters: CacheParameterType = None) -> t.Any | None:
-        if cache_parameters:
-            if key in self._cache_with_parameters:
-                if isinstance(cache_parameters, t.Hashable):
-                    cache_key = hash(cache_parameters)
-                else:
-                    cache_key = hash(tuple(x for x in t.cast(t.Iterable[t.Hashable], cache_parameters)))
-                if cache_key in self._cache_with_parameters[key]:
-                    return self._cache_with_parameters[key][cache_key]
-        elif key in self._cache:
-            return self._cache[key]
-        return None
+        return self._cache.get(self._cache_key(key, cache_parameters))[1]
 
     def _with_cache[X](self, key: t.Hashable, cb: t.Callable[..., X], *args, _invalidate: bool = False, cache_parameters: CacheParameterType = None, **kwargs) -> X:
-        if cache_parameters:
-            if key not in self._cache_with_parameters:
-                self._cache_with_parameters[key] = {}
-            if isinstance(cache_parameters, t.Hashable):
-                cache_key = hash(cache_parameters)
-            else:
-                cache_key = hash(tuple(x for x in t.cast(t.Iterable[t.Hashable], cache_parameters)))
-            if _invalidate or cache_key not in self._cache_with_parameters[key]:
-                self._cache_with_parameters[key][cache_key] = cb(*args, **kwargs)
-            return self._cache_with_parameters[key][cache_key]
-        else:
-            if _invalidate or key not in self._cache:
-                self._cache[key] = cb(*args, **kwargs)
-            return self._cache[key]
+        cache_key = self._cache_key(key, cache_parameters)
+        if not _invalidate:
+            found, value = self._cache.get(cache_key)
+            if found:
+                return value
+        value = cb(*args, **kwargs)
+        self._cache.set(cache_key, value)
+        return value
 
     def _set_cache(self, key: t.Hashable, obj: t.Any, cache_parameters: CacheParameterType = None):
         self._with_cache(key, cb=lambda: obj, cache_parameters=cache_parameters, _invalidate=True)
 
+    def set_cache_policy(self, policy: t.Optional[CachePolicy]):
+        """Change the cache policy of this object (this clears the cache)."""
+        self._cache = CacheStore(policy)
+
+    def cache_stats(self) -> dict[str, int]:
+        return {
+            'entries': len(self._cache),
+            'hits': self._cache.hits,
+            'misses': self._cache.misses,
+            'evictions': self._cache.evictions,
+        }
+
     def clear_cache(self, key: t.Optional[str] = None):
         if key is None:
             self._cache.clear()
-            self._cache_with_parameters.clear()
         else:
-            if key in self._cache:
-                del self._cache[key]
-            if key in self._cache_with_parameters:
-                del self._cache[key]
+            self._cache.remove_where(lambda x: x[0] == key)
@@ -2,17 +2,31 @@
 
     Note that we re-implement some functions here to properly account for uncertainty in the
     measurement value using the uncertainties library.
+
+    The *_array() and track_*() functions work on whole arrays of points at once. They take
+    NumPy arrays (or anything array-like) in degrees, or UncertainArrays to carry the
+    uncertainty through.
 """
+import datetime
+import typing as t
+
+import numpy as np
+import numpy.typing as npt
 from uncertainties import UFloat
 
 import medsutil.amath as amath
 import medsutil.adecimal as adecimal
+from medsutil.uarray import UncertainArray
 import shapely
 
 YXPoint = tuple[amath.AnyNumber, amath.AnyNumber]
 
+type CoordinateArray = npt.ArrayLike | UncertainArray
+
 _EARTH_RADIUS = adecimal.AccurateDecimal(6371000, 10000)
 
+_EARTH_RADIUS_ARRAY = UncertainArray.from_arrays(6371000, 10000)
+
 
 def haversine(yx1: YXPoint, yx2: YXPoint) -> amath.AnyNumber:
     """Calculate the distance between two points using the haversine function, maintaining
@@ -55,3 +69,116 @@ def coordinates_to_geometry(latitude: amath.AnyNumber, longitude: amath.AnyNumbe
             shapely.Point(longitude - longitude.std_dev, latitude - latitude.std_dev),
         ])
 
+
+
+def _as_array(values: CoordinateArray, std_dev: t.Optional[npt.ArrayLike] = None) -> npt.NDArray | UncertainArray:
+    if isinstance(values, UncertainArray):
+        return values
+    if std_dev is None:
+        return np.asarray(values, dtype=np.float64)
+    return UncertainArray.from_arrays(values, std_dev)
+
+
+def _nominal(values: CoordinateArray) -> npt.NDArray:
+    if isinstance(values, UncertainArray):
+        return values.nominal_value
+    return np.asarray(values, dtype=np.float64)
+
+
+def haversine_array(latitude1: CoordinateArray,
+                    longitude1: CoordinateArray,
+                    latitude2: CoordinateArray,
+                    longitude2: CoordinateArray) -> npt.NDArray | UncertainArray:
+    """Calculate the distance in metres between each pair of points, like haversine().
+
+        If any of the coordinates are UncertainArrays, so is the result, and it includes the
+        uncertainty in the radius of the Earth.
+    """
+    coordinates = [_as_array(x) for x in (latitude1, longitude1, latitude2, longitude2)]
+    if any(isinstance(x, UncertainArray) for x in coordinates):
+        lat1, lon1, lat2, lon2 = (UncertainArray(x) if not isinstance(x, UncertainArray) else x for x in coordinates)
+        a = ((lat2 - lat1).radians() * 0.5).sin() ** 2 + lat1.radians().cos() * lat2.radians().cos() * ((lon2 - lon1).radians() * 0.5).sin() ** 2
+        return 2 * a.sqrt().arcsin() * _EARTH_RADIUS_ARRAY
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in coordinates)
+    a = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * float(_EARTH_RADIUS.num)
+
+
+def bearing_array(latitude1: CoordinateArray,
+                  longitude1: CoordinateArray,
+                  latitude2: CoordinateArray,
+                  longitude2: CoordinateArray) -> npt.NDArray:
+    """Calculate the initial bearing in degrees (0 to 360, clockwise from north) from each first point to each second point."""
+    lat1, lon1, lat2, lon2 = (np.radians(_nominal(x)) for x in (latitude1, longitude1, latitude2, longitude2))
+    d_lon = lon2 - lon1
+    y = np.sin(d_lon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(d_lon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def track_distances(latitudes: CoordinateArray,
+                    longitudes: CoordinateArray,
+                    latitude_std_dev: t.Optional[npt.ArrayLike] = None,
+                    longitude_std_dev: t.Optional[npt.ArrayLike] = None) -> npt.NDArray | UncertainArray:
+    """Calculate the distance in metres between each consecutive pair of points on a track."""
+    lat = _as_array(latitudes, latitude_std_dev)
+    lon = _as_array(longitudes, longitude_std_dev)
+    return haversine_array(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+def track_speeds(latitudes: CoordinateArray,
+                 longitudes: CoordinateArray,
+                 times: t.Sequence[datetime.datetime] | npt.ArrayLike,
+                 latitude_std_dev: t.Optional[npt.ArrayLike] = None,
+                 longitude_std_dev: t.Optional[npt.ArrayLike] = None) -> npt.NDArray | UncertainArray:
+    """Calculate the speed in m s-1 between each consecutive pair of points on a track.
+
+        Times are datetimes or seconds. The speed is NaN where no time elapsed between two points.
+    """
+    seconds = np.array([x.timestamp() if isinstance(x, datetime.datetime) else x for x in times], dtype=np.float64)
+    elapsed = np.diff(seconds)
+    elapsed[elapsed == 0] = np.nan
+    return track_distances(latitudes, longitudes, latitude_std_dev, longitude_std_dev) / elapsed
+
+
+def coordinates_to_geometries(latitudes: CoordinateArray,
+                              longitudes: CoordinateArray,
+                              latitude_std_dev: t.Optional[npt.ArrayLike] = None,
+                              longitude_std_dev: t.Optional[npt.ArrayLike] = None) -> npt.NDArray[np.object_]:
+    """Convert arrays of points to geometries, following the same rules as coordinates_to_geometry()."""
+    lat, lon = _nominal(latitudes), _nominal(longitudes)
+    if latitude_std_dev is None:
+        latitude_std_dev = latitudes.std_dev if isinstance(latitudes, UncertainArray) else 0
+    if longitude_std_dev is None:
+        longitude_std_dev = longitudes.std_dev if isinstance(longitudes, UncertainArray) else 0
+    d_lat = np.broadcast_to(np.asarray(latitude_std_dev, dtype=np.float64), lat.shape)
+    d_lon = np.broadcast_to(np.asarray(longitude_std_dev, dtype=np.float64), lon.shape)
+    geometries = np.empty(lat.shape, dtype=np.object_)
+    lat_only = (d_lat != 0) & (d_lon == 0)
+    lon_only = (d_lat == 0) & (d_lon != 0)
+    both = (d_lat != 0) & (d_lon != 0)
+    points = ~(lat_only | lon_only | both)
+    if points.any():
+        geometries[points] = shapely.points(np.stack([lon[points], lat[points]], axis=-1))
+    if lon_only.any():
+        x, y, dx = lon[lon_only], lat[lon_only], d_lon[lon_only]
+        geometries[lon_only] = shapely.linestrings(np.stack([
+            np.stack([x - dx, y], axis=-1),
+            np.stack([x + dx, y], axis=-1),
+        ], axis=1))
+    if lat_only.any():
+        x, y, dy = lon[lat_only], lat[lat_only], d_lat[lat_only]
+        geometries[lat_only] = shapely.linestrings(np.stack([
+            np.stack([x, y - dy], axis=-1),
+            np.stack([x, y + dy], axis=-1),
+        ], axis=1))
+    if both.any():
+        x, y, dx, dy = lon[both], lat[both], d_lon[both], d_lat[both]
+        geometries[both] = shapely.polygons(np.stack([
+            np.stack([x - dx, y - dy], axis=-1),
+            np.stack([x + dx, y - dy], axis=-1),
+            np.stack([x + dx, y + dy], axis=-1),
+            np.stack([x - dx, y + dy], axis=-1),
+            np.stack([x - dx, y - dy], axis=-1),
+        ], axis=1))
+    return geometries
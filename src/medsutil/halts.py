@@ -98,6 +98,17 @@ class DummyHaltFlag(HaltFlag):
         super().__init__(DummyEvent())
 
 
+class LinkedHaltFlag(HaltFlag):
+    """Halt flag that also halts when any of the linked halt flags do."""
+
+    def __init__(self, event: ct.SupportsEvent, *linked: t.Optional[HaltFlag]):
+        super().__init__(event)
+        self._linked = [x for x in linked if x is not None]
+
+    def _should_continue(self) -> bool:
+        return super()._should_continue() and all(x.check_continue(False) for x in self._linked)
+
+
 def copy_with_halt(source_handle: ct.SupportsBinaryRead,
                    destination_handle: ct.SupportsBinaryWrite,
                    chunk_size: int = None,
@@ -1,6 +1,10 @@
 """
     The Python JSON library is inherently slow. There are several faster options. If they are available, we will
     use them. This module provides a wrapper around either orjson or the native JSON module.
+
+    Objects with a shallow_mapping() method (e.g. OCPROC2 records) can be dumped directly: the encoder calls it
+    for each object it finds and exports the result, so no full copy of the object is built first. Other objects
+    with a to_mapping() method are exported with it.
 """
 import datetime
 import enum
@@ -15,6 +19,10 @@ try:
     import orjson
 
     def _clean_for_orjson(x):
+        if hasattr(x, 'shallow_mapping'):
+            return x.shallow_mapping()
+        if hasattr(x, 'to_mapping'):
+            return x.to_mapping()
         try:
             return clean_for_json(x)
         except TypeError as ex:
@@ -37,6 +45,10 @@ except ModuleNotFoundError:
     import json
 
     def _clean_for_json(x):
+        if hasattr(x, 'shallow_mapping'):
+            return x.shallow_mapping()
+        if hasattr(x, 'to_mapping'):
+            return x.to_mapping()
         try:
             return clean_for_json(x)
         except TypeError:
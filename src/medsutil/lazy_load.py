@@ -82,6 +82,10 @@ class LazyLoadDict[V]:
             x: (self._dict[x] if not self._loaded[x] else self._dict[x].to_mapping()) for x in self._dict
         }
 
+    def shallow_mapping(self) -> dict[str, t.Any]:
+        """Like to_mapping(), but the loaded objects are left for the JSON encoder to export."""
+        return self._dict
+
     def update(self, d: dict[str, V]):
         for k in d:
             self.set(k, d[k])
@@ -156,6 +160,10 @@ class LazyLoadList[V]:
                 l.append(self._list[idx].to_mapping())
         return l
 
+    def shallow_mapping(self) -> list:
+        """Like to_mapping(), but the loaded objects are left for the JSON encoder to export."""
+        return self._list
+
     def from_mapping(self, map_: list):
         self._list = map_
         self._loaded = [False for _ in range(0, len(self._list))]
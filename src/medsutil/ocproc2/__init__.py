@@ -88,5 +88,5 @@ from .util import normalize_ocproc_path
 from .elements import MultiElement, AbstractElement, SingleElement, ElementMap
 from .history import HistoryEntry, QCResult, QCMessage, MessageType, QCTestRunInfo
 from .structures import BaseRecord, ParentRecord, ChildRecord, RecordSet, RecordMap, ElementMap
-from .operations import QCOperator, QCSetValue, QCAddHistory, QCSetWorkingQuality
+from .operations import QCOperator, QCSetValue, QCAddHistory, QCSetWorkingQuality, QCOperationBatch
 from .ontology import OCProc2Ontology, OCProc2ElementInfo, OCProc2ChildRecordTypeInfo
@@ -1,3 +1,4 @@
+import contextlib
 import pathlib
 import typing as t
 import os
@@ -8,6 +9,8 @@ from medsutil.ocproc2 import ParentRecord
 from pipeman.exceptions import CNODCError, NotSupportedError
 from medsutil.byteseq import ByteSequenceReader
 from medsutil.halts import DummyHaltFlag, HaltFlag
+from medsutil.storage.local import LocalHandle
+from medsutil.storage.interface import FilePath
 import medsutil.types as ct
 
 
@@ -64,6 +67,9 @@ class EncodeResult:
 
 class BaseCodec:
 
+    # Set to True if _decode_single_message() can work directly on a memoryview instead of bytes
+    accepts_memoryview: bool = False
+
     def __init__(self,
                  log_name: str,
                  is_encoder: bool = False,
@@ -176,11 +182,8 @@ class BaseCodec:
                 **kwargs
             )
         elif isinstance(file, (str, os.PathLike, pathlib.Path)):
-            with open(file, "rb") as h:
-                yield from self.decode_messages(
-                    self._read_in_chunks(h, chunk_size),
-                    **kwargs
-                )
+            with self.file_content(LocalHandle(file, halt_flag=self._halt_flag), chunk_size) as content:
+                yield from self.decode_messages(content, **kwargs)
         else:
             yield from self.decode_messages(file, **kwargs)
 
@@ -226,7 +229,7 @@ class BaseCodec:
                          data: ct.ByteStrings,
                          options: dict) -> t.Generator[DecodeResult]:
         if self.force_single_mode:
-            result = self._decode_message(b''.join(data), options)
+            result = self._decode_message(self._join_chunks(data), options)
             result.message_idx = 0
             result.single_message = True
             yield result
@@ -251,7 +254,7 @@ class BaseCodec:
             )
 
     def _parse_into_messages(self, data: ct.ByteStrings, options: dict) -> ct.ByteStrings:
-        yield b''.join(data)
+        yield self._join_chunks(data)
 
     def _decode_single_message(self, data: t.ByteString, options: dict) -> t.Iterable[ParentRecord]: raise NotSupportedError
 
@@ -259,6 +262,20 @@ class BaseCodec:
         for bytes_ in self._halt_flag.iterate(output):
             file_handle.write(bytes_)
 
+    @contextlib.contextmanager
+    def file_content(self, handle: FilePath, chunk_size: int = None) -> t.Generator[ct.ByteStrings]:
+        """Read a file for decoding.
+
+            Codecs that accept a memoryview get the whole file as one view over a memory map, if the
+            handle supports it. Other codecs get the file in chunks, so that the bytes they copy
+            stay around the chunk size and the halt flag is checked between chunks.
+        """
+        if self.accepts_memoryview:
+            with handle.read_content(chunk_size) as content:
+                yield content
+        else:
+            yield handle.streaming_read(chunk_size)
+
     def _read_in_chunks(self, file_handle: ct.SupportsBinaryRead, chunk_size: int = None) -> ct.ByteStrings:
         yield from self._halt_flag.read_all(file_handle, chunk_size)
 
@@ -271,3 +288,15 @@ class BaseCodec:
     @staticmethod
     def _yield_bytes(b: t.ByteString) -> t.Iterable[t.ByteString]:
         yield b
+
+    def _join_chunks(self, data: ct.ByteStrings) -> t.ByteString:
+        """Join the chunks into one byte string.
+
+            If there is only one chunk (e.g. a memory-mapped file), it is used as-is when possible
+            instead of being copied.
+        """
+        chunks = data if isinstance(data, (list, tuple)) else list(data)
+        if len(chunks) == 1:
+            if isinstance(chunks[0], bytes) or (self.accepts_memoryview and isinstance(chunks[0], memoryview)):
+                return chunks[0]
+        return b''.join(chunks)
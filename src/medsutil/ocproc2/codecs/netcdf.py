@@ -2,12 +2,14 @@ import dataclasses
 import datetime
 import functools
 import logging
+import math
 import pathlib
 import re
 import yaml
 import typing as t
 
 import netCDF4 as nc
+import numpy as np
 from autoinject import injector
 
 from medsutil.units import UnitConverter
@@ -31,6 +33,8 @@ class NetCDFCommonDecoderError(CNODCError):
 class NetCDFBaseDecoder(BaseCodec):
     """ Generic decoder for NetCDF files. """
 
+    accepts_memoryview = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, is_decoder=True, force_single_mode=True, **kwargs)
 
@@ -42,7 +46,11 @@ class NetCDFBaseDecoder(BaseCodec):
 
 
 class NetCDFCommonDecoder(NetCDFBaseDecoder):
-    """ Generalized decoder that uses a mapping file.  """
+    """ Generalized decoder that uses a mapping file.
+
+        Set the memory_budget_mb keyword to read the variables in slices of records that
+        fit in roughly that much memory, instead of reading the whole file at once.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(log_name="cnodc.netcdf_common_decoder", *args, **kwargs)
@@ -57,7 +65,8 @@ class NetCDFCommonDecoder(NetCDFBaseDecoder):
             mapping_file = map_cls.DEFAULT_MAPPING_FILE
         else:
             raise NetCDFCommonDecoderError("Missing [mapping_file] keyword", 1000, False)
-        mapper = map_cls(dataset, pathlib.Path(mapping_file))
+        memory_budget_mb = options.pop('memory_budget_mb', None)
+        mapper = map_cls(dataset, pathlib.Path(mapping_file), memory_budget_mb=float(memory_budget_mb) if memory_budget_mb else None)
         yield from mapper.build_records()
 
 
@@ -90,16 +99,64 @@ class NetCDFMappingDict(t.TypedDict):
     key_var: str | None
 
 
+@dataclasses.dataclass
+class NetCDFExtractionPlan:
+    """ Compiled form of a mapping file for one dataset.
+
+        The record variables are sorted once, and the data variables are read once each
+        as whole columns of native Python values, instead of converting every value and
+        building a dictionary for every record.
+    """
+    key_var: str
+    record_keys: list[str]
+    data_vars: list[str]
+
+
+class NetCDFRecordRow(t.Mapping[str, t.Any]):
+    """ Read-only view of the values for one record index in a set of columns. """
+
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns: dict[str, list[t.Any]], index: int):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key: str) -> t.Any:
+        column = self._columns[key]
+        return column[self._index] if self._index < len(column) else None
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._columns
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
 class NetCDFCommonMapper:
+    """ Builds records from a NetCDF dataset using a mapping file.
+
+        With a memory budget, the data variables are read in slices along the record
+        dimension and the records for each slice are yielded before the next one is read.
+        Within a slice, a variable with no values is treated as missing, as it is for the
+        whole file when there is no budget.
+    """
 
     units: UnitConverter = None
     ontology: OCProc2Ontology = None
 
+    # Estimated cost of a value on top of its NumPy size: the Python object, the list
+    # entry, and the mask and NaN checks made while converting it.
+    VALUE_OVERHEAD_BYTES: int = 48
+
     @injector.construct
     def __init__(self,
                  dataset: nc.Dataset,
                  mapping_file: ct.PathLike | dict,
-                 log_name: str = "cnodc.netcdf.common_mapper"):
+                 log_name: str = "cnodc.netcdf.common_mapper",
+                 memory_budget_mb: t.Optional[float] = None):
         self._map_file: ct.PathLike | None = None
         self._data = None
         if isinstance(mapping_file, dict):
@@ -110,6 +167,7 @@ class NetCDFCommonMapper:
         self._data_validated: bool = False
         self._cache = {}
         self._log = logging.getLogger(log_name)
+        self._memory_budget = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
 
     def _load_data(self):
         if self._data is None:
@@ -257,35 +315,85 @@ class NetCDFCommonMapper:
                     self._log.info(f"Missing input value [%s:%s], ignoring mapping instructions", map_info.mapping_type, map_info.source)
         return self._cache['ocproc_map']
 
-    def _get_netcdf_data(self, data_vars: list[str]) -> dict[str, list[int | float]]:
+    def _compile_plan(self) -> NetCDFExtractionPlan:
+        if 'plan' not in self._cache:
+            ocproc_map = self._get_ocproc2_map()
+            if ocproc_map['key_var'] is None:
+                raise NetCDFCommonDecoderError('Missing key variable', 3000)
+            record_keys = list(ocproc_map['record_vars'].keys())
+            record_keys.sort(key=lambda x: ocproc_map['record_vars'][x].order)
+            self._cache['plan'] = NetCDFExtractionPlan(
+                key_var=ocproc_map['key_var'],
+                record_keys=record_keys,
+                data_vars=[x for x in self._dataset.variables if x in ocproc_map['data_vars']],
+            )
+        return self._cache['plan']
+
+    def _record_count(self, plan: NetCDFExtractionPlan) -> int:
+        key_var = self._dataset.variables[plan.key_var]
+        if key_var.dtype == '|S1' or key_var.ndim == 0:
+            raise NetCDFCommonDecoderError(f'Key variable [{plan.key_var}] must be a numeric or string array', 3001)
+        return key_var.shape[0]
+
+    def _slice_size(self, plan: NetCDFExtractionPlan, record_count: int) -> int:
+        if self._memory_budget is None or record_count == 0:
+            return max(record_count, 1)
+        record_bytes = 0
+        for var_name in plan.data_vars:
+            var = self._dataset.variables[var_name]
+            if var.ndim == 0:
+                continue
+            item_size = var.dtype.itemsize if isinstance(var.dtype, np.dtype) else 0
+            record_bytes += math.prod(var.shape[1:]) * (item_size + self.VALUE_OVERHEAD_BYTES)
+        return min(record_count, max(1, self._memory_budget // max(record_bytes, 1)))
+
+    def _get_netcdf_data(self, data_vars: list[str], index: slice = slice(None)) -> dict[str, list[int | float]]:
         data = {}
         for var_name in self._dataset.variables:
             if var_name not in data_vars:
                 continue
-            var = self._dataset.variables[var_name]
-            var_data = var[:]
-            # we only want the numeric data that comes in arrays
-            if var.dtype != '|S1' and not var_data.ndim == 0:
-                var_data = unnumpy(var_data)
-                if any(d is not None for d in var_data):
-                    data[var_name] = var_data
+            var_data = self._read_column(self._dataset.variables[var_name], index)
+            if var_data is not None:
+                data[var_name] = var_data
         return data
 
+    @staticmethod
+    def _read_column(var: nc.Variable, index: slice = slice(None)) -> list[t.Any] | None:
+        """ Read a variable as a list of native values, with None for masked or NaN values. """
+        # we only want the numeric data that comes in arrays
+        if var.dtype == '|S1' or var.ndim == 0:
+            return None
+        var_data = var[index]
+        if isinstance(var_data, np.ndarray) and var_data.dtype.kind in 'biuf':
+            # netCDF4 has already applied the fill value, scale and offset, so the
+            # only work left is to mask NaNs and convert everything in one call
+            var_data = np.ma.asarray(var_data)
+            if var_data.dtype.kind == 'f':
+                var_data = np.ma.masked_where(np.isnan(var_data.filled(0)), var_data, copy=False)
+            if var_data.count() == 0:
+                return None
+            return var_data.tolist(None)
+        var_data = unnumpy(var_data)
+        if any(d is not None for d in var_data):
+            return var_data
+        return None
+
     def build_records(self) -> t.Iterable[ParentRecord]:
         self._cache = {}
         self._load_data()
         ocproc_map = self._get_ocproc2_map()
-        key_var = ocproc_map['key_var']
-        if key_var is None:
-            raise NetCDFCommonDecoderError('Missing key variable', 3000)
-        else:
-            data = self._get_netcdf_data(ocproc_map['data_vars'])
-            record_keys = list(ocproc_map['record_vars'].keys())
-            record_keys.sort(key=lambda x: ocproc_map['record_vars'][x].order)
-            for i in range(0, len(data[key_var])):
-                yield self._build_record(ocproc_map, i, {key: (data[key][i] if i < len(data[key]) else None) for key in data}, record_keys)
-
-    def _build_record(self, ocproc_map: NetCDFMappingDict, index: int, data: dict[str, t.Any], record_keys: list[str]) -> ParentRecord:
+        plan = self._compile_plan()
+        record_count = self._record_count(plan)
+        slice_size = self._slice_size(plan, record_count)
+        if slice_size < record_count:
+            self._log.debug('Reading [%s] records in slices of [%s]', record_count, slice_size)
+        for start in range(0, record_count, slice_size):
+            stop = min(start + slice_size, record_count)
+            data = self._get_netcdf_data(plan.data_vars, slice(start, stop))
+            for i in range(start, stop):
+                yield self._build_record(ocproc_map, i, NetCDFRecordRow(data, i - start), plan.record_keys)
+
+    def _build_record(self, ocproc_map: NetCDFMappingDict, index: int, data: t.Mapping[str, t.Any], record_keys: list[str]) -> ParentRecord:
         record = ParentRecord()
         record.coordinates.set('RecordNumber', index + 1)
         for key in record_keys:
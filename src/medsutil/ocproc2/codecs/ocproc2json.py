@@ -21,7 +21,7 @@ class OCProc2JsonCodec(BaseCodec):
         return b'['
 
     def _encode_single_record(self, record: ocproc2.ParentRecord, options: dict) -> ct.ByteStrings:
-        yield json.dumpb(record.to_mapping())
+        yield json.dumpb(record)
 
     def _encode_separator(self, options: dict) -> t.Union[None, bytes, bytearray]:
         return b','
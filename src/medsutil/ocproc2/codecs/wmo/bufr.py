@@ -1,3 +1,4 @@
+import threading
 import typing as t
 import pybufrkit.descriptors
 import zrlog
@@ -35,8 +36,16 @@ class BufrCDSTables:
                 str(x): self.standardize_instruction(raw[x])
                 for x in raw
             }
+        self._bufr_map_by_id = {
+            int(x): self._bufr_map[x]
+            for x in self._bufr_map
+            if x.isdigit()
+        }
+        self._units = {}
 
     def lookup(self, descriptor_id):
+        if descriptor_id in self._bufr_map_by_id:
+            return self._bufr_map_by_id[descriptor_id]
         key = str(int(descriptor_id))
         if key in self._bufr_map:
             return self._bufr_map[key]
@@ -45,7 +54,9 @@ class BufrCDSTables:
     def standardize_units(self, unit):
         if unit in ('Numeric', 'CCITT IA5', 'CODE TABLE'):
             return None
-        return self.converter.standardize(unit)
+        if unit not in self._units:
+            self._units[unit] = self.converter.standardize(unit)
+        return self._units[unit]
 
     def standardize_instruction(self, instruction):
         if isinstance(instruction, str):
@@ -87,9 +98,39 @@ class BufrCDSTables:
             return base
 
 
+@injector.injectable_global
+class BufrTemplateCache:
+    """ Keeps what can be reused between BUFR messages that share a template.
+
+        The pybufrkit decoder is shared so that it keeps its compiled templates (it compiles
+        each template, keyed on the descriptors and table group, the first time it sees it).
+        The inferred message type is cached by (edition, master table version, unexpanded
+        descriptors), since working it out can mean expanding the template against every
+        master table version.
+    """
+
+    def __init__(self, max_templates: int = 256):
+        self._max_templates = max_templates
+        self._decoder = Decoder(compiled_template_cache_max=max_templates)
+        self._message_types: dict[tuple[int, int, tuple[int, ...]], list[int]] = {}
+        self._lock = threading.Lock()
+
+    def decode(self, content: t.Union[bytearray, bytes]):
+        with self._lock:
+            return self._decoder.process(content)
+
+    def message_type(self, key: tuple[int, int, tuple[int, ...]], identify: t.Callable[[], list[int]]) -> list[int]:
+        if key not in self._message_types:
+            if len(self._message_types) >= self._max_templates:
+                del self._message_types[next(iter(self._message_types))]
+            self._message_types[key] = identify()
+        return self._message_types[key]
+
+
 class Bufr4Decoder(GtsSubDecoder):
 
     bufr_tables: BufrCDSTables = None
+    template_cache: BufrTemplateCache = None
 
     @injector.construct
     def __init__(self):
@@ -110,7 +151,7 @@ class Bufr4Decoder(GtsSubDecoder):
                 return DecodeResult(skipped=True, original=original_data)
             if bufr_version != 4:
                 raise CNODCError("Only BUFR4 is supported", "BUFR_DECODE", 2000)
-            instance = _Bufr4Decoder(header, content, self.bufr_tables)
+            instance = _Bufr4Decoder(header, content, self.bufr_tables, self.template_cache)
             return DecodeResult(
                 records=[x for x in instance.convert_to_records()],
                 original=original_data,
@@ -221,16 +262,29 @@ class _Bufr4Decoder:
         1019: [1015],
     }
 
-    def __init__(self, header, content: t.Union[bytearray, bytes], bufr_tables: BufrCDSTables):
+    def __init__(self, header, content: t.Union[bytearray, bytes], bufr_tables: BufrCDSTables, template_cache: t.Optional[BufrTemplateCache] = None):
         self.bufr_tables = bufr_tables
+        self.template_cache = template_cache
         self.header = header
         self.log = zrlog.get_logger("cnodc.bufr_decoder")
-        decoder = Decoder()
         self.raw_content = content
-        self.message = decoder.process(self.raw_content)
+        if template_cache is None:
+            self.message = Decoder().process(self.raw_content)
+        else:
+            self.message = template_cache.decode(self.raw_content)
         self.raw_data: TemplateData = self.message.template_data.value
         self.pybufr_tables = TableGroupCacheManager.get_table_group_by_key(self.message.table_group_key)
 
+    @classmethod
+    def _custom_handlers(cls) -> dict[int, str]:
+        if '_CUSTOM_HANDLERS' not in cls.__dict__:
+            cls._CUSTOM_HANDLERS = {
+                int(name[12:]): name
+                for name in dir(cls)
+                if name.startswith('_parse_node_') and name[12:].isdigit()
+            }
+        return cls._CUSTOM_HANDLERS
+
     def get_text_representation(self) -> str:
         return NestedTextRenderer().render(self.message)
 
@@ -255,10 +309,17 @@ class _Bufr4Decoder:
         if len(pieces) > 3 and pieces[3][0] in ('C', 'A', 'P'):
             raise CNODCError("BUFR decoder not configured to properly handle CCx AAx or Pxx messages", "BUFR_DECODE", 1000)
         descriptors = list(x for x in self.message.unexpanded_descriptors.value)
+        if self.template_cache is None:
+            message_type = self._identify_bufr_message_type(descriptors)
+        else:
+            message_type = list(self.template_cache.message_type(
+                (self.message.edition.value, self.message.master_table_version.value, tuple(descriptors)),
+                lambda: self._identify_bufr_message_type(descriptors)
+            ))
         common_metadata = {
             'GTSHeader': self.header,
             'BUFRDescriptors': descriptors,
-            'BUFRInferredMessageType': self._identify_bufr_message_type(descriptors),
+            'BUFRInferredMessageType': message_type,
             'BUFROriginCentre': self.message.originating_centre.value,
             'BUFROriginSubcentre': self.message.originating_subcentre.value,
             'BUFRDataCategory': self.message.data_category.value,
@@ -361,10 +422,10 @@ class _Bufr4Decoder:
 
     def _parse_node(self, node, ctx, _skip_custom_check: bool = False):
         if not _skip_custom_check:
-            test_name = f"_parse_node_{node.descriptor.id}"
             # Custom handling
-            if hasattr(self, test_name):
-                getattr(self, test_name)(node, ctx)
+            handler = _Bufr4Decoder._custom_handlers().get(node.descriptor.id)
+            if handler is not None:
+                getattr(self, handler)(node, ctx)
                 return
         # Sequence node
         if isinstance(node, SequenceNode):
@@ -343,6 +343,20 @@ class SingleElement(AbstractElement):
         else:
             return self._value
 
+    def shallow_mapping(self) -> t.Any:
+        """Like to_mapping(), but the metadata is left for the JSON encoder to export."""
+        if self._metadata:
+            return {
+                '_value': self._value,
+                '_metadata': self._metadata
+            }
+        elif type(self._value).__name__ in ('dict', 'list'):
+            return {
+                '_value': self._value,
+            }
+        else:
+            return self._value
+
     @staticmethod
     def build(v: t.Any, metadata: DefaultValueDict = None):
         v = SingleElement(v)
@@ -453,6 +467,15 @@ class MultiElement(AbstractElement[list[AbstractElement]]):
             return export
         return [v.to_mapping() for v in self._value]
 
+    def shallow_mapping(self) -> t.Any:
+        """Like to_mapping(), but the values and metadata are left for the JSON encoder to export."""
+        if self._metadata:
+            return {
+                '_values': self._value,
+                '_metadata': self._metadata
+            }
+        return self._value
+
 
 class ElementMap(LazyLoadDict[AbstractElement]):
     """Represents a map of element names to values"""
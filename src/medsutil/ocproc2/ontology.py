@@ -329,3 +329,8 @@ class OCProc2Ontology:
         if element_name in self._parameters:
             return self._parameters[element_name].essential_ocean_vars or None
         return None
+
+    def element_names(self, group_name: t.Optional[str] = None) -> t.Iterable[str]:
+        for e_name in self._parameters:
+            if group_name is None or self._parameters[e_name].group_name == group_name:
+                yield e_name
@@ -2,6 +2,8 @@ import datetime
 import typing as t
 import medsutil.awaretime as awaretime
 from medsutil.ocproc2 import util
+from medsutil.ocproc2.elements import SingleElement, ElementMap
+from medsutil.ocproc2.history import MessageType
 
 if t.TYPE_CHECKING:
     import medsutil.ocproc2 as ocproc2
@@ -33,18 +35,24 @@ class QCOperator:
             '_type': self._op_type,
         }
         if self._children:
-            map_['children'] = [x.export() for x in self._children]
+            map_['children'] = [x.to_map() for x in self._children]
         self._extend_map(map_)
         return map_
 
     def _extend_map(self, map_):
         pass
 
-    def apply(self, record: ocproc2.ParentRecord, working_record):
+    def apply(self, record: ocproc2.ParentRecord, working_record=None):
         self._apply(record, working_record)
         for child in self._children:
             child.apply(record, working_record)
 
+    def flatten(self) -> t.Iterable[QCOperator]:
+        """Yield this operator and all of its children, in the order they are applied."""
+        yield self
+        for child in self._children:
+            yield from child.flatten()
+
     def _apply(self, record: ocproc2.ParentRecord, working_record):
         pass
 
@@ -105,13 +113,21 @@ class QCAddHistory(QCOperator):
             'change_time': self._datetime.isoformat()
         })
 
-    def apply(self, record: ocproc2.ParentRecord, working_record):
+    @property
+    def source(self) -> tuple[str, str, str, str]:
+        return self._name, self._version, self._instance, self._type
+
+    @property
+    def change_time(self) -> datetime.datetime:
+        return self._datetime
+
+    def _apply(self, record: ocproc2.ParentRecord, working_record):
         record.add_history_entry(
             message=self._message,
             source_name=self._name,
             source_version=self._version,
             source_instance=self._instance,
-            message_type=ocproc2.MessageType(self._type),
+            message_type=MessageType(self._type),
             change_time=self._datetime
         )
 
@@ -157,15 +173,19 @@ class QCSetValue(QCOperator):
     def _get_path(self):
         return self._value_path.split('/')
 
-    def apply(self, record: ocproc2.ParentRecord, working_record):
+    @property
+    def target_path(self) -> tuple[str, ...]:
+        return tuple(self._get_path())
+
+    def _apply(self, record: ocproc2.ParentRecord, working_record):
         path = self._get_path()
-        v = record.find_child(path)
-        if isinstance(v, ocproc2.SingleElement):
+        v = record.find_child(path[:])
+        if isinstance(v, SingleElement):
             v.value = self._new_value
             return
         # TODO: multi-element?
         parent = record.find_child(path[:-1])
-        if isinstance(parent, ocproc2.ElementMap):
+        if isinstance(parent, ElementMap):
             parent[path[-1]] = self._new_value
             return
         raise ValueError('cannot find a value to set')
@@ -198,3 +218,98 @@ class QCSetWorkingQuality(QCSetValue):
         path = self._value_path.split('/')
         path.extend(['metadata', 'WorkingQuality'])
         return path
+
+
+class QCOperationBatch:
+    """Applies a list of operators (and their children) to a record in one pass.
+
+        Operators are compiled first: a value that is set more than once only keeps its last
+        value (unless something below it was changed in between) and each record (or
+        subrecord) they change is only looked up once. With merge_history, history entries
+        from the same source are merged into one entry with one line per message.
+    """
+
+    def __init__(self, operators: t.Iterable[QCOperator], merge_history: bool = False):
+        flat = [op for operator in operators for op in operator.flatten()]
+        self._set_values: list[tuple[tuple[str, ...], tuple[str, ...], t.Any]] = self._compile_set_values(flat)
+        self._history: list[QCAddHistory] = self._compile_history(
+            [x for x in flat if isinstance(x, QCAddHistory)],
+            merge_history
+        )
+
+    def __len__(self) -> int:
+        return len(self._set_values) + len(self._history)
+
+    @staticmethod
+    def from_maps(maps: t.Iterable[dict], merge_history: bool = False) -> QCOperationBatch:
+        return QCOperationBatch((QCOperator.from_map(x) for x in maps), merge_history)
+
+    @staticmethod
+    def _compile_set_values(operators: list[QCOperator]) -> list[tuple[tuple[str, ...], tuple[str, ...], t.Any]]:
+        # Work backwards so that we know which values are set again later. A later set only
+        # replaces an earlier one if nothing under that path was changed in between, since
+        # the element the earlier set creates may be needed for it.
+        set_later: set[tuple[tuple[str, ...], tuple[str, ...]]] = set()
+        compiled = []
+        for op in reversed(operators):
+            if not isinstance(op, QCSetValue):
+                continue
+            record_path, element_path = QCOperationBatch._split_path(op.target_path)
+            if set_later:
+                for idx in range(1, len(element_path)):
+                    set_later.discard((record_path, element_path[:idx]))
+            key = (record_path, element_path)
+            if key in set_later:
+                continue
+            set_later.add(key)
+            compiled.append((record_path, element_path, op.value))
+        compiled.reverse()
+        return compiled
+
+    @staticmethod
+    def _split_path(path: tuple[str, ...]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        # Split the path into the record (e.g. subrecords/PROFILE/0/5) and the element on it
+        idx = 0
+        while len(path) - idx > 4 and path[idx] == 'subrecords':
+            idx += 4
+        return path[:idx], path[idx:]
+
+    @staticmethod
+    def _compile_history(operators: list[QCAddHistory], merge_history: bool) -> list[QCAddHistory]:
+        if not merge_history:
+            return operators
+        by_source: dict[tuple[str, str, str, str], list[QCAddHistory]] = {}
+        for op in operators:
+            by_source.setdefault(op.source, []).append(op)
+        merged = []
+        for source, ops in by_source.items():
+            if len(ops) == 1:
+                merged.append(ops[0])
+            else:
+                merged.append(QCAddHistory(
+                    '\n'.join(x.value for x in ops),
+                    *source,
+                    change_time=max(x.change_time for x in ops)
+                ))
+        return merged
+
+    def apply(self, record: ocproc2.ParentRecord, working_record=None):
+        # Set operations never add or remove records, so each record is only looked up once
+        records: dict[tuple[str, ...], t.Any] = {(): record}
+        for record_path, element_path, new_value in self._set_values:
+            if record_path not in records:
+                records[record_path] = record.find_child(list(record_path))
+            target = records[record_path]
+            if target is not None:
+                v = target.find_child(list(element_path))
+                if isinstance(v, SingleElement):
+                    v.value = new_value
+                    continue
+                # TODO: multi-element?
+                parent = target.find_child(list(element_path[:-1]))
+                if isinstance(parent, ElementMap):
+                    parent[element_path[-1]] = new_value
+                    continue
+            raise ValueError(f'cannot find a value to set at [{"/".join(record_path + element_path)}]')
+        for op in self._history:
+            op.apply(record, working_record)
@@ -115,6 +115,19 @@ class BaseRecord:
             map_['_subrecords'] = sm
         return map_
 
+    def shallow_mapping(self) -> dict[str, t.Any]:
+        """Like to_mapping(), but the elements and subrecords are left for the JSON encoder to export."""
+        map_ = {}
+        if self._metadata:
+            map_['_metadata'] = self._metadata
+        if self._parameters:
+            map_['_parameters'] = self._parameters
+        if self._coordinates:
+            map_['_coordinates'] = self._coordinates
+        if self._subrecords is not None and self._subrecords.record_sets:
+            map_['_subrecords'] = self._subrecords
+        return map_
+
     def from_mapping(self, map_: BaseExport):
         if '_metadata' in map_:
             self.metadata.from_mapping(map_['_metadata'])
@@ -168,6 +181,14 @@ class ParentRecord(BaseRecord):
             map_['_qc_tests'] = self.qc_tests.to_mapping()
         return map_
 
+    def shallow_mapping(self) -> dict[str, t.Any]:
+        map_ = super().shallow_mapping()
+        if self.history:
+            map_['_history'] = self.history
+        if self.qc_tests:
+            map_['_qc_tests'] = self.qc_tests
+        return map_
+
     def from_mapping(self, map_: ParentExport):
         super().from_mapping(map_)
         if '_history' in map_:
@@ -304,6 +325,17 @@ class RecordSet:
                 '_records': self.records.to_mapping()
             }
 
+    def shallow_mapping(self) -> dict[str, t.Any]:
+        """Like to_mapping(), but the records are left for the JSON encoder to export."""
+        if self._metadata:
+            return {
+                '_records': self.records,
+                '_metadata': self._metadata
+            }
+        return {
+            '_records': self.records
+        }
+
     def from_mapping(self, map_: RecordSetExport):
         try:
             self.records.from_mapping(map_['_records'])
@@ -341,6 +373,9 @@ class RecordMap:
     def __contains__(self, key: str):
         return key in self.record_sets
 
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self.record_sets)
+
     def iter_subrecords(self, srt: t.Optional[str] = None) -> t.Iterable[BaseRecord]:
         if srt is not None:
             try:
@@ -396,6 +431,13 @@ class RecordMap:
         }
         return mapping
 
+    def shallow_mapping(self) -> dict[str, dict[str, RecordSet]]:
+        """Like to_mapping(), but the record sets are left for the JSON encoder to export."""
+        return {
+            x: {str(y): self.record_sets[x][y] for y in self.record_sets[x]}
+            for x in self.record_sets
+        }
+
     def from_mapping(self, map_):
         for x in map_:
             self.record_sets[x] = {}
@@ -0,0 +1,160 @@
+"""On-demand profiling of a running process.
+
+    Two kinds of profiles are supported:
+
+    - StackSampler samples the stack of one thread at a fixed interval for a number of seconds
+      and writes the samples as collapsed stacks (one line per distinct stack, frames from the
+      outermost in, separated by semicolons and followed by the number of samples), which most
+      flame graph tools can read. The overhead is one stack walk per interval, so it can run
+      against a live worker.
+    - CProfileSession runs cProfile around the next K calls of a function (e.g. processing a
+      payload) and writes the combined statistics in pstats format.
+
+    ProfileRequest carries a request to start one of these from the controller to a worker. It
+    can be backed by shared memory (e.g. a multiprocessing Array) so the controller can set it
+    for a worker running in another process.
+"""
+import collections
+import contextlib
+import cProfile
+import pathlib
+import sys
+import threading
+import time
+import typing as t
+
+import zrlog
+
+
+class _LocalBuffer:
+
+    def __init__(self):
+        self.value = b''
+
+
+class ProfileRequest:
+    """A request to profile a worker, written by the controller and read by the worker."""
+
+    MODES = ('sample', 'cprofile')
+
+    def __init__(self, buffer: t.Optional[t.Any] = None):
+        # Anything with a bytes value attribute works (e.g. multiprocessing.Array('c', 64))
+        self._buffer = buffer if buffer is not None else _LocalBuffer()
+        self._last_seen: t.Optional[bytes] = None
+
+    def set(self, mode: str, amount: float):
+        """Request a profile: sample for amount seconds, or cProfile the next amount calls."""
+        if mode not in ProfileRequest.MODES:
+            raise ValueError(f'Invalid profile mode [{mode}]')
+        if amount <= 0:
+            raise ValueError('Profile amount must be positive')
+        # A fresh timestamp makes repeated identical requests distinct
+        self._buffer.value = f'{time.time_ns()}:{mode}:{amount}'.encode('ascii')
+
+    def take(self) -> t.Optional[tuple[str, float]]:
+        """Get a request that hasn't been seen yet, if there is one."""
+        value = self._buffer.value
+        if not value or value == self._last_seen:
+            return None
+        self._last_seen = value
+        _, mode, amount = value.decode('ascii').split(':')
+        return mode, float(amount)
+
+
+class StackSampler:
+    """Samples the stack of a thread in a background thread."""
+
+    def __init__(self, output_file: pathlib.Path, thread_id: t.Optional[int] = None, interval: float = 0.005):
+        self.output_file = output_file
+        self._thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._interval = interval
+        self._samples: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+        self._log = zrlog.get_logger('medsutil.profiling')
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self._samples.values())
+
+    def start(self, duration: float):
+        self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True, name='stack-sampler')
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling early (the samples so far are still written)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, duration: float):
+        end_time = time.monotonic() + duration
+        while time.monotonic() < end_time and not self._stop.is_set():
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                break
+            self._samples[StackSampler.collapse(frame)] += 1
+            del frame
+            self._stop.wait(self._interval)
+        try:
+            self.write()
+            self._log.info('Wrote %s stack samples to [%s]', self.sample_count, self.output_file)
+        except OSError:
+            self._log.exception('Could not write stack samples to [%s]', self.output_file)
+
+    def write(self):
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.output_file, 'w', encoding='utf-8') as h:
+            for stack, count in self._samples.most_common():
+                h.write(f'{stack} {count}\n')
+
+    @staticmethod
+    def collapse(frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f'{code.co_qualname} ({pathlib.Path(code.co_filename).name}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(parts))
+
+
+class CProfileSession:
+    """Runs cProfile around a fixed number of calls."""
+
+    def __init__(self, output_file: pathlib.Path, calls: int):
+        self.output_file = output_file
+        self._remaining = max(1, calls)
+        self._profile = cProfile.Profile()
+        self._log = zrlog.get_logger('medsutil.profiling')
+
+    @property
+    def is_done(self) -> bool:
+        return self._remaining <= 0
+
+    @contextlib.contextmanager
+    def profile(self):
+        """Profile the code in the context; the stats are written after the last call."""
+        if self.is_done:
+            yield
+            return
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self._remaining -= 1
+            if self.is_done:
+                self.write()
+
+    def write(self):
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._profile.dump_stats(self.output_file)
+            self._log.info('Wrote profile to [%s]', self.output_file)
+        except (OSError, TypeError):
+            # cProfile raises TypeError when nothing was profiled
+            self._log.exception('Could not write profile to [%s]', self.output_file)
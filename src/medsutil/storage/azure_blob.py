@@ -311,6 +311,26 @@ class AzureBlobHandle(_AzureBaseHandle):
             walker.cleanup()
             del walker
 
+    @wrap_azure_errors
+    def _walk_files(self, recursive: bool = True) -> t.Iterable[tuple[str, str, StatResult]]:
+        from medsutil.awaretime import AwareDateTime
+        full_name = self.full_name()
+        # Blob listings are flat and already include the properties, so no need to build the tree
+        with self.container_client() as client:
+            for bp in self._halt_flag.iterate(client.list_blobs(name_starts_with=full_name)):
+                dir_list = bp.name[len(full_name):].strip('/').split('/')
+                file_name = dir_list.pop(-1)
+                if dir_list and not recursive:
+                    continue
+                yield ''.join([full_name, *(f'/{x}' for x in dir_list)]), file_name, StatResult(
+                    exists=True,
+                    is_file=True,
+                    is_dir=False,
+                    st_size=bp.size,
+                    st_mtime=AwareDateTime.from_datetime(bp.last_modified, 'Etc/UTC') if bp.last_modified is not None else None,
+                    etag=getattr(bp, 'etag', None),
+                )
+
     @wrap_azure_errors
     def _set_metadata(self, metadata: dict[str, str]):
         with self.client() as client:
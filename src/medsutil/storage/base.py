@@ -21,6 +21,9 @@ import medsutil.types as ct
 from medsutil.storage import StorageTier, interface
 from medsutil.storage.interface import StatResult, StorageError, FeatureFlag
 
+if t.TYPE_CHECKING:
+    from medsutil.storage.listing import ListingCache
+
 
 def _convert_local_error(ex):
     if isinstance(ex, NotADirectoryError):
@@ -278,6 +281,34 @@ class BaseStorageHandle(CachedObjectMixin, interface.FilePath, abc.ABC):
         with self.open('rb') as h:
             return h.read()
 
+    @contextmanager
+    def memory_view(self) -> t.Generator[memoryview | None]:
+        """Map the file into memory and yield a read-only memoryview over it.
+
+            None is yielded instead if the handle can't be memory-mapped (e.g. remote files). The
+            view (and any slice of it) must not be used after the context exits.
+        """
+        if not self.supports_feature(FeatureFlag.MEMORY_MAP):
+            yield None
+        else:
+            with self._memory_view() as view:
+                yield view
+
+    @contextmanager
+    def _memory_view(self) -> t.Generator[memoryview]:
+        raise NotImplementedError  # pragma: no coverage
+        yield
+
+    @contextmanager
+    def read_content(self, buffer_size: int | None = None) -> t.Generator[ct.ByteStrings]:
+        """Yield the content of the file, as a single memoryview if possible or as a stream of chunks otherwise."""
+        with self.memory_view() as view:
+            if view is not None:
+                self._log.trace('Reading [%s] from a memory map', self._path)
+                yield view,
+            else:
+                yield self.streaming_read(buffer_size)
+
     def download(self, destination: pathlib.Path, allow_overwrite: bool = False, buffer_size: int | None = None):
         """Download the file to the given local path."""
         if (not allow_overwrite) and destination.exists():
@@ -458,6 +489,40 @@ class BaseStorageHandle(CachedObjectMixin, interface.FilePath, abc.ABC):
             if not recursive:
                 break
 
+    def search_changes(self, listing_cache: ListingCache, pattern: t.Optional[str] = None, recursive: bool = True, case_sensitive: bool = False) -> t.Iterable[tuple[t.Self, StatResult]]:
+        """Find all files that match the given pattern and are new or changed since the listing cache was last committed.
+
+            The stat information from the listing is returned with each file so that callers do not need
+            to make another call per file. The caller is responsible for committing the listing cache once
+            the files have been handled.
+        """
+        self._log.trace("Searching for changed files matching [%s] in [%s][%s]", pattern, self._path, recursive)
+        if pattern is not None and not case_sensitive:
+            pattern = pattern.lower()
+        for dir_name, file_name, stat in self.walk_files(recursive):
+            if not dir_name.endswith('/'):
+                dir_name += '/'
+            listing_cache.visit(dir_name)
+            if pattern is not None and not fnmatch.fnmatchcase(file_name if case_sensitive else file_name.lower(), pattern):
+                continue
+            if listing_cache.has_changed(dir_name, file_name, stat):
+                yield self.from_absolute_path(dir_name + file_name, as_dir=False), stat
+
+    def walk_files(self, recursive: bool = True) -> t.Iterable[tuple[str, str, StatResult]]:
+        """Iterate over the files under this directory along with the stat information provided by the listing."""
+        if self.supports_feature(FeatureFlag.WALK):
+            yield from self._walk_files(recursive)
+        else:
+            self._log.trace("Walk not supported")
+
+    def _walk_files(self, recursive: bool = True) -> t.Iterable[tuple[str, str, StatResult]]:
+        # Fallback for storage systems whose listing doesn't provide any file details
+        for dir_name, _, file_names in self._walk():
+            for file_name in file_names:
+                yield dir_name, file_name, StatResult(exists=True, is_file=True, is_dir=False)
+            if not recursive:
+                break
+
     def _update_stat(self, **kwargs):
         # Don't build the cache if we don't need to.
         s = self._from_cache_only('stat')
@@ -349,6 +349,31 @@ class FTPHandle(UrlBaseHandle):
         for subd in dirs:
             yield from self._list_dir(ftp, dir_name + subd)
 
+    @ftplib_error_wrap_generator
+    def _walk_files(self, recursive: bool = True) -> t.Iterable[tuple[str, str, interface.StatResult]]:
+        if self.is_dir():
+            with self._connection() as ftp:
+                yield from self._list_dir_files(ftp, self._current_dir(), recursive)
+
+    def _list_dir_files(self, ftp, dir_name: str, recursive: bool):
+        dirs: list[str] = []
+        if not dir_name.endswith('/'):
+            dir_name = dir_name + '/'
+        for name, file_info in ftp.list_dir(dir_name, ['type', 'size', 'modify']):
+            if file_info['type'] == 'dir':
+                dirs.append(name)
+            else:
+                yield dir_name, name, interface.StatResult(
+                    st_size=int(file_info['size']) if 'size' in file_info else None,
+                    st_mtime=self._build_modified_time(file_info),
+                    exists=True,
+                    is_dir=False,
+                    is_file=True,
+                )
+        if recursive:
+            for subd in dirs:
+                yield from self._list_dir_files(ftp, dir_name + subd, recursive)
+
     @ftplib_error_wrap
     def _mkdir(self, mode: int = 0o777):
         with self._connection() as ftp:
@@ -8,6 +8,9 @@ from medsutil.awaretime import AwareDateTime
 from medsutil.exceptions import CodedError
 import medsutil.types as ct
 
+if t.TYPE_CHECKING:
+    from medsutil.storage.listing import ListingCache
+
 
 
 class StorageTier(enum.Enum):
@@ -29,6 +32,7 @@ class StatResult:
     is_dir: bool | None = None
     is_file: bool | None = None
     exists: bool = False
+    etag: str | None = None
 
 
 class StorageError(CodedError, OSError): CODE_SPACE = 'STORAGE'
@@ -44,6 +48,7 @@ class FeatureFlag(enum.IntFlag):
     REMOVAL = 64
     CHMOD = 128
     CREATED_TIME = 256
+    MEMORY_MAP = 512
     DEFAULT = FOLDERS | MODIFIED_TIME | SIZE | WALK | REMOVAL
 
 
@@ -109,6 +114,9 @@ class FilePath(t.Protocol):
              buffering: t.Optional[int] = None) -> t.ContextManager[ct.SupportsBinaryRead | ct.SupportsBinaryWrite]: ...
 
     def read_bytes(self) -> bytes: ...
+    def memory_view(self) -> t.ContextManager[memoryview | None]: ...
+    def read_content(self, buffer_size: int | None = None) -> t.ContextManager[ct.ByteStrings]: ...
+    def streaming_read(self, buffer_size: int | None = None) -> ct.ByteStrings: ...
     def write_bytes(self, b: bytes): ...
 
     def supports_feature(self, ff: FeatureFlag) -> bool: ...
@@ -145,6 +153,8 @@ class FilePath(t.Protocol):
     def search(self, pattern: t.Optional[str] = None, recursive: bool = True, case_sensitive: bool = False, path_types: PathType = PathType.BOTH) -> t.Iterable[t.Self]: ...
     def iterdir(self, recursive: bool = True, path_types: PathType = PathType.BOTH) -> t.Iterable[t.Self]: ...
     def walk(self) -> t.Iterable[tuple[str, list[str], list[str]]]: ...
+    def walk_files(self, recursive: bool = True) -> t.Iterable[tuple[str, str, StatResult]]: ...
+    def search_changes(self, listing_cache: ListingCache, pattern: t.Optional[str] = None, recursive: bool = True, case_sensitive: bool = False) -> t.Iterable[tuple[t.Self, StatResult]]: ...
 
     def set_metadata(self, metadata: dict[str, str]): ...
     def get_metadata(self) -> dict[str, str]: ...
@@ -0,0 +1,104 @@
+"""Persistent directory listing snapshots for change detection.
+
+    A ListingCache remembers, for each directory visited during a walk, a fingerprint
+    of every file that was seen (the modified time, size and ETag, as far as the
+    storage system reports them in its listing). On the next walk, only files that
+    are new or whose fingerprint has changed are reported, which lets scanners skip
+    per-file lookups for the (usually much larger) set of files they have already seen.
+
+    Changes are staged as they are detected and only written to the snapshot when
+    commit() is called, so a walk that fails part of the way through will report the
+    same files again on the next attempt.
+"""
+import json
+import os
+import pathlib
+import typing as t
+
+import zrlog
+
+from medsutil.storage.interface import StatResult
+
+type Fingerprint = list[str | int | None]
+
+
+class ListingCache:
+    """Directory listing snapshots, optionally persisted to a local JSON file."""
+
+    def __init__(self, cache_file: t.Optional[pathlib.Path | str] = None):
+        self._cache_file = pathlib.Path(cache_file) if cache_file is not None else None
+        self._snapshots: dict[str, dict[str, Fingerprint]] = {}
+        self._pending: dict[str, dict[str, Fingerprint]] = {}
+        self._log = zrlog.get_logger('storage_listing')
+        self.load()
+
+    def load(self):
+        """Load the snapshots from the cache file, if there is one."""
+        self._snapshots = {}
+        self._pending = {}
+        if self._cache_file is None or not self._cache_file.exists():
+            return
+        try:
+            with open(self._cache_file, 'r', encoding='utf-8') as h:
+                data = json.load(h)
+            if isinstance(data, dict):
+                self._snapshots = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except (OSError, ValueError):
+            # A corrupt cache only costs us a full scan, so start over
+            self._log.warning('Could not load listing cache [%s], starting fresh', self._cache_file, exc_info=True)
+
+    def save(self):
+        """Write the snapshots to the cache file, if there is one."""
+        if self._cache_file is None:
+            return
+        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self._cache_file.with_name(f'{self._cache_file.name}.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as h:
+            json.dump(self._snapshots, h)
+        os.replace(temp_file, self._cache_file)
+
+    @staticmethod
+    def fingerprint(stat: StatResult) -> Fingerprint:
+        """Build the fingerprint used to detect a changed file."""
+        return [
+            stat.st_mtime.isoformat() if stat.st_mtime is not None else None,
+            stat.st_size,
+            stat.etag
+        ]
+
+    def has_changed(self, dir_name: str, file_name: str, stat: StatResult) -> bool:
+        """Stage the file for the next snapshot and check if it is new or different from the last one."""
+        fp = ListingCache.fingerprint(stat)
+        if dir_name not in self._pending:
+            self._pending[dir_name] = {}
+        self._pending[dir_name][file_name] = fp
+        previous = self._snapshots.get(dir_name)
+        return previous is None or previous.get(file_name) != fp
+
+    def visit(self, dir_name: str):
+        """Note that a directory was listed, even if it had no files in it."""
+        if dir_name not in self._pending:
+            self._pending[dir_name] = {}
+
+    def commit(self, prune: bool = False):
+        """Replace the snapshots of every directory listed since the last commit and save them.
+
+            If prune is set, snapshots of directories that were not listed are removed. This
+            should only be used after a complete walk of everything the cache covers.
+        """
+        if prune:
+            self._snapshots = self._pending
+        else:
+            self._snapshots.update(self._pending)
+        self._pending = {}
+        self.save()
+
+    def discard(self):
+        """Throw away the changes staged since the last commit."""
+        self._pending = {}
+
+    def __contains__(self, dir_name: str) -> bool:
+        return dir_name in self._snapshots
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
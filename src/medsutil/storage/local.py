@@ -1,7 +1,10 @@
 """Local file handle"""
+import mmap
+import os
 import pathlib
 import typing as t
 import shutil
+from contextlib import contextmanager
 
 from medsutil.awaretime import AwareDateTime
 from medsutil.storage.base import BaseStorageHandle, local_file_error_wrap, local_file_generator_error_wrap
@@ -32,7 +35,7 @@ class LocalHandle(BaseStorageHandle):
         super().__init__(
             path,
             force_is_dir,
-            supports=FeatureFlag.DEFAULT | FeatureFlag.CHMOD | FeatureFlag.CREATED_TIME,
+            supports=FeatureFlag.DEFAULT | FeatureFlag.CHMOD | FeatureFlag.CREATED_TIME | FeatureFlag.MEMORY_MAP,
             log_name='local',
             **kwargs
         )
@@ -46,18 +49,21 @@ class LocalHandle(BaseStorageHandle):
         """Retrieve the stat information about the file handle."""
         p = self.pathlib_path
         try:
-            s = p.stat()
-            return StatResult(
-                exists=True,
-                is_dir=stat.S_ISDIR(s.st_mode),
-                is_file=stat.S_ISREG(s.st_mode),
-                st_size=s.st_size,
-                st_ctime=AwareDateTime.fromtimestamp(s.st_birthtime,) if hasattr(s, 'st_birthtime') and s.st_birthtime is not None else None,
-                st_mtime=AwareDateTime.fromtimestamp(s.st_mtime) if s.st_mtime is not None else None
-            )
+            return self._build_stat(p.stat())
         except FileNotFoundError:
             return StatResult(exists=False)
 
+    @staticmethod
+    def _build_stat(s: os.stat_result) -> StatResult:
+        return StatResult(
+            exists=True,
+            is_dir=stat.S_ISDIR(s.st_mode),
+            is_file=stat.S_ISREG(s.st_mode),
+            st_size=s.st_size,
+            st_ctime=AwareDateTime.fromtimestamp(s.st_birthtime,) if hasattr(s, 'st_birthtime') and s.st_birthtime is not None else None,
+            st_mtime=AwareDateTime.fromtimestamp(s.st_mtime) if s.st_mtime is not None else None
+        )
+
     @local_file_error_wrap
     def _streaming_write(self, chunks: t.Iterable[bytes], **kwargs):
         self._halt_flag.write_all(self._path, chunks)
@@ -74,6 +80,34 @@ class LocalHandle(BaseStorageHandle):
         with open(self._path, 'rb') as h:
             yield from self._halt_flag.read_all(h, buffer_size)
 
+    @contextmanager
+    def _memory_view(self) -> t.Generator[memoryview]:
+        h, mapped = self._open_memory_map()
+        view = memoryview(mapped) if mapped is not None else memoryview(b'')
+        try:
+            yield view
+        finally:
+            view.release()
+            if mapped is not None:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # A slice of the view is still in use; the map is closed once it is garbage collected.
+                    self._log.trace('Memory map of [%s] still in use, leaving it open', self._path)
+            h.close()
+
+    @local_file_error_wrap
+    def _open_memory_map(self) -> tuple[t.BinaryIO, mmap.mmap | None]:
+        h = open(self._path, 'rb')
+        try:
+            # Empty files can't be mapped
+            if os.fstat(h.fileno()).st_size == 0:
+                return h, None
+            return h, mmap.mmap(h.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            h.close()
+            raise
+
     @local_file_error_wrap
     def _complete_download(self, local_path: pathlib.Path):
         shutil.copystat(self._path, local_path)
@@ -130,6 +164,19 @@ class LocalHandle(BaseStorageHandle):
             subd = self.subdir(dir_)
             yield from subd._walk()
 
+    @local_file_generator_error_wrap
+    def _walk_files(self, recursive: bool = True) -> t.Iterable[tuple[str, str, StatResult]]:
+        work = [self._path]
+        while work:
+            dir_name = work.pop()
+            with os.scandir(dir_name) as entries:
+                for entry in self._halt_flag.iterate(entries):
+                    if entry.is_dir():
+                        if recursive:
+                            work.append(f"{dir_name.rstrip('/')}/{entry.name}")
+                    else:
+                        yield dir_name, entry.name, self._build_stat(entry.stat())
+
     @local_file_error_wrap
     def _touch(self, mode: int = 0o666):
         self.pathlib_path.touch(mode)
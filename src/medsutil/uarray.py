@@ -0,0 +1,274 @@
+""" Arrays of numbers with uncertainty, propagated with NumPy instead of one value at a time.
+
+    An UncertainArray keeps its nominal values and, for every independent source of error it
+    depends on, the partial derivatives with respect to that source. A source is a vector of
+    independent errors (e.g. the uncertainty of each level of a profile), and each term of the
+    Jacobian is stored as a (coefficient, source index) pair of arrays, so the Jacobian stays
+    sparse: an element-wise operation on two profiles only carries one term per source. The
+    last axis of a term lists distinct errors that all contribute to the same value (as after
+    a sum).
+
+    Correlations between values that come from the same source are kept, so x - x has no
+    uncertainty and differences between adjacent levels (x[1:] - x[:-1]) are handled exactly.
+    A UFloat used directly in an operation keeps its own error sources, so it stays correlated
+    with itself; values converted with from_values() (AccurateDecimal, UFloat, or anything with
+    nominal_value and std_dev) are treated as independent of each other.
+"""
+import decimal
+import itertools
+import math
+import typing as t
+
+import numpy as np
+import numpy.typing as npt
+
+from medsutil.adecimal import AccurateDecimal
+
+if t.TYPE_CHECKING:
+    from uncertainties import UFloat
+
+type _Term = tuple[npt.NDArray[np.float64], npt.NDArray[np.intp]]
+type _Terms = dict[t.Hashable, list[_Term]]
+
+_source_ids = itertools.count(1)
+
+
+class UncertainArray:
+
+    __array_priority__ = 100
+
+    def __init__(self,
+                 nominal: npt.ArrayLike,
+                 terms: t.Optional[_Terms] = None,
+                 sources: t.Optional[dict[t.Hashable, npt.NDArray[np.float64]]] = None,
+                 units: t.Optional[str] = None):
+        self._nominal: npt.NDArray[np.float64] = np.asarray(nominal, dtype=np.float64)
+        if self._nominal.ndim > 1:
+            raise ValueError('UncertainArray only supports one-dimensional arrays')
+        self._terms: _Terms = terms or {}
+        self._sources: dict[t.Hashable, npt.NDArray[np.float64]] = sources or {}
+        self._std_dev: t.Optional[npt.NDArray[np.float64]] = None
+        self.units = units
+
+    @staticmethod
+    def from_arrays(nominal: npt.ArrayLike, std_dev: npt.ArrayLike | float | None = None, units: t.Optional[str] = None) -> UncertainArray:
+        """ Build an array whose values each have their own independent error. """
+        nominal = np.asarray(nominal, dtype=np.float64)
+        if std_dev is None:
+            return UncertainArray(nominal, units=units)
+        std_dev = np.broadcast_to(np.asarray(std_dev, dtype=np.float64), nominal.shape)
+        if nominal.ndim == 0:
+            index = np.zeros((1,), dtype=np.intp)
+            std_dev = std_dev.reshape(1)
+        else:
+            index = np.arange(nominal.shape[0], dtype=np.intp)[:, None]
+        source_id = next(_source_ids)
+        return UncertainArray(
+            nominal,
+            {source_id: [(np.ones(index.shape, dtype=np.float64), index)]},
+            {source_id: np.array(std_dev, dtype=np.float64)},
+            units=units
+        )
+
+    @staticmethod
+    def from_values(values: t.Iterable[t.Any], units: t.Optional[str] = None) -> UncertainArray:
+        """ Build an array from scalars, with or without uncertainty. None is converted to NaN. """
+        nominal, std_dev = [], []
+        for value in values:
+            n, s = _split_scalar(value)
+            nominal.append(n)
+            std_dev.append(s)
+        return UncertainArray.from_arrays(nominal, std_dev, units)
+
+    def __len__(self) -> int:
+        return self._nominal.shape[0] if self._nominal.ndim > 0 else 1
+
+    def __repr__(self):
+        return f"<UncertainArray:{self._nominal!r} [sigma:{self.std_dev!r}] {self.units}>"
+
+    @property
+    def nominal_value(self) -> npt.NDArray[np.float64]:
+        return self._nominal
+
+    @property
+    def std_dev(self) -> npt.NDArray[np.float64]:
+        if self._std_dev is None:
+            variance = np.zeros(self._nominal.shape, dtype=np.float64)
+            for source_id, terms in self._terms.items():
+                sigma = self._sources[source_id]
+                scaled = [(coeff * sigma[index], index) for coeff, index in terms]
+                for idx, (value, index) in enumerate(scaled):
+                    variance += np.sum(value * value, axis=-1)
+                    # Two terms only add up where they point at the same error
+                    for value2, index2 in scaled[idx + 1:]:
+                        same = index[..., :, None] == index2[..., None, :]
+                        variance += 2 * np.sum(np.where(same, value[..., :, None] * value2[..., None, :], 0), axis=(-2, -1))
+            self._std_dev = np.sqrt(variance)
+        return self._std_dev
+
+    def to_ufloats(self) -> list[UFloat]:
+        """ Convert to UFloat values (correlations between the values are not kept). """
+        from uncertainties import ufloat
+        return [ufloat(n, s) for n, s in zip(np.atleast_1d(self._nominal).tolist(), np.atleast_1d(self.std_dev).tolist())]
+
+    def to_accurate_decimals(self) -> list[AccurateDecimal]:
+        """ Convert to AccurateDecimal values (correlations between the values are not kept). """
+        return [AccurateDecimal(repr(n), repr(s)) for n, s in zip(np.atleast_1d(self._nominal).tolist(), np.atleast_1d(self.std_dev).tolist())]
+
+    def __getitem__(self, key) -> UncertainArray:
+        return UncertainArray(
+            self._nominal[key],
+            {
+                source_id: [(coeff[key], index[key]) for coeff, index in terms]
+                for source_id, terms in self._terms.items()
+            },
+            self._sources,
+            units=self.units
+        )
+
+    def sum(self) -> UncertainArray:
+        return self._reduce(np.ones(self._nominal.shape, dtype=np.float64), float(np.sum(self._nominal)))
+
+    def mean(self) -> UncertainArray:
+        n = len(self)
+        return self._reduce(np.full(self._nominal.shape, 1 / n, dtype=np.float64), float(np.mean(self._nominal)))
+
+    def _reduce(self, weights: npt.NDArray[np.float64], nominal: float) -> UncertainArray:
+        # Coefficients that point at the same error are summed first, so they stay correlated
+        terms = {}
+        for source_id, source_terms in self._terms.items():
+            coefficients = np.zeros(self._sources[source_id].shape, dtype=np.float64)
+            for coeff, index in source_terms:
+                np.add.at(coefficients, index, weights[..., None] * coeff)
+            used = np.flatnonzero(coefficients)
+            terms[source_id] = [(coefficients[used], used.astype(np.intp))]
+        return UncertainArray(nominal, terms, self._sources, units=self.units)
+
+    def apply(self, nominal: npt.ArrayLike, derivative: npt.ArrayLike, units: t.Optional[str] = None) -> UncertainArray:
+        """ Build the result of a function of this array from its values and its derivative. """
+        return _combine(nominal, ((self, derivative),), units)
+
+    def __neg__(self) -> UncertainArray:
+        return self.apply(-self._nominal, -1.0, self.units)
+
+    def __pos__(self) -> UncertainArray:
+        return self
+
+    def __abs__(self) -> UncertainArray:
+        return self.apply(np.abs(self._nominal), np.where(self._nominal < 0, -1.0, 1.0), self.units)
+
+    def __add__(self, other) -> UncertainArray:
+        other = _as_uncertain_array(other)
+        return _combine(self._nominal + other._nominal, ((self, 1.0), (other, 1.0)), self.units)
+
+    def __radd__(self, other) -> UncertainArray:
+        return self.__add__(other)
+
+    def __sub__(self, other) -> UncertainArray:
+        other = _as_uncertain_array(other)
+        return _combine(self._nominal - other._nominal, ((self, 1.0), (other, -1.0)), self.units)
+
+    def __rsub__(self, other) -> UncertainArray:
+        return _as_uncertain_array(other).__sub__(self)
+
+    def __mul__(self, other) -> UncertainArray:
+        other = _as_uncertain_array(other)
+        return _combine(self._nominal * other._nominal, ((self, other._nominal), (other, self._nominal)), None)
+
+    def __rmul__(self, other) -> UncertainArray:
+        return self.__mul__(other)
+
+    def __truediv__(self, other) -> UncertainArray:
+        other = _as_uncertain_array(other)
+        return _combine(
+            self._nominal / other._nominal,
+            ((self, 1 / other._nominal), (other, -self._nominal / (other._nominal * other._nominal))),
+            None
+        )
+
+    def __rtruediv__(self, other) -> UncertainArray:
+        return _as_uncertain_array(other).__truediv__(self)
+
+    def __pow__(self, power: float | int) -> UncertainArray:
+        if not isinstance(power, (int, float)):
+            return NotImplemented
+        return self.apply(self._nominal ** power, power * self._nominal ** (power - 1))
+
+    def sqrt(self) -> UncertainArray:
+        # The derivative is undefined at zero, where the uncertainty is left out
+        result = np.sqrt(self._nominal)
+        return self.apply(result, np.divide(0.5, result, out=np.zeros_like(result), where=result > 0))
+
+    def exp(self) -> UncertainArray:
+        result = np.exp(self._nominal)
+        return self.apply(result, result)
+
+    def log(self) -> UncertainArray:
+        return self.apply(np.log(self._nominal), 1 / self._nominal)
+
+    def sin(self) -> UncertainArray:
+        return self.apply(np.sin(self._nominal), np.cos(self._nominal))
+
+    def cos(self) -> UncertainArray:
+        return self.apply(np.cos(self._nominal), -np.sin(self._nominal))
+
+    def arcsin(self) -> UncertainArray:
+        return self.apply(np.arcsin(self._nominal), 1 / np.sqrt(1 - self._nominal * self._nominal))
+
+    def radians(self) -> UncertainArray:
+        return self.apply(np.radians(self._nominal), math.pi / 180, 'rad')
+
+    def degrees(self) -> UncertainArray:
+        return self.apply(np.degrees(self._nominal), 180 / math.pi, '°')
+
+
+def _split_scalar(value: t.Any) -> tuple[float, float]:
+    if value is None:
+        return math.nan, 0.0
+    if isinstance(value, AccurateDecimal):
+        return float(value.num), float(value.std_dev)
+    if hasattr(value, 'nominal_value') and hasattr(value, 'std_dev'):
+        return float(value.nominal_value), float(value.std_dev or 0)
+    if isinstance(value, (int, float, decimal.Decimal, np.number)):
+        return float(value), 0.0
+    raise TypeError(f'Cannot convert [{value.__class__.__name__}] to an uncertain number')
+
+
+def _as_uncertain_array(value: t.Any) -> UncertainArray:
+    if isinstance(value, UncertainArray):
+        return value
+    if isinstance(value, np.ndarray):
+        return UncertainArray(value)
+    if hasattr(value, 'derivatives') and hasattr(value, 'nominal_value'):
+        # UFloat: its variables are used as the error sources, so that it stays correlated
+        # with itself (and with anything else derived from the same variables)
+        index = np.zeros((1,), dtype=np.intp)
+        return UncertainArray(
+            value.nominal_value,
+            {variable: [(np.array([derivative], dtype=np.float64), index)] for variable, derivative in value.derivatives.items()},
+            {variable: np.array([variable.std_dev], dtype=np.float64) for variable in value.derivatives}
+        )
+    nominal, std_dev = _split_scalar(value)
+    return UncertainArray.from_arrays(nominal, std_dev if std_dev else None)
+
+
+def _combine(nominal: npt.ArrayLike, parts: t.Iterable[tuple[UncertainArray, npt.ArrayLike]], units: t.Optional[str]) -> UncertainArray:
+    nominal = np.asarray(nominal, dtype=np.float64)
+    terms: _Terms = {}
+    sources = {}
+    for array, derivative in parts:
+        derivative = np.broadcast_to(np.asarray(derivative, dtype=np.float64), nominal.shape)
+        sources.update(array._sources)
+        for source_id, source_terms in array._terms.items():
+            merged = terms.setdefault(source_id, [])
+            for coeff, index in source_terms:
+                term_shape = nominal.shape + index.shape[-1:]
+                new_coeff = derivative[..., None] * np.broadcast_to(coeff, term_shape)
+                new_index = np.broadcast_to(index, term_shape)
+                for idx, (coeff2, index2) in enumerate(merged):
+                    if np.array_equal(index2, new_index):
+                        merged[idx] = (coeff2 + new_coeff, index2)
+                        break
+                else:
+                    merged.append((new_coeff, new_index))
+    return UncertainArray(nominal, terms, sources, units=units)
@@ -2,6 +2,7 @@
     to support the NODB."""
 import contextlib
 import datetime
+import itertools
 import uuid
 import typing as t
 
@@ -26,6 +27,8 @@ from medsutil.awaretime import AwareDateTime
 
 _DEBUG_SQL_CALLS = False
 
+_DEFAULT_VALUE = pgext.AsIs('DEFAULT')
+
 if _DEBUG_SQL_CALLS:
     # This gives me some additional insight into the timing of SQL
     # Eventually I should make this a metric for key queries
@@ -156,6 +159,10 @@ class _PGCursor:
         else:
             self._cursor.execute(query, args)
 
+    def execute_values(self, query: str | pgs.Composable, rows: t.Sequence[t.Sequence], page_size: int = 100):
+        """Execute a query with a single %s placeholder for the VALUES list, page_size rows at a time."""
+        pge.execute_values(self._cursor, query, rows, page_size=page_size)
+
     def fetchone(self):
         """Fetch a single record"""
         return self._cursor.fetchone()
@@ -210,7 +217,9 @@ class PostgresController:
         self._is_closed = False
         self._log = zrlog.get_logger("cnodc.db")
         self._max_in_size = 32767
+        self._insert_page_size = 250
         self._stable_sort_columns = False
+        self._after_commit: list[t.Callable[[], t.Any]] = []
 
     def raw_cursor(self) -> _PGCursor:
         return self._cur_cls(self._conn.cursor(), self._conn)
@@ -228,11 +237,22 @@ class PostgresController:
     def commit(self):
         """Commit the transaction."""
         self._conn.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception as ex:
+                self._log.exception(f"Error in after commit callback: {ex.__class__.__name__}: {str(ex)}")
 
     @wrap_nodb_exceptions
     def rollback(self):
         """Rollback the transaction."""
         self._conn.rollback()
+        self._after_commit = []
+
+    def after_commit(self, callback: t.Callable[[], t.Any]):
+        """Call a function once the current transaction is committed (it is dropped if rolled back instead)."""
+        self._after_commit.append(callback)
 
     def close(self):
         """Close the connection"""
@@ -410,8 +430,12 @@ class PostgresController:
         return True
 
     @wrap_nodb_exceptions
-    def insert_object(self, obj: NODBObject) -> bool:
-        """Insert an object into its table."""
+    def insert_object(self, obj: NODBObject, ignore_conflicts: bool = False) -> bool:
+        """Insert an object into its table.
+
+            If ignore_conflicts is set, a row that violates a unique constraint is skipped
+            and False is returned instead of raising an error.
+        """
         primary_keys = list(obj.get_primary_keys())
         insert_statement = self.assemble_query(
             self.build_insert_statement(
@@ -421,12 +445,15 @@ class PostgresController:
                     for x in obj.modified_values
                 },
                 primary_keys,
-                self._stable_sort_columns
+                self._stable_sort_columns,
+                ignore_conflicts
             )
         )
         with self.cursor() as cur:
             cur.execute(insert_statement)
             row = cur.fetchone()
+            if row is None and ignore_conflicts:
+                return False
             if row is not None and row[0] is not None:
                 with obj.readonly_access():
                     for x in primary_keys:
@@ -503,6 +530,25 @@ class PostgresController:
                 res[row[1]][row[2]] = row[0]
         return res
 
+    @wrap_nodb_exceptions
+    def fetch_queue_backlog(self) -> dict[str, tuple[int, float]]:
+        """Get the number of items workers can fetch from each queue and the age (in seconds) of the oldest one.
+
+            This matches what next_queue_item() can return: unescalated items that are unlocked or whose
+            delayed release has passed. Delayed items are aged from their release date.
+        """
+        res = {}
+        with self.cursor() as cur:
+            cur.execute("""
+                SELECT queue_name, COUNT(*), EXTRACT(EPOCH FROM (NOW() - MIN(CASE WHEN status = 'DELAYED_RELEASE' THEN delay_release ELSE db_created_date END)))
+                FROM nodb_queues
+                WHERE escalation_level <= 0 AND (status = 'UNLOCKED' OR (status = 'DELAYED_RELEASE' AND delay_release <= CURRENT_TIMESTAMP(0)))
+                GROUP BY queue_name
+            """)
+            for row in cur.fetch_stream(25):
+                res[row[0]] = (int(row[1]), float(row[2] or 0))
+        return res
+
     @wrap_nodb_exceptions
     def fast_update_queue_status(self,
                                  queue_uuid: str,
@@ -545,6 +591,41 @@ class PostgresController:
             else:
                 return ScannedFileStatus.UNPROCESSED
 
+    @wrap_nodb_exceptions
+    def bulk_scanned_file_status(self, files: t.Sequence[tuple[str, datetime.datetime | None]]) -> dict[str, ScannedFileStatus]:
+        """Get the status of many scanned files, keyed by file path."""
+        results: dict[str, ScannedFileStatus] = {x[0]: ScannedFileStatus.NOT_PRESENT for x in files}
+        mod_times = {x[0]: x[1] for x in files}
+        with self.cursor() as cur:
+            for subset in self.batched(list(mod_times.keys())):
+                cur.execute("SELECT file_path, modified_date, was_processed, was_errored FROM nodb_scanned_files WHERE file_path = ANY(%s)", [subset])
+                for row in cur.fetch_stream():
+                    if row[1] != mod_times[row[0]]:
+                        continue
+                    elif bool(row[2]):
+                        results[row[0]] = ScannedFileStatus.PROCESSED
+                    elif bool(row[3]):
+                        results[row[0]] = ScannedFileStatus.ERRORED
+                    else:
+                        results[row[0]] = ScannedFileStatus.UNPROCESSED
+        return results
+
+    @wrap_nodb_exceptions
+    def bulk_note_scanned_files(self, files: t.Sequence[tuple[str, datetime.datetime | None]]) -> set[str]:
+        """Mark many scanned files as visited and return the file paths that were newly inserted."""
+        inserted = set()
+        with self.cursor() as cur:
+            for subset in self.batched(list(files)):
+                cur.execute(
+                    "INSERT INTO nodb_scanned_files (file_path, modified_date) SELECT * FROM unnest(%s::text[], %s::timestamptz[]) ON CONFLICT DO NOTHING RETURNING file_path",
+                    [
+                        [x[0] for x in subset],
+                        [x[1].isoformat() if x[1] is not None else None for x in subset]
+                    ]
+                )
+                inserted.update(row[0] for row in cur.fetch_stream())
+        return inserted
+
     @wrap_nodb_exceptions
     def note_scanned_file(self, file_path: str, mod_time: datetime.datetime | None = None):
         """Mark a scanned file as visited."""
@@ -615,6 +696,58 @@ class PostgresController:
                 specific_query = base_query + pgs.SQL("(" + ",".join('%s' for _ in range(0, len(subset))) + ")")
                 cur.execute(specific_query, [*subset])
 
+    @wrap_nodb_exceptions
+    def bulk_insert_objects(self, objs: t.Sequence[NODBObject], ignore_conflicts: bool = False):
+        """Insert many objects with one multi-row INSERT per table.
+
+            Primary keys are not read back, so they must be set on the objects beforehand.
+            Columns that were not set on an object are filled with their default value.
+            If ignore_conflicts is set, rows that violate a unique constraint are skipped.
+            The rows are sent in pages of at most _insert_page_size rows.
+        """
+        by_table: dict[str, list[NODBObject]] = {}
+        for obj in objs:
+            by_table.setdefault(obj.get_table_name(), []).append(obj)
+        with self.cursor() as cur:
+            for table_name, table_objs in by_table.items():
+                columns = list(set(itertools.chain.from_iterable(obj.modified_values for obj in table_objs)))
+                if not columns:
+                    continue
+                if self._stable_sort_columns:
+                    columns.sort()
+                query = self.assemble_query(
+                    pgs.SQL('INSERT INTO'),
+                    pgs.Identifier(table_name),
+                    pgs.SQL('(') + pgs.SQL(',').join(pgs.Identifier(x) for x in columns) + pgs.SQL(')'),
+                    pgs.SQL('VALUES %s'),
+                    pgs.SQL('ON CONFLICT DO NOTHING') if ignore_conflicts else ()
+                )
+                # Values are sent as parameters instead of being inlined in the query
+                cur.execute_values(query, [
+                    [obj.get_for_db(x) if x in obj.modified_values else _DEFAULT_VALUE for x in columns]
+                    for obj in table_objs
+                ], page_size=self._insert_page_size)
+        for obj in objs:
+            obj.is_new = False
+            obj.clear_modified()
+
+    @wrap_nodb_exceptions
+    def bulk_delete_objects(self, obj_cls: NODBObjectType, key_field: str, key_values: list[SupportsPostgres]):
+        """Delete every object whose key_field is in key_values."""
+        base_query = self.assemble_query(
+            self.build_delete_clause(obj_cls.get_table_name()),
+            (
+                pgs.SQL('WHERE'),
+                pgs.Identifier(key_field),
+                pgs.SQL('IN'),
+            )
+        )
+        with self.cursor() as cur:
+            for subset in self.batched(key_values):
+                # Untyped literals let Postgres coerce the values to the column type (e.g. UUID)
+                specific_query = base_query + pgs.SQL("(" + ",".join('%s' for _ in range(0, len(subset))) + ")")
+                cur.execute(specific_query, [*subset])
+
     def batched(self, values: list) -> t.Iterable[list]:
         """Separate a list of values into manageable lists for an IN clause."""
         x = 0
@@ -795,7 +928,7 @@ class PostgresController:
         )
 
     @staticmethod
-    def build_insert_statement(table: str, insert_values: dict[str, t.Any] = None, primary_keys: list[str] = None, stable_sort: bool = False) -> t.Iterable[pgs.Composable]:
+    def build_insert_statement(table: str, insert_values: dict[str, t.Any] = None, primary_keys: list[str] = None, stable_sort: bool = False, ignore_conflicts: bool = False) -> t.Iterable[pgs.Composable]:
         yield pgs.SQL('INSERT INTO')
         yield pgs.Identifier(table)
         if insert_values:
@@ -806,6 +939,8 @@ class PostgresController:
             yield pgs.SQL('VALUES (') + pgs.SQL(',').join(pgs.Literal(insert_values[x]) for x in keys) + pgs.SQL(')')
         else:
             yield pgs.SQL('DEFAULT VALUES')
+        if ignore_conflicts:
+            yield pgs.SQL('ON CONFLICT DO NOTHING')
         if primary_keys:
             if stable_sort:
                 primary_keys.sort()
@@ -848,13 +983,13 @@ class PostgresController:
                         suffix = pgs.SQL(')')
                     op = filters[key][1].strip().upper()
                     val = filters[key][0]
-                    if op == 'IN':
+                    if op in ('IN', 'NOT IN'):
                         yield pgs.Identifier(key)
-                        yield pgs.Identifier('IN')
+                        yield pgs.SQL(op)
                         yield pgs.Composed((
-                            pgs.Identifier('('),
+                            pgs.SQL('('),
                             pgs.SQL(',').join(pgs.Literal(v) for v in val),
-                            pgs.Identifier(')'),
+                            pgs.SQL(')'),
                             suffix
                         ))
                     else:
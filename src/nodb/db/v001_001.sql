@@ -0,0 +1,12 @@
+-- Quality-aware summary columns for observations
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS level_count INTEGER;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS min_time TIMESTAMPTZ;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS max_time TIMESTAMPTZ;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS parameter_summary JSONB;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS summary_version SMALLINT;
+
+CREATE INDEX IF NOT EXISTS nodb_obs_level_count ON nodb_obs(level_count) WHERE level_count IS NOT NULL;
+CREATE INDEX IF NOT EXISTS nodb_obs_min_time ON nodb_obs(min_time) WHERE min_time IS NOT NULL;
+CREATE INDEX IF NOT EXISTS nodb_obs_max_time ON nodb_obs(max_time) WHERE max_time IS NOT NULL;
+CREATE INDEX IF NOT EXISTS nodb_obs_parameter_summary ON nodb_obs USING GIN(parameter_summary jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS nodb_obs_summary_version ON nodb_obs(summary_version);
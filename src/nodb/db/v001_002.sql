@@ -0,0 +1,39 @@
+-- Outgoing GTS messages
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'gts_message_type') THEN
+        CREATE TYPE gts_message_type AS ENUM (
+            'NEW',
+            'CORRECTION',
+            'ADDITION',
+            'DELAYED'
+        );
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'gts_message_status') THEN
+        CREATE TYPE gts_message_status AS ENUM (
+            'QUEUED',
+            'SENT'
+        );
+    END IF;
+END$$;
+
+CREATE TABLE IF NOT EXISTS gts_outgoing_message (
+    message_id              UUID                NOT NULL    DEFAULT gen_random_uuid() PRIMARY KEY,
+    message_format          VARCHAR(126)        NOT NULL,
+    message_type            gts_message_type    NOT NULL    DEFAULT 'NEW',
+    processing_center       VARCHAR(126)        NOT NULL    DEFAULT '',
+    obs_uuid                UUID                NOT NULL,
+    obs_received_date       DATE                NOT NULL,
+    status                  gts_message_status  NOT NULL    DEFAULT 'QUEUED',
+    queued_date             TIMESTAMPTZ         NOT NULL    DEFAULT CURRENT_TIMESTAMP,
+    sent_date               TIMESTAMPTZ,
+    assigned_header         VARCHAR(126),
+    supplementary_header    VARCHAR(126),
+
+    FOREIGN KEY (obs_uuid, obs_received_date) REFERENCES nodb_obs (obs_uuid, received_date)
+);
+
+CREATE INDEX IF NOT EXISTS ix_gts_outgoing_message_status ON gts_outgoing_message(status);
+
+-- Only one copy of a message can be waiting to be sent
+CREATE UNIQUE INDEX IF NOT EXISTS ix_gts_outgoing_message_queued ON gts_outgoing_message(obs_uuid, obs_received_date, message_format, message_type) WHERE status = 'QUEUED';
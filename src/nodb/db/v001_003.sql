@@ -0,0 +1,11 @@
+-- Typed depth ranges of good data for the most commonly filtered parameters, so that range
+-- queries (e.g. good salinity below 500 m) can use a B-tree index
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS temperature_good_min_depth FLOAT;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS temperature_good_max_depth FLOAT;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS salinity_good_min_depth FLOAT;
+ALTER TABLE nodb_obs ADD COLUMN IF NOT EXISTS salinity_good_max_depth FLOAT;
+
+CREATE INDEX IF NOT EXISTS nodb_obs_temperature_good_min_depth ON nodb_obs(temperature_good_min_depth) WHERE temperature_good_min_depth IS NOT NULL;
+CREATE INDEX IF NOT EXISTS nodb_obs_temperature_good_max_depth ON nodb_obs(temperature_good_max_depth) WHERE temperature_good_max_depth IS NOT NULL;
+CREATE INDEX IF NOT EXISTS nodb_obs_salinity_good_min_depth ON nodb_obs(salinity_good_min_depth) WHERE salinity_good_min_depth IS NOT NULL;
+CREATE INDEX IF NOT EXISTS nodb_obs_salinity_good_max_depth ON nodb_obs(salinity_good_max_depth) WHERE salinity_good_max_depth IS NOT NULL;
@@ -0,0 +1,19 @@
+-- Scanned files without a modified date must also be unique by path, so merge any duplicates
+-- (keeping their status) before recreating the index with NULLS NOT DISTINCT
+UPDATE nodb_scanned_files f
+SET was_processed = d.was_processed, was_errored = d.was_errored, scanned_date = d.scanned_date
+FROM (
+    SELECT file_path, MIN(ctid) AS keep_ctid, BOOL_OR(was_processed) AS was_processed, BOOL_OR(was_errored) AS was_errored, MIN(scanned_date) AS scanned_date
+    FROM nodb_scanned_files
+    WHERE modified_date IS NULL
+    GROUP BY file_path
+    HAVING COUNT(*) > 1
+) d
+WHERE f.ctid = d.keep_ctid;
+
+DELETE FROM nodb_scanned_files a
+USING nodb_scanned_files b
+WHERE a.file_path = b.file_path AND a.modified_date IS NULL AND b.modified_date IS NULL AND a.ctid > b.ctid;
+
+DROP INDEX IF EXISTS ix_nodb_scanned_files_unique;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_nodb_scanned_files_unique ON nodb_scanned_files(file_path, modified_date) NULLS NOT DISTINCT;
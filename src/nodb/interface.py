@@ -270,6 +270,7 @@ class NODBInstance(t.Protocol):
 
     def commit(self): ...
     def rollback(self): ...
+    def after_commit(self, callback: t.Callable[[], t.Any]): ...
     def close(self): ...
 
     def create_savepoint(self, name: DatabaseIdentifier): ...
@@ -296,7 +297,7 @@ class NODBInstance(t.Protocol):
                       join_str: JoinString = None) -> int: ...
     def upsert_object(self, obj: ConcreteNODBObject) -> bool: ...
     def update_object(self, obj: ConcreteNODBObject) -> bool: ...
-    def insert_object(self, obj: ConcreteNODBObject) -> bool: ...
+    def insert_object(self, obj: ConcreteNODBObject, ignore_conflicts: bool = False) -> bool: ...
     def delete_object(self, obj: ConcreteNODBObject): ...
     def load_object(self,
                     obj_cls: type[ConcreteNODBObject],
@@ -326,8 +327,14 @@ class NODBInstance(t.Protocol):
                             updates: dict[str, SupportsPostgres],
                             key_field: str,
                             key_values: list[SupportsPostgres]): ...
+    def bulk_insert_objects(self, objs: t.Sequence[ConcreteNODBObject], ignore_conflicts: bool = False): ...
+    def bulk_delete_objects(self,
+                            obj_cls: NODBObjectType,
+                            key_field: str,
+                            key_values: list[SupportsPostgres]): ...
 
     def fetch_queue_summary(self, tag_name: str | None = None) -> dict[str, dict[str, int]]: ...
+    def fetch_queue_backlog(self) -> dict[str, tuple[int, float]]: ...
     def fast_renew_queue_item(self, queue_uuid: str, now_: AwareDateTime | None = None) -> AwareDateTime: ...
     def fast_update_queue_status(self,
                                  queue_uuid: str,
@@ -358,6 +365,8 @@ class NODBInstance(t.Protocol):
 
     def scanned_file_status(self, file_path: str, mod_time: datetime.datetime | None = None) -> ScannedFileStatus: ...
     def note_scanned_file(self, file_path: str, mod_time: datetime.datetime | None = None): ...
+    def bulk_scanned_file_status(self, files: t.Sequence[tuple[str, datetime.datetime | None]]) -> dict[str, ScannedFileStatus]: ...
+    def bulk_note_scanned_files(self, files: t.Sequence[tuple[str, datetime.datetime | None]]) -> set[str]: ...
     def mark_scanned_item_failed(self, file_path: str, mod_time: datetime.datetime | None = None): ...
     def mark_scanned_item_success(self, file_path: str, mod_time: datetime.datetime | None = None): ...
 
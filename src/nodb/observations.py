@@ -342,12 +342,54 @@ class NODBBatch(s.MetadataMixin, s.NODBBaseObject):
         )
 
 
+# Quality flags ordered from best to worst, used to rank flags when summarizing parameters
+QUALITY_RANK: dict[int, int] = {1: 0, 5: 1, 2: 2, 0: 3, 3: 4, 4: 5, 9: 6}
+
+# Quality flags that count as good data when summarizing parameters
+GOOD_QUALITY: frozenset[int] = frozenset((1, 2, 5))
+
+
 @dataclasses.dataclass
 class SubrecordInfo:
     min_depth: t.Optional[float] = None
     max_depth: t.Optional[float] = None
     profile_parameters: set[str] = dataclasses.field(default_factory=set)
     surface_parameters: set[str] = dataclasses.field(default_factory=set)
+    level_count: int = 0
+    min_time: t.Optional[AwareDateTime] = None
+    max_time: t.Optional[AwareDateTime] = None
+    parameter_summary: dict[str, dict[str, int | float | None]] = dataclasses.field(default_factory=dict)
+
+    def add_time(self, obs_time: AwareDateTime):
+        if self.min_time is None or self.min_time > obs_time:
+            self.min_time = obs_time
+        if self.max_time is None or self.max_time < obs_time:
+            self.max_time = obs_time
+
+    def add_parameter(self, parameter_name: str, element: ocproc2.AbstractElement, depth: t.Optional[float]):
+        # Each value of a multi-value element has its own quality flag
+        for value in list(element.all_values()) or [element]:
+            self._add_parameter_quality(parameter_name, value.quality, depth)
+
+    def _add_parameter_quality(self, parameter_name: str, quality: int, depth: t.Optional[float]):
+        if parameter_name not in self.parameter_summary:
+            self.parameter_summary[parameter_name] = {
+                'best': quality,
+                'worst': quality,
+                'good_min_depth': None,
+                'good_max_depth': None,
+            }
+        summary = self.parameter_summary[parameter_name]
+        rank = QUALITY_RANK.get(quality, QUALITY_RANK[9])
+        if rank < QUALITY_RANK.get(summary['best'], QUALITY_RANK[9]):
+            summary['best'] = quality
+        if rank > QUALITY_RANK.get(summary['worst'], QUALITY_RANK[9]):
+            summary['worst'] = quality
+        if depth is not None and quality in GOOD_QUALITY:
+            if summary['good_min_depth'] is None or summary['good_min_depth'] > depth:
+                summary['good_min_depth'] = depth
+            if summary['good_max_depth'] is None or summary['good_max_depth'] < depth:
+                summary['good_max_depth'] = depth
 
 
 class NODBObservation(s.NODBBaseObject):
@@ -360,6 +402,15 @@ class NODBObservation(s.NODBBaseObject):
     TABLE_NAME = "nodb_obs"
     PRIMARY_KEYS = ("obs_uuid", "received_date")
 
+    # Increment when the summary columns change so that maintenance can backfill them
+    SUMMARY_VERSION = 2
+
+    # Parameters whose good data depth range is also stored in its own indexed columns
+    SUMMARY_DEPTH_COLUMNS: dict[str, str] = {
+        'Temperature': 'temperature',
+        'PracticalSalinity': 'salinity',
+    }
+
     obs_uuid: str = s.UUIDColumn()
     received_date: datetime.date = s.DateColumn()
 
@@ -374,6 +425,15 @@ class NODBObservation(s.NODBBaseObject):
     profile_parameters: set[str] = s.JsonSetColumn()
     processing_level: ProcessingLevel = s.EnumColumn(ProcessingLevel)
     embargo_date: t.Optional[AwareDateTime] = s.DateTimeColumn()
+    level_count: t.Optional[int] = s.IntColumn()
+    min_time: t.Optional[AwareDateTime] = s.DateTimeColumn()
+    max_time: t.Optional[AwareDateTime] = s.DateTimeColumn()
+    parameter_summary: dict[str, dict[str, int | float | None]] = s.JsonDictColumn()
+    summary_version: t.Optional[int] = s.IntColumn()
+    temperature_good_min_depth: t.Optional[float] = s.FloatColumn()
+    temperature_good_max_depth: t.Optional[float] = s.FloatColumn()
+    salinity_good_min_depth: t.Optional[float] = s.FloatColumn()
+    salinity_good_max_depth: t.Optional[float] = s.FloatColumn()
 
     @classmethod
     def prepare_insert(cls, db: interface.NODBInstance, name: str) -> interface.PreparedStatementProtocol:
@@ -391,6 +451,15 @@ class NODBObservation(s.NODBBaseObject):
             'profile_parameters': 'JSON',
             'processing_level': 'processing_level',
             'embargo_date': 'TIMESTAMPTZ',
+            'level_count': 'INTEGER',
+            'min_time': 'TIMESTAMPTZ',
+            'max_time': 'TIMESTAMPTZ',
+            'parameter_summary': 'JSON',
+            'summary_version': 'SMALLINT',
+            'temperature_good_min_depth': 'FLOAT',
+            'temperature_good_max_depth': 'FLOAT',
+            'salinity_good_min_depth': 'FLOAT',
+            'salinity_good_max_depth': 'FLOAT',
         }, name=name)
 
     def find_observation_data(self, db: interface.NODBInstance) -> NODBObservationData | None:
@@ -407,6 +476,15 @@ class NODBObservation(s.NODBBaseObject):
         self.surface_parameters = ref_info.surface_parameters
         self.min_depth = ref_info.min_depth
         self.max_depth = ref_info.max_depth
+        self.level_count = ref_info.level_count
+        self.min_time = ref_info.min_time
+        self.max_time = ref_info.max_time
+        self.parameter_summary = ref_info.parameter_summary
+        for parameter_name, prefix in NODBObservation.SUMMARY_DEPTH_COLUMNS.items():
+            summary = ref_info.parameter_summary.get(parameter_name, {})
+            setattr(self, f'{prefix}_good_min_depth', summary.get('good_min_depth'))
+            setattr(self, f'{prefix}_good_max_depth', summary.get('good_max_depth'))
+        self.summary_version = NODBObservation.SUMMARY_VERSION
         if self.location is None or self.obs_time is None:
             self.observation_type = ObservationType.OTHER
         elif self.min_depth is not None and self.min_depth > 0:
@@ -446,10 +524,19 @@ class NODBObservation(s.NODBBaseObject):
             from medsutil.seawater import eos80_depth
             depth = eos80_depth(position['Pressure'], position['Latitude'])
         if depth is not None:
+            depth = coerce.as_float(depth)
             if ref_info.min_depth is None or ref_info.min_depth > depth:
-                ref_info.min_depth = coerce.as_float(depth)
+                ref_info.min_depth = depth
             if ref_info.max_depth is None or ref_info.max_depth < depth:
-                ref_info.max_depth = coerce.as_float(depth)
+                ref_info.max_depth = depth
+            if record.coordinates.has_value('Depth') or record.coordinates.has_value('Pressure'):
+                ref_info.level_count += 1
+
+        if record.coordinates.has_value('Time') and record.coordinates['Time'].is_iso_datetime():
+            ref_info.add_time(record.coordinates['Time'].to_datetime())
+
+        for parameter_name in record.parameters.keys():
+            ref_info.add_parameter(parameter_name, record.parameters[parameter_name], depth)
 
         if ('Depth' in position and position['Depth'] != 0) or ('Pressure' in position and position['Pressure'] != 0):
             ref_info.profile_parameters.update(x for x in record.parameters.keys())
@@ -618,6 +705,23 @@ class NODBWorkingRecord(_RecordMixin, s.MetadataMixin, s.NODBBaseObject):
                 "record_idx": record_idx
             }, **kwargs)
 
+    @classmethod
+    def find_all_by_source_file_raw(cls,
+                                    db: interface.NODBInstance,
+                                    source_file_uuid: str,
+                                    source_received_date: ct.AcceptAsDateTime,
+                                    **kwargs) -> t.Iterable[dict]:
+        """Find the raw working records from a source file."""
+        filters = {
+            "received_date": s.parse_received_date(source_received_date),
+            "source_file_uuid": source_file_uuid,
+        }
+        if 'filters' in kwargs:
+            kwargs['filters'].update(filters)
+        else:
+            kwargs['filters'] = filters
+        return db.stream_raw(cls, **kwargs)
+
     @staticmethod
     def bulk_set_batch_uuid(
             db: interface.NODBInstance,
@@ -0,0 +1,159 @@
+"""Process-wide cache of reference objects (platforms, missions) loaded from the NODB.
+
+    Reference objects are read for almost every record that is loaded, but rarely change. This
+    cache keeps them beyond the lifetime of a single record manager. If a cache file is configured
+    (cnodc.reference_cache.file), the entries are kept in a local SQLite database so that every
+    process on the server shares them; otherwise, each process keeps its own in-memory copy.
+
+    Each entry has a version stamp. Invalidating an entry bumps the version, and an object read
+    from the database is only stored if the version hasn't changed since the lookup started, so
+    a process can't overwrite a newer invalidation with the stale copy it was loading at the time.
+"""
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import typing as t
+
+import zirconium as zr
+import zrlog
+from autoinject import injector
+
+import medsutil.json as json
+from nodb.base import NODBBaseObject
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reference_objects (
+        kind        TEXT        NOT NULL,
+        key         TEXT        NOT NULL,
+        version     INTEGER     NOT NULL DEFAULT 0,
+        stored_at   REAL,
+        data        TEXT,
+        PRIMARY KEY (kind, key)
+    )
+"""
+
+
+@injector.injectable_global
+class ReferenceCache:
+
+    config: zr.ApplicationConfig = None
+
+    @injector.construct
+    def __init__(self, cache_file: t.Optional[pathlib.Path | str] = None, max_age_seconds: t.Optional[int] = None):
+        if cache_file is None:
+            cache_file = self.config.as_path(('cnodc', 'reference_cache', 'file'), default=None)
+        if max_age_seconds is None:
+            max_age_seconds = self.config.as_int(('cnodc', 'reference_cache', 'max_age_seconds'), default=900)
+        self._cache_file = pathlib.Path(cache_file) if cache_file else None
+        self._max_age = max_age_seconds
+        self._log = zrlog.get_logger('cnodc.reference_cache')
+        self._lock = threading.Lock()
+        self._memory: dict[tuple[str, str], tuple[int, float | None, str | None]] = {}
+        self._conn: t.Optional[sqlite3.Connection] = None
+        self._conn_pid: t.Optional[int] = None
+
+    @property
+    def is_shared(self) -> bool:
+        return self._cache_file is not None
+
+    def fetch[T: NODBBaseObject](self, kind: str, key: str, loader: t.Callable[[], T | None]) -> T | None:
+        """Get an object from the cache, or call loader() to load it (and cache the result)."""
+        version, data = self._get(kind, key)
+        if data is not None:
+            obj = NODBBaseObject.from_map(data)
+            obj.is_new = False
+            obj.clear_modified()
+            return obj
+        obj = loader()
+        if obj is not None:
+            self._put(kind, key, version, obj.export())
+        return obj
+
+    def invalidate(self, kind: str, key: str):
+        """Remove an object from the cache, e.g. after it was updated."""
+        if self._cache_file is None:
+            with self._lock:
+                version = self._memory[(kind, key)][0] + 1 if (kind, key) in self._memory else 1
+                self._memory[(kind, key)] = (version, None, None)
+            return
+        try:
+            self._connection().execute(
+                "INSERT INTO reference_objects (kind, key, version) VALUES (?, ?, 1) "
+                "ON CONFLICT (kind, key) DO UPDATE SET version = version + 1, data = NULL, stored_at = NULL",
+                [kind, key]
+            )
+        except (sqlite3.Error, OSError):
+            # Other processes may keep a stale copy until it expires, but we can keep going
+            self._log.exception('Could not invalidate [%s:%s] in the reference cache', kind, key)
+
+    def clear(self):
+        """Remove every object from the cache."""
+        if self._cache_file is None:
+            with self._lock:
+                self._memory.clear()
+            return
+        try:
+            self._connection().execute("UPDATE reference_objects SET version = version + 1, data = NULL, stored_at = NULL")
+        except (sqlite3.Error, OSError):
+            self._log.exception('Could not clear the reference cache')
+
+    def _get(self, kind: str, key: str) -> tuple[int, t.Optional[dict]]:
+        if self._cache_file is None:
+            with self._lock:
+                version, stored_at, data = self._memory.get((kind, key), (0, None, None))
+        else:
+            try:
+                row = self._connection().execute(
+                    "SELECT version, stored_at, data FROM reference_objects WHERE kind = ? AND key = ?",
+                    [kind, key]
+                ).fetchone()
+            except (sqlite3.Error, OSError):
+                self._log.exception('Could not read [%s:%s] from the reference cache', kind, key)
+                return -1, None
+            if row is None:
+                return 0, None
+            version, stored_at, data = row
+        if data is None or stored_at is None or (time.time() - stored_at) > self._max_age:
+            return version, None
+        return version, json.loads(data)
+
+    def _put(self, kind: str, key: str, version: int, data: dict):
+        if version < 0:
+            return
+        now = time.time()
+        # Stored as JSON in memory too, so that changes to the returned objects don't leak into the cache
+        data = json.dumps(data)
+        if self._cache_file is None:
+            with self._lock:
+                current = self._memory.get((kind, key), (0, None, None))[0]
+                if current == version:
+                    self._memory[(kind, key)] = (version, now, data)
+            return
+        try:
+            self._connection().execute(
+                "INSERT INTO reference_objects (kind, key, version, stored_at, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, key) DO UPDATE SET stored_at = excluded.stored_at, data = excluded.data "
+                "WHERE reference_objects.version = excluded.version",
+                [kind, key, version, now, data]
+            )
+        except (sqlite3.Error, OSError):
+            self._log.exception('Could not store [%s:%s] in the reference cache', kind, key)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections can't be shared with a forked child process, so each process opens its own.
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._cache_file, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._conn_pid = None
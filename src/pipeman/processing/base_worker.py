@@ -1,3 +1,5 @@
+import contextlib
+import gc
 import json
 import os
 import pathlib
@@ -9,14 +11,16 @@ import zrlog
 from autoinject import injector
 
 import nodb.interface as interface
-from medsutil.cached import CachedObjectMixin, cached_method
+from medsutil.cached import CachedObjectMixin, CachePolicy, cached_method
 from medsutil.dynamic import dynamic_object, DynamicObjectLoadError
 from medsutil.exceptions import CodedError, HaltInterrupt
 from medsutil.halts import HaltFlag, gzip_with_halt, ungzip_with_halt
 from medsutil.metrics import Gauge, Histogram
+from medsutil.profiling import ProfileRequest, StackSampler, CProfileSession
 
 from medsutil.storage import StorageController, FilePath
 from pipeman.instrumented import InstrumentedObject
+from pipeman.processing.tracing import Tracer, Span
 
 
 class BaseWorker(CachedObjectMixin, InstrumentedObject):
@@ -53,9 +57,17 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
 
         This will ensure the _run function returns appropriately. It should also catch and handle any errors
         that would not prevent the worker from continuing onto the next iteration.
+
+        Workers can be given a memory budget in their configuration (memory_soft_limit_mb and
+        memory_hard_limit_mb), which is checked against the resident set size after each cycle.
+        Over the soft limit, the worker trims its caches (see register_cache_trimmer()). If it is
+        still over the hard limit after that, the worker stops at the end of the cycle as if the
+        end flag were set, so the controller can start a fresh process in its place. The worker's own
+        cache can also be bounded by giving a cache_policy (max_entries, max_bytes and/or ttl_seconds).
     """
 
     nodb: interface.NODB = None
+    tracer: Tracer = None
 
     @injector.construct
     def __init__(self,
@@ -66,7 +78,8 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
                  _process_uuid: str,
                  _halt_flag: HaltFlag,
                  _end_flag: HaltFlag,
-                 _config: dict = None):
+                 _config: dict = None,
+                 _profile_request: t.Optional[ProfileRequest] = None):
         super().__init__(
             log_name=f"cnodc.worker.{process_name.lower()}",
             subsystem=process_name.lower(),
@@ -82,6 +95,10 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
         self._defaults = {
             'save_file': None,
             'max_check_delay_seconds': 1,
+            'profile_dir': None,
+            'memory_soft_limit_mb': None,
+            'memory_hard_limit_mb': None,
+            'cache_policy': None,
         }
         self._temp_dir: t.Optional[tempfile.TemporaryDirectory] = None
         self._save_data: t.Optional[SaveData] = None
@@ -89,6 +106,11 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
         self._events: list[str] = ['on_start', 'before_cycle', 'after_cycle', 'on_exit']
         self._last_run_gauge = None
         self._run_time_histogram = None
+        self._profile_request = _profile_request
+        self._stack_sampler: t.Optional[StackSampler] = None
+        self._cprofile: t.Optional[CProfileSession] = None
+        self._cache_trimmers: list[t.Callable[[], t.Any]] = [self.clear_cache]
+        self._over_memory_budget: bool = False
 
     def add_events(self, events: list[str]):
         self._events.extend(events)
@@ -143,10 +165,11 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
                 et = time.monotonic()
                 if not self.continue_loop():
                     break
+                self.check_profile_request()
 
     def continue_loop(self):
         """Check if the halt or end flags are set (True if neither are). """
-        return self._halt_flag.check_continue(False) and self._end_flag.check_continue(False)
+        return self._halt_flag.check_continue(False) and self._end_flag.check_continue(False) and not self._over_memory_budget
 
     def get_merged_config(self, key) -> list:
         values = []
@@ -229,6 +252,7 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
 
     def _run(self):
         while self.continue_loop():
+            self.check_profile_request()
             sleep_time = self._run_once()
             self.responsive_sleep(sleep_time)
 
@@ -240,12 +264,22 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
         """Override this method to provide functionality prior to _run() being called."""
         self._last_run_gauge = Gauge(name="last_run", documentation="When did the last execution finish?", unit="timestamp_seconds", namespace="pipeman", subsystem=self.process_full_id.replace(":", "_"), multiprocess_mode="livemostrecent")
         self._run_time_histogram = Histogram(name="run_time", documentation="How long did the execution take to finish", unit="seconds", namespace="pipeman", subsystem=self.process_full_id.replace(":", "_"))
+        cache_policy = self.get_config('cache_policy')
+        if cache_policy:
+            try:
+                self.set_cache_policy(CachePolicy.from_config(cache_policy, name=f'worker_{self.process_name}'))
+            except (TypeError, ValueError, AttributeError):
+                self._log.exception('Invalid cache policy, the cache will not be bounded')
         self.run_hook('on_start')
 
     def on_exit(self, exception: Exception = None):
         """Override this method for clean-up after _run() is called."""
         if self._save_data is not None:
             self._save_data.save_file()
+        if self._stack_sampler is not None and self._stack_sampler.is_running:
+            self._stack_sampler.stop()
+        if self._cprofile is not None and not self._cprofile.is_done:
+            self._cprofile.write()
         self.run_hook('on_exit', exception=exception)
 
     def before_cycle(self):
@@ -260,9 +294,86 @@ class BaseWorker(CachedObjectMixin, InstrumentedObject):
             self._log.trace('Cleaning up temp directory')
             self._temp_dir.cleanup()
             self._temp_dir = None
+        self.check_memory_budget()
         if self._last_run_gauge is not None:
             self._last_run_gauge.set_to_current_time()
 
+    def register_cache_trimmer(self, trimmer: t.Callable[[], t.Any]):
+        """Register a function that releases cached data when the worker is over its soft memory limit."""
+        self._cache_trimmers.append(trimmer)
+
+    def trim_caches(self):
+        """Release cached data that can be rebuilt later."""
+        for trimmer in self._cache_trimmers:
+            try:
+                trimmer()
+            except Exception as ex:
+                self._log.exception(f"Error trimming cache: {ex.__class__.__name__}: {str(ex)}")
+        gc.collect()
+
+    def check_memory_budget(self):
+        """Trim caches over the soft memory limit and stop the worker over the hard limit."""
+        soft_limit = self.get_config('memory_soft_limit_mb', coerce=float)
+        hard_limit = self.get_config('memory_hard_limit_mb', coerce=float)
+        if soft_limit is None and hard_limit is None:
+            return
+        rss = self._resident_memory_mb()
+        if soft_limit is not None and rss >= soft_limit:
+            self._log.info('Memory use [%.1f MB] is over the soft limit [%s MB], trimming caches', rss, soft_limit)
+            self.trim_caches()
+            rss = self._resident_memory_mb()
+        if hard_limit is not None and rss >= hard_limit:
+            self._log.warning('Memory use [%.1f MB] is over the hard limit [%s MB], stopping for a restart', rss, hard_limit)
+            self._over_memory_budget = True
+
+    def _resident_memory_mb(self) -> float:
+        return self._psutil_process.memory_info().rss / 1048576
+
+    def current_correlation_id(self) -> t.Optional[str]:
+        """Override to provide the correlation ID of the item being processed, for tracing."""
+        return None
+
+    def trace(self, stage: str, correlation_id: t.Optional[str] = None, **kwargs) -> t.ContextManager[Span]:
+        """Record the time spent in a stage of processing the current item."""
+        return self.tracer.span(correlation_id or self.current_correlation_id(), stage, worker=self.process_name, **kwargs)
+
+    def check_profile_request(self):
+        """Start profiling if the controller asked for it."""
+        if self._profile_request is None:
+            return
+        request = self._profile_request.take()
+        if request is None:
+            return
+        mode, amount = request
+        if mode == 'sample':
+            if self._stack_sampler is not None and self._stack_sampler.is_running:
+                self._log.warning('Stack sampling already in progress')
+                return
+            self._stack_sampler = StackSampler(self._profile_file('collapsed'))
+            self._stack_sampler.start(amount)
+            self._log.info('Sampling stacks for [%s] seconds', amount)
+        else:
+            self._cprofile = CProfileSession(self._profile_file('pstats'), int(amount))
+            self._log.info('Profiling the next [%s] items', int(amount))
+
+    @contextlib.contextmanager
+    def profiled(self):
+        """Profile the code in the context if cProfile was requested for the next few items."""
+        if self._cprofile is None:
+            yield
+            return
+        with self._cprofile.profile():
+            yield
+        if self._cprofile.is_done:
+            self._cprofile = None
+
+    def _profile_file(self, extension: str) -> pathlib.Path:
+        # Profiles must outlive the current item, so they don't go in temp_dir()
+        profile_dir = self.get_config('profile_dir', None)
+        profile_dir = pathlib.Path(profile_dir) if profile_dir else pathlib.Path(tempfile.gettempdir()) / 'cnodc_profiles'
+        safe_id = ''.join(x if x.isalnum() or x in '-_' else '_' for x in f'{self.process_name}_{self.process_uuid}')
+        return profile_dir / f'{safe_id}_{time.strftime("%Y%m%d%H%M%S")}.{extension}'
+
     @property
     def save_data(self):
         if self._save_data is None:
@@ -1,26 +1,75 @@
 """
     A payload worker is a queue worker where the queue data structure
     follows one of the workflow payload types (e.g. Batch, SourceFile, File, etc.).
+
+    Payload workers can optionally prefetch items: with prefetch_count set above zero,
+    up to that many queue items beyond the current one are claimed ahead of time and their
+    files are downloaded on a background thread while the current payload is processed.
+    Claimed items have their locks renewed along with the current item and are released
+    when the worker exits.
 """
+import collections
+import concurrent.futures as cf
 import datetime
 import pathlib
+import tempfile
+import threading
 
 from nodb.observations import NODBBatch, NODBSourceFile
 from nodb.queue import NODBQueueItem
 from pipeman.processing.queue_worker import QueueWorker, QueueItemResult
 import typing as t
 
+from medsutil.halts import HaltFlag, LinkedHaltFlag
 from pipeman.exceptions import CNODCError
 from pipeman.processing.payloads import WorkflowPayload, FilePayload, SourceFilePayload, BatchPayload, \
     ObservationPayload, Payload
 
 
+class PrefetchedItem:
+    """A queue item claimed ahead of time, with its file (if any) downloading in the background."""
+
+    def __init__(self, queue_item: NODBQueueItem, halt_flag: HaltFlag):
+        self.queue_item = queue_item
+        self.halt_flag = halt_flag
+        self.future: t.Optional[cf.Future] = None
+        self._temp_dir: t.Optional[tempfile.TemporaryDirectory] = None
+
+    def temp_dir(self) -> pathlib.Path:
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory()
+        return pathlib.Path(self._temp_dir.name)
+
+    def downloaded_file(self) -> pathlib.Path:
+        """Wait for the download to finish and return the file (or raise the error from downloading it)."""
+        return self.future.result()
+
+    def cancel(self):
+        """Stop the download, if it is running, and wait for it to finish."""
+        self.halt_flag.event.set()
+        if self.future is not None and not self.future.cancel():
+            cf.wait([self.future])
+
+    def cleanup(self):
+        self.cancel()
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+
+
 class PayloadWorker[T: Payload](QueueWorker):
 
     def __init__(self, process_name: str, process_version: str, require_type: t.Optional[type[T]] = None, **kwargs):
         super().__init__(process_version=process_version, process_name=process_name, **kwargs)
+        self.set_defaults({
+            'prefetch_count': 0,
+        })
         self._require_type: type[Payload] = require_type or Payload
         self._current_payload: t.Optional[T] = None
+        self._prefetch_count: int = 0
+        self._prefetched: collections.deque[PrefetchedItem] = collections.deque()
+        self._current_prefetch: t.Optional[PrefetchedItem] = None
+        self._prefetch_executor: t.Optional[cf.ThreadPoolExecutor] = None
 
     @property
     def current_payload(self) -> T:
@@ -50,6 +99,95 @@ class PayloadWorker[T: Payload](QueueWorker):
     def after_cycle(self):
         super().after_cycle()
         self._current_payload = None
+        if self._current_prefetch is not None:
+            self._current_prefetch.cleanup()
+            self._current_prefetch = None
+
+    def on_start(self):
+        super().on_start()
+        self._prefetch_count = max(0, self.get_config('prefetch_count', 0, coerce=int))
+        if self._prefetch_count > 0:
+            self._prefetch_executor = cf.ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{self.process_name}-prefetch')
+
+    def on_exit(self, exception: Exception = None):
+        try:
+            self.release_prefetched_items()
+        except Exception:
+            self._log.exception('Could not release prefetched queue items, they will be unlocked when their locks expire')
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True, cancel_futures=True)
+            self._prefetch_executor = None
+        super().on_exit(exception)
+
+    def _fetch_next_queue_item(self) -> NODBQueueItem | None:
+        if self._prefetch_executor is None:
+            return super()._fetch_next_queue_item()
+        if self._current_prefetch is not None:
+            self._current_prefetch.cleanup()
+            self._current_prefetch = None
+        for entry in self._prefetched:
+            entry.queue_item.renew(self.db)
+        try:
+            self._fill_prefetch_queue(self._prefetch_count + 1)
+        except Exception:
+            if not self._prefetched:
+                raise
+            # Items we already hold can still be processed
+            self._log.exception('An exception occurred while prefetching queue items')
+            self.db.rollback()
+        if not self._prefetched:
+            return None
+        self._current_prefetch = self._prefetched.popleft()
+        return self._current_prefetch.queue_item
+
+    def _fill_prefetch_queue(self, max_items: int):
+        while len(self._prefetched) < max_items and self.continue_loop():
+            item = super()._fetch_next_queue_item()
+            if item is None:
+                break
+            self.db.commit()
+            self._prefetched.append(self._start_prefetch(item))
+
+    def _start_prefetch(self, item: NODBQueueItem) -> PrefetchedItem:
+        entry = PrefetchedItem(item, LinkedHaltFlag(threading.Event(), self._halt_flag))
+        try:
+            payload = Payload.from_queue_item(item)
+        except Exception:
+            # The error is raised again when the item is processed
+            return entry
+        if hasattr(payload, 'download_from_db') or hasattr(payload, 'download'):
+            self._log.trace('Prefetching file for queue item [%s]', item.queue_uuid)
+            entry.future = self._prefetch_executor.submit(self._prefetch_download, payload, entry)
+        return entry
+
+    def _prefetch_download(self, payload: Payload, entry: PrefetchedItem) -> pathlib.Path:
+        with self.trace('download', correlation_id=entry.queue_item.correlation_id) as span:
+            if hasattr(payload, 'download_from_db'):
+                # Runs outside the main thread, so it needs a connection of its own
+                with self.nodb as db:
+                    file = payload.download_from_db(db=db, target_dir=entry.temp_dir(), halt_flag=entry.halt_flag)
+            else:
+                file = payload.download(target_dir=entry.temp_dir(), halt_flag=entry.halt_flag)
+            span.item_size = file.stat().st_size
+            return file
+
+    def renew_item(self):
+        super().renew_item()
+        for entry in self._prefetched:
+            entry.queue_item.renew(self.db)
+
+    def release_prefetched_items(self):
+        """Stop any prefetching and release the items that were claimed but not processed."""
+        if not self._prefetched:
+            return
+        for entry in self._prefetched:
+            entry.cleanup()
+        with self.nodb as db:
+            while self._prefetched:
+                entry = self._prefetched.popleft()
+                self._log.trace('Releasing prefetched queue item [%s]', entry.queue_item.queue_uuid)
+                entry.queue_item.release(db)
+            db.commit()
 
     def before_payload(self):
         self.run_hook('before_payload', payload=self.current_payload)
@@ -72,12 +210,21 @@ class PayloadWorker[T: Payload](QueueWorker):
         return payload_copy
 
     def download_to_temp_file(self) -> pathlib.Path:
+        if self._current_prefetch is not None and self._current_prefetch.future is not None and self._current_prefetch.queue_item is self._current_item:
+            self._log.debug("Using prefetched file")
+            return self._current_prefetch.downloaded_file()
         if hasattr(self.current_payload, 'download_from_db'):
             self._log.debug("Downloading file from payment")
-            return self.current_payload.download_from_db(db=self.db, target_dir=self.temp_dir(), halt_flag=self._halt_flag)
+            with self.trace('download', correlation_id=self.current_payload.correlation_id) as span:
+                file = self.current_payload.download_from_db(db=self.db, target_dir=self.temp_dir(), halt_flag=self._halt_flag)
+                span.item_size = file.stat().st_size
+                return file
         elif hasattr(self.current_payload, 'download'):
             self._log.debug("Downloading file from payment")
-            return self.current_payload.download(target_dir=self.temp_dir(), halt_flag=self._halt_flag)
+            with self.trace('download', correlation_id=self.current_payload.correlation_id) as span:
+                file = self.current_payload.download(target_dir=self.temp_dir(), halt_flag=self._halt_flag)
+                span.item_size = file.stat().st_size
+                return file
         else:
             raise CNODCError('Invalid payload type for downloading', 'PAYLOAD', 1001)
 
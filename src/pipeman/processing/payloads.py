@@ -19,7 +19,7 @@ from medsutil.storage import StorageController, FilePath
 from pipeman.exceptions import CNODCError
 from medsutil.halts import HaltFlag, ungzip_with_halt
 from medsutil.awaretime import AwareDateTime
-from medsutil.datadict import DataDictObject, p_str, p_bool, p_date, p_awaretime, p_dict
+from medsutil.datadict import DataDictObject, p_str, p_bool, p_date, p_awaretime, p_dict, p_list
 
 if t.TYPE_CHECKING:
     from pipeman.processing.workflow import WorkflowController
@@ -394,6 +394,35 @@ class ObservationPayload(WorkflowPayload):
         )
 
 
+class ObservationListPayload(WorkflowPayload):
+    """A payload referencing several observations in the database at once.
+
+        Each entry is a dictionary with at least the obs_uuid and received_date of
+        the observation; workers may define other keys that they use.
+    """
+
+    observations: list[dict] = p_list()
+
+    def __str__(self):  # pragma: no coverage (debugging only)
+        return f'<ObservationListPayload:{len(self.observations)}:{self.workflow_name}:{self.current_step}>'
+
+    def add_observation(self, obs: t.Union[NODBObservation, NODBObservationData], **kwargs):
+        """Add an observation to the list, with any extra information in kwargs."""
+        self.observations.append({
+            'obs_uuid': obs.obs_uuid,
+            'received_date': obs.received_date.isoformat() if obs.received_date is not None else None,
+            **kwargs
+        })
+
+    @staticmethod
+    def from_observations(observations: t.Iterable[t.Union[NODBObservation, NODBObservationData]], **kwargs):
+        """Build a payload from several observation or observation data objects."""
+        payload = ObservationListPayload(**kwargs)
+        for obs in observations:
+            payload.add_observation(obs)
+        return payload
+
+
 class NewFilePayload(Payload):
 
     file_path: str = p_str()
@@ -6,6 +6,8 @@
     Queue items have a "unique_item_name" which, when non-null, will prevent two items
     with the same value for that field from being locked at the same time.
 """
+import contextlib
+import time
 import uuid
 import typing as t
 import enum
@@ -16,6 +18,7 @@ import nodb.interface as interface
 from pipeman.exceptions import CNODCError
 from medsutil.exceptions import HaltInterrupt, CodedError
 from nodb.queue import NODBQueueItem
+from pipeman.processing.tracing import Span
 
 
 class QueueItemResult(enum.Enum):
@@ -46,6 +49,7 @@ class QueueWorker(BaseWorker):
         self._app_id = None
         self._current_delay_time = None
         self._current_item: t.Optional[NODBQueueItem] = None
+        self._current_span: t.Optional[Span] = None
         self._db: t.Optional[interface.NODBInstance] = None
         self._status_info.update({
             'items_processed': 0,
@@ -91,7 +95,7 @@ class QueueWorker(BaseWorker):
                 self._status_info['items_processed'] += 1
                 self.report(activity='processing')
                 self.db.commit()
-                with self._run_time_histogram.time():
+                with self._run_time_histogram.time(), self._trace_queue_item(self._current_item):
                     self._actual_process_next_queue_item()
                 return True
         except Exception as ex:
@@ -101,6 +105,31 @@ class QueueWorker(BaseWorker):
             self._current_item = None
         return False
 
+    def current_correlation_id(self) -> t.Optional[str]:
+        return self._current_item.correlation_id if self._current_item is not None else None
+
+    @contextlib.contextmanager
+    def _trace_queue_item(self, queue_item: NODBQueueItem) -> t.Generator[Span, t.Any, None]:
+        """Record the time the item waited in the queue and the time spent processing it."""
+        wait_time = None
+        if self.tracer.enabled and queue_item.created_date is not None:
+            now = time.time()
+            wait_time = max(0.0, now - queue_item.created_date.timestamp())
+            self.tracer.record(Span(
+                correlation_id=queue_item.correlation_id,
+                stage=f'queue:{queue_item.queue_name}',
+                start_time=now - wait_time,
+                end_time=now,
+                worker=self.process_name,
+                queue_name=queue_item.queue_name,
+            ))
+        with self.trace(self.process_name, queue_name=queue_item.queue_name, queue_wait_seconds=wait_time) as span:
+            self._current_span = span
+            try:
+                yield span
+            finally:
+                self._current_span = None
+
     def _actual_process_next_queue_item(self):
         exc: Exception | None = None
         try:
@@ -111,7 +140,9 @@ class QueueWorker(BaseWorker):
             else:
                 self.set_cycle_config({})
             self.before_queue_item(self._current_item)
-            self._process_result(self._current_item, self.process_queue_item(self._current_item))
+            with self.profiled():
+                result = self.process_queue_item(self._current_item)
+            self._process_result(self._current_item, result)
         except CodedError as ex:
             exc = ex
 
@@ -191,6 +222,8 @@ class QueueWorker(BaseWorker):
                 queue_result = "retry"
                 self._status_info['items_retry'] += 1
             self.db.commit()
+            if self._current_span is not None:
+                self._current_span.status = queue_result
             after(queue_item, ex)
             self.count("queue_items_total", result=queue_result, queue_name=queue_item.queue_name)
 
@@ -0,0 +1,266 @@
+"""Spans that record where the time went for each file going through the pipeline.
+
+    Every payload carries a correlation ID from the moment its file is received. Each stage that
+    works on it (uploading the file, waiting in a queue, downloading it, and each worker that
+    processes it) records a span with the correlation ID, the stage name, the worker, and the start
+    and end times. The spans of one correlation ID can then be put back together to see which
+    stages the file spent its time in.
+
+    Tracing is off unless a sink is configured:
+
+        cnodc:
+          tracing:
+            sink: sqlite
+            file: /var/cnodc/traces.sqlite
+
+    The sink may also be the name of a SpanSink class, to send the spans somewhere else. Errors
+    from the sink are logged and never stop a worker.
+"""
+import contextlib
+import dataclasses
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import typing as t
+import uuid
+
+import zirconium as zr
+import zrlog
+from autoinject import injector
+
+from medsutil.dynamic import dynamic_object
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS spans (
+        span_id             TEXT        NOT NULL PRIMARY KEY,
+        correlation_id      TEXT        NOT NULL,
+        stage               TEXT        NOT NULL,
+        worker              TEXT,
+        start_time          REAL        NOT NULL,
+        end_time            REAL        NOT NULL,
+        queue_name          TEXT,
+        queue_wait_seconds  REAL,
+        item_size           INTEGER,
+        status              TEXT
+    )
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS ix_spans_correlation_id ON spans (correlation_id, end_time)"
+
+_COLUMNS = ('span_id', 'correlation_id', 'stage', 'worker', 'start_time', 'end_time', 'queue_name', 'queue_wait_seconds', 'item_size', 'status')
+
+_INSERT = """
+    INSERT OR REPLACE INTO spans
+        (span_id, correlation_id, stage, worker, start_time, end_time, queue_name, queue_wait_seconds, item_size, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SELECT_BY_CORRELATION_ID = """
+    SELECT span_id, correlation_id, stage, worker, start_time, end_time, queue_name, queue_wait_seconds, item_size, status
+    FROM spans
+    WHERE correlation_id = ?
+    ORDER BY end_time
+"""
+
+_SELECT_SINCE = """
+    SELECT span_id, correlation_id, stage, worker, start_time, end_time, queue_name, queue_wait_seconds, item_size, status
+    FROM spans
+    WHERE correlation_id IN (SELECT correlation_id FROM spans WHERE end_time >= ?)
+    ORDER BY correlation_id, end_time
+"""
+
+_SELECT_ALL = """
+    SELECT span_id, correlation_id, stage, worker, start_time, end_time, queue_name, queue_wait_seconds, item_size, status
+    FROM spans
+    ORDER BY correlation_id, end_time
+"""
+
+
+@dataclasses.dataclass
+class Span:
+    """Time spent by one stage on the file with a given correlation ID. Times are in seconds since the epoch."""
+
+    correlation_id: str
+    stage: str
+    start_time: float
+    end_time: t.Optional[float] = None
+    worker: t.Optional[str] = None
+    queue_name: t.Optional[str] = None
+    queue_wait_seconds: t.Optional[float] = None
+    item_size: t.Optional[int] = None
+    status: str = 'ok'
+    span_id: str = dataclasses.field(default_factory=lambda: str(uuid.uuid4()))
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time if self.end_time is not None else time.time()) - self.start_time
+
+    def to_row(self) -> tuple:
+        return tuple(getattr(self, x) for x in _COLUMNS)
+
+    @staticmethod
+    def from_row(row: t.Sequence) -> Span:
+        return Span(**{x: row[idx] for idx, x in enumerate(_COLUMNS)})
+
+
+class SpanSink:
+    """Destination for spans."""
+
+    def export(self, spans: t.Sequence[Span]):
+        raise NotImplementedError  # pragma: no coverage
+
+    def read(self, correlation_id: t.Optional[str] = None, since: t.Optional[float] = None) -> list[Span]:
+        """Read back the spans for a correlation ID (or every correlation ID with a span ending after since)."""
+        raise NotImplementedError  # pragma: no coverage
+
+    def close(self):
+        pass
+
+
+class MemorySpanSink(SpanSink):
+    """Keeps spans in memory (mostly for testing)."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: t.Sequence[Span]):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def read(self, correlation_id: t.Optional[str] = None, since: t.Optional[float] = None) -> list[Span]:
+        with self._lock:
+            spans = list(self.spans)
+        if correlation_id is not None:
+            return [x for x in spans if x.correlation_id == correlation_id]
+        if since is not None:
+            recent = set(x.correlation_id for x in spans if x.end_time is not None and x.end_time >= since)
+            return [x for x in spans if x.correlation_id in recent]
+        return spans
+
+
+class SQLiteSpanSink(SpanSink):
+    """Writes spans to a local SQLite file that every process on the server can share."""
+
+    def __init__(self, file: pathlib.Path | str):
+        self._file = pathlib.Path(file)
+        self._conn: t.Optional[sqlite3.Connection] = None
+        self._conn_pid: t.Optional[int] = None
+
+    def export(self, spans: t.Sequence[Span]):
+        self._connection().executemany(_INSERT, [x.to_row() for x in spans])
+
+    def read(self, correlation_id: t.Optional[str] = None, since: t.Optional[float] = None) -> list[Span]:
+        if correlation_id is not None:
+            rows = self._connection().execute(_SELECT_BY_CORRELATION_ID, [correlation_id])
+        elif since is not None:
+            rows = self._connection().execute(_SELECT_SINCE, [since])
+        else:
+            rows = self._connection().execute(_SELECT_ALL)
+        return [Span.from_row(x) for x in rows]
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections can't be shared with a forked child process, so each process opens its own.
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._file.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._file, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            conn.execute(_INDEX)
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._conn_pid = None
+
+
+@injector.injectable_global
+class Tracer:
+    """Records spans to the configured sink."""
+
+    config: zr.ApplicationConfig = None
+
+    @injector.construct
+    def __init__(self, sink: t.Optional[SpanSink] = None):
+        self._log = zrlog.get_logger('cnodc.tracing')
+        self._sink = sink if sink is not None else self._build_sink()
+
+    def _build_sink(self) -> t.Optional[SpanSink]:
+        sink_name = self.config.as_str(('cnodc', 'tracing', 'sink'), default=None)
+        if not sink_name:
+            return None
+        if sink_name == 'sqlite':
+            return SQLiteSpanSink(self.config.as_path(('cnodc', 'tracing', 'file')))
+        if sink_name == 'memory':
+            return MemorySpanSink()
+        return dynamic_object(sink_name)()
+
+    @property
+    def enabled(self) -> bool:
+        return self._sink is not None
+
+    @property
+    def sink(self) -> t.Optional[SpanSink]:
+        return self._sink
+
+    def record(self, span: Span):
+        if self._sink is None or not span.correlation_id:
+            return
+        if span.end_time is None:
+            span.end_time = time.time()
+        try:
+            self._sink.export([span])
+        except Exception:
+            self._log.exception('Could not record span [%s] for [%s]', span.stage, span.correlation_id)
+
+    @contextlib.contextmanager
+    def span(self, correlation_id: t.Optional[str], stage: str, **kwargs) -> t.Generator[Span, t.Any, None]:
+        """Time the code in the context, which can update the span (e.g. to set the item size or status)."""
+        span = Span(correlation_id=correlation_id or '', stage=stage, start_time=time.time(), **kwargs)
+        try:
+            yield span
+        except BaseException:
+            if span.status == 'ok':
+                span.status = 'error'
+            raise
+        finally:
+            span.end_time = time.time()
+            self.record(span)
+
+
+@dataclasses.dataclass
+class PathStep:
+    """One step on the critical path of a file: a span, or a gap no span accounts for."""
+
+    stage: str
+    start_time: float
+    end_time: float
+    span: t.Optional[Span] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
+
+def critical_path(spans: t.Iterable[Span]) -> list[PathStep]:
+    """Find the chain of spans that determined when the last span of a file ended.
+
+        Starting from the span that ended last, this steps back to the span that ended last before
+        the current one started, and so on. Time between two spans on the path is reported as a gap
+        (stage '(untracked)').
+    """
+    remaining = sorted((x for x in spans if x.end_time is not None), key=lambda x: x.end_time)
+    path: list[PathStep] = []
+    while remaining:
+        current = remaining.pop()
+        if path and path[0].start_time > current.end_time:
+            path.insert(0, PathStep('(untracked)', current.end_time, path[0].start_time))
+        path.insert(0, PathStep(current.stage, current.start_time, current.end_time, current))
+        remaining = [x for x in remaining if x.end_time <= current.start_time]
+    return path
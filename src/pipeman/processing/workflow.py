@@ -8,6 +8,8 @@
     3. Batch (a set of one or more working records, referenced by their batch ID)
     4. Observation (a specific observation, which is a working record once finalized to the DB)
 """
+import concurrent.futures
+import dataclasses
 import hashlib
 import tempfile
 import uuid
@@ -29,6 +31,7 @@ import pathlib
 import datetime
 
 from pipeman.processing.payloads import WorkflowPayload, FilePayload
+from pipeman.processing.tracing import Tracer
 import medsutil.awaretime as awaretime
 if t.TYPE_CHECKING:
     import nodb.interface as interface
@@ -37,6 +40,8 @@ VALID_METADATA_CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxy
 
 VALID_FILENAME_CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-."
 
+CONTENT_HASH_METADATA = "ContentSHA256"
+
 RESERVED_FILENAMES = (
     "CON", "PRN", "AUX", "NUL",
     "COM1", "COM2", "COM3", "COM4", "COM5", "COM6", "COM7", "COM8", "COM9",
@@ -44,19 +49,35 @@ RESERVED_FILENAMES = (
 )
 
 
+@dataclasses.dataclass
+class UploadTarget:
+    """Where and how a file will be uploaded."""
+
+    handle: FilePath
+    filename: str
+    gzip: bool
+    allow_overwrite: bool
+    storage_metadata: t.Optional[dict[str, str]]
+    final_tier: t.Optional[StorageTier]
+    content_hash: t.Optional[str] = None
+
+
 class WorkflowController:
     """Manages the flow of an object through a workflow based on its configuration.
      """
 
     storage: StorageController = None
+    tracer: Tracer = None
 
     @injector.construct
     def __init__(self,
                  workflow_name: str,
                  config: WorkflowConfiguration,
                  process_metadata: t.Optional[dict[str, str]] = None,
-                 halt_flag: HaltFlag = None):
+                 halt_flag: HaltFlag = None,
+                 max_upload_workers: int = 4):
         self._process_metadata = process_metadata or {}
+        self._max_upload_workers = max(1, max_upload_workers)
         self._step_list = None
         self.name: str = workflow_name
         self.config: WorkflowConfiguration = config
@@ -79,7 +100,9 @@ class WorkflowController:
         # Validate the upload
         self._validate_file_upload(local_path, metadata, filename)
         # Upload the file to various locations and queue the working file
-        self._upload_and_queue_file(local_path, metadata, success_hook, db, unique_queue_id, filename, correlation_id)
+        correlation_id = correlation_id or str(uuid.uuid4())
+        with self.tracer.span(correlation_id, 'upload', worker=f'workflow:{self.name}', item_size=local_path.stat().st_size):
+            self._upload_and_queue_file(local_path, metadata, success_hook, db, unique_queue_id, filename, correlation_id)
 
     def _extend_metadata(self, metadata: dict[str, str]):
         """Extend the input metadata with the default metadata"""
@@ -119,15 +142,29 @@ class WorkflowController:
                 return gzip_file, gzip_filename
 
             file_handles: list[tuple[FilePath, StorageTier | None, str]] = []
+            created_handles: list[FilePath] = []
             try:
+                # The hash is of the original content, so it is the same for the gzipped and plain copies
+                content_hash = self._hash_file(local_path)
+                uploads: list[UploadTarget] = []
                 for target in (self.config.working_target, *self.config.additional_targets):
                     if target is None:
                         continue
-                    if target.gzip:
-                        lp, fn = _get_gzip_file()
-                    else:
-                        lp, fn = local_path, filename
-                    file_handles.append(self._handle_file_upload(lp, fn, metadata, target))
+                    uploads.append(self._prepare_file_upload(
+                        gzip_filename if target.gzip else filename,
+                        metadata,
+                        target,
+                        gzip=target.gzip,
+                        content_hash=content_hash
+                    ))
+                pending = [u for u in uploads if not self._is_already_uploaded(u)]
+                # Only compress the file if at least one target still needs the gzipped copy
+                sources = {
+                    id(u): (_get_gzip_file()[0] if u.gzip else local_path)
+                    for u in pending
+                }
+                self._upload_all(pending, sources, created_handles)
+                file_handles = [(u.handle, u.final_tier, u.filename) for u in uploads]
                 metadata['workflow-uploaded-files'] = ";".join(
                     str(x[0].path())
                     for x in file_handles
@@ -144,9 +181,11 @@ class WorkflowController:
                 # set if there are errors setting the tier.
                 fh = file_handles
                 file_handles = []
+                created_handles = []
                 self._finish_file_handles(fh)
             except Exception as ex:
-                for fh, _, _ in file_handles:
+                # Files that were already there from a previous attempt are left alone
+                for fh in created_handles:
                     if fh is not None:
                         fh.remove()
                 if isinstance(ex, CNODCError):
@@ -154,6 +193,31 @@ class WorkflowController:
                 else:
                     raise CNODCError(f"Exception while processing incoming file: {ex_pretty(ex)}", "WORKFLOW", 1000) from ex
 
+    def _hash_file(self, local_path: pathlib.Path) -> str:
+        """Calculate the SHA-256 hash of a local file."""
+        with open(local_path, 'rb') as h:
+            return hashlib.file_digest(h, 'sha256').hexdigest()
+
+    def _upload_all(self, uploads: list[UploadTarget], sources: dict[int, pathlib.Path], completed: list[FilePath]):
+        """Upload the files to each target, in parallel if there is more than one.
+
+            The handle of each successful upload is added to completed, so they can be removed if another fails.
+        """
+        def _upload(upload: UploadTarget):
+            self._upload_file(sources[id(upload)], upload)
+            completed.append(upload.handle)
+        if len(uploads) < 2 or self._max_upload_workers < 2:
+            for u in uploads:
+                _upload(u)
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(uploads), self._max_upload_workers)) as executor:
+            futures = [executor.submit(_upload, u) for u in uploads]
+            concurrent.futures.wait(futures)
+        for future in futures:
+            ex = future.exception()
+            if ex is not None:
+                raise ex
+
     def _queue_working_file(self,
                             working_file: FilePath,
                             metadata: dict[str, str],
@@ -295,6 +359,17 @@ class WorkflowController:
                             upload_info: WorkflowDirectory,
                             gzip: bool = False) -> tuple[FilePath, t.Optional[StorageTier], str]:
         """Upload a file to a given location."""
+        upload = self._prepare_file_upload(filename, metadata, upload_info, gzip)
+        self._upload_file(local_path, upload)
+        return upload.handle, upload.final_tier, upload.filename
+
+    def _prepare_file_upload(self,
+                             filename: str,
+                             metadata: dict[str, str],
+                             upload_info: WorkflowDirectory,
+                             gzip: bool = False,
+                             content_hash: t.Optional[str] = None) -> UploadTarget:
+        """Create the target directory and work out where and how a file will be uploaded."""
         with self.storage.handle(upload_info.directory, halt_flag=self.halt_flag) as target_dir_handle:
             target_dir_handle.mkdir()
             if upload_info.keep_versions:
@@ -303,34 +378,56 @@ class WorkflowController:
                 file_handle = version_dir_handle.child(filename)
             else:
                 file_handle = target_dir_handle.child(filename)
-            storage_tier = upload_info.tier
-            if not file_handle.supports_feature(FeatureFlag.TIERING):
-                storage_tier = None
-            if file_handle.supports_feature(FeatureFlag.METADATA):
-                storage_metadata = self.storage.build_metadata(
-                    gzip=gzip,
-                    storage_tier=storage_tier,
-                )
-                storage_metadata.update(WorkflowController._get_storage_metadata(upload_info.metadata, metadata))
-            else:
-                storage_metadata = None
-
-            allow_overwrite = metadata['allow-overwrite'] == '1' if 'allow-overwrite' in metadata else False
-
-            if upload_info.allow_overwrite is OverwriteOption.NEVER:
-                allow_overwrite = False
-            elif upload_info.allow_overwrite is OverwriteOption.ALWAYS:
-                allow_overwrite = True
-
-            self._log.info(f"Uploading file to [%s]", file_handle.path())
-            file_handle.upload(
-                local_path,
-                allow_overwrite=allow_overwrite,
-                storage_tier=StorageTier.FREQUENT,
-                metadata=storage_metadata
+        storage_tier = upload_info.tier
+        if not file_handle.supports_feature(FeatureFlag.TIERING):
+            storage_tier = None
+        if file_handle.supports_feature(FeatureFlag.METADATA):
+            storage_metadata = self.storage.build_metadata(
+                gzip=gzip,
+                storage_tier=storage_tier,
             )
+            storage_metadata.update(WorkflowController._get_storage_metadata(upload_info.metadata, metadata))
+            if content_hash is not None:
+                storage_metadata[CONTENT_HASH_METADATA] = content_hash
+        else:
+            storage_metadata = None
+
+        allow_overwrite = metadata['allow-overwrite'] == '1' if 'allow-overwrite' in metadata else False
+
+        if upload_info.allow_overwrite is OverwriteOption.NEVER:
+            allow_overwrite = False
+        elif upload_info.allow_overwrite is OverwriteOption.ALWAYS:
+            allow_overwrite = True
+
+        return UploadTarget(
+            handle=file_handle,
+            filename=filename,
+            gzip=gzip,
+            allow_overwrite=allow_overwrite,
+            storage_metadata=storage_metadata,
+            final_tier=None if storage_tier is None or storage_tier == StorageTier.FREQUENT else storage_tier,
+            content_hash=content_hash
+        )
+
+    def _is_already_uploaded(self, upload: UploadTarget) -> bool:
+        """Check if the target already holds a copy of the same content (e.g. from a previous attempt)."""
+        if upload.content_hash is None or upload.storage_metadata is None:
+            return False
+        if not upload.handle.exists():
+            return False
+        existing = upload.handle.get_metadata()
+        if existing.get(CONTENT_HASH_METADATA) != upload.content_hash or existing.get('Gzip') != upload.storage_metadata.get('Gzip'):
+            return False
+        self._log.info(f"Skipping upload to [%s], content is unchanged", upload.handle.path())
+        return True
+
+    def _upload_file(self, local_path: pathlib.Path, upload: UploadTarget):
+        """Upload a local file to a prepared target."""
+        self._log.info(f"Uploading file to [%s]", upload.handle.path())
+        upload.handle.upload(
+            local_path,
+            allow_overwrite=upload.allow_overwrite,
+            storage_tier=StorageTier.FREQUENT,
+            metadata=upload.storage_metadata
+        )
 
-            if storage_tier is None or storage_tier == StorageTier.FREQUENT:
-                return file_handle, None, filename
-            else:
-                return file_handle, storage_tier, filename
@@ -1,2 +1,2 @@
 """Support for ERDDAP in CNODC processing tools."""
-from .erddap import ErddapController, ReloadFlag
+from .erddap import ErddapController, ReloadFlag, ReloadScheduler
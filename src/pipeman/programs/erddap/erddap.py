@@ -4,6 +4,7 @@ import zirconium as zr
 import zrlog
 from autoinject import injector
 import enum
+import time
 import typing as t
 
 from medsutil.metrics import Counter
@@ -18,6 +19,74 @@ class ReloadFlag(enum.Enum):
     BAD_FILES = 1
     HARD = 2
 
+    @staticmethod
+    def strongest(a: "ReloadFlag", b: "ReloadFlag") -> "ReloadFlag":
+        """Return the flag that reloads more thoroughly (HARD > BAD_FILES > SOFT)."""
+        return a if a.value >= b.value else b
+
+
+type ReloadKey = tuple[t.Optional[str], str]
+
+
+class ReloadScheduler:
+    """Coalesces reload requests so that each dataset is reloaded at most once per window.
+
+        The first request for a dataset (on a given cluster) is due immediately. Requests
+        that arrive within window_seconds of the last reload are merged into one pending
+        reload, keeping the strongest flag, which becomes due when the window ends.
+    """
+
+    def __init__(self, window_seconds: float = 0):
+        self.window_seconds = max(0.0, float(window_seconds))
+        self._pending: dict[ReloadKey, ReloadFlag] = {}
+        self._last_issued: dict[ReloadKey, float] = {}
+
+    def add(self, dataset_id: str, flag: ReloadFlag = ReloadFlag.SOFT, cluster_name: t.Optional[str] = None):
+        """Request a reload of the dataset."""
+        key = (cluster_name, dataset_id)
+        self._pending[key] = ReloadFlag.strongest(self._pending[key], flag) if key in self._pending else flag
+
+    def pop_due(self, now: t.Optional[float] = None) -> list[tuple[str, ReloadFlag, t.Optional[str]]]:
+        """Remove and return the (dataset_id, flag, cluster_name) reloads that should be issued now."""
+        now = time.monotonic() if now is None else now
+        due = [key for key in self._pending if self._wait_time(key, now) <= 0]
+        for key in due:
+            self._last_issued[key] = now
+        # Datasets that haven't been reloaded within the window no longer need to be tracked
+        for key in [k for k, issued in self._last_issued.items() if now - issued >= self.window_seconds and k not in self._pending]:
+            del self._last_issued[key]
+        return [(key[1], self._pending.pop(key), key[0]) for key in due]
+
+    def pop_all(self) -> list[tuple[str, ReloadFlag, t.Optional[str]]]:
+        """Remove and return every pending reload, regardless of the window."""
+        pending = [(key[1], flag, key[0]) for key, flag in self._pending.items()]
+        self._pending.clear()
+        return pending
+
+    def is_pending(self, dataset_id: str, cluster_name: t.Optional[str] = None) -> bool:
+        """Check if a reload of the dataset is waiting to be issued."""
+        return (cluster_name, dataset_id) in self._pending
+
+    def seconds_until_due(self, dataset_id: str, cluster_name: t.Optional[str] = None, now: t.Optional[float] = None) -> float:
+        """Number of seconds until a reload of the dataset can be issued."""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._wait_time((cluster_name, dataset_id), now))
+
+    def next_due(self, now: t.Optional[float] = None) -> t.Optional[float]:
+        """Number of seconds until the next pending reload is due, or None if nothing is pending."""
+        if not self._pending:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._wait_time(key, now) for key in self._pending))
+
+    def _wait_time(self, key: ReloadKey, now: float) -> float:
+        if key not in self._last_issued:
+            return 0
+        return self._last_issued[key] + self.window_seconds - now
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
 
 @injector.injectable
 class ErddapController:
@@ -1,14 +1,28 @@
+import math
+import time
 import typing as t
 
 from autoinject import injector
 
-from pipeman.programs.erddap import ErddapController, ReloadFlag
+from pipeman.programs.erddap import ErddapController, ReloadFlag, ReloadScheduler
 from nodb.queue import NODBQueueItem
 from pipeman.processing.queue_worker import QueueWorker, QueueItemResult
 from pipeman.exceptions import CNODCError
 
 
 class ERDDAPReloadWorker(QueueWorker):
+    """Reloads ERDDAP datasets.
+
+        Reloads of the same dataset on the same cluster are coalesced: after a dataset
+        is reloaded, further requests for it within coalesce_window_seconds are merged
+        into one reload (with the strongest flag requested) when the window ends. Set
+        the window to 0 to reload on every queue item.
+
+        Queue items merged into a pending reload are not completed until it is issued. They
+        are released until the window ends, then completed when they come back. If the worker
+        stops before then, the pending reload is kept in the queue and another worker reloads
+        the dataset when it picks the item up.
+    """
 
     erddap: ErddapController = None
 
@@ -21,8 +35,26 @@ class ERDDAPReloadWorker(QueueWorker):
         )
         self.set_defaults({
             'queue_name': 'erddap_reload',
-            'default_cluster': None
+            'default_cluster': None,
+            'coalesce_window_seconds': 30,
         })
+        self._scheduler: t.Optional[ReloadScheduler] = None
+        # Queue items waiting on a pending reload, by (cluster_name, dataset_id)
+        self._waiting: dict[tuple[t.Optional[str], str], set[str]] = {}
+        # Queue items whose reload has been issued since they were released, with the time it was issued
+        self._issued: dict[str, float] = {}
+
+    def on_start(self):
+        super().on_start()
+        self._scheduler = ReloadScheduler(self.get_config('coalesce_window_seconds', 30, coerce=float))
+
+    def _run_once(self) -> float:
+        sleep_time = super()._run_once()
+        self.issue_due_reloads()
+        next_due = self._scheduler.next_due()
+        if next_due is not None and next_due < sleep_time:
+            return next_due
+        return sleep_time
 
     def process_queue_item(self, item: NODBQueueItem) -> t.Optional[QueueItemResult]:
         if 'dataset_id' not in item.data or not item.data['dataset_id']:
@@ -38,4 +70,60 @@ class ERDDAPReloadWorker(QueueWorker):
         cluster_name = self.get_config('default_cluster', None)
         if 'cluster_name' in item.data:
             cluster_name = item.data['cluster_name']
-        self.erddap.reload_dataset(item.data['dataset_id'], flag=flag, cluster_name=cluster_name)
+        dataset_id = item.data['dataset_id']
+        if item.queue_uuid in self._issued:
+            del self._issued[item.queue_uuid]
+            return None
+        # Adding again is harmless if the item was already waiting, and restores its reload if it failed
+        self._scheduler.add(dataset_id, flag, cluster_name)
+        self.issue_due_reloads((cluster_name, dataset_id))
+        if item.queue_uuid in self._issued:
+            del self._issued[item.queue_uuid]
+            return None
+        if not self._scheduler.is_pending(dataset_id, cluster_name):
+            return None
+        self._waiting.setdefault((cluster_name, dataset_id), set()).add(item.queue_uuid)
+        item.release(self.db, release_in_seconds=math.ceil(self._scheduler.seconds_until_due(dataset_id, cluster_name)) + 1)
+        return QueueItemResult.HANDLED
+
+    def issue_due_reloads(self, raise_for: t.Optional[tuple[t.Optional[str], str]] = None):
+        """Issue every reload whose window has ended.
+
+            Errors for the dataset given in raise_for (the one from the current queue item) are
+            raised so the item can be retried; for other datasets, they are logged instead.
+        """
+        own_reload = None
+        self._prune_issued()
+        for dataset_id, flag, cluster_name in self._scheduler.pop_due():
+            if (cluster_name, dataset_id) == raise_for:
+                own_reload = (dataset_id, flag, cluster_name)
+            else:
+                self._reload(dataset_id, flag, cluster_name)
+        # Issued last, so an error here can't stop the other due reloads from being issued
+        if own_reload is not None:
+            self.erddap.reload_dataset(own_reload[0], flag=own_reload[1], cluster_name=own_reload[2])
+            self._mark_issued(own_reload[2], own_reload[0])
+
+    def _mark_issued(self, cluster_name: t.Optional[str], dataset_id: str):
+        now = time.monotonic()
+        for queue_uuid in self._waiting.pop((cluster_name, dataset_id), ()):
+            self._issued[queue_uuid] = now
+
+    def _prune_issued(self):
+        """Forget issued reloads whose queue items were picked up by another worker instead."""
+        cutoff = time.monotonic() - self._scheduler.window_seconds - 300
+        for queue_uuid in [x for x, issued in self._issued.items() if issued < cutoff]:
+            del self._issued[queue_uuid]
+
+    def _reload(self, dataset_id: str, flag: ReloadFlag, cluster_name: t.Optional[str]):
+        try:
+            self.erddap.reload_dataset(dataset_id, flag=flag, cluster_name=cluster_name)
+            self._mark_issued(cluster_name, dataset_id)
+        except CNODCError as ex:
+            self._log.exception('Could not reload dataset [%s] on cluster [%s]', dataset_id, cluster_name)
+            if ex.is_transient and self._scheduler is not None:
+                self._scheduler.add(dataset_id, flag, cluster_name)
+        except Exception:
+            self._log.exception('Could not reload dataset [%s] on cluster [%s]', dataset_id, cluster_name)
+            if self._scheduler is not None:
+                self._scheduler.add(dataset_id, flag, cluster_name)
@@ -13,6 +13,7 @@ from pipeman.processing.queue_worker import QueueItemResult
 from pipeman.processing.workflow import WorkflowController
 from pipeman.processing.payloads import NewFilePayload
 from medsutil.storage import StorageController, FilePath
+from medsutil.storage.listing import ListingCache
 
 from pipeman.exceptions import CNODCError
 from autoinject import injector
@@ -42,6 +43,8 @@ class FileScanTask(ScheduledTask):
             'reprocess_updated_files': False,
             'metadata': None,
             'downloader_config': None,
+            'scan_batch_size': 500,
+            'listing_cache_file': None,
         })
         self._scan_target: t.Optional[FilePath] = None
         self._remove_when_complete = None
@@ -51,6 +54,8 @@ class FileScanTask(ScheduledTask):
         self._recursive = None
         self._workflow_name = None
         self._queue_name = None
+        self._listing_cache: t.Optional[ListingCache] = None
+        self._scan_errors = False
 
     def on_start(self):
         scan_target = self.get_config('scan_target')
@@ -68,6 +73,9 @@ class FileScanTask(ScheduledTask):
         self._headers = self.get_config("metadata", {})
         self._pattern = self.get_config('pattern', '*')
         self._recursive = bool(self.get_config('recursive', False))
+        listing_cache_file = self.get_config('listing_cache_file')
+        if listing_cache_file:
+            self._listing_cache = ListingCache(listing_cache_file)
         self.counter("files_scanned_total", description="The total number of files scanned", labels=("outcome",))
         super().on_start()
 
@@ -88,55 +96,115 @@ class FileScanTask(ScheduledTask):
             self._log.warning(f"Directory %s does not exist", self.scan_target.path())
             return
         batch_id = str(uuid.uuid4())
-        full_path = None
-        mod_time = None
+        batch_size = max(1, int(self.get_config('scan_batch_size', 500)))
         self._log.info(f'Scanning [%s]', scan_target.path())
+        self._scan_errors = False
         with scan_target:
+            page: list[tuple[FilePath, str, AwareDateTime | None]] = []
+            for file, mod_time in self._search_files(scan_target):
+                page.append((file, file.path(), mod_time))
+                if len(page) >= batch_size:
+                    self._scan_page(db, page, batch_id)
+                    page = []
+            if page:
+                self._scan_page(db, page, batch_id)
+        if self._listing_cache is not None:
+            if self._scan_errors:
+                # Make sure the files that had errors are seen again on the next pass
+                self._listing_cache.discard()
+            else:
+                self._listing_cache.commit(prune=True)
+
+    def _search_files(self, scan_target: FilePath) -> t.Iterable[tuple[FilePath, AwareDateTime | None]]:
+        if self._listing_cache is None:
             for file in scan_target.search(self._pattern, self._recursive):
-                db.create_savepoint('FILE_INSERT')
-                try:
-                    full_path = file.path()
-                    mod_time = file.modified_datetime() if self._reprocess_updated_files else None
-                    status = db.scanned_file_status(full_path, mod_time)
-                    if status is ScannedFileStatus.NOT_PRESENT:
-                        self._log.info("Found new file [%s][%s]", full_path, mod_time)
-                        db.note_scanned_file(full_path, mod_time)
-                        payload = NewFilePayload.from_handle(file,
-                                                             workflow_name=self._workflow_name,
-                                                             remove_when_complete=self._remove_when_complete,
-                                                             modified_time=mod_time)
-                        payload.metadata.update(self._headers)
-                        payload.metadata.update({
-                            'source': self.process_full_id,
-                            'scan-batch': batch_id,
-                            'scan-target': scan_target.path(),
-                            'scanned-time': awaretime.utc_now().isoformat()
-                        })
-                        payload.set_worker_config('file_downloader', self.get_config('downloader_config', {}))
-                        payload.enqueue(db, self._queue_name)
-                        db.commit()
-                        self.count("files_scanned_total", outcome="success")
-                    else:
-                        self._log.info(f"Skipping old file [%s][%s]", full_path, mod_time)
-                        self.count("files_scanned_total", outcome="skipped")
-                except NODBError as ex:
-
-                    # Serialization or unique key failure means we have one of two issues:
-                    # - The file path was inserted between our own checking and inserting
-                    # - The queue UUID was duplicated (unlikely)
-                    # In either case, we can ignore it for now as long as we rollback.
-                    # If the file doesn't get properly recorded, it will be checked on the next pass
-                    self.count("files_scanned_total", outcome="error")
-                    if ex.is_retryable_error:
-                        db.rollback_to_savepoint('FILE_INSERT')
-                        self._log.warning("Exception while creating database entry for scanned file [%s][%s]", full_path, mod_time, exc_info=True)
-
-                    # Other errors indicate a bigger issue, we want to raise those
-                    else:
-                        raise
-                finally:
-                    full_path = None
-                    mod_time = None
+                yield file, file.modified_datetime() if self._reprocess_updated_files else None
+        else:
+            for file, stat in scan_target.search_changes(self._listing_cache, self._pattern, self._recursive):
+                if not self._reprocess_updated_files:
+                    yield file, None
+                elif stat.st_mtime is not None:
+                    yield file, stat.st_mtime
+                else:
+                    yield file, file.modified_datetime()
+
+    def _scan_page(self, db, page: list[tuple[FilePath, str, AwareDateTime | None]], batch_id: str):
+        statuses = db.bulk_scanned_file_status([(full_path, mod_time) for _, full_path, mod_time in page])
+        new_files = []
+        for file, full_path, mod_time in page:
+            if statuses.get(full_path, ScannedFileStatus.NOT_PRESENT) is ScannedFileStatus.NOT_PRESENT:
+                new_files.append((file, full_path, mod_time))
+            else:
+                self._log.info(f"Skipping old file [%s][%s]", full_path, mod_time)
+                self.count("files_scanned_total", outcome="skipped")
+        if not new_files:
+            return
+        db.create_savepoint('FILE_PAGE_INSERT')
+        try:
+            inserted = db.bulk_note_scanned_files([(full_path, mod_time) for _, full_path, mod_time in new_files])
+            for file, full_path, mod_time in new_files:
+                if full_path not in inserted:
+                    # Another scanner noted the file between our status check and insert
+                    self._log.info(f"Skipping old file [%s][%s]", full_path, mod_time)
+                    continue
+                self._log.info("Found new file [%s][%s]", full_path, mod_time)
+                self._enqueue_file(db, file, mod_time, batch_id)
+            db.commit()
+            for _, full_path, _ in new_files:
+                self.count("files_scanned_total", outcome="success" if full_path in inserted else "skipped")
+        except NODBError as ex:
+            if not ex.is_retryable_error:
+                raise
+            # Fall back to handling each file on its own so that one bad file doesn't block the page
+            db.rollback_to_savepoint('FILE_PAGE_INSERT')
+            self._log.warning("Exception while creating database entries for scanned files, retrying individually", exc_info=True)
+            for file, full_path, mod_time in new_files:
+                self._scan_file(db, file, full_path, mod_time, batch_id)
+
+    def _scan_file(self, db, file: FilePath, full_path: str, mod_time: AwareDateTime | None, batch_id: str):
+        db.create_savepoint('FILE_INSERT')
+        try:
+            status = db.scanned_file_status(full_path, mod_time)
+            if status is ScannedFileStatus.NOT_PRESENT:
+                self._log.info("Found new file [%s][%s]", full_path, mod_time)
+                db.note_scanned_file(full_path, mod_time)
+                self._enqueue_file(db, file, mod_time, batch_id)
+                db.commit()
+                self.count("files_scanned_total", outcome="success")
+            else:
+                self._log.info(f"Skipping old file [%s][%s]", full_path, mod_time)
+                self.count("files_scanned_total", outcome="skipped")
+        except NODBError as ex:
+
+            # Serialization or unique key failure means we have one of two issues:
+            # - The file path was inserted between our own checking and inserting
+            # - The queue UUID was duplicated (unlikely)
+            # In either case, we can ignore it for now as long as we rollback.
+            # If the file doesn't get properly recorded, it will be checked on the next pass
+            self.count("files_scanned_total", outcome="error")
+            self._scan_errors = True
+            if ex.is_retryable_error:
+                db.rollback_to_savepoint('FILE_INSERT')
+                self._log.warning("Exception while creating database entry for scanned file [%s][%s]", full_path, mod_time, exc_info=True)
+
+            # Other errors indicate a bigger issue, we want to raise those
+            else:
+                raise
+
+    def _enqueue_file(self, db, file: FilePath, mod_time: AwareDateTime | None, batch_id: str):
+        payload = NewFilePayload.from_handle(file,
+                                             workflow_name=self._workflow_name,
+                                             remove_when_complete=self._remove_when_complete,
+                                             modified_time=mod_time)
+        payload.metadata.update(self._headers)
+        payload.metadata.update({
+            'source': self.process_full_id,
+            'scan-batch': batch_id,
+            'scan-target': self.scan_target.path(),
+            'scanned-time': awaretime.utc_now().isoformat()
+        })
+        payload.set_worker_config('file_downloader', self.get_config('downloader_config', {}))
+        payload.enqueue(db, self._queue_name)
 
 
 class FileDownloadWorker(PayloadWorker[NewFilePayload]):
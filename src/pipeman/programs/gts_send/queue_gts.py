@@ -1,13 +1,26 @@
 import typing as t
+import uuid
 
+from nodb.gts import GTSOutgoingMessage, GTSOutgoingMessageType, GTSOutgoingMessageStatus
 from pipeman.processing.queue_worker import QueueItemResult
-from pipeman.processing.payload_worker import ObservationWorkflowWorker
+from pipeman.processing.payload_worker import WorkflowWorker
 from pipeman.exceptions import CNODCError
-from pipeman.processing.payloads import ObservationPayload
-import nodb as orm
+from pipeman.processing.payloads import ObservationPayload, ObservationListPayload, WorkflowPayload
 
 
-class GTSQueueWorker(ObservationWorkflowWorker):
+class GTSQueueWorker(WorkflowWorker[WorkflowPayload]):
+    """Queues outgoing GTS messages for one observation or a list of observations.
+
+        The messages to send are described by a gts_info dictionary (or a list of them),
+        with the format, message_type (default NEW) and processing_center. For a list
+        payload, each entry may have its own gts_info; otherwise the gts_info from the
+        payload metadata (or, failing that, the gts_info setting of the worker) is used.
+        All the messages for a queue item are built first and inserted together, and
+        duplicate messages (same observation, format and type) are only queued once.
+
+        List payloads are queued by NODBFinalizeWorker (see its observation_list_queue
+        setting) alongside the workflow, so they are not progressed to another step.
+    """
 
     def __init__(self, **kwargs):
         super().__init__(
@@ -15,34 +28,62 @@ class GTSQueueWorker(ObservationWorkflowWorker):
             process_version="1.0",
             **kwargs
         )
-        self.set_defaults({})
-
-    def process_payload(self, payload: ObservationPayload) -> t.Optional[QueueItemResult]:
-        if 'gts_info' not in payload.metadata or not payload.metadata['gts_info']:
-            raise CNODCError("Missing GTS message data")
-        if isinstance(payload.metadata['gts_info'], (list, tuple, set)):
-            for info in payload.metadata['gts_info']:
-                self._queue_gts_message(payload, info)
+        self.set_defaults({
+            'gts_info': None,
+        })
+
+    def process_payload(self, payload: WorkflowPayload) -> t.Optional[QueueItemResult]:
+        default_info = payload.metadata.get('gts_info') or self.get_config('gts_info', None)
+        if isinstance(payload, ObservationListPayload):
+            messages = self.build_messages(
+                (entry.get('obs_uuid'), entry.get('received_date'), entry.get('gts_info') or default_info)
+                for entry in payload.observations
+            )
+            self.prevent_default_progression()
+        elif isinstance(payload, ObservationPayload):
+            messages = self.build_messages([(payload.obs_uuid, payload.received_date, default_info)])
         else:
-            self._queue_gts_message(payload, payload.metadata['gts_info'])
+            raise CNODCError(f'Payload is not of valid type [found {payload.__class__.__name__}, expecting ObservationPayload or ObservationListPayload]', 'GTS', 1000)
+        if messages:
+            self.db.bulk_insert_objects(messages, ignore_conflicts=True)
+        self._log.debug('Queued [%s] GTS messages', len(messages))
         return QueueItemResult.SUCCESS
 
+    def build_messages(self, observations: t.Iterable[tuple[str, t.Any, t.Any]]) -> list[GTSOutgoingMessage]:
+        """Build the outgoing messages for (obs_uuid, received_date, gts_info) tuples, skipping duplicates."""
+        messages = []
+        seen = set()
+        for obs_uuid, received_date, gts_info in observations:
+            if not obs_uuid or not received_date:
+                raise CNODCError('Missing observation UUID or received date', 'GTS', 1001)
+            if not gts_info:
+                raise CNODCError('Missing GTS message data', 'GTS', 1002)
+            if not isinstance(gts_info, (list, tuple, set)):
+                gts_info = [gts_info]
+            for info in gts_info:
+                message = self._build_gts_message(obs_uuid, received_date, info)
+                key = (message.obs_uuid, message.message_format, message.message_type)
+                if key in seen:
+                    continue
+                seen.add(key)
+                messages.append(message)
+        return messages
 
-    def _queue_gts_message(self, payload: ObservationPayload, gts_info: dict):
+    def _build_gts_message(self, obs_uuid: str, received_date, gts_info: dict) -> GTSOutgoingMessage:
         if not isinstance(gts_info, dict):
-            raise CNODCError('Invalid GTS info')
+            raise CNODCError('Invalid GTS info', 'GTS', 1003)
         if 'format' not in gts_info or not gts_info['format']:
-            raise CNODCError('Missing GTS format')
-        if 'message_type' not in gts_info or not gts_info['message_type']:
-            gts_info['message_type'] = 'NEW'
-        if 'processing_center' not in gts_info or not gts_info['processing_center']:
-            gts_info['processing_center'] = ''
-        message = orm.GTSOutgoingMessage()
-        message.obs_uuid = payload.obs_uuid
-        message.obs_received_date = payload.received_date
+            raise CNODCError('Missing GTS format', 'GTS', 1004)
+        try:
+            message_type = GTSOutgoingMessageType(gts_info.get('message_type') or 'NEW')
+        except ValueError as ex:
+            raise CNODCError(f'Invalid GTS message type [{gts_info['message_type']}]', 'GTS', 1005) from ex
+        message = GTSOutgoingMessage()
+        message.message_id = str(uuid.uuid4())
+        message.obs_uuid = obs_uuid
+        message.obs_received_date = received_date
         message.message_format = gts_info['format']
-        message.message_type = orm.GTSOutgoingMessageType(gts_info['message_type'])
-
-        self.db.insert_object(message)
-
-
+        message.message_type = message_type
+        message.processing_center = gts_info.get('processing_center') or ''
+        message.status = GTSOutgoingMessageStatus.Queued
+        return message
@@ -1,11 +1,19 @@
-import medsutil.ocproc2 as ocproc2
+import math
 import typing as t
 
+from uncertainties import ufloat, UFloat
+
 from medsutil import geodesy
-from pipeman.programs.nodb.qc.qc import BaseTestSuite, TestContext, RecordTest
+from medsutil.uarray import UncertainArray
+from pipeman.programs.nodb.qc.qc import BaseTestSuite, TestContext, BatchTest, QCSkipTest
 
 
 class GTSPPSpeedTest(BaseTestSuite):
+    """Checks the speed between consecutive positions of each station in a batch.
+
+        The positions of each station are collected first and the speeds along the whole
+        track are calculated at once, with the uncertainty of the coordinates carried through.
+    """
 
     def __init__(self, **kwargs):
         super().__init__(
@@ -16,33 +24,47 @@ class GTSPPSpeedTest(BaseTestSuite):
             **kwargs
         )
 
-    @RecordTest(top_only=True)
-    def test_inter_record_speed(self, record: ocproc2.ParentRecord, context: TestContext):
-        self.precheck_value_in_map(record.metadata, 'CNODCStation', allow_dubious=False)
-        self.precheck_value_in_map(record.coordinates, 'Time', allow_dubious=False)
-        self.precheck_value_in_map(record.coordinates, 'Latitude', allow_dubious=False)
-        self.precheck_value_in_map(record.coordinates, 'Longitude', allow_dubious=False)
-        xx = record.coordinates['Longitude'].to_ufloat()
-        yy = record.coordinates['Latitude'].to_ufloat()
-        tt = record.coordinates['Time'].to_datetime()
-        sid = record.metadata['CNODCStation'].to_string()
-        info = (xx, yy, tt)
-        if 'previous_positions' not in context.batch_context:
-            context.batch_context['previous_positions'] = {}
-        if 'top_speeds' not in context.batch_context:
-            context.batch_context['top_speeds'] = {}
-        try:
-            if sid in context.batch_context['previous_positions']:
-                if sid not in context.batch_context['top_speeds']:
-                    context.batch_context['top_speeds'][sid] = self._get_top_speed(sid)
-                self._run_speed_test(
-                    info,
-                    context.batch_context['previous_positions'][sid],
-                    context.batch_context['top_speeds'][sid],
-                    context
-                )
-        finally:
-            context.batch_context['previous_positions'][sid] = info
+    @BatchTest()
+    def test_inter_record_speed(self, batch: dict[str, TestContext]):
+        batch_context = next(iter(batch.values())).batch_context
+        if 'top_speeds' not in batch_context:
+            batch_context['top_speeds'] = {}
+        tracks: dict[str, list[TestContext]] = {}
+        for key in batch:
+            context = batch[key]
+            if context.top_record.latest_test_result(self.test_name):
+                continue
+            record = context.top_record
+            try:
+                self.precheck_value_in_map(record.metadata, 'CNODCStation', allow_dubious=False)
+                self.precheck_value_in_map(record.coordinates, 'Time', allow_dubious=False)
+                self.precheck_value_in_map(record.coordinates, 'Latitude', allow_dubious=False)
+                self.precheck_value_in_map(record.coordinates, 'Longitude', allow_dubious=False)
+            except QCSkipTest:
+                continue
+            tracks.setdefault(record.metadata['CNODCStation'].to_string(), []).append(context)
+        top_speeds = batch_context['top_speeds']
+        for sid, contexts in tracks.items():
+            if len(contexts) < 2:
+                continue
+            if sid not in top_speeds:
+                top_speeds[sid] = self._get_top_speed(sid)
+            if top_speeds[sid] is None:
+                continue
+            for context, speed in zip(contexts[1:], self._track_speeds(contexts)):
+                self._run_speed_test(speed, top_speeds[sid], context)
+
+    @staticmethod
+    def _track_speeds(contexts: list[TestContext]) -> list[t.Optional[UFloat | float]]:
+        speeds = geodesy.track_speeds(
+            UncertainArray.from_values(x.top_record.coordinates['Latitude'].to_ufloat() for x in contexts),
+            UncertainArray.from_values(x.top_record.coordinates['Longitude'].to_ufloat() for x in contexts),
+            [x.top_record.coordinates['Time'].to_datetime() for x in contexts]
+        )
+        return [
+            None if math.isnan(n) else (ufloat(n, s) if s > 0 else n)
+            for n, s in zip(speeds.nominal_value.tolist(), speeds.std_dev.tolist())
+        ]
 
     def _get_top_speed(self, station_id: str) -> t.Optional[float]:
         top_speed = 40
@@ -60,10 +82,9 @@ class GTSPPSpeedTest(BaseTestSuite):
             # TODO: notify that there was an error
             return 40
 
-    def _run_speed_test(self, xyt2: tuple, xyt1: tuple, top_speed, context):
-        if top_speed is None:
+    def _run_speed_test(self, speed, top_speed, context: TestContext):
+        # Positions at the same time have no speed to check
+        if speed is None:
             return
-        distance = geodesy.haversine((xyt2[1], xyt2[0]), (xyt1[1], xyt1[0]))
-        time = (xyt2[2] - xyt1[2]).total_seconds()
         with context.two_coordinate_context('Latitude', 'Longitude') as ctx2:
-            self.assert_greater_than('speed_too_fast', distance / time, top_speed, qc_flag=13)
+            self.assert_greater_than('speed_too_fast', speed, top_speed, qc_flag=13)
@@ -0,0 +1,313 @@
+"""Columnar export of NODB observations for analytics.
+
+    Observations are flattened into one row per record (the parent record and each of its
+    subrecords), with the coordinates of parent records inherited by their children so that
+    every row is fully located. For each coordinate and parameter element in the ontology,
+    three columns are written: the value (in the preferred unit where one is defined), the
+    quality flag, and the units of the value.
+
+    Files are written one per received date in either Parquet or Arrow IPC format. Writing
+    requires pyarrow, which is an optional dependency (see requirements/req.pipeman.export.txt).
+"""
+import datetime
+import pathlib
+import typing as t
+
+from autoinject import injector
+
+from medsutil.exceptions import CodedError
+from medsutil.ocproc2 import OCProc2Ontology, BaseRecord, ParentRecord, AbstractElement
+from medsutil.storage import FilePath
+import medsutil.awaretime as awaretime
+from nodb.observations import NODBObservationData, ObservationStatus
+from pipeman.exceptions import CNODCError
+from pipeman.processing.scheduled_task import ScheduledTask
+
+try:
+    import pyarrow
+except ModuleNotFoundError:
+    pyarrow = None
+
+
+class ColumnType:
+    """Logical column types, independent of the output library."""
+
+    STRING = 'string'
+    FLOAT = 'float'
+    INTEGER = 'integer'
+    DATETIME = 'datetime'
+    DATE = 'date'
+    QUALITY = 'quality'
+
+
+class ColumnarSchema:
+    """Flattened schema for exporting OCPROC2 records as rows."""
+
+    BASE_COLUMNS: tuple[tuple[str, str], ...] = (
+        ('obs_uuid', ColumnType.STRING),
+        ('received_date', ColumnType.DATE),
+        ('status', ColumnType.STRING),
+        ('record_path', ColumnType.STRING),
+    )
+
+    DATA_TYPE_MAP: dict[str, str] = {
+        'decimal': ColumnType.FLOAT,
+        'integer': ColumnType.INTEGER,
+        'dateTimeStamp': ColumnType.DATETIME,
+    }
+
+    def __init__(self, ontology: OCProc2Ontology, element_names: t.Optional[t.Iterable[str]] = None):
+        self._ontology = ontology
+        if element_names is None:
+            self.coordinates = sorted(ontology.element_names('coordinates'))
+            self.parameters = sorted(ontology.element_names('parameters'))
+        else:
+            names = set(element_names)
+            self.coordinates = sorted(x for x in names if ontology.group_name(x) == 'coordinates')
+            self.parameters = sorted(x for x in names if x not in self.coordinates)
+        self._element_types: dict[str, str] = {
+            x: ColumnarSchema.DATA_TYPE_MAP.get(ontology.data_type(x), ColumnType.STRING)
+            for x in self.coordinates + self.parameters
+        }
+        self._preferred_units: dict[str, t.Optional[str]] = {
+            x: ontology.preferred_unit(x)
+            for x in self._element_types
+        }
+
+    def __contains__(self, element_name: str) -> bool:
+        return element_name in self._element_types
+
+    def element_type(self, element_name: str) -> str:
+        return self._element_types[element_name]
+
+    def preferred_unit(self, element_name: str) -> t.Optional[str]:
+        return self._preferred_units[element_name]
+
+    def columns(self) -> list[tuple[str, str]]:
+        """List the names and logical types of all columns, in order."""
+        columns = list(ColumnarSchema.BASE_COLUMNS)
+        for element_name in self.coordinates + self.parameters:
+            columns.append((element_name, self._element_types[element_name]))
+            columns.append((f'{element_name}_quality', ColumnType.QUALITY))
+            columns.append((f'{element_name}_units', ColumnType.STRING))
+        return columns
+
+    def arrow_schema(self):
+        """Build the equivalent pyarrow schema."""
+        type_map = {
+            ColumnType.STRING: pyarrow.string(),
+            ColumnType.FLOAT: pyarrow.float64(),
+            ColumnType.INTEGER: pyarrow.int64(),
+            ColumnType.DATETIME: pyarrow.timestamp('us', tz='UTC'),
+            ColumnType.DATE: pyarrow.date32(),
+            ColumnType.QUALITY: pyarrow.int8(),
+        }
+        return pyarrow.schema([
+            pyarrow.field(name, type_map[col_type])
+            for name, col_type in self.columns()
+        ])
+
+
+class RecordFlattener:
+    """Converts OCPROC2 records into flat rows matching a ColumnarSchema."""
+
+    def __init__(self, schema: ColumnarSchema):
+        self._schema = schema
+        self._parameter_columns: set[str] = set()
+        for element_name in schema.parameters:
+            self._parameter_columns.update((element_name, f'{element_name}_quality', f'{element_name}_units'))
+
+    def flatten(self, record: ParentRecord, base_values: t.Optional[dict[str, t.Any]] = None) -> t.Iterable[dict[str, t.Any]]:
+        yield from self._flatten_record(record, base_values or {}, '')
+
+    def _flatten_record(self, record: BaseRecord, inherited: dict[str, t.Any], record_path: str) -> t.Iterable[dict[str, t.Any]]:
+        row = dict(inherited)
+        row['record_path'] = record_path
+        for element_name in record.coordinates:
+            if element_name in self._schema:
+                self._set_element(row, element_name, record.coordinates[element_name])
+        has_parameters = False
+        for element_name in record.parameters:
+            if element_name in self._schema:
+                has_parameters = True
+                self._set_element(row, element_name, record.parameters[element_name])
+        has_subrecords = record._subrecords is not None and bool(record.subrecords.record_sets)
+        if has_parameters or not has_subrecords:
+            yield row
+        if has_subrecords:
+            child_inherited = {x: row[x] for x in row if x not in self._parameter_columns}
+            for srt, record_sets in record.subrecords.record_sets.items():
+                for rs_idx, record_set in record_sets.items():
+                    for r_idx, subrecord in enumerate(record_set.records):
+                        sub_path = f'subrecords/{srt}/{rs_idx}/{r_idx}'
+                        yield from self._flatten_record(
+                            subrecord,
+                            child_inherited,
+                            f'{record_path}/{sub_path}' if record_path else sub_path
+                        )
+
+    def _set_element(self, row: dict[str, t.Any], element_name: str, element: AbstractElement):
+        ideal = element.ideal()
+        if ideal is None:
+            return
+        row[f'{element_name}_quality'] = ideal.quality
+        units = ideal.units()
+        if ideal.value is None or ideal.value == '':
+            row[element_name] = None
+            row[f'{element_name}_units'] = units
+            return
+        col_type = self._schema.element_type(element_name)
+        try:
+            if col_type == ColumnType.FLOAT or col_type == ColumnType.INTEGER:
+                pref_units = self._schema.preferred_unit(element_name) if units is not None else None
+                if col_type == ColumnType.FLOAT:
+                    row[element_name] = ideal.to_float(pref_units)
+                else:
+                    row[element_name] = ideal.to_int(pref_units, no_loss=False)
+                units = pref_units or units
+            elif col_type == ColumnType.DATETIME:
+                row[element_name] = ideal.to_datetime()
+            else:
+                row[element_name] = ideal.to_string()
+        except (ValueError, TypeError, CodedError):
+            row[element_name] = None
+        row[f'{element_name}_units'] = units
+
+
+class ColumnarWriter:
+    """Writes rows to a Parquet or Arrow IPC file."""
+
+    FORMATS: dict[str, str] = {
+        'parquet': 'parquet',
+        'arrow': 'arrow',
+    }
+
+    def __init__(self, output_file: pathlib.Path, schema: ColumnarSchema, file_format: str = 'parquet', compression: t.Optional[str] = 'zstd'):
+        if pyarrow is None:
+            raise CNODCError('pyarrow is required for columnar export', 'NODBEXPORT', 1000)
+        if file_format not in ColumnarWriter.FORMATS:
+            raise CNODCError(f'Invalid columnar format [{file_format}]', 'NODBEXPORT', 1001)
+        self._schema = schema.arrow_schema()
+        if file_format == 'parquet':
+            from pyarrow import parquet
+            self._writer = parquet.ParquetWriter(str(output_file), self._schema, compression=compression)
+        else:
+            from pyarrow import ipc
+            self._writer = ipc.new_file(
+                str(output_file),
+                self._schema,
+                options=ipc.IpcWriteOptions(compression=compression)
+            )
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_rows(self, rows: list[dict[str, t.Any]]):
+        if rows:
+            self._writer.write_batch(pyarrow.RecordBatch.from_pylist(rows, schema=self._schema))
+            self.rows_written += len(rows)
+
+    def close(self):
+        self._writer.close()
+
+
+class NODBColumnarExportTask(ScheduledTask):
+    """Exports recently received observations to a columnar file per received date."""
+
+    ontology: OCProc2Ontology = None
+
+    @injector.construct
+    def __init__(self, **kwargs):
+        super().__init__(
+            process_name='nodb_columnar_export',
+            process_version='1.0',
+            **kwargs
+        )
+        self.set_defaults({
+            'output_target': None,
+            'format': 'parquet',
+            'compression': 'zstd',
+            'elements': None,
+            'days_back': 1,
+            'batch_size': 10000,
+            'allow_overwrite': False,
+            'exclude_statuses': [ObservationStatus.DUPLICATE.value, ObservationStatus.DISCARDED.value],
+        })
+        self._output_target: t.Optional[FilePath] = None
+        self._schema: t.Optional[ColumnarSchema] = None
+        self._flattener: t.Optional[RecordFlattener] = None
+        self._file_format: t.Optional[str] = None
+        self._exclude_statuses: set[str] = set()
+
+    def on_start(self):
+        output_target = self.get_config('output_target')
+        if not output_target:
+            raise CNODCError('Output target is not configured', 'NODBEXPORT', 1002)
+        self._file_format = self.get_config('format', 'parquet')
+        if self._file_format not in ColumnarWriter.FORMATS:
+            raise CNODCError(f'Invalid columnar format [{self._file_format}]', 'NODBEXPORT', 1001)
+        self._output_target = self.get_handle(output_target, True)
+        self._schema = ColumnarSchema(self.ontology, self.get_config('elements'))
+        self._flattener = RecordFlattener(self._schema)
+        self._exclude_statuses = set(self.get_config('exclude_statuses') or [])
+        self.counter('columnar_rows_exported_total', description='The total number of rows exported')
+        super().on_start()
+
+    @property
+    def schema(self) -> ColumnarSchema:
+        if self._schema is None:
+            raise RuntimeError('Schema called too early')
+        return self._schema
+
+    def execute(self):
+        today = awaretime.utc_now().date()
+        with self.nodb as db:
+            for offset in range(int(self.get_config('days_back', 1)), 0, -1):
+                self.breakpoint()
+                self.export_received_date(db, today - datetime.timedelta(days=offset))
+
+    def export_received_date(self, db, received_date: datetime.date) -> bool:
+        file_name = f'nodb_obs_{received_date.strftime("%Y%m%d")}.{ColumnarWriter.FORMATS[self._file_format]}'
+        target = self._output_target / file_name
+        allow_overwrite = bool(self.get_config('allow_overwrite', False))
+        if target.exists() and not allow_overwrite:
+            self._log.debug('Export [%s] already exists, skipping', target.path())
+            return False
+        local_file = self.temp_dir() / file_name
+        batch_size = int(self.get_config('batch_size', 10000))
+        with ColumnarWriter(local_file, self.schema, self._file_format, self.get_config('compression')) as writer:
+            rows = []
+            for row in self.iter_rows(db, received_date):
+                rows.append(row)
+                if len(rows) >= batch_size:
+                    self.breakpoint()
+                    writer.write_rows(rows)
+                    rows = []
+            writer.write_rows(rows)
+            rows_written = writer.rows_written
+        if rows_written == 0:
+            self._log.debug('No observations received on [%s], skipping', received_date)
+            return False
+        self._log.info('Uploading [%s] rows to [%s]', rows_written, target.path())
+        target.upload(local_file, allow_overwrite=allow_overwrite)
+        self.counter('columnar_rows_exported_total').inc(rows_written)
+        return True
+
+    def iter_rows(self, db, received_date: datetime.date) -> t.Iterable[dict[str, t.Any]]:
+        filters: dict[str, t.Any] = {'received_date': received_date}
+        if self._exclude_statuses:
+            filters['status'] = (sorted(self._exclude_statuses), 'NOT IN', True)
+        for obs_data in db.stream_objects(NODBObservationData, filters=filters):
+            obs_data: NODBObservationData
+            record = obs_data.record
+            if record is None:
+                continue
+            yield from self._flattener.flatten(record, {
+                'obs_uuid': obs_data.obs_uuid,
+                'received_date': obs_data.received_date,
+                'status': obs_data.status.value if obs_data.status is not None else None,
+            })
@@ -4,12 +4,17 @@ import typing as t
 from pipeman.processing.payload_worker import BatchWorkflowWorker
 from pipeman.processing.queue_worker import QueueItemResult
 from pipeman.programs.nodb.record_manager import NODBRecordManager
-from pipeman.processing.payloads import BatchPayload
+from pipeman.processing.payloads import BatchPayload, ObservationListPayload
 
-from nodb.observations import BatchStatus
+from nodb.observations import BatchStatus, NODBWorkingRecord, NODBObservation
 
 
 class NODBFinalizeWorker(BatchWorkflowWorker):
+    """Moves the working records of a batch into the completed observation tables.
+
+        If observation_list_queue is set, an ObservationListPayload with the observations created
+        from each chunk is also queued there (e.g. for GTSQueueWorker to send them in bulk).
+    """
 
     def __init__(self, **kwargs):
         super().__init__(
@@ -20,22 +25,39 @@ class NODBFinalizeWorker(BatchWorkflowWorker):
         self.set_defaults({
             'queue_name': 'nodb_finalize',
             'next_queue': 'workflow_continue',
+            'finalize_chunk_size': 250,
+            'observation_list_queue': None,
         })
+        self._chunk_size: int = 250
+        self._observation_list_queue: t.Optional[str] = None
 
     def on_start(self):
         super().on_start()
+        self._chunk_size = max(1, self.get_config('finalize_chunk_size', 250, coerce=int))
+        self._observation_list_queue = self.get_config('observation_list_queue', None) or None
 
     def process_payload(self, payload: BatchPayload) -> t.Optional[QueueItemResult]:
         batch = payload.load_batch(self.db)
         if batch.status != BatchStatus.COMPLETE:
             with NODBRecordManager(self.db) as rm:
+                chunk: list[NODBWorkingRecord] = []
                 for working in batch.stream_working_records(self.db):
-                    rm.create_completed_entry_from_working_record(
-                        working=working,
-                    )
-                    self.db.delete_object(working)
+                    chunk.append(working)
+                    if len(chunk) >= self._chunk_size:
+                        self._finalize_chunk(rm, chunk)
+                        chunk = []
+                if chunk:
+                    self._finalize_chunk(rm, chunk)
             batch.status = BatchStatus.COMPLETE
             self.db.update_object(batch)
             self.progress_payload(prevent_default_progression=True)
 
-
+    def _finalize_chunk(self, rm: NODBRecordManager, chunk: list[NODBWorkingRecord]):
+        self.breakpoint()
+        created: list[NODBObservation] = []
+        rm.create_completed_entries_from_working_records(chunk, created)
+        self.db.bulk_delete_objects(NODBWorkingRecord, 'working_uuid', [x.working_uuid for x in chunk])
+        if self._observation_list_queue is not None and created:
+            payload = ObservationListPayload.from_observations(created)
+            self.add_payload_metadata(payload)
+            payload.enqueue(self.db, self._observation_list_queue)
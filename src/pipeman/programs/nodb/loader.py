@@ -3,6 +3,7 @@ import uuid
 from medsutil.ocproc2.codecs.base import BaseCodec, DecodeResult
 from nodb.interface import LockType
 import medsutil.ocproc2 as ocproc2
+import medsutil.types as ct
 import typing as t
 
 from pipeman.processing.payload_worker import WorkflowWorker
@@ -85,8 +86,8 @@ class NODBDecodeLoadWorker(WorkflowWorker):
             raise CNODCError(f"Specified codec [{cls.__name__}] is not a decoder", "NODB-LOAD", 1002)
         return decoder
 
-    def _decode_records(self, h) -> t.Iterable[DecodeResult]:
-        yield from self.decoder.buffered_decode_messages(self.decoder._read_in_chunks(h), **self.get_config('decoder_kwargs', {}))
+    def _decode_records(self, content: ct.ByteStrings) -> t.Iterable[DecodeResult]:
+        yield from self.decoder.buffered_decode_messages(content, **self.get_config('decoder_kwargs', {}))
 
     def process_payload(self, payload: WorkflowPayload) -> t.Optional[QueueItemResult]:
         # Find the source file
@@ -117,8 +118,8 @@ class NODBDecodeLoadWorker(WorkflowWorker):
 
         # Decode each entry and save them
         with NODBRecordManager(self._db) as rm:
-            with open(temp_file, "rb") as h:
-                for result in self._decode_records(h):
+            with self.decoder.file_content(self.get_handle(temp_file, raise_ex=True)) as content:
+                for result in self._decode_records(content):
                     success, skipped, had_error = self._create_nodb_record_from_result(rm, source_file, result)
                     total_created += success
                     total_skipped += skipped
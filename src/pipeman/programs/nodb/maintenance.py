@@ -1,3 +1,5 @@
+from nodb.interface import LockType
+from nodb.observations import NODBObservation
 from pipeman.processing.scheduled_task import ScheduledTask
 
 
@@ -11,8 +13,43 @@ class NODBMaintenanceTask(ScheduledTask):
         )
         self.set_defaults({
             'run_on_boot': True,
+            'summary_backfill_batch_size': 1000,
         })
 
     def execute(self):
         with self.nodb as db:
             db.run_maintenance()
+            self.backfill_observation_summaries(db)
+
+    def backfill_observation_summaries(self, db) -> int:
+        """Recalculate the summary columns for observations built with an older summary version."""
+        batch_size = int(self.get_config('summary_backfill_batch_size', 1000))
+        if batch_size <= 0:
+            return 0
+        keys = []
+        for row in db.stream_raw(
+            NODBObservation,
+            filters={'summary_version': (NODBObservation.SUMMARY_VERSION, '<', True)},
+            key_only=True
+        ):
+            keys.append((row['obs_uuid'], row['received_date']))
+            if len(keys) >= batch_size:
+                break
+        updated = 0
+        for obs_uuid, received_date in keys:
+            self.breakpoint()
+            obs = NODBObservation.find_by_uuid(db, obs_uuid, received_date, lock_type=LockType.FOR_NO_KEY_UPDATE)
+            if obs is None:
+                continue
+            obs_data = obs.find_observation_data(db)
+            if obs_data is None or obs_data.record is None:
+                # Nothing to summarize, but record the version so we don't retry it every run
+                obs.summary_version = NODBObservation.SUMMARY_VERSION
+            else:
+                obs.update_from_record(obs_data.record)
+            db.update_object(obs)
+            db.commit()
+            updated += 1
+        if updated:
+            self._log.info('Backfilled summary columns for [%s] observations', updated)
+        return updated
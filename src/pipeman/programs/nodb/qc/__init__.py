@@ -0,0 +1,4 @@
+from .qc import (
+    BaseTestSuite, QCTestRunner, TestContext, QCSkipTest, QCComplete, QCAssertionError,
+    BatchTest, RecordSetTest, RecordTest, CoordinateTest, MetadataTest, ParameterTest
+)
@@ -11,6 +11,7 @@ from medsutil import ocproc2 as ocproc2
 from medsutil.awaretime import AwareDateTime
 from nodb.observations import NODBSourceFile, NODBWorkingRecord, NODBObservationData, NODBObservation, NODBPlatform, NODBMission
 from nodb.interface import NODBInstance, LockType
+from nodb.reference_cache import ReferenceCache
 from medsutil.ocproc2 import OCProc2Ontology
 from medsutil.units import UnitConverter
 
@@ -19,6 +20,7 @@ class NODBRecordManager:
 
     converter: UnitConverter = None
     ontology: OCProc2Ontology = None
+    reference_cache: ReferenceCache = None
 
     @injector.construct
     def __init__(self, db: NODBInstance):
@@ -92,16 +94,57 @@ class NODBRecordManager:
         return result
 
     def create_completed_entry(self, record: ocproc2.ParentRecord, source_file_uuid: str, received_date: datetime.date, message_idx: int, record_idx: int, original_uuid: str = None):
-        if self._check_completed_entry(source_file_uuid, received_date, message_idx, record_idx, record.metadata.best('CNODCLevel', coerce=str, default='UNKNOWN')):
+        entry = self._prepare_completed_entry(record, source_file_uuid, received_date, message_idx, record_idx, original_uuid)
+        if entry is None:
             return False
+        self._prep_obs.execute(entry[0])
+        self._prep_obs_data.execute(entry[1])
+        return True
+
+    def create_completed_entries_from_working_records(self, workings: t.Iterable[NODBWorkingRecord], created: t.Optional[list[NODBObservation]] = None) -> int:
+        """Build the completed entries for a chunk of working records and insert them together.
+
+            Returns the number of entries created; working records that already have a
+            completed entry are skipped. If created is given, the new observations are added to it.
+        """
+        observations = []
+        observation_data = []
+        for working in workings:
+            entry = self._prepare_completed_entry(
+                record=working.record,
+                source_file_uuid=working.source_file_uuid,
+                received_date=working.received_date,
+                message_idx=working.message_idx,
+                record_idx=working.record_idx
+            )
+            if entry is not None:
+                observations.append(entry[0])
+                observation_data.append(entry[1])
+        if observations:
+            self._db.bulk_insert_objects(observations)
+            self._db.bulk_insert_objects(observation_data)
+            if created is not None:
+                created.extend(observations)
+        return len(observations)
+
+    def _prepare_completed_entry(self,
+                                 record: ocproc2.ParentRecord,
+                                 source_file_uuid: str,
+                                 received_date: datetime.date,
+                                 message_idx: int,
+                                 record_idx: int,
+                                 original_uuid: str = None) -> tuple[NODBObservation, NODBObservationData] | None:
+        cnodc_level = record.metadata.best('CNODCLevel', coerce=str, default='UNKNOWN')
+        if self._check_completed_entry(source_file_uuid, received_date, message_idx, record_idx, cnodc_level):
+            return None
         self._identify_platform(record)
         self._prune_platform_metadata(record)
         self._identify_mission(record)
         self._prune_mission_metadata(record)
-        obs, obs_data = self.build_nodb_entry(record, source_file_uuid, received_date, message_idx, record_idx, original_uuid)
-        self._prep_obs.execute(obs)
-        self._prep_obs_data.execute(obs_data)
-        return True
+        entry = self.build_nodb_entry(record, source_file_uuid, received_date, message_idx, record_idx, original_uuid)
+        # Remember it, so a repeat later in the same chunk isn't inserted twice
+        self._memory['completed_entries_by_file'][f"{source_file_uuid}__{received_date.isoformat()}"][(message_idx, record_idx, cnodc_level)] = True
+        return entry
 
     def _identify_platform(self, record: ocproc2.ParentRecord):
         if record.metadata.has_value('CNODCPlatform'):
@@ -217,42 +260,75 @@ class NODBRecordManager:
         if lookup_key_name not in self._memory:
             self._memory[lookup_key_name] = {}
         if obj_uuid not in self._memory[lookup_key_name]:
-            self._memory[lookup_key_name][obj_uuid] = finder(self._db, obj_uuid)
+            self._memory[lookup_key_name][obj_uuid] = self.reference_cache.fetch(
+                lookup_key_name,
+                obj_uuid,
+                functools.partial(finder, self._db, obj_uuid)
+            )
         return obj_uuid, self._memory[lookup_key_name][obj_uuid]
 
     def _prune_metadata(self, record: ocproc2.ParentRecord, lookup_key_name, group_name, finder: t.Callable):
         obj_uuid, obj = self._get_object_with_cache(record, lookup_key_name, finder)
         if obj is None:
             return
-        unloaded = obj.metadata
-        changed = False
+        # The cached copy may be stale, so it only decides what is already known. Anything else is
+        # checked against the locked row itself before it is added.
+        known = obj.metadata or {}
         remove_keys = []
+        new_values = {}
         for element_name in record.metadata.keys():
             element_group = self.ontology.group_name(element_name)
             if element_group == group_name:
-                if element_name not in unloaded:
-                    unloaded[element_name] = record.metadata[element_name].to_mapping()
-                    changed = True
-                    remove_keys.append(element_name)
-                elif unloaded[element_name] == record.metadata[element_name].to_mapping():
+                value = record.metadata[element_name].to_mapping()
+                if element_name not in known:
+                    new_values[element_name] = value
+                elif known[element_name] == value:
                     remove_keys.append(element_name)
+        if new_values:
+            locked = finder(self._db, obj_uuid, lock_type=LockType.FOR_NO_KEY_UPDATE)
+            if locked is not None:
+                remove_keys.extend(self._merge_new_metadata(locked, new_values, lookup_key_name, obj_uuid))
+                self._memory[lookup_key_name][obj_uuid] = locked
         for element_name in remove_keys:
             del record.metadata[element_name]
+
+    def _merge_new_metadata(self, locked, new_values: dict, lookup_key_name: str, obj_uuid: str) -> list[str]:
+        """Add the new metadata values to a locked row and return the names that are now stored on it."""
+        metadata = dict(locked.metadata or {})
+        stored = []
+        changed = False
+        for element_name, value in new_values.items():
+            if element_name not in metadata:
+                metadata[element_name] = value
+                changed = True
+                stored.append(element_name)
+            elif metadata[element_name] == value:
+                stored.append(element_name)
         if changed:
-            obj = finder(self._db, obj_uuid, lock_type=LockType.FOR_NO_KEY_UPDATE)
-            obj.metadata = unloaded
-            self._db.update_object(obj)
-            self._memory[lookup_key_name][obj_uuid] = obj
+            locked.metadata = metadata
+            self._db.update_object(locked)
+            # Invalidating before the commit would let another process cache the old row again
+            self._db.after_commit(functools.partial(self.reference_cache.invalidate, lookup_key_name, obj_uuid))
+        return stored
+
+    def _working_positions(self, source_file_uuid: str, received_date: datetime.date) -> set[tuple[int, int]]:
+        key = f"{source_file_uuid}__{received_date.isoformat()}"
+        if 'working_entries_by_file' not in self._memory:
+            self._memory['working_entries_by_file'] = {}
+        if key not in self._memory['working_entries_by_file']:
+            self._memory['working_entries_by_file'][key] = set(
+                (int(row["message_idx"]), int(row["record_idx"]))
+                for row in NODBWorkingRecord.find_all_by_source_file_raw(self._db, source_file_uuid, received_date, limit_fields=["message_idx", "record_idx"])
+            )
+        return self._memory['working_entries_by_file'][key]
 
     def create_working_entry(self, record: ocproc2.ParentRecord, source_file_uuid: str, received_date: datetime.date, message_idx: int, record_idx: int):
-        check = NODBWorkingRecord.find_by_source_info(
-            self._db, source_file_uuid, received_date, message_idx, record_idx, key_only=True
-        )
-        if check is not None:
+        if (message_idx, record_idx) in self._working_positions(source_file_uuid, received_date):
             return False
         working_record = self.build_nodb_working_entry(record, source_file_uuid, received_date, message_idx, record_idx)
-        self._db.insert_object(working_record)
-        return True
+        # The preloaded positions aren't updated (a failed message is rolled back), so repeats
+        # and records loaded by another process since then are left to the unique index.
+        return self._db.insert_object(working_record, ignore_conflicts=True)
 
     def build_nodb_working_entry(self,
                                  record: ocproc2.ParentRecord,
@@ -294,22 +370,23 @@ class NODBRecordManager:
         return obs, obs_data
 
     def finalize(self, record: ocproc2.BaseRecord, is_top_level: bool = True):
+        """Promote WorkingQuality to Quality on every element of the record and its subrecords."""
         if is_top_level:
             if not record.metadata.has_value('CNODCLevel'):
                 record.metadata.set('CNODCLevel', 'UNKNOWN')
-        for key in record.metadata:
-            self._finalize_value(record.metadata[key])
-        for key in record.parameters:
-            self._finalize_value(record.parameters[key])
-        for key in record.coordinates:
-            self._finalize_value(record.coordinates[key])
-        for record in record.iter_subrecords():
-            self.finalize(record, False)
-
-    def _finalize_value(self, value: ocproc2.AbstractElement):
+        records = [record]
+        while records:
+            current = records.pop()
+            elements = [*current.metadata.values(), *current.parameters.values(), *current.coordinates.values()]
+            while elements:
+                value = elements.pop()
+                self._finalize_value(value)
+                if isinstance(value, ocproc2.MultiElement):
+                    elements.extend(value.values())
+            records.extend(current.iter_subrecords())
+
+    @staticmethod
+    def _finalize_value(value: ocproc2.AbstractElement):
         if 'WorkingQuality' in value.metadata:
             value.metadata['Quality'] = value.metadata['WorkingQuality'].best()
             del value.metadata['WorkingQuality']
-        if isinstance(value, ocproc2.MultiElement):
-            for v in value.values():
-                self._finalize_value(v)
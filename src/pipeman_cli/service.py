@@ -37,6 +37,20 @@ def shutdown(config: zr.ApplicationConfig = None):
     exit(0 if res == b'0' else 1)
 
 
+@service.command(help="Profile the running workers of a process set")
+@click.argument('process-name')
+@click.option('--cprofile', default=None, type=int, help="Run cProfile around this many queue items instead of sampling stacks")
+@click.option('--seconds', default=30.0, type=float, help="Number of seconds to sample stacks for")
+def profile(process_name: str, cprofile: int | None = None, seconds: float = 30.0, config: zr.ApplicationConfig = None):
+    from medsutil.servicecmd import send_command
+    socket_port: int = config.as_int(("pipeman", "service", "port"), default=9173)
+    if cprofile:
+        res = send_command(socket_port, f'profile {process_name} cprofile {cprofile}'.encode('utf-8'))
+    else:
+        res = send_command(socket_port, f'profile {process_name} sample {seconds}'.encode('utf-8'))
+    exit(0 if res == b'0' else 1)
+
+
 @service.command()
 @click.option('--silent', default=False, is_flag=True)
 def health_check(silent: bool = False, config: zr.ApplicationConfig = None):
@@ -0,0 +1,68 @@
+import statistics
+import time
+
+import click
+from autoinject import injector
+
+from pipeman.processing.tracing import Tracer, critical_path, Span
+
+
+@click.group("trace", help="Summarize the time files spend in each stage of the pipeline")
+def trace(): ...
+
+
+def _load_sink(tracer: Tracer):
+    if not tracer.enabled:
+        raise click.ClickException('Tracing is not configured (cnodc.tracing.sink)')
+    return tracer.sink
+
+
+@trace.command(help="Show the critical path of one file")
+@click.argument('correlation_id')
+@injector.inject
+def show(correlation_id: str, tracer: Tracer = None):
+    spans = _load_sink(tracer).read(correlation_id=correlation_id)
+    if not spans:
+        raise click.ClickException(f'No spans found for [{correlation_id}]')
+    path = critical_path(spans)
+    total = path[-1].end_time - path[0].start_time
+    print("STAGE,WORKER,SECONDS,PERCENT,STATUS")
+    for step in path:
+        worker = step.span.worker if step.span else ''
+        status = step.span.status if step.span else ''
+        print(f"{step.stage},{worker or ''},{step.duration:.3f},{(step.duration / total * 100) if total else 0:.1f},{status}")
+    print(f"TOTAL,,{total:.3f},100.0,")
+
+
+@trace.command(help="Summarize the critical path latency by stage for recent files")
+@click.option("--hours", default=24.0, type=float, help="Only include files with a span that ended in this many hours")
+@injector.inject
+def summary(hours: float = 24.0, tracer: Tracer = None):
+    spans_by_id: dict[str, list[Span]] = {}
+    for span in _load_sink(tracer).read(since=time.time() - (hours * 3600)):
+        spans_by_id.setdefault(span.correlation_id, []).append(span)
+    if not spans_by_id:
+        raise click.ClickException('No spans found')
+    totals = []
+    by_stage: dict[str, list[float]] = {}
+    for spans in spans_by_id.values():
+        path = critical_path(spans)
+        totals.append(path[-1].end_time - path[0].start_time)
+        stage_times = {}
+        for step in path:
+            stage_times[step.stage] = stage_times.get(step.stage, 0) + step.duration
+        for stage, seconds in stage_times.items():
+            by_stage.setdefault(stage, []).append(seconds)
+    grand_total = sum(totals)
+    print("STAGE,FILES,MEAN_SECONDS,P50_SECONDS,P95_SECONDS,MAX_SECONDS,PERCENT_OF_TOTAL")
+    for stage, values in sorted(by_stage.items(), key=lambda x: sum(x[1]), reverse=True):
+        print(_summary_row(stage, values, grand_total))
+    print(_summary_row('TOTAL', totals, grand_total))
+
+
+def _summary_row(name: str, values: list[float], grand_total: float) -> str:
+    values = sorted(values)
+    p50 = statistics.median(values)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    percent = (sum(values) / grand_total * 100) if grand_total else 0
+    return f"{name},{len(values)},{statistics.fmean(values):.3f},{p50:.3f},{p95:.3f},{values[-1]:.3f},{percent:.1f}"
@@ -33,7 +33,7 @@ from desktop.gui.record_list_pane import RecordListPane
 from desktop.gui.station_pane import StationPane
 from desktop.gui.map_pane import MapPane
 from desktop.util import TranslatableException
-from medsutil.ocproc2.operations import QCOperator, QCSetWorkingQuality, QCAddHistory
+from medsutil.ocproc2.operations import QCOperator, QCSetWorkingQuality, QCAddHistory, QCOperationBatch
 from medsutil.dynamic import dynamic_object
 from autoinject import injector
 
@@ -249,9 +249,8 @@ class CNODCQCApp:
                 cur.execute('SELECT rowid, action_text FROM actions WHERE record_uuid = ?', [record_uuid])
                 actions = {}
                 for rowid, action_text in cur.fetchall():
-                    operator = QCOperator.from_map(json.loads(action_text))
-                    operator.apply(record, None)
-                    actions[rowid] = operator
+                    actions[rowid] = QCOperator.from_map(json.loads(action_text))
+                QCOperationBatch(actions.values()).apply(record)
                 subrecord_path = None
                 if self.app_state.record_uuid is None or self.app_state.record_uuid != record_uuid:
                     subrecord_path = self.app_state.subrecord_path
@@ -0,0 +1,151 @@
+"""Queue-driven autoscaling for process sets.
+
+    A process set can grow and shrink with the backlog of the queue its workers read from,
+    by adding an autoscale block next to its count:
+
+        gts_send:
+          class_name: pipeman.programs.gts_send.queue_gts.GTSQueueWorker
+          count: 2
+          config:
+            queue_name: gts_send
+          autoscale:
+            min_count: 1
+            max_count: 8
+            items_per_process: 25
+            scale_down_items_per_process: 10
+            max_age_seconds: 600
+            scale_up_cooldown_seconds: 60
+            scale_down_cooldown_seconds: 300
+            max_cpu_percent: 90
+            max_memory_percent: 90
+
+    The count is then only used as the starting number of processes. The backlog of a queue is
+    the number of unlocked items in it and the age of the oldest one. A process set grows to
+    one process per items_per_process items in the backlog (or by one process when the
+    oldest item is older than max_age_seconds) and shrinks one process at a time once the
+    backlog would fit in one fewer process at scale_down_items_per_process items each (by
+    default, half of items_per_process). The gap between the two thresholds keeps the set
+    from bouncing between two sizes, and the cooldowns limit how often it can change in
+    either direction. Growth is held back while the host CPU or memory use is above
+    max_cpu_percent or max_memory_percent.
+
+    The queue name defaults to the queue_name in the worker configuration.
+"""
+import dataclasses
+import math
+import time
+import typing as t
+
+from pipeman.exceptions import CNODCError
+
+
+@dataclasses.dataclass(frozen=True)
+class QueueBacklog:
+    """Items waiting in a queue."""
+
+    depth: int = 0
+    oldest_age_seconds: float = 0.0
+
+
+@dataclasses.dataclass(frozen=True)
+class AutoscalePolicy:
+    """Settings for scaling a process set."""
+
+    queue_name: str
+    min_count: int = 1
+    max_count: int = 1
+    items_per_process: float = 10
+    scale_down_items_per_process: t.Optional[float] = None
+    max_age_seconds: t.Optional[float] = None
+    scale_up_cooldown_seconds: float = 60
+    scale_down_cooldown_seconds: float = 300
+    max_cpu_percent: t.Optional[float] = None
+    max_memory_percent: t.Optional[float] = None
+
+    @property
+    def scale_down_threshold(self) -> float:
+        if self.scale_down_items_per_process is None:
+            return self.items_per_process / 2
+        return self.scale_down_items_per_process
+
+    def clamp(self, count: int) -> int:
+        return min(max(count, self.min_count), self.max_count)
+
+    @staticmethod
+    def from_config(config: dict, worker_config: t.Optional[dict] = None) -> AutoscalePolicy:
+        """Build a policy from the autoscale block of a process definition."""
+        if not isinstance(config, dict):
+            raise CNODCError('Autoscale configuration must be a dictionary', 'AUTOSCALE', 1000)
+        fields = {x.name for x in dataclasses.fields(AutoscalePolicy)}
+        unknown = [x for x in config if x not in fields]
+        if unknown:
+            raise CNODCError(f'Unknown autoscale settings [{', '.join(unknown)}]', 'AUTOSCALE', 1001)
+        kwargs = dict(config)
+        if not kwargs.get('queue_name'):
+            kwargs['queue_name'] = (worker_config or {}).get('queue_name')
+        if not kwargs['queue_name']:
+            raise CNODCError('No queue specified for autoscaling', 'AUTOSCALE', 1002)
+        try:
+            for key in ('min_count', 'max_count'):
+                if key in kwargs:
+                    kwargs[key] = int(kwargs[key])
+            for key in fields - {'queue_name', 'min_count', 'max_count'}:
+                if kwargs.get(key) is not None:
+                    kwargs[key] = float(kwargs[key])
+        except (TypeError, ValueError) as ex:
+            raise CNODCError(f'Invalid autoscale setting: {ex}', 'AUTOSCALE', 1003) from ex
+        policy = AutoscalePolicy(**kwargs)
+        if policy.min_count < 1 or policy.max_count < policy.min_count:
+            raise CNODCError(f'Invalid autoscale range [{policy.min_count}-{policy.max_count}]', 'AUTOSCALE', 1004)
+        if policy.items_per_process <= 0 or policy.scale_down_threshold > policy.items_per_process:
+            raise CNODCError('Autoscale thresholds must be positive and scale down below the scale up threshold', 'AUTOSCALE', 1005)
+        return policy
+
+
+class Autoscaler:
+    """Decides how many processes a process set should have."""
+
+    def __init__(self, policy: AutoscalePolicy):
+        self.policy = policy
+        self._last_change: t.Optional[float] = None
+
+    def target_count(self,
+                     current: int,
+                     backlog: QueueBacklog,
+                     cpu_percent: t.Optional[float] = None,
+                     memory_percent: t.Optional[float] = None,
+                     now: t.Optional[float] = None) -> int:
+        """Get the number of processes to run, given the current count and the backlog."""
+        now = time.monotonic() if now is None else now
+        target = self._target_count(current, backlog, cpu_percent, memory_percent, now)
+        if target != current:
+            self._last_change = now
+        return target
+
+    def _target_count(self, current: int, backlog: QueueBacklog, cpu_percent: t.Optional[float], memory_percent: t.Optional[float], now: float) -> int:
+        policy = self.policy
+        if current != policy.clamp(current):
+            return policy.clamp(current)
+        too_old = policy.max_age_seconds is not None and backlog.depth > 0 and backlog.oldest_age_seconds > policy.max_age_seconds
+        wanted = math.ceil(backlog.depth / policy.items_per_process)
+        if too_old:
+            wanted = max(wanted, current + 1)
+        if wanted > current:
+            if self._cooling_down(now, policy.scale_up_cooldown_seconds) or self._resources_exhausted(cpu_percent, memory_percent):
+                return current
+            return policy.clamp(wanted)
+        if not too_old and current > 1 and backlog.depth <= policy.scale_down_threshold * (current - 1):
+            if self._cooling_down(now, policy.scale_down_cooldown_seconds):
+                return current
+            return policy.clamp(current - 1)
+        return current
+
+    def _cooling_down(self, now: float, cooldown: float) -> bool:
+        return self._last_change is not None and (now - self._last_change) < cooldown
+
+    def _resources_exhausted(self, cpu_percent: t.Optional[float], memory_percent: t.Optional[float]) -> bool:
+        if self.policy.max_cpu_percent is not None and cpu_percent is not None and cpu_percent >= self.policy.max_cpu_percent:
+            return True
+        if self.policy.max_memory_percent is not None and memory_percent is not None and memory_percent >= self.policy.max_memory_percent:
+            return True
+        return False
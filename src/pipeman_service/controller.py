@@ -20,6 +20,8 @@ from pipeman.instrumented import InstrumentedObject
 
 if t.TYPE_CHECKING:
     from medsutil.halts import HaltFlag
+    from medsutil.profiling import ProfileRequest
+    from pipeman_service.autoscale import AutoscalePolicy, Autoscaler, QueueBacklog
 
 @dataclass
 class ProcessInfo:
@@ -45,6 +47,7 @@ class _ProcessProtocol(t.Protocol):
     def run(self): ...
     def shutdown(self): ...
     def is_alive(self) -> bool: ...
+    def request_profile(self, mode: str, amount: float): ...
 
 class _WorkerProtocol(t.Protocol):
     def run(self): ...
@@ -70,8 +73,10 @@ class _ProcessCreatorProtocol(t.Protocol):
 
 class BaseProcess:
 
-    def __init__(self, *args, proc_info: ProcessInfo, end_flag: ct.SupportsEvent, **kwargs):
+    def __init__(self, *args, proc_info: ProcessInfo, end_flag: ct.SupportsEvent, profile_request: t.Optional[ProfileRequest] = None, **kwargs):
+        from medsutil.profiling import ProfileRequest
         self._end_flag = end_flag
+        self._profile_request = profile_request or ProfileRequest()
         self._proc_info = proc_info
         self._log = None
         super().__init__(*args, **kwargs)
@@ -101,6 +106,7 @@ class BaseProcess:
             _config=json.loads(self._proc_info.json_config),
             _halt_flag=HaltFlag(self.halt_flag),
             _end_flag=HaltFlag(self.end_flag),
+            _profile_request=self._profile_request,
         )
         worker.run()
         return worker
@@ -111,6 +117,10 @@ class BaseProcess:
             self._log.trace('Shutdown requested')
         self._end_flag.set()
 
+    def request_profile(self, mode: str, amount: float):
+        """Ask the worker to profile itself (see medsutil.profiling)."""
+        self._profile_request.set(mode, amount)
+
     def run(self):
         """Create and run the worker."""
         self._noop_signals()
@@ -135,6 +145,9 @@ class _ProcessSet:
         self._process_cls = process_cls
         self._info = process_info
         self._active_processes: dict[str, _ProcessProtocol] = {}
+        # Processes asked to stop by autoscaling that are still finishing their current item
+        self._stopping: dict[str, _ProcessProtocol] = {}
+        self._autoscaler: t.Optional[Autoscaler] = None
         self._is_active = True
         self._log = zrlog.get_logger(f'cnodc.process_set.{process_info.process_name}')
         self._idx = 0
@@ -153,6 +166,43 @@ class _ProcessSet:
         """Set the target number of workers to have running."""
         self._info.quota = new_count if new_count > 1 else 1
 
+    @property
+    def quota(self) -> int:
+        return self._info.quota
+
+    @property
+    def autoscaler(self) -> t.Optional[Autoscaler]:
+        return self._autoscaler
+
+    def set_autoscale(self, policy: t.Optional[AutoscalePolicy]):
+        """Set the autoscaling policy (or None to keep a fixed count)."""
+        if policy is None:
+            self._autoscaler = None
+            return
+        from pipeman_service.autoscale import Autoscaler
+        # Keep the old autoscaler when the policy hasn't changed, so its cooldowns still apply
+        if self._autoscaler is None or self._autoscaler.policy != policy:
+            self._autoscaler = Autoscaler(policy)
+        self.set_quota(policy.clamp(self._info.quota))
+
+    def autoscale(self, backlog: QueueBacklog, cpu_percent: t.Optional[float] = None, memory_percent: t.Optional[float] = None):
+        """Update the quota from the queue backlog and stop any processes over it."""
+        if self._autoscaler is None or not self._is_active:
+            return
+        target = self._autoscaler.target_count(self._info.quota, backlog, cpu_percent, memory_percent)
+        if target != self._info.quota:
+            self._log.info('Scaling from %s to %s processes (backlog %s items, oldest %.0fs)', self._info.quota, target, backlog.depth, backlog.oldest_age_seconds)
+            self.set_quota(target)
+            self._stop_extra()
+
+    def _stop_extra(self):
+        """Request that the newest processes over the quota stop once they finish their current item."""
+        for proc_uuid in list(self._active_processes.keys())[self._info.quota:]:
+            self._log.info('Stopping extra process')
+            proc = self._active_processes.pop(proc_uuid)
+            proc.shutdown()
+            self._stopping[proc_uuid] = proc
+
     def deactivate(self):
         """Stop all workers"""
         self._is_active = False
@@ -167,16 +217,26 @@ class _ProcessSet:
         self._log.trace('Shutting down all active processes')
         for x in self._active_processes:
             self._active_processes[x].shutdown()
+        for x in self._stopping:
+            self._stopping[x].shutdown()
 
     def is_active(self, _no_reap: bool = False) -> bool:
         """Check if any processes are still active."""
         if not _no_reap:
             self._reap()
-        return len(self._active_processes) > 0
+        return len(self._active_processes) > 0 or len(self._stopping) > 0
 
     def is_activated(self) -> bool:
         return self._is_active
 
+    def request_profile(self, mode: str, amount: float) -> int:
+        """Ask every running worker to profile itself, returns the number of workers asked."""
+        count = 0
+        for proc in self._active_processes.values():
+            proc.request_profile(mode, amount)
+            count += 1
+        return count
+
     def set_config(self, config: dict):
         """Set the configuration for the workers and restarts them if the configuration has changed."""
         if not isinstance(config, dict):
@@ -203,6 +263,10 @@ class _ProcessSet:
             if not self._active_processes[x].is_alive():
                 self._log.info('Removing dead process')
                 del self._active_processes[x]
+        for x in list(self._stopping.keys()):
+            if not self._stopping[x].is_alive():
+                self._log.info('Removing stopped process')
+                del self._stopping[x]
 
     def _sow(self):
         """Start new workers as needed"""
@@ -260,6 +324,8 @@ class BaseController(InstrumentedObject):
         self._no_start = _no_start
         self._logging_queue = logging_queue
         self._sleep_time = 2.5
+        self._autoscale_interval = 15
+        self._last_autoscale: t.Optional[float] = None
 
         from medsutil.servicecmd import ServiceCommandManager
         self._manager = ServiceCommandManager(socket_port, self._handle_command)
@@ -274,7 +340,8 @@ class BaseController(InstrumentedObject):
                           process_name: str,
                           process_cls_name: str,
                           count: int = 1,
-                          config: dict[str, ct.SupportsExtendedJson] = None):
+                          config: dict[str, ct.SupportsExtendedJson] = None,
+                          autoscale: t.Optional[AutoscalePolicy] = None):
         if process_name not in self._process_info:
             self._log.debug("Registering process %s", process_name)
             self._process_info[process_name] = _ProcessSet(self._process_runner_cls, ProcessInfo(
@@ -285,9 +352,13 @@ class BaseController(InstrumentedObject):
                 server_name=self.server_name,
                 **self._base_kwargs
             ))
+            self._process_info[process_name].set_autoscale(autoscale)
         else:
             self._log.debug("Updating process %s", process_name)
-            self._process_info[process_name].set_quota(count)
+            # An autoscaled process set keeps its current size (within the new limits)
+            if autoscale is None:
+                self._process_info[process_name].set_quota(count)
+            self._process_info[process_name].set_autoscale(autoscale)
             self._process_info[process_name].set_config(config or {})
             self._process_info[process_name].activate()
 
@@ -400,6 +471,17 @@ class BaseController(InstrumentedObject):
                 self._log.warning("Processing [%s] has a non-integer value for the quota [%s], defaulting to 1", process_name, config[process_name]['count'])
         return True, proc_config, count
 
+    def _validate_autoscale(self, process_name: str, config: dict, proc_config: dict) -> t.Optional[AutoscalePolicy]:
+        from pipeman_service.autoscale import AutoscalePolicy
+        from pipeman.exceptions import CNODCError
+        if not config[process_name].get('autoscale'):
+            return None
+        try:
+            return AutoscalePolicy.from_config(config[process_name]['autoscale'], proc_config)
+        except CNODCError:
+            self._log.exception("Process [%s] has an invalid autoscale configuration, using a fixed count", process_name)
+            return None
+
     def _reload_config(self):
         """Reload configuration from disk."""
         self._log.trace('Reloading process configuration')
@@ -420,6 +502,7 @@ class BaseController(InstrumentedObject):
                 config[process_name]['class_name'],
                 count,
                 proc_config,
+                self._validate_autoscale(process_name, config, proc_config),
             )
         # Deregister processes not found in current list
         for process_name in deregister_list:
@@ -460,6 +543,8 @@ class BaseController(InstrumentedObject):
         try:
             while not (self._halt_flag.is_set() or self._shutdown_requested):
                 self.reload_check()
+                self.report(activity="autoscaling")
+                self.autoscale()
                 self.report(activity="reaping and sowing")
                 self.reap_and_sow()
                 self.report(activity="checking for signals", _update_resources=True)
@@ -496,9 +581,27 @@ class BaseController(InstrumentedObject):
                 self._halt_flag.set()
                 self._kill_requested = True
                 return b'0'
+            case _ if message.startswith(b'profile '):
+                return self._handle_profile_command(message)
             case _:
                 return b'1'
 
+    def _handle_profile_command(self, message: bytes) -> bytes:
+        """Handle 'profile <process name> <sample|cprofile> <seconds|calls>'."""
+        from medsutil.profiling import ProfileRequest
+        parts = message.decode('utf-8', errors='replace').split()
+        if len(parts) != 4 or parts[1] not in self._process_info or parts[2] not in ProfileRequest.MODES:
+            self._log.warning('Invalid profile command [%s]', message)
+            return b'1'
+        try:
+            amount = float(parts[3])
+            count = self._process_info[parts[1]].request_profile(parts[2], amount)
+        except ValueError:
+            self._log.warning('Invalid profile command [%s]', message)
+            return b'1'
+        self._log.info('Requested %s profile from %s processes of [%s]', parts[2], count, parts[1])
+        return b'0' if count > 0 else b'1'
+
     def deactivate_all(self):
         """Request every process stop immediately."""
         self._log.trace(f"Requesting all processes to halt")
@@ -527,5 +630,25 @@ class BaseController(InstrumentedObject):
         for process_name in self._process_info:
             self._process_info[process_name].reap_and_sow()
 
-
-
+    def autoscale(self, force: bool = False):
+        """Resize the autoscaled process sets from the backlog of their queues."""
+        scaled = [x for x in self._process_info.values() if x.autoscaler is not None and x.is_activated()]
+        if not scaled:
+            return
+        now = time.monotonic()
+        if not (force or self._last_autoscale is None or (now - self._last_autoscale) >= self._autoscale_interval):
+            return
+        self._last_autoscale = now
+        from pipeman_service.autoscale import QueueBacklog
+        import psutil
+        try:
+            with self.nodb as db:
+                backlogs = db.fetch_queue_backlog()
+        except Exception:
+            self._log.exception('Could not load the queue backlog for autoscaling')
+            return
+        cpu_percent = psutil.cpu_percent()
+        memory_percent = psutil.virtual_memory().percent
+        for process_set in scaled:
+            depth, age = backlogs.get(process_set.autoscaler.policy.queue_name, (0, 0.0))
+            process_set.autoscale(QueueBacklog(depth, age), cpu_percent, memory_percent)
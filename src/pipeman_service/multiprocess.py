@@ -1,6 +1,7 @@
 """Controller for multiple processes based on the multiprocessing library."""
 import typing as t
 import os
+import shutil
 import tempfile
 
 import psutil
@@ -9,6 +10,7 @@ import multiprocessing as mp
 import zirconium as zr
 from prometheus_client.multiprocess import mark_process_dead
 
+from medsutil.profiling import ProfileRequest
 from nodb.interface import NODB
 from pipeman_service.controller import BaseController, BaseProcess
 
@@ -33,7 +35,7 @@ class _MultiProcessRunner(BaseProcess, mp.Process):
     """Implementation of a process that runs a worker class."""
 
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs, end_flag=ImprovedEvent(), daemon=True)
+        super().__init__(*args, **kwargs, end_flag=ImprovedEvent(), profile_request=ProfileRequest(mp.Array('c', 64)), daemon=True)
 
     def setup(self):
         from pipeman.boot import init_pipeman
@@ -78,6 +80,11 @@ class MultiProcessController(BaseController):
             }
         )
         ml.init_as_subprocess(lq)
+        self._reference_cache_dir = None
+        if 'CNODC_REFERENCE_CACHE_FILE' not in os.environ and not self.config.as_str(('cnodc', 'reference_cache', 'file'), default=None):
+            # Give the worker processes a shared reference cache, they find it through the environment
+            self._reference_cache_dir = tempfile.mkdtemp(prefix='cnodc_refs_')
+            os.environ['CNODC_REFERENCE_CACHE_FILE'] = os.path.join(self._reference_cache_dir, 'references.sqlite')
         super().__init__(
             process_creator=_MultiProcessRunner,
             log_name="cnodc.multi_process",
@@ -93,3 +100,6 @@ class MultiProcessController(BaseController):
     def cleanup(self):
         super().cleanup()
         self._logging_subprocess.stop()
+        if self._reference_cache_dir is not None:
+            os.environ.pop('CNODC_REFERENCE_CACHE_FILE', None)
+            shutil.rmtree(self._reference_cache_dir, ignore_errors=True)
@@ -1,6 +1,7 @@
 """Provides a single-threaded process controller that only runs one process."""
 import threading
 
+from medsutil.profiling import ProfileRequest
 from pipeman_service.controller import BaseController, BaseProcess
 from pipeman.exceptions import CNODCError
 
@@ -8,7 +9,7 @@ from pipeman.exceptions import CNODCError
 class _SingleProcessRunner(BaseProcess):
 
     def __init__(self, **kwargs):
-        super().__init__(**kwargs, end_flag=threading.Event())
+        super().__init__(**kwargs, end_flag=threading.Event(), profile_request=ProfileRequest())
         self._worker = None
 
     def _build_and_run(self):
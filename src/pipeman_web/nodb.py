@@ -11,7 +11,7 @@ from nodb.observations import NODBBatch, NODBWorkingRecord, NODBPlatform
 from nodb.interface import NODB, LockType, QueueStatus
 from nodb.queue import NODBQueueItem
 from nodb.workflow import NODBUploadWorkflow
-from medsutil.ocproc2.operations import QCOperator
+from medsutil.ocproc2.operations import QCOperationBatch
 import medsutil.ocproc2 as ocproc2
 from pipeman.exceptions import CNODCError
 from medsutil.vlq import vlq_encode
@@ -381,9 +381,7 @@ class NODBWebController:
                 yield data
 
     def _apply_all_actions(self, record: ocproc2.ParentRecord, actions: list[dict]):
-        for action_def in actions:
-            action = QCOperator.from_map(action_def)
-            action.apply(record)
+        QCOperationBatch.from_maps(actions, merge_history=True).apply(record)
 
     def create_station(self, station_def: dict):
         if not isinstance(station_def, dict):
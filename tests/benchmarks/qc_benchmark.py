@@ -0,0 +1,227 @@
+"""Throughput, latency and memory benchmarks for QC test suites.
+
+    Each suite is run on its own through QCTestRunner.process_batch() against the mock
+    database, using the same synthetic profiles every time. Results are written as JSON so
+    that runs can be compared between commits, e.g.:
+
+        python -m tests.benchmarks.qc_benchmark --levels 200 --parameters 4 --output before.json
+
+    Per-record latency is the time between consecutive records coming out of
+    process_batch(). For suites with batch tests, every record in a batch is released at
+    once, so the first record of each batch carries the cost of the whole batch.
+
+    Peak memory is measured with tracemalloc in a separate pass, since tracing slows the
+    code down too much to time it at the same time.
+"""
+import argparse
+import dataclasses
+import gc
+import importlib
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import typing as t
+
+from nodb.observations import NODBWorkingRecord
+from pipeman.programs.nodb.qc.qc import BaseTestSuite, QCTestRunner
+from tests.benchmarks.synthetic import SyntheticProfileGenerator, ProfileParameters
+from tests.helpers.mock_nodb import DatabaseMock, DummyNODB
+
+REFERENCE_DIR = pathlib.Path(__file__).absolute().parent.parent.parent / 'docs' / 'old' / 'examples' / 'references'
+
+
+def _suite_factory(module_name: str, class_name: str, *args, **kwargs) -> t.Callable[[], BaseTestSuite]:
+    # Import when the suite is built, so that a suite that can't be imported is reported as an error
+    # in the results instead of stopping the whole benchmark.
+    def _factory():
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)(*args, **kwargs)
+    return _factory
+
+
+def default_suites() -> dict[str, t.Callable[[], BaseTestSuite]]:
+    """Build the factories for the QC suites that can run without external services.
+
+        NODBIntegrityCheck, GTSPPInitialQualityFlagsCheck and GTSPPParameterRangeTest are left out
+        because they fail on any record (or, for the range test, on any reference file) at the moment.
+    """
+    return {
+        'gtspp_increasing': _suite_factory('pipeman.programs.gtspp.increasing_test', 'GTSPPIncreasingProfileTest'),
+        'gtspp_envelope': _suite_factory('pipeman.programs.gtspp.envelope_test', 'GTSPPEnvelopeTest', REFERENCE_DIR / 'gtspp_profile_envelopes.yaml'),
+        'gtspp_constant': _suite_factory('pipeman.programs.gtspp.constant_test', 'GTSPPConstantTest'),
+        'gtspp_freezing': _suite_factory('pipeman.programs.gtspp.freezing_point_test', 'GTSPPFreezingPointTest'),
+        'gtspp_spike': _suite_factory('pipeman.programs.gtspp.spike_gradient_test', 'GTSPPSpikeGradientTest', REFERENCE_DIR / 'gtspp_spike_gradient.yaml'),
+        'gtspp_density': _suite_factory('pipeman.programs.gtspp.density_inversion_test', 'GTSPPDensityInversionTest'),
+        'gtspp_temp_inversion': _suite_factory('pipeman.programs.gtspp.temperature_inversion_test', 'GTSPPTemperatureInversionTest'),
+        'gtspp_speed': _suite_factory('pipeman.programs.gtspp.speed_test', 'GTSPPSpeedTest'),
+    }
+
+
+@dataclasses.dataclass
+class SuiteResult:
+
+    suite_name: str
+    record_count: int
+    total_seconds: float
+    records_per_second: float
+    latency_ms: dict[str, float]
+    peak_memory_bytes: t.Optional[int] = None
+    error: t.Optional[str] = None
+
+
+class QCBenchmark:
+    """Runs QC suites over a fixed set of synthetic working records."""
+
+    def __init__(self, parameters: ProfileParameters, batch_size: int = 100, trace_memory: bool = True):
+        self.parameters = parameters
+        self.batch_size = max(1, batch_size)
+        self.trace_memory = trace_memory
+        self._encoded = list(SyntheticProfileGenerator(parameters).working_records())
+
+    def working_records(self) -> list[NODBWorkingRecord]:
+        """Build fresh working records, so that every run decodes and tests the records from scratch."""
+        return [
+            NODBWorkingRecord(working_uuid=working_uuid, data_record=data_record)
+            for working_uuid, data_record in self._encoded
+        ]
+
+    def run(self, suites: dict[str, t.Callable[[], BaseTestSuite]]) -> list[SuiteResult]:
+        return [self.run_suite(name, suites[name]) for name in suites]
+
+    def run_suite(self, suite_name: str, suite_factory: t.Callable[[], BaseTestSuite]) -> SuiteResult:
+        try:
+            latencies, total_time = self._timed_pass(suite_factory)
+            peak_memory = self._memory_pass(suite_factory) if self.trace_memory else None
+        except Exception as ex:
+            return SuiteResult(suite_name, 0, 0, 0, {}, error=f'{ex.__class__.__name__}: {ex}')
+        return SuiteResult(
+            suite_name=suite_name,
+            record_count=len(latencies),
+            total_seconds=total_time,
+            records_per_second=len(latencies) / total_time if total_time > 0 else 0,
+            latency_ms=QCBenchmark.latency_summary(latencies),
+            peak_memory_bytes=peak_memory
+        )
+
+    def _build_runner(self, suite_factory: t.Callable[[], BaseTestSuite], db: DatabaseMock) -> QCTestRunner:
+        suite = suite_factory()
+        suite.nodb = DummyNODB(db)
+        runner = QCTestRunner([suite])
+        runner.set_db_instance(db)
+        return runner
+
+    def _batches(self) -> t.Iterable[list[NODBWorkingRecord]]:
+        records = self.working_records()
+        for idx in range(0, len(records), self.batch_size):
+            yield records[idx:idx + self.batch_size]
+
+    def _timed_pass(self, suite_factory: t.Callable[[], BaseTestSuite]) -> tuple[list[float], float]:
+        db = DatabaseMock()
+        runner = self._build_runner(suite_factory, db)
+        batches = list(self._batches())
+        latencies = []
+        gc.collect()
+        start = time.perf_counter()
+        for batch in batches:
+            last = time.perf_counter()
+            for _ in runner.process_batch(batch):
+                now = time.perf_counter()
+                latencies.append(now - last)
+                last = now
+        total_time = time.perf_counter() - start
+        runner.clear_db_instance(db)
+        return latencies, total_time
+
+    def _memory_pass(self, suite_factory: t.Callable[[], BaseTestSuite]) -> int:
+        db = DatabaseMock()
+        runner = self._build_runner(suite_factory, db)
+        batches = list(self._batches())
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            for batch in batches:
+                for _ in runner.process_batch(batch):
+                    pass
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        runner.clear_db_instance(db)
+        return peak - baseline
+
+    @staticmethod
+    def latency_summary(latencies: list[float]) -> dict[str, float]:
+        if not latencies:
+            return {}
+        ms = sorted(x * 1000 for x in latencies)
+        if len(ms) > 1:
+            q = statistics.quantiles(ms, n=100, method='inclusive')
+            p50, p90, p99 = q[49], q[89], q[98]
+        else:
+            p50 = p90 = p99 = ms[0]
+        return {
+            'mean': statistics.fmean(ms),
+            'p50': p50,
+            'p90': p90,
+            'p99': p99,
+            'max': ms[-1],
+        }
+
+    def report(self, results: list[SuiteResult]) -> dict[str, t.Any]:
+        return {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'batch_size': self.batch_size,
+            'profiles': dataclasses.asdict(self.parameters),
+            'suites': [dataclasses.asdict(r) for r in results],
+        }
+
+
+def main(argv: t.Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark QC test suites on synthetic profiles')
+    parser.add_argument('--records', type=int, default=100, help='Number of records to test')
+    parser.add_argument('--levels', type=int, default=50, help='Number of levels per profile')
+    parser.add_argument('--parameters', type=int, default=2, help='Number of parameters per level')
+    parser.add_argument('--stations', type=int, default=10, help='Number of stations the records are spread over')
+    parser.add_argument('--no-uncertainty', action='store_true', help='Leave the uncertainty off of the values')
+    parser.add_argument('--batch-size', type=int, default=100, help='Number of records per call to process_batch()')
+    parser.add_argument('--seed', type=int, default=12345)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory pass')
+    parser.add_argument('--suite', action='append', dest='suites', help='Only run the given suite (can be repeated)')
+    parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    suites = default_suites()
+    if args.suites:
+        unknown = [x for x in args.suites if x not in suites]
+        if unknown:
+            parser.error(f'Unknown suites: {", ".join(unknown)}')
+        suites = {x: suites[x] for x in args.suites}
+    benchmark = QCBenchmark(
+        ProfileParameters(
+            record_count=args.records,
+            level_count=args.levels,
+            parameter_count=args.parameters,
+            with_uncertainty=not args.no_uncertainty,
+            station_count=args.stations,
+            seed=args.seed,
+        ),
+        batch_size=args.batch_size,
+        trace_memory=not args.no_memory
+    )
+    report = json.dumps(benchmark.report(benchmark.run(suites)), indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as h:
+            h.write(report)
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == '__main__':
+    from pipeman.boot import init_for_tests
+    init_for_tests()
+    main()
@@ -0,0 +1,125 @@
+"""Synthetic OCPROC2 profiles for benchmarking.
+
+    Records are generated from a seed so that the same parameters always produce the same
+    records, which makes benchmark results comparable between commits.
+"""
+import dataclasses
+import datetime
+import math
+import random
+import typing as t
+import uuid
+
+import medsutil.ocproc2 as ocproc2
+from medsutil.awaretime import AwareDateTime
+from nodb.observations import NODBWorkingRecord
+
+
+# Extra parameters in the order they are added, with (units, surface value, deep value, e-folding depth)
+EXTRA_PARAMETERS: tuple[tuple[str, str, float, float, float], ...] = (
+    ('DissolvedOxygen', 'umol kg-1', 250, 150, 800),
+    ('ChlorophyllA', 'mg m-3', 1.5, 0, 50),
+    ('NitrateMolar', 'umol L-1', 2, 35, 400),
+    ('PhosphateMolar', 'umol L-1', 0.3, 2.5, 400),
+    ('SilicateMolar', 'umol L-1', 3, 120, 1000),
+    ('AmmoniaMolar', 'umol L-1', 0.5, 0.1, 100),
+)
+
+
+@dataclasses.dataclass
+class ProfileParameters:
+    """Describes the shape of the synthetic profiles."""
+
+    record_count: int = 100
+    level_count: int = 50
+    parameter_count: int = 2
+    with_uncertainty: bool = True
+    station_count: int = 10
+    max_depth: float = 2000
+    seed: int = 12345
+
+    def __post_init__(self):
+        if self.level_count < 1:
+            raise ValueError('level_count must be at least 1')
+        if not 1 <= self.parameter_count <= 2 + len(EXTRA_PARAMETERS):
+            raise ValueError(f'parameter_count must be between 1 and {2 + len(EXTRA_PARAMETERS)}')
+        if self.station_count < 1:
+            raise ValueError('station_count must be at least 1')
+
+
+class SyntheticProfileGenerator:
+    """Builds CTD-like profiles spread over a number of slowly drifting stations.
+
+        The first two parameters are always Temperature and PracticalSalinity (so that the
+        density-based tests have something to work with), further parameters are taken
+        from EXTRA_PARAMETERS.
+    """
+
+    def __init__(self, parameters: ProfileParameters):
+        self.parameters = parameters
+        self._start_time = AwareDateTime(2020, 1, 1, 0, 0, 0, tzinfo=datetime.timezone.utc)
+
+    def records(self) -> t.Iterable[ocproc2.ParentRecord]:
+        rng = random.Random(self.parameters.seed)
+        stations = [self._station(rng, idx) for idx in range(0, self.parameters.station_count)]
+        for idx in range(0, self.parameters.record_count):
+            station_idx = idx % self.parameters.station_count
+            visit = idx // self.parameters.station_count
+            yield self.build_record(rng, stations[station_idx], visit)
+
+    def working_records(self) -> t.Iterable[tuple[str, bytes]]:
+        """Build the encoded working records, as (working_uuid, data_record) pairs."""
+        for record in self.records():
+            wr = NODBWorkingRecord()
+            wr.working_uuid = str(uuid.uuid4())
+            wr.record = record
+            yield wr.working_uuid, wr.data_record
+
+    @staticmethod
+    def _station(rng: random.Random, idx: int) -> dict[str, t.Any]:
+        return {
+            'uuid': str(uuid.UUID(int=rng.getrandbits(128))),
+            'wmo_id': str(4500000 + idx),
+            'latitude': rng.uniform(40, 60),
+            'longitude': rng.uniform(-60, -30),
+        }
+
+    def build_record(self, rng: random.Random, station: dict[str, t.Any], visit: int) -> ocproc2.ParentRecord:
+        p = self.parameters
+        record = ocproc2.ParentRecord()
+        record.metadata['CNODCStation'] = station['uuid']
+        record.metadata['WMOID'] = station['wmo_id']
+        obs_time = self._start_time + datetime.timedelta(hours=6 * visit)
+        record.coordinates['Time'] = obs_time.isoformat()
+        # Drift about 1 km between visits
+        record.coordinates.set('Latitude', round(station['latitude'] + 0.01 * visit, 4), Units='degree_north', **self._uncertainty(0.001))
+        record.coordinates.set('Longitude', round(station['longitude'] + 0.01 * visit, 4), Units='degree_east', **self._uncertainty(0.001))
+        rs = record.subrecords.new_recordset('PROFILE')
+        step = p.max_depth / p.level_count
+        for level in range(0, p.level_count):
+            depth = round(step * (level + 0.5), 2)
+            child = ocproc2.ChildRecord()
+            child.coordinates.set('Depth', depth, Units='m', **self._uncertainty(0.5))
+            child.parameters.set(
+                'Temperature',
+                round(2 + 18 * math.exp(-depth / 500) + rng.gauss(0, 0.01), 3),
+                Units='degC',
+                **self._uncertainty(0.002)
+            )
+            if p.parameter_count > 1:
+                child.parameters.set(
+                    'PracticalSalinity',
+                    round(34 + 0.8 * (1 - math.exp(-depth / 300)) + rng.gauss(0, 0.001), 4),
+                    Units='0.001',
+                    **self._uncertainty(0.003)
+                )
+            for name, units, surface, deep, scale in EXTRA_PARAMETERS[0:max(0, p.parameter_count - 2)]:
+                value = deep + (surface - deep) * math.exp(-depth / scale)
+                child.parameters.set(name, round(max(0.0, value * rng.uniform(0.99, 1.01)), 4), Units=units, **self._uncertainty(abs(value) * 0.01))
+            rs.records.append(child)
+        return record
+
+    def _uncertainty(self, value: float) -> dict[str, float]:
+        if self.parameters.with_uncertainty:
+            return {'Uncertainty': value}
+        return {}
@@ -0,0 +1,94 @@
+import json
+import logging
+import unittest.mock
+
+from tests.benchmarks.qc_benchmark import QCBenchmark, default_suites, main
+from tests.benchmarks.synthetic import SyntheticProfileGenerator, ProfileParameters
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestSyntheticProfiles(BaseTestCase):
+
+    def test_profile_shape(self):
+        gen = SyntheticProfileGenerator(ProfileParameters(record_count=6, level_count=7, parameter_count=4, station_count=3))
+        records = list(gen.records())
+        self.assertEqual(6, len(records))
+        self.assertEqual(3, len(set(r.metadata['CNODCStation'].value for r in records)))
+        profile = records[0].subrecords['PROFILE'][0].records
+        self.assertEqual(7, len(profile))
+        self.assertEqual({'Temperature', 'PracticalSalinity', 'DissolvedOxygen', 'ChlorophyllA'}, set(profile[0].parameters.keys()))
+        self.assertIn('Uncertainty', profile[0].parameters['Temperature'].metadata)
+
+    def test_no_uncertainty(self):
+        gen = SyntheticProfileGenerator(ProfileParameters(record_count=1, level_count=2, parameter_count=1, with_uncertainty=False))
+        record = list(gen.records())[0]
+        profile = record.subrecords['PROFILE'][0].records
+        self.assertEqual(['Temperature'], list(profile[0].parameters.keys()))
+        self.assertNotIn('Uncertainty', profile[0].parameters['Temperature'].metadata)
+        self.assertNotIn('Uncertainty', record.coordinates['Latitude'].metadata)
+
+    def test_repeatable(self):
+        params = ProfileParameters(record_count=3, level_count=5)
+        first = [r.to_mapping() for r in SyntheticProfileGenerator(params).records()]
+        second = [r.to_mapping() for r in SyntheticProfileGenerator(params).records()]
+        self.assertEqual(first, second)
+
+    def test_bad_parameters(self):
+        with self.assertRaises(ValueError):
+            ProfileParameters(level_count=0)
+        with self.assertRaises(ValueError):
+            ProfileParameters(parameter_count=100)
+        with self.assertRaises(ValueError):
+            ProfileParameters(station_count=0)
+
+
+class TestQCBenchmark(BaseTestCase):
+
+    def test_run_suite(self):
+        benchmark = QCBenchmark(ProfileParameters(record_count=4, level_count=3, station_count=2), batch_size=3)
+        result = benchmark.run_suite('gtspp_increasing', default_suites()['gtspp_increasing'])
+        self.assertIsNone(result.error)
+        self.assertEqual(4, result.record_count)
+        self.assertGreater(result.records_per_second, 0)
+        self.assertGreater(result.peak_memory_bytes, 0)
+        self.assertEqual({'mean', 'p50', 'p90', 'p99', 'max'}, set(result.latency_ms.keys()))
+
+    def test_default_suites_run(self):
+        benchmark = QCBenchmark(ProfileParameters(record_count=2, level_count=3, station_count=1), trace_memory=False)
+        for suite_name, suite_factory in default_suites().items():
+            with self.subTest(suite=suite_name):
+                result = benchmark.run_suite(suite_name, suite_factory)
+                self.assertIsNone(result.error)
+                self.assertEqual(2, result.record_count)
+
+    def test_suite_error_is_reported(self):
+        def _broken():
+            raise ValueError('oh no')
+        benchmark = QCBenchmark(ProfileParameters(record_count=1, level_count=1), trace_memory=False)
+        result = benchmark.run_suite('broken', _broken)
+        self.assertEqual('ValueError: oh no', result.error)
+        self.assertEqual(0, result.record_count)
+
+    def test_latency_summary(self):
+        summary = QCBenchmark.latency_summary([0.001 * x for x in range(1, 101)])
+        self.assertAlmostEqual(summary['max'], 100)
+        self.assertAlmostEqual(summary['p50'], 50.5)
+        self.assertEqual({}, QCBenchmark.latency_summary([]))
+        self.assertEqual(2, QCBenchmark.latency_summary([0.002])['p99'])
+
+    def test_main(self):
+        output = self.temp_dir / 'results.json'
+        main(['--records', '2', '--levels', '2', '--suite', 'gtspp_constant', '--no-memory', '--output', str(output)])
+        with open(output, 'r') as h:
+            report = json.load(h)
+        self.assertEqual(2, report['profiles']['record_count'])
+        self.assertEqual(1, len(report['suites']))
+        self.assertEqual('gtspp_constant', report['suites'][0]['suite_name'])
+        self.assertIsNone(report['suites'][0]['peak_memory_bytes'])
+
+    def test_main_leaves_environment(self):
+        logger = logging.getLogger('cnodc.benchmark_test')
+        with unittest.mock.patch('pipeman.boot.init_for_tests') as init:
+            main(['--records', '1', '--levels', '1', '--suite', 'gtspp_constant', '--no-memory', '--output', str(self.temp_dir / 'results.json')])
+            self.assertEqual(0, init.call_count)
+        self.assertFalse(logger.disabled)
@@ -17,6 +17,7 @@ from autoinject import injector
 from medsutil.awaretime import AwareDateTime
 from medsutil.halts import DummyHaltFlag
 from nodb.interface import NODB
+from nodb.reference_cache import ReferenceCache
 from tests.helpers.mock_containers import TestContainer, NODBContainer
 from tests.helpers.mock_runner import WorkerTestController
 from medsutil.exceptions import CodedError
@@ -202,6 +203,7 @@ class BaseTestCase(ut.TestCase):
 
     def tearDown(self):
         self._clean_injectable()
+        self._clean_reference_cache()
         self._clean_db()
         self._clean_halt_flag()
 
@@ -217,6 +219,10 @@ class BaseTestCase(ut.TestCase):
     def _clean_injectable(self, d: InjectableDict = None):
         d.data.clear()
 
+    @injector.inject
+    def _clean_reference_cache(self, cache: ReferenceCache = None):
+        cache.clear()
+
     @classmethod
     def start_container_by_name(cls, name, always_restart: bool = False) -> TestContainer:
         return cls.start_container(TestContainer(name, always_restart))
@@ -250,6 +250,7 @@ class _BlobProperties:
         self.name = name
         self.size = size
         self.last_modified = lmt
+        self.creation_time = lmt
         self.metadata = metadata
         self.blob_tier = blob_tier
 
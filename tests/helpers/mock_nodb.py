@@ -33,6 +33,7 @@ class DatabaseMock:
         self._scanned_files: list[dict[str, t.Any]] = []
         self._lookups: dict[str, dict[str, dict[str, list[int]]]] = {}
         self._rolled_back = False
+        self._after_commit = []
 
     def create_savepoint(self, name):
         pass
@@ -48,7 +49,8 @@ class DatabaseMock:
             for index_name in self._lookups[table_name]:
                 for index_key in self._lookups[table_name][index_name]:
                     index_list = self._lookups[table_name][index_name][index_key]
-                    index_list.remove(idx)
+                    if idx in index_list:
+                        index_list.remove(idx)
 
     def _update_indices(self, obj: NODBBaseObject, index: int):
         tbl_name = obj.get_table_name()
@@ -84,6 +86,20 @@ class DatabaseMock:
             'modified_date': mod_time
         })
 
+    def bulk_scanned_file_status(self, files: t.Sequence[tuple[str, t.Optional[datetime.datetime]]]) -> dict[str, ScannedFileStatus]:
+        return {
+            file_path: self.scanned_file_status(file_path, mod_time)
+            for file_path, mod_time in files
+        }
+
+    def bulk_note_scanned_files(self, files: t.Sequence[tuple[str, t.Optional[datetime.datetime]]]) -> set[str]:
+        inserted = set()
+        for file_path, mod_time in files:
+            if mod_time is None or self.scanned_file_status(file_path, mod_time) is ScannedFileStatus.NOT_PRESENT:
+                self.note_scanned_file(file_path, mod_time)
+                inserted.add(file_path)
+        return inserted
+
     def load_queue_items(self) -> t.Iterable[tuple[str, str, str]]:
         for item in self.table(NODBQueueItem):
             yield item.queue_name, item.queue_uuid, item.status.value
@@ -176,6 +192,7 @@ class DatabaseMock:
 
     def reset(self):
         self._rolled_back = False
+        self._after_commit.clear()
         self.tables.clear()
         self._permissions.clear()
         self._scanned_files.clear()
@@ -222,17 +239,30 @@ class DatabaseMock:
             for name in updates:
                 setattr(obj, name, updates[name])
 
+    def bulk_insert_objects(self, objs, ignore_conflicts: bool = False):
+        for obj in objs:
+            self.insert_object(obj, ignore_conflicts=ignore_conflicts)
+
+    def bulk_delete_objects(self, cls, key_field, key_values):
+        for obj in list(self.stream_objects(cls, filters={key_field: (key_values, 'IN', False)})):
+            self.delete_object(obj)
+
     def update_object(self, obj):
         pass
 
-    def insert_object(self, obj):
+    def insert_object(self, obj, ignore_conflicts: bool = False):
         for key in obj.get_primary_keys():
             if 'uuid' in key and getattr(obj, key) is None:
                 setattr(obj, key, str(uuid.uuid4()))
+        if ignore_conflicts:
+            pk_filters = {key: obj.get_for_db(key) for key in obj.get_primary_keys()}
+            if self._find_object_index(obj.get_table_name(), pk_filters) is not None:
+                return False
         _tbl = self.table(obj)
         index = len(_tbl)
         _tbl.append(obj)
         self._update_indices(obj ,index)
+        return True
 
     def upsert_object(self, obj):
         if obj.is_new:
@@ -276,7 +306,8 @@ class DatabaseMock:
             filters = self._clean_filters(filters)
             limit_set = self._build_index_set(table_name, filters, join_str)
             if limit_set is not None:
-                for idx in limit_set:
+                # copy it, since the index can change if objects are deleted while streaming
+                for idx in list(limit_set):
                     obj = self.tables[table_name][idx]
                     if obj is None:
                         continue
@@ -322,6 +353,8 @@ class DatabaseMock:
                     return test_value < filter_info[0]
                 elif filter_info[1] == 'IN':
                     return test_value in filter_info[0]
+                elif filter_info[1] == 'NOT IN':
+                    return test_value not in filter_info[0]
                 else:
                     raise ValueError(f'op [{filter_info[1]}] not recognized [mock DB]')
         else:
@@ -341,6 +374,26 @@ class DatabaseMock:
                 report[item.queue_name][item.status.value] += 1
         return report
 
+    def fetch_queue_backlog(self) -> dict[str, tuple[int, float]]:
+        report = {}
+        if NODBQueueItem.TABLE_NAME in self.tables:
+            for item in self.tables[NODBQueueItem.TABLE_NAME]:
+                item: NODBQueueItem = item
+                if (item.escalation_level or 0) > 0:
+                    continue
+                if item.status == QueueStatus.UNLOCKED:
+                    available_since = item.created_date
+                elif item.status == QueueStatus.DELAYED_RELEASE and item.delay_release is not None:
+                    available_since = item.delay_release
+                else:
+                    continue
+                now = AwareDateTime.now() if available_since.tzinfo else datetime.datetime.now()
+                if available_since > now:
+                    continue
+                count, age = report.get(item.queue_name, (0, 0.0))
+                report[item.queue_name] = (count + 1, max(age, (now - available_since).total_seconds()))
+        return report
+
     def create_queue_item(self, **kwargs):
         kwargs['queue_uuid'] = str(uuid.uuid4())
         kwargs['created_date'] = datetime.datetime.now()
@@ -372,10 +425,16 @@ class DatabaseMock:
         return None
 
     def commit(self):
-        pass
+        callbacks, self._after_commit = self._after_commit, []
+        for cb in callbacks:
+            cb()
 
     def rollback(self):
         self._rolled_back = True
+        self._after_commit = []
+
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
 
     def rows(self, tbl_name: str) -> int:
         if tbl_name in self.tables:
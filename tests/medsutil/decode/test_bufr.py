@@ -1,5 +1,6 @@
 import medsutil.ocproc2 as ocproc2
 from medsutil.ocproc2.codecs import GtsCodec
+from medsutil.ocproc2.codecs.wmo.bufr import BufrTemplateCache, Bufr4Decoder, _Bufr4Decoder
 from tests.helpers.base_test_case import BaseTestCase
 
 
@@ -44,3 +45,30 @@ class TestBufrParsing(BaseTestCase):
         self.assertEqual(levels[0].parameters['Temperature'].metadata.best('WMOProfileInstrumentType'), 212)
         self.assertEqual(levels[0].parameters['Temperature'].metadata.best('ProfilerSerialNumber'), None)
 
+
+    def test_template_cache_matches_uncached(self):
+        with open(self.data_file_path('bufr/315004_1.bufr'), 'rb') as h:
+            content = h.read()
+        content = content[content.find(b'BUFR'):]
+        header = 'IOSC01 RJTD 170700'
+        tables = Bufr4Decoder().bufr_tables
+        cache = BufrTemplateCache()
+        uncached = [x.to_mapping() for x in _Bufr4Decoder(header, content, tables).convert_to_records()]
+        for _ in range(0, 2):
+            cached = [x.to_mapping() for x in _Bufr4Decoder(header, content, tables, cache).convert_to_records()]
+            self.assertEqual(uncached, cached)
+
+    def test_template_cache_message_types(self):
+        cache = BufrTemplateCache(max_templates=2)
+        calls = []
+        def _identify(result):
+            calls.append(result)
+            return [result]
+        self.assertEqual([1], cache.message_type((4, 23, (1,)), lambda: _identify(1)))
+        self.assertEqual([1], cache.message_type((4, 23, (1,)), lambda: _identify(2)))
+        self.assertEqual([1], calls)
+        cache.message_type((4, 24, (1,)), lambda: _identify(3))
+        cache.message_type((4, 23, (2,)), lambda: _identify(4))
+        # the oldest template is dropped once the cache is full
+        self.assertEqual([5], cache.message_type((4, 23, (1,)), lambda: _identify(5)))
+        self.assertEqual([1, 3, 4, 5], calls)
@@ -2,6 +2,7 @@ import datetime
 import logging
 
 import netCDF4 as nc
+import numpy as np
 import yaml
 
 from medsutil.dynamic import dynamic_name
@@ -20,6 +21,35 @@ def dynamic_int_processor(data_processor, value, *args, **kwargs):
 
 class TestNetCDFCommonDecode(BaseTestCase):
 
+    def test_decode_from_memory_map(self):
+        config_file = self.temp_dir / 'test.yaml'
+        with open(config_file, "w") as h:
+            yaml.safe_dump({
+                'ocproc2_map': {
+                    'test': {
+                        'target': 'metadata/Bar',
+                        'is_index': True,
+                    },
+                },
+                'data_maps': {},
+            }, h)
+        nc_file = self.temp_dir / "test.nc"
+        with nc.Dataset(nc_file, "w") as ds:
+            ds.createDimension('FOO')
+            ds.createVariable('test', 'i4', ('FOO',))
+            ds.variables['test'][:] = [1, 2, 3]
+        decoder = NetCDFCommonDecoder()
+        seen = []
+        original = decoder._decode_single_message
+        def _check_type(data, options):
+            seen.append(type(data))
+            return original(data, options)
+        decoder._decode_single_message = _check_type
+        records = [x for x in decoder.load(nc_file, mapping_file=str(config_file))]
+        self.assertEqual([r.metadata['Bar'].value for r in records], [1, 2, 3])
+        # The memory-mapped file is passed straight through instead of being copied
+        self.assertEqual(seen, [memoryview])
+
     def test_full_decoder(self):
         config_file = self.temp_dir / 'test.yaml'
         with open(config_file, "w") as h:
@@ -1395,3 +1425,86 @@ class TestNetCDFCommonDecode(BaseTestCase):
                     }, 'test')
                     with self.assertRaises(NetCDFCommonDecoderError):
                         _ = [x for x in mapper.build_records()]
+
+    def test_read_column_masks_fill_and_nan(self):
+        with nc.Dataset("inmemory.nc", "r+", diskless=True) as ds:
+            ds.createDimension('FOO')
+            v = ds.createVariable('test', 'f4', ('FOO',), fill_value=-999.0)
+            v.setncattr('scale_factor', 0.5)
+            v[:] = np.ma.masked_array([2.0, float('nan'), 0.0, 4.0], mask=[False, False, True, False])
+            w = ds.createVariable('test2', 'f4', ('FOO',))
+            w[:] = [float('nan')] * 4
+            self.assertEqual([2.0, None, None, 4.0], NetCDFCommonMapper._read_column(v))
+            self.assertIsNone(NetCDFCommonMapper._read_column(w))
+
+    def test_masked_values_are_skipped(self):
+        with nc.Dataset("inmemory.nc", "r+", diskless=True) as ds:
+            ds.createDimension('FOO')
+            ds.createVariable('test', 'i4', ('FOO',))
+            ds.createVariable('test2', 'f8', ('FOO',), fill_value=-999.0)
+            ds.variables['test'][:] = [1, 2, 3]
+            ds.variables['test2'][:] = np.ma.masked_array([1.5, 2.5, float('nan')], mask=[False, True, False])
+            mapper = NetCDFCommonMapper(ds, {
+                'ocproc2_map': {
+                    'test': {
+                        'target': 'metadata/Bar',
+                        'is_index': True,
+                    },
+                    'test2': 'metadata/Bar2',
+                },
+                'data_maps': {},
+            }, 'test')
+            records = [x for x in mapper.build_records()]
+            self.assertEqual(3, len(records))
+            self.assertEqual(1.5, records[0].metadata['Bar2'].value)
+            self.assertIsInstance(records[0].metadata['Bar2'].value, float)
+            self.assertNotIn('Bar2', records[1].metadata)
+            self.assertNotIn('Bar2', records[2].metadata)
+
+    def test_sliced_build_records(self):
+        with nc.Dataset("inmemory.nc", "r+", diskless=True) as ds:
+            ds.createDimension('FOO')
+            ds.createVariable('test', 'i4', ('FOO',))
+            ds.createVariable('test2', 'f8', ('FOO',))
+            ds.variables['test'][:] = list(range(0, 10))
+            ds.variables['test2'][:] = [x / 2 for x in range(0, 10)]
+            mapping = {
+                'ocproc2_map': {
+                    'test': {
+                        'target': 'metadata/Bar',
+                        'is_index': True,
+                    },
+                    'test2': 'metadata/Bar2',
+                },
+                'data_maps': {},
+            }
+            full = [x.to_mapping() for x in NetCDFCommonMapper(ds, yaml.safe_load(yaml.safe_dump(mapping)), 'test').build_records()]
+            # two variables at (8 + 48) bytes per value
+            mapper = NetCDFCommonMapper(ds, mapping, 'test', memory_budget_mb=(3 * 112) / (1024 * 1024))
+            reads = []
+            original = mapper._get_netcdf_data
+            def _track(data_vars, index):
+                reads.append((index.start, index.stop))
+                return original(data_vars, index)
+            mapper._get_netcdf_data = _track
+            sliced = [x.to_mapping() for x in mapper.build_records()]
+            self.assertEqual([(0, 3), (3, 6), (6, 9), (9, 10)], reads)
+            self.assertEqual(full, sliced)
+            self.assertEqual(10, sliced[-1]['_coordinates']['RecordNumber'])
+
+    def test_sliced_decode_with_ego_mapper(self):
+        nc_file = self.temp_dir / "test.nc"
+        with nc.Dataset(nc_file, "w") as ds:
+            ds.createDimension('FOO')
+            v = ds.createVariable('JULD', 'i4', ('FOO',))
+            v.setncattr('units', 'seconds since 1950-01-01T00:00:00')
+            ds.variables['JULD'][:] = [1, 2, 3, 4, 5]
+        decoder = NetCDFCommonDecoder()
+        with self.assertLogs("cnodc.programs.glider.ego_decode", "DEBUG") as logs:
+            records = [x for x in decoder.load(nc_file, mapping_class=dynamic_name(GliderEGOMapper), memory_budget_mb=0.0001)]
+        self.assertIn('slices of [2]', '\n'.join(logs.output))
+        self.assertEqual(5, len(records))
+        for idx, record in enumerate(records):
+            with self.subTest(record_no=idx):
+                self.assertEqual(idx + 1, record.coordinates['RecordNumber'].value)
+                self.assertEqual('glider', record.metadata['PlatformCNODCType'].value)
@@ -24,6 +24,23 @@ class TestOCProc2JsonFormat(CodecTestCase):
         records = [x for x in codec.load(file, use_mmap=False)]
         self._verify_standard_records(records)
 
+    def test_load_from_path_in_chunks(self):
+        file = self.temp_dir / 'file.txt'
+        codec = OCProc2JsonCodec()
+        codec.dump(file, self._build_standard_records())
+        chunks = []
+        original = codec.decode_messages
+        def _check_chunks(data, **kwargs):
+            for chunk in data:
+                chunks.append(chunk)
+                yield chunk
+        codec.decode_messages = lambda data, **kwargs: original(_check_chunks(data), **kwargs)
+        records = [x for x in codec.load(file, chunk_size=16)]
+        self._verify_standard_records(records)
+        # Codecs that don't accept a memoryview get bytes chunks instead of the whole file
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(isinstance(x, bytes) and len(x) <= 16 for x in chunks))
+
     def test_load_all_from_bytes(self):
         codec = OCProc2JsonCodec()
         data = bytearray()
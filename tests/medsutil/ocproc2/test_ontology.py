@@ -374,6 +374,14 @@ rstypes:Type3  rdf:type skos:Concept ;
         self.assertIsNone(self.ontology.recordset_info('Type4'))
         self.assertIsNone(self.ontology.coordinates('Type4'))
 
+    def test_element_names(self):
+        self.assertIn('Parameter4', set(self.ontology.element_names('coordinates')))
+        self.assertNotIn('Parameter5', set(self.ontology.element_names('coordinates')))
+        self.assertEqual(
+            set(x[0] for x in TestBasicOntology.TEST_INFO if x[1]),
+            set(self.ontology.element_names())
+        )
+
 
 class TestActualOntology(BaseTestCase):
 
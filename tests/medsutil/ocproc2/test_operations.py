@@ -0,0 +1,92 @@
+import datetime
+import unittest as ut
+
+import medsutil.ocproc2 as ocproc2
+from medsutil.ocproc2 import QCOperator, QCSetValue, QCSetWorkingQuality, QCAddHistory, QCOperationBatch
+
+
+class TestOperations(ut.TestCase):
+
+    def _build_record(self, levels: int = 3) -> ocproc2.ParentRecord:
+        record = ocproc2.ParentRecord()
+        record.coordinates['Latitude'] = 45
+        for i in range(0, levels):
+            sr = ocproc2.ChildRecord()
+            sr.coordinates['Depth'] = i
+            sr.parameters['Temperature'] = 5 + i
+            record.subrecords.append_to_record_set('PROFILE', 0, sr)
+        return record
+
+    def _flag_operator(self, path: str, flag: int, minute: int = 0) -> QCOperator:
+        return QCSetWorkingQuality(path, flag, children=[
+            QCAddHistory(
+                f'CHANGE QC FLAG [{path}] to [{flag}]',
+                'manual_qc',
+                '1.0',
+                'user',
+                ocproc2.MessageType.INFO.value,
+                datetime.datetime(2020, 1, 1, 0, minute, tzinfo=datetime.timezone.utc)
+            )
+        ])
+
+    def test_apply_with_children(self):
+        record = self._build_record()
+        self._flag_operator('subrecords/PROFILE/0/1/parameters/Temperature', 4).apply(record)
+        self.assertEqual(4, record.subrecords['PROFILE'][0].records[1].parameters['Temperature'].metadata.best('WorkingQuality'))
+        self.assertEqual(1, len(record.history))
+
+    def test_round_trip(self):
+        op = self._flag_operator('parameters/Temperature', 3)
+        op2 = QCOperator.from_map(op.to_map())
+        self.assertEqual(op.to_map(), op2.to_map())
+
+    def test_batch_matches_individual(self):
+        operators = [
+            self._flag_operator('subrecords/PROFILE/0/0/parameters/Temperature', 3),
+            QCSetValue('subrecords/PROFILE/0/1/parameters/Temperature', 12),
+            self._flag_operator('subrecords/PROFILE/0/0/parameters/Temperature', 4, 1),
+            QCSetValue('parameters/Salinity', 35, children=[QCSetWorkingQuality('parameters/Salinity', 5)]),
+            QCSetValue('coordinates/Latitude', 46),
+        ]
+        record1 = self._build_record()
+        for op in operators:
+            op.apply(record1)
+        record2 = self._build_record()
+        QCOperationBatch(operators).apply(record2)
+        self.assertEqual(record1.to_mapping(), record2.to_mapping())
+        self.assertEqual(record1.generate_hash(), record2.generate_hash())
+
+    def test_batch_skips_overwritten_values(self):
+        path = 'subrecords/PROFILE/0/0/parameters/Temperature'
+        batch = QCOperationBatch([self._flag_operator(path, x) for x in (3, 4, 1)])
+        self.assertEqual(4, len(batch))
+        record = self._build_record()
+        batch.apply(record)
+        self.assertEqual(1, record.subrecords['PROFILE'][0].records[0].parameters['Temperature'].metadata.best('WorkingQuality'))
+
+    def test_batch_keeps_created_parents(self):
+        operators = [
+            QCSetValue('parameters/Salinity', 34),
+            QCSetWorkingQuality('parameters/Salinity', 3),
+            QCSetValue('parameters/Salinity', 35),
+        ]
+        batch = QCOperationBatch(operators)
+        self.assertEqual(3, len(batch))
+        record = self._build_record()
+        batch.apply(record)
+        self.assertEqual(35, record.parameters['Salinity'].value)
+        self.assertEqual(3, record.parameters['Salinity'].metadata.best('WorkingQuality'))
+
+    def test_batch_merge_history(self):
+        operators = [self._flag_operator(f'subrecords/PROFILE/0/{x}/parameters/Temperature', 4, x) for x in range(0, 3)]
+        record = self._build_record()
+        QCOperationBatch.from_maps([x.to_map() for x in operators], merge_history=True).apply(record)
+        self.assertEqual(1, len(record.history))
+        self.assertEqual(3, len(record.history[0].message.split('\n')))
+        self.assertEqual('2020-01-01T00:02:00+00:00', record.history[0].timestamp)
+        for sr in record.subrecords['PROFILE'][0].records:
+            self.assertEqual(4, sr.parameters['Temperature'].metadata.best('WorkingQuality'))
+
+    def test_batch_bad_path(self):
+        with self.assertRaises(ValueError):
+            QCOperationBatch([QCSetValue('subrecords/PROFILE/0/7/parameters/Temperature', 5)]).apply(self._build_record())
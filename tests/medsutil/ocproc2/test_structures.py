@@ -2,6 +2,7 @@ import datetime
 import hashlib
 import unittest as ut
 
+import medsutil.json as json
 from medsutil.ocproc2 import ChildRecord, MultiElement, ParentRecord, QCTestRunInfo, QCResult, QCMessage, HistoryEntry, \
     MessageType, SingleElement, RecordSet, ChildRecord, RecordMap
 
@@ -355,6 +356,27 @@ class TestParentRecord(ut.TestCase):
         self.assertIsNotNone(pr.history[0].timestamp)
         self.assertEqual(pr.history[0].message_type, MessageType.INFO)
 
+    def test_json_direct(self):
+        pr = ParentRecord()
+        pr.coordinates['Latitude'] = SingleElement(45, Uncertainty=0.01, Units='degrees_north')
+        pr.parameters['Flags'] = MultiElement([1, SingleElement(2, Units='m')], Units='x')
+        pr.parameters['Plain'] = MultiElement([1, 2])
+        pr.metadata['Complex'] = {'a': [1, 2]}
+        pr.record_note('Hello', 'foo', '1', 'bar')
+        for i in range(0, 3):
+            cr = ChildRecord()
+            cr.coordinates['Depth'] = i
+            cr.parameters['Temperature'] = SingleElement(5 + i, WorkingQuality=1)
+            pr.subrecords.append_to_record_set('PROFILE', 0, cr)
+        pr.subrecords['PROFILE'][0].metadata['Foo'] = 'Bar'
+        self.assertEqual(json.dumpb(pr.to_mapping()), json.dumpb(pr))
+        # Partly loaded records keep the raw values that weren't loaded
+        pr2 = ParentRecord.build_from_mapping(json.load_dict(json.dumpb(pr)))
+        pr2.subrecords['PROFILE'][0].records[1].parameters['Temperature'].metadata['WorkingQuality'] = 4
+        self.assertEqual(json.dumpb(pr2.to_mapping()), json.dumpb(pr2))
+        self.assertEqual(pr2.to_mapping(), json.load_dict(json.dumpb(pr2)))
+
+
 class TestRecordSet(ut.TestCase):
 
     def test_metadata(self):
@@ -8,6 +8,7 @@ from medsutil.storage import StorageController, StorageTier
 from medsutil.storage.azure_blob import AzureBlobHandle
 from medsutil.storage.azure import AzureClientPool
 from medsutil.storage.interface import PathType
+from medsutil.storage.listing import ListingCache
 from tests.helpers.base_test_case import BaseTestCase
 
 
@@ -160,6 +161,17 @@ class BlobTest(BaseTestCase):
         file.download(p)
         self.assertTrue(file.exists())
 
+    @injector.test_case({
+        AzureClientPool: AzureMockClientPool
+    })
+    @test_with_config(("azure", "storage", "test", "connection_string"), "GoodString")
+    def test_read_content_streams(self):
+        file = AzureBlobHandle.build('https://test.blob.core.windows.net/container/test.txt')
+        with file.memory_view() as view:
+            self.assertIsNone(view)
+        with file.read_content() as content:
+            self.assertEqual(b''.join(content), file.read_bytes())
+
     @injector.test_case({
         AzureClientPool: AzureMockClientPool
     })
@@ -226,3 +238,19 @@ class BlobTest(BaseTestCase):
         self.assertIn("https://test.blob.core.windows.net/container/subdir/subdir2/test5.txt", files)
         self.assertNotIn("https://test.blob.core.windows.net/container/subdir/", files)
 
+
+    @injector.test_case({
+        AzureClientPool: AzureMockClientPool
+    })
+    def test_search_changes(self):
+        blob = AzureBlobHandle.build('https://test.blob.core.windows.net/container')
+        cache = ListingCache()
+        found = {file.path(): stat for file, stat in blob.search_changes(cache)}
+        self.assertIn("https://test.blob.core.windows.net/container/test.txt", found)
+        self.assertIn("https://test.blob.core.windows.net/container/subdir/subdir2/test5.txt", found)
+        self.assertIsNotNone(found["https://test.blob.core.windows.net/container/test.txt"].st_mtime)
+        cache.commit()
+        self.assertEqual([], list(blob.search_changes(cache)))
+        top_level = [file.path() for file, _ in blob.search_changes(ListingCache(), recursive=False)]
+        self.assertIn("https://test.blob.core.windows.net/container/test.txt", top_level)
+        self.assertNotIn("https://test.blob.core.windows.net/container/subdir/test2.txt", top_level)
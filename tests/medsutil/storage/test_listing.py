@@ -0,0 +1,94 @@
+import os
+
+from medsutil.awaretime import AwareDateTime
+from medsutil.storage.interface import StatResult
+from medsutil.storage.listing import ListingCache
+from medsutil.storage.local import LocalHandle
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestListingCache(BaseTestCase):
+
+    def test_has_changed(self):
+        cache = ListingCache()
+        stat = StatResult(exists=True, st_size=5, st_mtime=AwareDateTime(2015, 1, 2, 3, 4, 5))
+        self.assertTrue(cache.has_changed('/dir/', 'file.txt', stat))
+        # not committed yet
+        self.assertTrue(cache.has_changed('/dir/', 'file.txt', stat))
+        cache.commit()
+        self.assertFalse(cache.has_changed('/dir/', 'file.txt', stat))
+        self.assertTrue(cache.has_changed('/dir/', 'file.txt', StatResult(exists=True, st_size=6, st_mtime=stat.st_mtime)))
+        self.assertTrue(cache.has_changed('/dir/', 'file2.txt', stat))
+        self.assertTrue(cache.has_changed('/dir2/', 'file.txt', stat))
+
+    def test_etag(self):
+        cache = ListingCache()
+        cache.has_changed('/dir/', 'file.txt', StatResult(exists=True, etag='abc'))
+        cache.commit()
+        self.assertFalse(cache.has_changed('/dir/', 'file.txt', StatResult(exists=True, etag='abc')))
+        self.assertTrue(cache.has_changed('/dir/', 'file.txt', StatResult(exists=True, etag='def')))
+
+    def test_discard(self):
+        cache = ListingCache()
+        stat = StatResult(exists=True, st_size=5)
+        cache.has_changed('/dir/', 'file.txt', stat)
+        cache.discard()
+        cache.commit()
+        self.assertNotIn('/dir/', cache)
+        self.assertTrue(cache.has_changed('/dir/', 'file.txt', stat))
+
+    def test_prune(self):
+        cache = ListingCache()
+        stat = StatResult(exists=True, st_size=5)
+        cache.has_changed('/dir/', 'file.txt', stat)
+        cache.has_changed('/dir2/', 'file.txt', stat)
+        cache.commit()
+        self.assertEqual(2, len(cache))
+        cache.has_changed('/dir/', 'file.txt', stat)
+        cache.commit(prune=True)
+        self.assertIn('/dir/', cache)
+        self.assertNotIn('/dir2/', cache)
+
+    def test_persistence(self):
+        cache_file = self.temp_dir / 'cache' / 'listing.json'
+        cache = ListingCache(cache_file)
+        stat = StatResult(exists=True, st_size=5, st_mtime=AwareDateTime(2015, 1, 2, 3, 4, 5))
+        cache.has_changed('/dir/', 'file.txt', stat)
+        cache.commit()
+        self.assertTrue(cache_file.exists())
+        cache2 = ListingCache(cache_file)
+        self.assertFalse(cache2.has_changed('/dir/', 'file.txt', stat))
+
+    def test_corrupt_file(self):
+        cache_file = self.temp_dir / 'listing.json'
+        with open(cache_file, 'w') as h:
+            h.write('{not json')
+        with self.assertLogs('storage_listing', 'WARNING'):
+            cache = ListingCache(cache_file)
+        self.assertEqual(0, len(cache))
+
+    def test_search_changes(self):
+        (self.temp_dir / 'subdir').mkdir()
+        (self.temp_dir / 'file1.txt').write_text('hello')
+        (self.temp_dir / 'file2.csv').write_text('hello')
+        (self.temp_dir / 'subdir' / 'file3.txt').write_text('hello')
+        handle = LocalHandle(self.temp_dir)
+        cache = ListingCache()
+        found = {h.name: s for h, s in handle.search_changes(cache, '*.txt')}
+        self.assertEqual({'file1.txt', 'file3.txt'}, set(found.keys()))
+        self.assertEqual(5, found['file1.txt'].st_size)
+        self.assertIsNotNone(found['file1.txt'].st_mtime)
+        cache.commit(prune=True)
+        self.assertEqual([], list(handle.search_changes(cache, '*.txt')))
+        (self.temp_dir / 'file1.txt').write_text('hello world')
+        (self.temp_dir / 'subdir' / 'file4.txt').write_text('hello')
+        found = [h.name for h, _ in handle.search_changes(cache, '*.txt')]
+        self.assertEqual({'file1.txt', 'file4.txt'}, set(found))
+
+    def test_search_changes_not_recursive(self):
+        (self.temp_dir / 'subdir').mkdir()
+        (self.temp_dir / 'file1.txt').write_text('hello')
+        (self.temp_dir / 'subdir' / 'file3.txt').write_text('hello')
+        handle = LocalHandle(self.temp_dir)
+        found = [h.path() for h, _ in handle.search_changes(ListingCache(), recursive=False)]
+        self.assertEqual([str(self.temp_dir / 'file1.txt').replace(os.sep, '/')], found)
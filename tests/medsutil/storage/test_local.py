@@ -101,6 +101,29 @@ class TestLocalHandle(BaseTestCase):
             h.write('12345')
         self.assertEqual(handle.size(), 5)
 
+    def test_memory_view(self):
+        with open(self.temp_dir / 'file.txt', 'wb') as h:
+            h.write(b'12345')
+        handle = LocalHandle(self.temp_dir / 'file.txt')
+        with handle.memory_view() as view:
+            self.assertIsInstance(view, memoryview)
+            self.assertEqual(bytes(view), b'12345')
+            part = view[1:3]
+        # A slice that outlives the context shouldn't break the clean up
+        self.assertEqual(bytes(part), b'23')
+        with handle.read_content() as content:
+            self.assertEqual(b''.join(content), b'12345')
+
+    def test_memory_view_empty_file(self):
+        (self.temp_dir / 'empty.txt').touch()
+        with LocalHandle(self.temp_dir / 'empty.txt').memory_view() as view:
+            self.assertEqual(len(view), 0)
+
+    def test_memory_view_missing_file(self):
+        with self.assertRaises(StorageError):
+            with LocalHandle(self.temp_dir / 'missing.txt').memory_view():
+                pass
+
     def test_walk(self):
         test_dirs = ['a', 'b', 'e', 'f', 'z']
         test_subdirs = ['t', 'y', 'g']
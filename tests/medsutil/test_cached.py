@@ -0,0 +1,131 @@
+import time
+import unittest as ut
+
+from medsutil.cached import CachedObjectMixin, CachePolicy, CacheStore, cached_method
+
+
+class Counted(CachedObjectMixin):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    @cached_method
+    def double(self, x):
+        self.calls += 1
+        return x * 2
+
+    def nothing(self):
+        return self._with_cache('nothing', self._nothing)
+
+    def _nothing(self):
+        self.calls += 1
+        return None
+
+
+class BoundedCounted(Counted):
+
+    cache_policy = CachePolicy(max_entries=2, name='test_bounded')
+
+
+class TestCachedObjectMixin(ut.TestCase):
+
+    def test_unbounded(self):
+        obj = Counted()
+        for x in range(0, 100):
+            self.assertEqual(x * 2, obj.double(x))
+        for x in range(0, 100):
+            self.assertEqual(x * 2, obj.double(x))
+        self.assertEqual(100, obj.calls)
+        self.assertEqual({'entries': 100, 'hits': 100, 'misses': 100, 'evictions': 0}, obj.cache_stats())
+
+    def test_caches_none(self):
+        obj = Counted()
+        self.assertIsNone(obj.nothing())
+        self.assertIsNone(obj.nothing())
+        self.assertEqual(1, obj.calls)
+
+    def test_set_and_clear(self):
+        obj = Counted()
+        obj._set_cache('foo', 'bar')
+        obj._set_cache('foo', 'baz', cache_parameters=(1,))
+        self.assertEqual('bar', obj._from_cache_only('foo'))
+        self.assertEqual('baz', obj._from_cache_only('foo', (1,)))
+        self.assertIsNone(obj._from_cache_only('foo', (2,)))
+        obj.double(2)
+        obj.clear_cache('foo')
+        self.assertIsNone(obj._from_cache_only('foo'))
+        self.assertIsNone(obj._from_cache_only('foo', (1,)))
+        self.assertEqual(1, obj.cache_stats()['entries'])
+        obj.clear_cache()
+        self.assertEqual(0, obj.cache_stats()['entries'])
+
+    def test_lru_by_count(self):
+        obj = BoundedCounted()
+        obj.double(1)
+        obj.double(2)
+        obj.double(1)
+        obj.double(3)
+        self.assertEqual(3, obj.calls)
+        obj.double(1)
+        self.assertEqual(3, obj.calls)
+        obj.double(2)
+        self.assertEqual(4, obj.calls)
+        self.assertEqual(2, obj.cache_stats()['evictions'])
+
+    def test_set_cache_policy(self):
+        obj = Counted()
+        obj.double(1)
+        obj.set_cache_policy(CachePolicy(max_entries=1))
+        self.assertEqual(0, obj.cache_stats()['entries'])
+        obj.double(1)
+        obj.double(2)
+        self.assertEqual(1, obj.cache_stats()['entries'])
+
+
+class TestCacheStore(ut.TestCase):
+
+    def test_max_bytes(self):
+        store = CacheStore(CachePolicy(max_bytes=10, size_of=len))
+        store.set('a', 'aaaa')
+        store.set('b', 'bbbb')
+        self.assertEqual(8, store.total_bytes)
+        store.set('c', 'cccc')
+        self.assertNotIn('a', store)
+        self.assertIn('b', store)
+        self.assertEqual(8, store.total_bytes)
+        # A single value over the limit is still kept until the next one arrives
+        store.set('d', 'd' * 20)
+        self.assertEqual(['d'], store.keys())
+        self.assertEqual(3, store.evictions)
+
+    def test_ttl(self):
+        store = CacheStore(CachePolicy(ttl_seconds=0.05))
+        store.set('a', 1)
+        self.assertEqual((True, 1), store.get('a'))
+        time.sleep(0.1)
+        self.assertEqual((False, None), store.get('a'))
+        self.assertEqual(0, len(store))
+        self.assertEqual(1, store.evictions)
+        self.assertEqual(1, store.hits)
+        self.assertEqual(1, store.misses)
+
+
+class TestCachePolicy(ut.TestCase):
+
+    def test_from_config(self):
+        policy = CachePolicy.from_config({'max_entries': '5', 'ttl_seconds': 30}, name='foo')
+        self.assertEqual(5, policy.max_entries)
+        self.assertIsNone(policy.max_bytes)
+        self.assertEqual(30.0, policy.ttl_seconds)
+        self.assertEqual('foo', policy.name)
+        self.assertTrue(policy.is_bounded)
+        self.assertFalse(CachePolicy().is_bounded)
+
+    def test_bad_config(self):
+        with self.assertRaises(ValueError):
+            CachePolicy.from_config({'max_things': 5})
+        with self.assertRaises(ValueError):
+            CachePolicy.from_config({'max_entries': 0})
+        with self.assertRaises(ValueError):
+            CachePolicy.from_config({'ttl_seconds': 'soon'})
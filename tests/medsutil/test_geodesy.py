@@ -0,0 +1,53 @@
+import datetime
+
+import numpy as np
+import shapely
+from uncertainties import ufloat, umath
+
+from medsutil import geodesy
+from medsutil.uarray import UncertainArray
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestGeodesyArrays(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.lats = [45.0, 45.1, 45.1, 45.3]
+        self.lons = [-60.0, -60.1, -60.1, -60.5]
+
+    def test_haversine_array_matches_scalar(self):
+        distances = geodesy.track_distances(self.lats, self.lons)
+        expected = [float(geodesy.haversine((self.lats[i], self.lons[i]), (self.lats[i + 1], self.lons[i + 1])).num) for i in range(0, 3)]
+        np.testing.assert_allclose(distances, expected)
+
+    def test_haversine_array_uncertainty(self):
+        distances = geodesy.track_distances(self.lats, self.lons, 0.001, 0.001)
+        self.assertIsInstance(distances, UncertainArray)
+        lat1, lon1, lat2, lon2 = (umath.radians(ufloat(x, 0.001)) for x in (45, -60, 45.1, -60.1))
+        a = umath.sin((lat2 - lat1) / 2) ** 2 + umath.cos(lat1) * umath.cos(lat2) * umath.sin((lon2 - lon1) / 2) ** 2
+        expected = 2 * umath.asin(umath.sqrt(a)) * ufloat(6371000, 10000)
+        self.assertAlmostEqual(expected.nominal_value, distances.nominal_value[0], delta=1e-6)
+        self.assertAlmostEqual(expected.std_dev, distances.std_dev[0], delta=1e-6)
+        # Identical positions have no distance but still the uncertainty of both positions
+        self.assertEqual(0, distances.nominal_value[1])
+
+    def test_bearing_array(self):
+        np.testing.assert_allclose(geodesy.bearing_array([0, 0, 0, 0], [0, 0, 0, 0], [1, 0, -1, 0], [0, 1, 0, -1]), [0, 90, 180, 270])
+
+    def test_track_speeds(self):
+        start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        times = [start + datetime.timedelta(hours=x) for x in (0, 1, 1, 3)]
+        speeds = geodesy.track_speeds(self.lats, self.lons, times)
+        distances = geodesy.track_distances(self.lats, self.lons)
+        np.testing.assert_allclose(speeds[[0, 2]], [distances[0] / 3600, distances[2] / 7200])
+        self.assertTrue(np.isnan(speeds[1]))
+        np.testing.assert_allclose(geodesy.track_speeds(self.lats, self.lons, [0, 3600, 3600, 10800]), speeds)
+
+    def test_coordinates_to_geometries(self):
+        geometries = geodesy.coordinates_to_geometries([1, 2, 3, 4], [5, 6, 7, 8], [0, 0.1, 0, 0.1], [0, 0, 0.1, 0.1])
+        self.assertEqual(['Point', 'LineString', 'LineString', 'Polygon'], [x.geom_type for x in geometries])
+        self.assertTrue(shapely.equals(geometries[0], shapely.Point(5, 1)))
+        self.assertTrue(shapely.equals(geometries[1], shapely.LineString([(6, 1.9), (6, 2.1)])))
+        self.assertTrue(shapely.equals(geometries[2], shapely.LineString([(6.9, 3), (7.1, 3)])))
+        self.assertTrue(shapely.equals(geometries[3], shapely.box(7.9, 3.9, 8.1, 4.1)))
@@ -3,7 +3,7 @@ import threading
 
 from medsutil.halts import HaltFlag, HaltInterrupt, copy_with_halt, gzip_with_halt, ungzip_with_halt
 from tests.helpers.base_test_case import BaseTestCase
-from medsutil.halts import DummyHaltFlag
+from medsutil.halts import DummyHaltFlag, LinkedHaltFlag
 
 
 class TestHaltFlag(BaseTestCase):
@@ -26,6 +26,19 @@ class TestHaltFlag(BaseTestCase):
         with self.assertRaises(HaltInterrupt):
             hf.breakpoint()
 
+    def test_linked_halt_flag(self):
+        parent = DummyHaltFlag()
+        hf = LinkedHaltFlag(threading.Event(), parent, None)
+        self.assertTrue(hf.check_continue(False))
+        parent.event.set()
+        self.assertFalse(hf.check_continue(False))
+        with self.assertRaises(HaltInterrupt):
+            hf.breakpoint()
+        parent.event.clear()
+        hf.event.set()
+        self.assertFalse(hf.check_continue(False))
+        self.assertTrue(parent.check_continue(False))
+
     def test_protocol(self):
         chf = DummyHaltFlag()
         self.assertTrue(chf._should_continue())
@@ -0,0 +1,78 @@
+import multiprocessing as mp
+import pstats
+import threading
+import time
+
+from medsutil.profiling import ProfileRequest, StackSampler, CProfileSession
+from tests.helpers.base_test_case import BaseTestCase
+
+
+def _busy_loop(seconds: float):
+    end = time.monotonic() + seconds
+    total = 0
+    while time.monotonic() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestProfileRequest(BaseTestCase):
+
+    def test_request(self):
+        for req in (ProfileRequest(), ProfileRequest(mp.Array('c', 64))):
+            with self.subTest(buffer=req._buffer.__class__.__name__):
+                self.assertIsNone(req.take())
+                req.set('sample', 2.5)
+                self.assertEqual(('sample', 2.5), req.take())
+                self.assertIsNone(req.take())
+                req.set('cprofile', 3)
+                self.assertEqual(('cprofile', 3), req.take())
+
+    def test_bad_request(self):
+        req = ProfileRequest()
+        with self.assertRaises(ValueError):
+            req.set('foo', 2)
+        with self.assertRaises(ValueError):
+            req.set('sample', 0)
+
+
+class TestProfilers(BaseTestCase):
+
+    def test_stack_sampler(self):
+        output = self.temp_dir / 'profiles' / 'samples.collapsed'
+        sampler = StackSampler(output, interval=0.001)
+        sampler.start(0.2)
+        _busy_loop(0.1)
+        sampler.stop()
+        self.assertFalse(sampler.is_running)
+        self.assertGreater(sampler.sample_count, 0)
+        with open(output, 'r', encoding='utf-8') as h:
+            lines = h.read().splitlines()
+        self.assertTrue(any('_busy_loop' in x for x in lines))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn(';', stack)
+
+    def test_stack_sampler_other_thread(self):
+        output = self.temp_dir / 'samples.collapsed'
+        thread = threading.Thread(target=_busy_loop, args=(0.2,))
+        thread.start()
+        sampler = StackSampler(output, thread_id=thread.ident, interval=0.001)
+        sampler.start(5)
+        thread.join()
+        sampler.stop()
+        self.assertTrue(output.exists())
+
+    def test_cprofile_session(self):
+        output = self.temp_dir / 'profile.pstats'
+        session = CProfileSession(output, 2)
+        with session.profile():
+            _busy_loop(0.01)
+        self.assertFalse(session.is_done)
+        self.assertFalse(output.exists())
+        with session.profile():
+            _busy_loop(0.01)
+        self.assertTrue(session.is_done)
+        stats = pstats.Stats(str(output))
+        self.assertTrue(any(x[2] == '_busy_loop' for x in stats.stats.keys()))
+        with session.profile():
+            pass
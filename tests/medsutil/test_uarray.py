@@ -0,0 +1,72 @@
+import decimal
+
+import numpy as np
+from uncertainties import ufloat, umath
+
+from medsutil.adecimal import AccurateDecimal
+from medsutil.uarray import UncertainArray
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestUncertainArray(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.values = [1.0, 2.0, 3.0, 4.0]
+        self.std_devs = [0.1, 0.2, 0.3, 0.4]
+        self.array = UncertainArray.from_arrays(self.values, self.std_devs)
+        self.ufloats = [ufloat(v, s) for v, s in zip(self.values, self.std_devs)]
+
+    def assertMatches(self, result: UncertainArray, expected):
+        if not isinstance(expected, list):
+            expected = [expected]
+        np.testing.assert_allclose(np.atleast_1d(result.nominal_value), [x.nominal_value for x in expected])
+        np.testing.assert_allclose(np.atleast_1d(result.std_dev), [x.std_dev for x in expected], atol=1e-12)
+
+    def test_elementwise(self):
+        a, u = self.array, self.ufloats
+        with self.subTest(msg='arithmetic'):
+            self.assertMatches((a * 3 + 1) / a - a ** 2, [(x * 3 + 1) / x - x ** 2 for x in u])
+        with self.subTest(msg='functions'):
+            self.assertMatches(a.sin() / a.sqrt() + a.exp().log(), [umath.sin(x) / umath.sqrt(x) + umath.log(umath.exp(x)) for x in u])
+        with self.subTest(msg='reversed'):
+            self.assertMatches(2 / a - 1, [2 / x - 1 for x in u])
+            self.assertMatches(np.array(self.values) - a, [v - x for v, x in zip(self.values, u)])
+
+    def test_correlations(self):
+        a, u = self.array, self.ufloats
+        with self.subTest(msg='self'):
+            self.assertMatches(a - a, [x - x for x in u])
+            self.assertMatches(a * a, [x * x for x in u])
+        with self.subTest(msg='shifted'):
+            diff = a[1:] - a[:-1]
+            self.assertMatches(diff, [u[i + 1] - u[i] for i in range(0, 3)])
+            self.assertMatches(diff * a[:-1] + a[1:], [(u[i + 1] - u[i]) * u[i] + u[i + 1] for i in range(0, 3)])
+        with self.subTest(msg='ufloat'):
+            s = ufloat(5, 0.5)
+            self.assertMatches(a * s + s, [x * s + s for x in u])
+
+    def test_reductions(self):
+        a, u = self.array, self.ufloats
+        self.assertMatches(a.sum(), sum(u))
+        self.assertMatches((a * 2).mean(), sum(x * 2 for x in u) / 4)
+        self.assertMatches(a.sum() - a[0], sum(u) - u[0])
+
+    def test_round_trip(self):
+        arr = UncertainArray.from_values([AccurateDecimal(1, '0.1'), ufloat(2, 0.2), decimal.Decimal('3'), None], units='m')
+        self.assertEqual('m', arr.units)
+        np.testing.assert_allclose(arr.nominal_value, [1, 2, 3, np.nan])
+        np.testing.assert_allclose(arr.std_dev, [0.1, 0.2, 0, 0])
+        ufloats = arr[0:2].to_ufloats()
+        self.assertEqual([2.0, 0.2], [ufloats[1].nominal_value, ufloats[1].std_dev])
+        decimals = arr[0:3].to_accurate_decimals()
+        self.assertEqual(decimal.Decimal('1.0'), decimals[0].num)
+        self.assertEqual(decimal.Decimal('0.1'), decimals[0].std_dev)
+
+    def test_no_uncertainty(self):
+        arr = UncertainArray.from_arrays([1, 2, 3])
+        np.testing.assert_allclose((arr * 2).std_dev, [0, 0, 0])
+
+    def test_bad_value(self):
+        with self.assertRaises(TypeError):
+            UncertainArray.from_values(['foo'])
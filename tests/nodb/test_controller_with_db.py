@@ -6,6 +6,7 @@ import typing as t
 from nodb.controller import PostgresController, NODBPostgresController
 from nodb.access import NODBUser, NODBSession, UserStatus
 from nodb.interface import NODBError
+from nodb.observations import NODBBatch, BatchStatus
 
 from medsutil.awaretime import AwareDateTime
 from tests.helpers.base_test_case import BaseTestCase, skip_long_test
@@ -102,6 +103,57 @@ class TestControllerInstanceNoMock(BaseTestCase):
             self.assertEqual(user.phash, user2.phash)
             self.assertIsNone(NODBUser.find_by_username(db, 'foobar2'))
 
+    def test_bulk_insert_objects(self):
+        with self.real_nodb_test('nodb_qc_batches') as (db, cur):
+            uuids = [str(uuid.uuid4()) for _ in range(0, 3)]
+            db.bulk_insert_objects([NODBBatch(batch_uuid=x, status=BatchStatus.NEW) for x in uuids])
+            db.commit()
+            cur.execute('SELECT batch_uuid, status FROM nodb_qc_batches')
+            rows = {str(x[0]): x[1] for x in cur.fetch_stream(25)}
+            self.assertEqual({x: 'NEW' for x in uuids}, rows)
+            db.bulk_insert_objects([NODBBatch(batch_uuid=uuids[0], status=BatchStatus.QUEUED)], ignore_conflicts=True)
+            db.commit()
+            cur.execute('SELECT status FROM nodb_qc_batches WHERE batch_uuid = %s', [uuids[0]])
+            self.assertEqual('NEW', cur.fetchone()[0])
+
+    def test_bulk_insert_objects_in_pages(self):
+        with self.real_nodb_test('nodb_qc_batches') as (db, cur):
+            uuids = [str(uuid.uuid4()) for _ in range(0, 5)]
+            reset = db._insert_page_size
+            db._insert_page_size = 2
+            try:
+                db.bulk_insert_objects([NODBBatch(batch_uuid=x, status=BatchStatus.NEW) for x in uuids])
+            finally:
+                db._insert_page_size = reset
+            db.commit()
+            cur.execute('SELECT batch_uuid, status FROM nodb_qc_batches')
+            rows = {str(x[0]): x[1] for x in cur.fetch_stream(25)}
+            self.assertEqual({x: 'NEW' for x in uuids}, rows)
+
+    def test_bulk_delete_objects(self):
+        with self.real_nodb_test('nodb_qc_batches') as (db, cur):
+            uuids = [str(uuid.uuid4()) for _ in range(0, 5)]
+            db.bulk_insert_objects([NODBBatch(batch_uuid=x, status=BatchStatus.NEW) for x in uuids])
+            db.commit()
+            reset = db._max_in_size
+            db._max_in_size = 2
+            try:
+                db.bulk_delete_objects(NODBBatch, 'batch_uuid', uuids[:3])
+            finally:
+                db._max_in_size = reset
+            db.commit()
+            cur.execute('SELECT batch_uuid FROM nodb_qc_batches')
+            self.assertEqual(set(uuids[3:]), set(str(x[0]) for x in cur.fetch_stream(25)))
+
+    def test_bulk_note_scanned_files_no_modified_date(self):
+        with self.real_nodb_test('nodb_scanned_files') as (db, cur):
+            self.assertEqual({'/path/file.txt', '/path/file2.txt'}, db.bulk_note_scanned_files([('/path/file.txt', None), ('/path/file2.txt', None)]))
+            db.commit()
+            self.assertEqual(set(), db.bulk_note_scanned_files([('/path/file.txt', None)]))
+            db.commit()
+            cur.execute("SELECT COUNT(*) FROM nodb_scanned_files WHERE file_path = '/path/file.txt'")
+            self.assertEqual(1, cur.fetchone()[0])
+
     def test_record_login(self):
         with self.real_nodb_test('nodb_logins', 'nodb_users') as (db, cur):
             user = NODBUser(username='foobar')
@@ -441,6 +493,44 @@ class TestControllerInstanceNoMock(BaseTestCase):
                     ScannedFileStatus.UNPROCESSED
                 )
 
+    def test_bulk_scanned_file_status(self):
+        mod_time = datetime.datetime(2015, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+        with self.nodb as db:
+            with self.assertQueries([
+                ("SELECT file_path, modified_date, was_processed, was_errored FROM nodb_scanned_files WHERE file_path = ANY(ARRAY['/path/file.txt','/path/file2.txt','/path/file3.txt'])", [
+                    ['/path/file.txt', None, True, False],
+                    ['/path/file2.txt', None, False, False],
+                    ['/path/file2.txt', mod_time, False, True],
+                ])
+            ]):
+                self.assertDictEqual(
+                    db.bulk_scanned_file_status([
+                        ('/path/file.txt', None),
+                        ('/path/file2.txt', mod_time),
+                        ('/path/file3.txt', None),
+                    ]),
+                    {
+                        '/path/file.txt': ScannedFileStatus.PROCESSED,
+                        '/path/file2.txt': ScannedFileStatus.ERRORED,
+                        '/path/file3.txt': ScannedFileStatus.NOT_PRESENT,
+                    }
+                )
+
+    def test_bulk_note_scanned_files(self):
+        with self.nodb as db:
+            with self.assertQueries([
+                ("INSERT INTO nodb_scanned_files (file_path, modified_date) SELECT * FROM unnest(ARRAY['/path/file.txt','/path/file2.txt']::text[], ARRAY[NULL,'2015-01-02T03:04:05+00:00']::timestamptz[]) ON CONFLICT DO NOTHING RETURNING file_path", [
+                    ['/path/file2.txt']
+                ])
+            ]):
+                self.assertEqual(
+                    db.bulk_note_scanned_files([
+                        ('/path/file.txt', None),
+                        ('/path/file2.txt', datetime.datetime(2015, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)),
+                    ]),
+                    {'/path/file2.txt'}
+                )
+
     def test_mark_scanned_item_failed_no_date(self):
         with self.nodb as db:
             with self.assertQueries([
@@ -584,6 +674,7 @@ class TestControllerInstanceNoMock(BaseTestCase):
             ({'foo': (2, '<')}, None, ' WHERE foo < %s', [2]),
             ({'foo': (2, '>')}, None, ' WHERE foo > %s', [2]),
             ({'foo': ((2, 3, 4), 'IN')}, None, ' WHERE foo IN (%s,%s,%s)', [2, 3, 4]),
+            ({'foo': ((2, 3), 'NOT IN', True)}, None, ' WHERE (foo IS NULL OR foo NOT IN (%s,%s))', [2, 3]),
             ({'foo': (2, '<=', True)}, None, ' WHERE (foo IS NULL OR foo <= %s)', [2]),
             ({'foo': (2, '<=', False)}, None, ' WHERE foo <= %s', [2]),
             ({'foo': 2, 'bar': 3}, None, ' WHERE foo = %s AND bar = %s', [2, 3]),
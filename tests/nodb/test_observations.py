@@ -4,7 +4,7 @@ import enum
 from medsutil.awaretime import AwareDateTime
 from nodb.observations import NODBSourceFile, NODBObservation, NODBObservationData, NODBMission, NODBPlatform, PlatformStatus, \
     NODBBatch, ProcessingLevel, ObservationType, ObservationStatus, NODBWorkingRecord, BatchStatus
-from medsutil.ocproc2 import ParentRecord, ChildRecord, QCResult
+from medsutil.ocproc2 import ParentRecord, ChildRecord, QCResult, MultiElement, SingleElement
 from medsutil.ocproc2.codecs import OCProc2BinCodec
 from tests.helpers.base_test_case import BaseTestCase
 
@@ -459,6 +459,70 @@ class TestObservation(BaseTestCase):
         self.assertEqual(obs.min_depth, 0)
         self.assertEqual(obs.max_depth, 75)
 
+    def test_summary_columns(self):
+        obs = NODBObservation()
+        self.assertIsNone(obs.level_count)
+        self.assertIsNone(obs.summary_version)
+        record = ParentRecord()
+        record.coordinates['Time'] = '2015-01-02T00:00:00+00:00'
+        record.coordinates['Latitude'] = 45.123456
+        record.coordinates['Longitude'] = -123.12345478
+        record.parameters.set('AirTemperature', 5, Quality=4)
+        for idx, (depth, quality) in enumerate(((10, 1), (20, 3), (30, 2), (40, 4))):
+            subrecord = ChildRecord()
+            subrecord.coordinates.set('Depth', depth, Units='m')
+            subrecord.coordinates['Time'] = f'2015-01-02T00:0{idx}:00+00:00'
+            subrecord.parameters.set('Temperature', 6, Units='K', Quality=quality)
+            record.subrecords.append_to_record_set('PROFILE', 0, subrecord)
+        obs.update_from_record(record)
+        self.assertEqual(obs.level_count, 4)
+        self.assertEqual(obs.summary_version, NODBObservation.SUMMARY_VERSION)
+        self.assertSameTime(obs.min_time, '2015-01-02T00:00:00+00:00')
+        self.assertSameTime(obs.max_time, '2015-01-02T00:03:00+00:00')
+        self.assertDictSimilar(obs.parameter_summary, {
+            'AirTemperature': {'best': 4, 'worst': 4, 'good_min_depth': None, 'good_max_depth': None},
+            'Temperature': {'best': 1, 'worst': 4, 'good_min_depth': 10.0, 'good_max_depth': 30.0},
+        })
+        self.assertEqual(obs.temperature_good_min_depth, 10.0)
+        self.assertEqual(obs.temperature_good_max_depth, 30.0)
+        self.assertIsNone(obs.salinity_good_min_depth)
+        self.assertIsNone(obs.salinity_good_max_depth)
+
+    def test_summary_working_quality(self):
+        obs = NODBObservation()
+        record = ParentRecord()
+        record.coordinates.set('Depth', 5, Units='m')
+        record.parameters.set('Temperature', 6, Units='K', WorkingQuality=2)
+        record.parameters.set('PracticalSalinity', None)
+        obs.update_from_record(record)
+        self.assertEqual(obs.level_count, 1)
+        self.assertIsNone(obs.min_time)
+        self.assertEqual(obs.parameter_summary['Temperature']['best'], 2)
+        self.assertEqual(obs.parameter_summary['Temperature']['good_max_depth'], 5.0)
+        self.assertEqual(obs.parameter_summary['PracticalSalinity']['worst'], 9)
+
+    def test_summary_multi_element_quality(self):
+        obs = NODBObservation()
+        record = ParentRecord()
+        record.coordinates.set('Depth', 600, Units='m')
+        record.parameters['PracticalSalinity'] = MultiElement([
+            SingleElement(35, WorkingQuality=4),
+            SingleElement(34.5, WorkingQuality=1),
+        ])
+        record.parameters['Temperature'] = MultiElement([
+            SingleElement(6, WorkingQuality=3),
+            SingleElement(7, WorkingQuality=4),
+        ], WorkingQuality=1)
+        obs.update_from_record(record)
+        self.assertEqual(obs.parameter_summary['PracticalSalinity']['best'], 1)
+        self.assertEqual(obs.parameter_summary['PracticalSalinity']['worst'], 4)
+        self.assertEqual(obs.parameter_summary['Temperature']['best'], 3)
+        self.assertEqual(obs.parameter_summary['Temperature']['worst'], 4)
+        self.assertEqual(obs.salinity_good_min_depth, 600.0)
+        self.assertEqual(obs.salinity_good_max_depth, 600.0)
+        self.assertIsNone(obs.temperature_good_min_depth)
+        self.assertIsNone(obs.temperature_good_max_depth)
+
     def test_find_observation_data(self):
         obs = NODBObservation()
         obs.obs_uuid = '12345'
@@ -0,0 +1,126 @@
+from nodb.observations import NODBPlatform, NODBMission
+from nodb.reference_cache import ReferenceCache
+from tests.helpers.base_test_case import BaseTestCase
+
+
+def _platform(wmo_id: str = '12345') -> NODBPlatform:
+    platform = NODBPlatform()
+    platform.platform_uuid = 'abcdef'
+    platform.wmo_id = wmo_id
+    platform.metadata = {'PlatformName': 'foo'}
+    return platform
+
+
+class _Loader:
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.obj
+
+
+class TestReferenceCache(BaseTestCase):
+
+    def _build(self, **kwargs) -> ReferenceCache:
+        return ReferenceCache(**kwargs)
+
+    def test_memory_cache(self):
+        cache = self._build(cache_file='', max_age_seconds=60)
+        self.assertFalse(cache.is_shared)
+        self._check_fetch(cache)
+
+    def test_shared_cache(self):
+        cache = self._build(cache_file=self.temp_dir / 'refs.sqlite', max_age_seconds=60)
+        self.assertTrue(cache.is_shared)
+        self._check_fetch(cache)
+        cache.close()
+
+    def _check_fetch(self, cache: ReferenceCache):
+        loader = _Loader(_platform())
+        first = cache.fetch('CNODCPlatform', 'abcdef', loader)
+        self.assertEqual(first.wmo_id, '12345')
+        second = cache.fetch('CNODCPlatform', 'abcdef', loader)
+        self.assertEqual(1, loader.calls)
+        self.assertIsInstance(second, NODBPlatform)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.wmo_id, '12345')
+        self.assertEqual(second.metadata, {'PlatformName': 'foo'})
+        self.assertFalse(second.is_new)
+        self.assertEqual(0, len(second.modified_values))
+        # changing the returned object doesn't change the cache
+        second.metadata['PlatformName'] = 'bar'
+        self.assertEqual(cache.fetch('CNODCPlatform', 'abcdef', loader).metadata, {'PlatformName': 'foo'})
+        # other kinds of object don't clash
+        mission = NODBMission()
+        mission.mission_uuid = 'abcdef'
+        self.assertIsInstance(cache.fetch('CNODCMission', 'abcdef', _Loader(mission)), NODBMission)
+        cache.invalidate('CNODCPlatform', 'abcdef')
+        cache.fetch('CNODCPlatform', 'abcdef', loader)
+        self.assertEqual(2, loader.calls)
+
+    def test_shared_between_instances(self):
+        one = self._build(cache_file=self.temp_dir / 'refs.sqlite', max_age_seconds=60)
+        two = self._build(cache_file=self.temp_dir / 'refs.sqlite', max_age_seconds=60)
+        one.fetch('CNODCPlatform', 'abcdef', _Loader(_platform()))
+        loader = _Loader(None)
+        self.assertEqual(two.fetch('CNODCPlatform', 'abcdef', loader).wmo_id, '12345')
+        self.assertEqual(0, loader.calls)
+        two.invalidate('CNODCPlatform', 'abcdef')
+        loader = _Loader(_platform('67890'))
+        self.assertEqual(one.fetch('CNODCPlatform', 'abcdef', loader).wmo_id, '67890')
+        self.assertEqual(1, loader.calls)
+        one.close()
+        two.close()
+
+    def test_stale_load_not_stored(self):
+        for cache_file in ('', self.temp_dir / 'refs.sqlite'):
+            with self.subTest(cache_file=cache_file):
+                cache = self._build(cache_file=cache_file, max_age_seconds=60)
+                stale = _platform('11111')
+
+                def _slow_loader():
+                    # the object is updated elsewhere while we were loading it
+                    cache.invalidate('CNODCPlatform', 'abcdef')
+                    return stale
+
+                self.assertIs(cache.fetch('CNODCPlatform', 'abcdef', _slow_loader), stale)
+                loader = _Loader(_platform())
+                self.assertEqual(cache.fetch('CNODCPlatform', 'abcdef', loader).wmo_id, '12345')
+                self.assertEqual(1, loader.calls)
+                cache.close()
+
+    def test_expiry(self):
+        cache = self._build(cache_file='', max_age_seconds=-1)
+        loader = _Loader(_platform())
+        cache.fetch('CNODCPlatform', 'abcdef', loader)
+        cache.fetch('CNODCPlatform', 'abcdef', loader)
+        self.assertEqual(2, loader.calls)
+
+    def test_none_not_cached(self):
+        cache = self._build(cache_file='', max_age_seconds=60)
+        loader = _Loader(None)
+        self.assertIsNone(cache.fetch('CNODCPlatform', 'abcdef', loader))
+        self.assertIsNone(cache.fetch('CNODCPlatform', 'abcdef', loader))
+        self.assertEqual(2, loader.calls)
+
+    def test_clear(self):
+        cache = self._build(cache_file=self.temp_dir / 'refs.sqlite', max_age_seconds=60)
+        loader = _Loader(_platform())
+        cache.fetch('CNODCPlatform', 'abcdef', loader)
+        cache.clear()
+        cache.fetch('CNODCPlatform', 'abcdef', loader)
+        self.assertEqual(2, loader.calls)
+        cache.close()
+
+    def test_bad_cache_file(self):
+        bad_file = self.temp_dir / 'not_a_dir'
+        bad_file.write_text('hello')
+        cache = self._build(cache_file=bad_file / 'refs.sqlite', max_age_seconds=60)
+        loader = _Loader(_platform())
+        with self.assertLogs('cnodc.reference_cache', 'ERROR'):
+            self.assertEqual(cache.fetch('CNODCPlatform', 'abcdef', loader).wmo_id, '12345')
+            cache.fetch('CNODCPlatform', 'abcdef', loader)
+        self.assertEqual(2, loader.calls)
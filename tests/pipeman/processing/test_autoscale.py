@@ -0,0 +1,216 @@
+import datetime
+
+import yaml
+
+from medsutil.dynamic import dynamic_name
+from medsutil.exceptions import CodedError
+from nodb.interface import QueueStatus
+from nodb.queue import NODBQueueItem
+from pipeman.processing.scheduled_task import ScheduledTask
+from pipeman_service.autoscale import AutoscalePolicy, Autoscaler, QueueBacklog
+from pipeman_service.single import SingleProcessController
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestAutoscaler(BaseTestCase):
+
+    def _autoscaler(self, **kwargs) -> Autoscaler:
+        settings = {
+            'min_count': 1,
+            'max_count': 5,
+            'items_per_process': 10,
+            'scale_up_cooldown_seconds': 60,
+            'scale_down_cooldown_seconds': 300,
+        }
+        settings.update(kwargs)
+        return Autoscaler(AutoscalePolicy.from_config(settings, {'queue_name': 'hello'}))
+
+    def test_scale_up(self):
+        scaler = self._autoscaler()
+        self.assertEqual(1, scaler.target_count(1, QueueBacklog(10, 0), now=0))
+        self.assertEqual(3, scaler.target_count(1, QueueBacklog(25, 0), now=1))
+        # Still cooling down
+        self.assertEqual(3, scaler.target_count(3, QueueBacklog(45, 0), now=30))
+        self.assertEqual(5, scaler.target_count(3, QueueBacklog(500, 0), now=61))
+
+    def test_scale_down_hysteresis(self):
+        scaler = self._autoscaler()
+        # Between the two thresholds, nothing changes
+        self.assertEqual(3, scaler.target_count(3, QueueBacklog(11, 0), now=0))
+        self.assertEqual(2, scaler.target_count(3, QueueBacklog(10, 0), now=1))
+        self.assertEqual(2, scaler.target_count(2, QueueBacklog(0, 0), now=100))
+        self.assertEqual(1, scaler.target_count(2, QueueBacklog(0, 0), now=301))
+        self.assertEqual(1, scaler.target_count(1, QueueBacklog(0, 0), now=1000))
+
+    def test_scale_up_on_age(self):
+        scaler = self._autoscaler(max_age_seconds=120)
+        self.assertEqual(2, scaler.target_count(1, QueueBacklog(3, 150), now=0))
+        # Doesn't shrink while the items are too old, and keeps growing after the cooldown
+        self.assertEqual(2, scaler.target_count(2, QueueBacklog(1, 150), now=30))
+        self.assertEqual(3, scaler.target_count(2, QueueBacklog(1, 150), now=1000))
+        self.assertEqual(2, scaler.target_count(3, QueueBacklog(1, 10), now=2000))
+
+    def test_resource_limits(self):
+        scaler = self._autoscaler(max_cpu_percent=80, max_memory_percent=90)
+        self.assertEqual(1, scaler.target_count(1, QueueBacklog(50, 0), cpu_percent=85, memory_percent=10, now=0))
+        self.assertEqual(1, scaler.target_count(1, QueueBacklog(50, 0), cpu_percent=10, memory_percent=95, now=0))
+        self.assertEqual(5, scaler.target_count(1, QueueBacklog(50, 0), cpu_percent=10, memory_percent=10, now=0))
+
+    def test_clamp(self):
+        scaler = self._autoscaler(min_count=2, max_count=3)
+        self.assertEqual(2, scaler.target_count(1, QueueBacklog(0, 0), now=0))
+        self.assertEqual(3, scaler.target_count(6, QueueBacklog(100, 0), now=1))
+
+    def test_bad_config(self):
+        with self.assertRaisesCoded('AUTOSCALE-1000'):
+            AutoscalePolicy.from_config('foo')
+        with self.assertRaisesCoded('AUTOSCALE-1001'):
+            AutoscalePolicy.from_config({'queue_name': 'hello', 'foo': 'bar'})
+        with self.assertRaisesCoded('AUTOSCALE-1002'):
+            AutoscalePolicy.from_config({'max_count': 5}, {})
+        with self.assertRaisesCoded('AUTOSCALE-1003'):
+            AutoscalePolicy.from_config({'queue_name': 'hello', 'max_count': 'five'})
+        with self.assertRaisesCoded('AUTOSCALE-1004'):
+            AutoscalePolicy.from_config({'queue_name': 'hello', 'min_count': 3, 'max_count': 2})
+        with self.assertRaisesCoded('AUTOSCALE-1005'):
+            AutoscalePolicy.from_config({'queue_name': 'hello', 'max_count': 2, 'items_per_process': 5, 'scale_down_items_per_process': 6})
+
+
+class _DummyProcess:
+
+    def __init__(self, proc_info):
+        self.proc_info = proc_info
+        self.started = False
+        self.stopped = False
+
+    def start(self):
+        self.started = True
+
+    def shutdown(self):
+        self.stopped = True
+
+    def is_alive(self) -> bool:
+        return not self.stopped
+
+
+class _SlowStopProcess(_DummyProcess):
+
+    def is_alive(self) -> bool:
+        return True
+
+
+class TestControllerAutoscale(BaseTestCase):
+
+    def _controller(self, autoscale) -> SingleProcessController:
+        file = self.temp_dir / "test.yaml"
+        with open(file, "w") as h:
+            yaml.safe_dump({
+                'process1': {
+                    'class_name': dynamic_name(ScheduledTask),
+                    'count': 2,
+                    'config': {
+                        'queue_name': 'hello',
+                    },
+                    'autoscale': autoscale,
+                },
+            }, h)
+        nc = SingleProcessController(
+            process_name="process1",
+            config_file=file,
+            _no_report=True
+        )
+        nc.nodb = self.mock_nodb
+        nc.reload_check()
+        nc._process_info['process1']._process_cls = _DummyProcess
+        return nc
+
+    def test_autoscale(self):
+        nc = self._controller({'min_count': 1, 'max_count': 4, 'items_per_process': 2, 'scale_up_cooldown_seconds': 0, 'scale_down_cooldown_seconds': 0})
+        process_set = nc._process_info['process1']
+        self.assertEqual(2, process_set.quota)
+        nc.reap_and_sow()
+        self.assertEqual(2, len(process_set._active_processes))
+        for _ in range(0, 7):
+            self.db.create_queue_item(queue_name='hello', data={})
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.autoscale(force=True)
+        self.assertEqual(4, process_set.quota)
+        nc.reap_and_sow()
+        self.assertEqual(4, len(process_set._active_processes))
+        self.db.reset()
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.autoscale(force=True)
+        self.assertEqual(3, process_set.quota)
+        self.assertEqual(3, len(process_set._active_processes))
+        stopped = list(process_set._stopping.values())
+        self.assertEqual(1, len(stopped))
+        self.assertTrue(stopped[0].stopped)
+        self.assertEqual(4, stopped[0].proc_info.process_index)
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.reap_and_sow()
+        self.assertEqual(3, len(process_set._active_processes))
+        self.assertEqual(0, len(process_set._stopping))
+
+    def test_regrow_after_stop(self):
+        nc = self._controller({'min_count': 1, 'max_count': 4, 'items_per_process': 2, 'scale_up_cooldown_seconds': 0, 'scale_down_cooldown_seconds': 0})
+        process_set = nc._process_info['process1']
+        process_set._process_cls = _SlowStopProcess
+        nc.reap_and_sow()
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.autoscale(force=True)
+        self.assertEqual(1, process_set.quota)
+        self.assertEqual(1, len(process_set._stopping))
+        for _ in range(0, 7):
+            self.db.create_queue_item(queue_name='hello', data={})
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.autoscale(force=True)
+            nc.reap_and_sow()
+        # The process that is still stopping doesn't count towards the new quota
+        self.assertEqual(4, len(process_set._active_processes))
+        self.assertEqual(1, len(process_set._stopping))
+        self.assertTrue(process_set.is_active())
+
+    def test_escalated_items_ignored(self):
+        nc = self._controller({'min_count': 1, 'max_count': 4, 'items_per_process': 2, 'max_age_seconds': 60, 'scale_up_cooldown_seconds': 0, 'scale_down_cooldown_seconds': 0})
+        process_set = nc._process_info['process1']
+        nc.reap_and_sow()
+        for _ in range(0, 7):
+            self.db.create_queue_item(queue_name='hello', data={})
+        for item in self.db.table(NODBQueueItem):
+            with item.readonly_access():
+                item.escalation_level = 1
+                item.created_date = datetime.datetime.now() - datetime.timedelta(hours=1)
+        self.assertEqual({}, self.db.fetch_queue_backlog())
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.autoscale(force=True)
+        self.assertEqual(1, process_set.quota)
+
+    def test_due_delayed_items_counted(self):
+        for _ in range(0, 2):
+            self.db.create_queue_item(queue_name='hello', data={})
+        for item, delay in zip(self.db.table(NODBQueueItem), (-120, 3600)):
+            with item.readonly_access():
+                item.status = QueueStatus.DELAYED_RELEASE
+                item.delay_release = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+        depth, age = self.db.fetch_queue_backlog()['hello']
+        self.assertEqual(1, depth)
+        self.assertGreaterEqual(age, 120)
+
+    def test_reload_keeps_size(self):
+        nc = self._controller({'min_count': 1, 'max_count': 4, 'items_per_process': 2, 'scale_up_cooldown_seconds': 0})
+        process_set = nc._process_info['process1']
+        for _ in range(0, 7):
+            self.db.create_queue_item(queue_name='hello', data={})
+        with self.assertLogs('cnodc.process_set.process1', 'INFO'):
+            nc.autoscale(force=True)
+        self.assertEqual(4, process_set.quota)
+        nc._reload_requested = True
+        nc.reload_check()
+        self.assertEqual(4, process_set.quota)
+        self.assertIsNotNone(process_set.autoscaler)
+
+    def test_bad_autoscale_config(self):
+        with self.assertLogs('cnodc.single_process', 'ERROR'):
+            nc = self._controller({'min_count': 5, 'max_count': 1})
+        self.assertIsNone(nc._process_info['process1'].autoscaler)
+        self.assertEqual(2, nc._process_info['process1'].quota)
@@ -7,6 +7,8 @@ import datetime
 
 from medsutil.dynamic import dynamic_name
 from medsutil.storage import StorageTier
+from medsutil.storage.azure import AzureClientPool
+from medsutil.storage.azure_blob import AzureBlobHandle
 from medsutil.storage.local import LocalHandle
 from nodb.workflow import WorkflowDirectory, WorkflowConfiguration
 from pipeman.processing.workflow import WorkflowController
@@ -15,6 +17,7 @@ from nodb.queue import NODBQueueItem
 from medsutil.exceptions import CodedError
 from medsutil.awaretime import from_timestamp
 from tests.helpers.base_test_case import BaseTestCase, InjectableDict
+from tests.helpers.mock_azure import AzureMockClientPool
 
 
 class TestWorkflowController(BaseTestCase):
@@ -702,6 +705,73 @@ class TestWorkflowController(BaseTestCase):
         self.assertIn('filename', d.data['metadata'])
         self.assertEqual(d.data['metadata']['filename'], 'world.txt')
 
+    def _content_workflow(self, local_overwrite: str = 'user') -> WorkflowController:
+        (self.temp_dir / 'hello').mkdir(exist_ok=True)
+        return WorkflowController("test", WorkflowConfiguration(**{
+            'working_target': {
+                'directory': self.temp_dir / 'hello',
+                'allow_overwrite': local_overwrite,
+            },
+            'additional_targets': [
+                {
+                    'directory': 'https://test.blob.core.windows.net/container/wf_uploads/',
+                    'gzip': True,
+                    'allow_overwrite': 'user',
+                },
+            ],
+            "steps": {
+                'step1': {
+                    'name': 'step1',
+                    'order': 1,
+                },
+            }
+        }))
+
+    @injector.test_case({
+        AzureClientPool: AzureMockClientPool
+    })
+    def test_upload_skips_unchanged_content(self):
+        workflow = self._content_workflow('always')
+        file = self.temp_dir / 'file.txt'
+        with open(file, 'w') as h:
+            h.write('foobar')
+        with self.temp_data_dir('azure_containers/container/wf_uploads') as blob_dir:
+            workflow._upload_and_queue_file(file, {'allow-overwrite': '1'}, None, self.db, None, 'world.txt')
+            blob = AzureBlobHandle.build('https://test.blob.core.windows.net/container/wf_uploads/world.txt.gz')
+            self.assertEqual(blob.get_metadata()['ContentSHA256'], hashlib.sha256(b'foobar').hexdigest())
+            self.assertEqual(gzip.decompress(blob.read_bytes()), b'foobar')
+            # Change the blob behind the scenes, so we can tell if it gets uploaded again
+            (blob_dir / 'world.txt.gz').write_bytes(b'not uploaded again')
+            # Same content, the blob is left alone
+            workflow._upload_and_queue_file(file, {'allow-overwrite': '1'}, None, self.db, None, 'world.txt')
+            self.assertEqual((blob_dir / 'world.txt.gz').read_bytes(), b'not uploaded again')
+            # Different content, the blob is replaced
+            with open(file, 'w') as h:
+                h.write('foobar2')
+            workflow._upload_and_queue_file(file, {'allow-overwrite': '1'}, None, self.db, None, 'world.txt')
+            blob.clear_cache()
+            self.assertEqual(blob.get_metadata()['ContentSHA256'], hashlib.sha256(b'foobar2').hexdigest())
+            self.assertEqual(gzip.decompress((blob_dir / 'world.txt.gz').read_bytes()), b'foobar2')
+            with open(self.temp_dir / 'hello' / 'world.txt', 'r') as h:
+                self.assertEqual(h.read(), 'foobar2')
+
+    @injector.test_case({
+        AzureClientPool: AzureMockClientPool
+    })
+    def test_upload_failure_keeps_existing_content(self):
+        workflow = self._content_workflow('never')
+        file = self.temp_dir / 'file.txt'
+        with open(file, 'w') as h:
+            h.write('foobar')
+        with self.temp_data_dir('azure_containers/container/wf_uploads'):
+            workflow._upload_and_queue_file(file, {}, None, self.db, None, 'world.txt')
+            blob = AzureBlobHandle.build('https://test.blob.core.windows.net/container/wf_uploads/world.txt.gz')
+            # The local copy can't be overwritten, but the blob already has the content and is kept
+            with self.assertRaisesCoded():
+                workflow._upload_and_queue_file(file, {}, None, self.db, None, 'world.txt')
+            self.assertTrue(blob.exists())
+            self.assertTrue((self.temp_dir / 'hello' / 'world.txt').exists())
+
 @injector.inject
 def _fake_validation_called(local_path, metadata, filename, d: InjectableDict=None):
     d.data['local_path'] = local_path
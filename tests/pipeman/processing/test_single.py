@@ -481,6 +481,33 @@ class TestBaseProcessController(BaseTestCase):
         self.assertFalse(nc._process_info['process1'].is_active())
         self.assertTrue(nc.wait_for_all(0.5))
 
+    def test_profile_command(self):
+        file = self.temp_dir / "test.yaml"
+        with open(file, "w") as h:
+            yaml.safe_dump({'process1': {'class_name': dynamic_name(GoodTest), 'count': 2}}, h)
+        nc = SingleProcessController(
+            process_name="process1",
+            config_file=file,
+            _no_report=True
+        )
+        nc.reload_check()
+        self.assertEqual(b'1', nc._handle_command(b'profile process1 sample 10', None))
+        nc.reap_and_sow()
+        self.assertEqual(b'0', nc._handle_command(b'profile process1 sample 10', None))
+        for ap in nc._process_info['process1']._active_processes.values():
+            self.assertEqual(('sample', 10), ap._profile_request.take())
+        self.assertEqual(b'0', nc._handle_command(b'profile process1 cprofile 3', None))
+        for ap in nc._process_info['process1']._active_processes.values():
+            self.assertEqual(('cprofile', 3), ap._profile_request.take())
+        with self.assertLogs('cnodc.single_process', 'WARNING'):
+            self.assertEqual(b'1', nc._handle_command(b'profile process2 sample 10', None))
+        with self.assertLogs('cnodc.single_process', 'WARNING'):
+            self.assertEqual(b'1', nc._handle_command(b'profile process1 foo 10', None))
+        with self.assertLogs('cnodc.single_process', 'WARNING'):
+            self.assertEqual(b'1', nc._handle_command(b'profile process1 sample ten', None))
+        with self.assertLogs('cnodc.single_process', 'WARNING'):
+            self.assertEqual(b'1', nc._handle_command(b'profile process1 sample -1', None))
+
 
 
 class GoodTest(BaseWorker):
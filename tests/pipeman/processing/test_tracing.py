@@ -0,0 +1,94 @@
+import typing as t
+
+from pipeman.processing.payload_worker import FileWorkflowWorker
+from pipeman.processing.payloads import FilePayload
+from pipeman.processing.queue_worker import QueueItemResult
+from pipeman.processing.tracing import Tracer, MemorySpanSink, SQLiteSpanSink, Span, critical_path
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TracedFileWorker(FileWorkflowWorker):
+
+    def __init__(self, **kwargs):
+        super().__init__(process_name='traced', process_version='1.0', **kwargs)
+
+    def process_payload(self, payload: FilePayload) -> t.Optional[QueueItemResult]:
+        self.download_to_temp_file()
+        with self.trace('decode') as span:
+            span.item_size = 5
+        return QueueItemResult.HANDLED
+
+
+class TestTracing(BaseTestCase):
+
+    def test_span(self):
+        tracer = Tracer(sink=MemorySpanSink())
+        with tracer.span('12345', 'stage1', worker='foo') as span:
+            span.item_size = 10
+        with self.assertRaises(ValueError):
+            with tracer.span('12345', 'stage2'):
+                raise ValueError('oh no')
+        with tracer.span(None, 'stage3'):
+            pass
+        spans = tracer.sink.read()
+        self.assertEqual(['stage1', 'stage2'], [x.stage for x in spans])
+        self.assertEqual(['ok', 'error'], [x.status for x in spans])
+        self.assertEqual(10, spans[0].item_size)
+        self.assertEqual('foo', spans[0].worker)
+        self.assertGreaterEqual(spans[0].end_time, spans[0].start_time)
+
+    def test_disabled(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled)
+        with tracer.span('12345', 'stage1'):
+            pass
+
+    def test_sqlite_sink(self):
+        sink = SQLiteSpanSink(self.temp_dir / 'traces' / 'spans.sqlite')
+        try:
+            sink.export([
+                Span('A', 'upload', 10, 20, item_size=100),
+                Span('A', 'queue:decode', 20, 25, queue_name='decode'),
+                Span('B', 'upload', 1, 2),
+            ])
+            spans = sink.read(correlation_id='A')
+            self.assertEqual(['upload', 'queue:decode'], [x.stage for x in spans])
+            self.assertEqual(100, spans[0].item_size)
+            self.assertEqual('decode', spans[1].queue_name)
+            self.assertEqual({'A'}, set(x.correlation_id for x in sink.read(since=15)))
+            self.assertEqual(3, len(sink.read()))
+        finally:
+            sink.close()
+
+    def test_critical_path(self):
+        path = critical_path([
+            Span('A', 'upload', 0, 10),
+            Span('A', 'queue:decode', 10, 40),
+            Span('A', 'download', 41, 45),
+            Span('A', 'decode', 40, 60),
+            Span('A', 'queue:qc', 65, 70),
+            Span('A', 'qc', 70, 100),
+        ])
+        self.assertEqual(['upload', 'queue:decode', 'decode', '(untracked)', 'queue:qc', 'qc'], [x.stage for x in path])
+        self.assertEqual(5, path[3].duration)
+        self.assertEqual([], critical_path([]))
+
+    def test_worker_spans(self):
+        with open(self.temp_dir / 'file.txt', 'w') as h:
+            h.write('hello world')
+        FilePayload(file_path=self.temp_dir / 'file.txt', correlation_id='12345').enqueue(self.db, 'hello')
+        worker: TracedFileWorker = self.worker_controller.build_test_worker(TracedFileWorker, {
+            'queue_name': 'hello',
+        })
+        worker.tracer = Tracer(sink=MemorySpanSink())
+        worker.run_once()
+        spans = {x.stage: x for x in worker.tracer.sink.read(correlation_id='12345')}
+        self.assertEqual({'queue:hello', 'download', 'decode', 'traced'}, set(spans.keys()))
+        self.assertEqual(11, spans['download'].item_size)
+        self.assertEqual('success', spans['traced'].status)
+        self.assertEqual('hello', spans['traced'].queue_name)
+        self.assertIsNotNone(spans['traced'].queue_wait_seconds)
+        self.assertEqual('traced', spans['decode'].worker)
+        path = critical_path(spans.values())
+        self.assertEqual('queue:hello', path[0].stage)
+        self.assertEqual('traced', path[-1].stage)
@@ -14,6 +14,7 @@ from pipeman.processing.queue_worker import QueueWorker, QueueItemResult
 from pipeman.processing.scheduled_task import ScheduledTask
 from pipeman.processing.payloads import FilePayload, BatchPayload, WorkflowPayload, SourceFilePayload, ObservationPayload
 from medsutil.exceptions import CodedError, HaltInterrupt
+from medsutil.profiling import ProfileRequest
 from tests.helpers.base_test_case import BaseTestCase, skip_long_test
 
 
@@ -546,6 +547,84 @@ class TestQueueWorker(BaseTestCase):
         self.assertIn('after_cycle', worker._called_methods)
         self.assertEqual(obj.status, QueueStatus.COMPLETE)
 
+    def test_profile_request(self):
+        request = ProfileRequest()
+        worker: BoringQueueWorker = self.worker_controller.build_test_worker(BoringQueueWorker, {
+            'queue_name': 'hello',
+            'profile_dir': str(self.temp_dir / 'profiles'),
+        })
+        worker._profile_request = request
+        worker.on_start()
+        request.set('cprofile', 1)
+        with self.assertLogs('cnodc.worker.test', 'INFO'):
+            worker.check_profile_request()
+        self.db.create_queue_item(data={'foobar': 'hello'}, queue_name='hello')
+        worker.run_once_after_start()
+        self.assertIsNone(worker._cprofile)
+        self.assertEqual(1, len(list((self.temp_dir / 'profiles').glob('*.pstats'))))
+        request.set('sample', 0.1)
+        with self.assertLogs('cnodc.worker.test', 'INFO'):
+            worker.check_profile_request()
+        worker.on_exit()
+        self.assertEqual(1, len(list((self.temp_dir / 'profiles').glob('*.collapsed'))))
+
+    def test_memory_budget(self):
+        worker: BoringQueueWorker = self.worker_controller.build_test_worker(BoringQueueWorker, {
+            'queue_name': 'hello',
+            'memory_soft_limit_mb': 100,
+            'memory_hard_limit_mb': 200,
+        })
+        memory_used = [150]
+        trimmed = []
+        worker._resident_memory_mb = lambda: memory_used[0]
+        worker.register_cache_trimmer(lambda: trimmed.append(True))
+        worker._set_cache('foo', 'bar')
+        worker.on_start()
+        self.db.create_queue_item(data={'foobar': 'hello'}, queue_name='hello')
+        with self.assertLogs('cnodc.worker.test', 'INFO'):
+            worker.run_once_after_start()
+        self.assertEqual(1, len(trimmed))
+        self.assertIsNone(worker._from_cache_only('foo'))
+        self.assertTrue(worker.continue_loop())
+        memory_used[0] = 250
+        self.db.create_queue_item(data={'foobar': 'hello'}, queue_name='hello')
+        with self.assertLogs('cnodc.worker.test', 'WARNING'):
+            worker.run_once_after_start()
+        self.assertEqual(2, len(trimmed))
+        self.assertFalse(worker.continue_loop())
+        self.assertEqual(2, len([x for x in self.db.table(NODBQueueItem) if x.status == QueueStatus.COMPLETE]))
+
+    def test_no_memory_budget(self):
+        worker: BoringQueueWorker = self.worker_controller.build_test_worker(BoringQueueWorker, {
+            'queue_name': 'hello',
+        })
+        worker._resident_memory_mb = lambda: 1000000
+        worker._set_cache('foo', 'bar')
+        worker.check_memory_budget()
+        self.assertEqual('bar', worker._from_cache_only('foo'))
+        self.assertTrue(worker.continue_loop())
+
+    def test_cache_policy(self):
+        worker: BoringQueueWorker = self.worker_controller.build_test_worker(BoringQueueWorker, {
+            'queue_name': 'hello',
+            'cache_policy': {'max_entries': 2},
+        })
+        worker.on_start()
+        self.assertEqual(2, worker._cache.policy.max_entries)
+        self.assertEqual('worker_test', worker._cache.policy.name)
+        for x in range(0, 5):
+            worker._set_cache(f'foo{x}', x)
+        self.assertEqual(2, worker.cache_stats()['entries'])
+
+    def test_bad_cache_policy(self):
+        worker: BoringQueueWorker = self.worker_controller.build_test_worker(BoringQueueWorker, {
+            'queue_name': 'hello',
+            'cache_policy': {'max_entries': -1},
+        })
+        with self.assertLogs('cnodc.worker.test', 'ERROR'):
+            worker.on_start()
+        self.assertFalse(worker._cache.policy.is_bounded)
+
     def test_full_run(self):
         worker: BoringQueueWorker = self.worker_controller.build_test_worker(BoringQueueWorker, {
             'queue_name': 'hello',
@@ -789,3 +868,90 @@ class TestObservationWorker(BaseTestCase):
         ow._current_payload = op
         with self.assertRaisesCoded('PAYLOAD-1001'):
             ow.download_to_temp_file()
+
+
+class PrefetchFileWorker(FileWorkflowWorker):
+
+    def __init__(self, **kwargs):
+        super().__init__(process_name='test', process_version='1.0', **kwargs)
+        self.contents = []
+
+    def process_payload(self, payload: FilePayload) -> t.Optional[QueueItemResult]:
+        with open(self.download_to_temp_file(), 'r') as h:
+            self.contents.append(h.read())
+        return QueueItemResult.HANDLED
+
+
+class TestPayloadPrefetch(BaseTestCase):
+
+    def _enqueue_files(self, count: int) -> list[NODBQueueItem]:
+        for i in range(0, count):
+            with open(self.temp_dir / f'{i}.txt', 'w') as h:
+                h.write(f'file {i}')
+            FilePayload(file_path=self.temp_dir / f'{i}.txt').enqueue(self.db, 'hello')
+        return list(self.db.table(NODBQueueItem))
+
+    def test_prefetch(self):
+        items = self._enqueue_files(3)
+        worker: PrefetchFileWorker = self.worker_controller.build_test_worker(PrefetchFileWorker, {
+            'queue_name': 'hello',
+            'prefetch_count': 1,
+        })
+        worker.on_start()
+        try:
+            worker.run_once_after_start()
+            self.assertEqual(['file 0'], worker.contents)
+            self.assertEqual([QueueStatus.LOCKED, QueueStatus.LOCKED, QueueStatus.UNLOCKED], [x.status for x in items])
+            self.assertEqual(1, len(worker._prefetched))
+            worker.run_once_after_start()
+            worker.run_once_after_start()
+            self.assertEqual(['file 0', 'file 1', 'file 2'], worker.contents)
+            self.assertEqual(0, len(worker._prefetched))
+        finally:
+            worker.on_exit()
+
+    def test_release_on_exit(self):
+        items = self._enqueue_files(3)
+        worker: PrefetchFileWorker = self.worker_controller.build_test_worker(PrefetchFileWorker, {
+            'queue_name': 'hello',
+            'prefetch_count': 2,
+        })
+        worker.on_start()
+        try:
+            worker.run_once_after_start()
+            self.assertEqual(2, len(worker._prefetched))
+            prefetched_dirs = [x.temp_dir() for x in worker._prefetched]
+        finally:
+            worker.on_exit()
+        self.assertEqual(['file 0'], worker.contents)
+        self.assertEqual([QueueStatus.LOCKED, QueueStatus.UNLOCKED, QueueStatus.UNLOCKED], [x.status for x in items])
+        self.assertEqual(0, len(worker._prefetched))
+        self.assertFalse(any(x.exists() for x in prefetched_dirs))
+
+    def test_prefetch_download_error(self):
+        items = self._enqueue_files(2)
+        (self.temp_dir / '1.txt').unlink()
+        worker: PrefetchFileWorker = self.worker_controller.build_test_worker(PrefetchFileWorker, {
+            'queue_name': 'hello',
+            'prefetch_count': 1,
+        })
+        worker.on_start()
+        try:
+            worker.run_once_after_start()
+            worker.run_once_after_start()
+        finally:
+            worker.on_exit()
+        self.assertEqual(['file 0'], worker.contents)
+        self.assertEqual(QueueStatus.ERROR, items[1].status)
+
+    def test_no_prefetch_by_default(self):
+        items = self._enqueue_files(2)
+        worker: PrefetchFileWorker = self.worker_controller.build_test_worker(PrefetchFileWorker, {
+            'queue_name': 'hello',
+        })
+        worker.on_start()
+        try:
+            worker.run_once_after_start()
+        finally:
+            worker.on_exit()
+        self.assertEqual([QueueStatus.LOCKED, QueueStatus.UNLOCKED], [x.status for x in items])
@@ -1,9 +1,13 @@
 import base64
+import datetime
 import functools
 import json
+import unittest.mock
 
+from medsutil.awaretime import AwareDateTime
+from nodb.interface import QueueStatus
 from nodb.queue import NODBQueueItem
-from pipeman.programs.erddap import ErddapController, ReloadFlag
+from pipeman.programs.erddap import ErddapController, ReloadFlag, ReloadScheduler
 from pipeman.programs.erddap.reloader import ERDDAPReloadWorker
 from tests.helpers.mock_requests import MockResponse
 from tests.helpers.base_test_case import BaseTestCase
@@ -399,4 +403,131 @@ class TestERDDAPWorkerAndConnection(BaseTestCase):
                     qi
                 )
             self.assertEqual(0, len(self.reloaded))
-            self.assertEqual(0, len(self.reloaded2))
\ No newline at end of file
+            self.assertEqual(0, len(self.reloaded2))
+
+    @injector.test_case
+    @zr.test_with_config(('erddaputil', 'username'), 'hello')
+    @zr.test_with_config(('erddaputil', 'password'), 'world')
+    @zr.test_with_config(('erddaputil', 'base_url'), 'http://test/api/')
+    def test_erddap_reload_worker_coalesces(self):
+        with self.mock_web_test():
+            worker = self.worker_controller.build_test_worker(ERDDAPReloadWorker, {'coalesce_window_seconds': 3600})
+            worker.on_start()
+            for data in [{'dataset_id': 'foo'}, {'dataset_id': 'foo'}, {'dataset_id': 'foo', 'flag': 2}, {'dataset_id': 'foo', 'flag': 1}, {'dataset_id': 'bar'}]:
+                self.db.create_queue_item(queue_name='erddap_reload', data=data)
+            for _ in range(0, 5):
+                worker._run_once()
+            self.assertEqual(self.reloaded, [('foo', 0, 0), ('bar', 0, 0)])
+            items = self.db.table(NODBQueueItem)
+            # The merged requests wait in the queue until their reload is issued
+            self.assertEqual([x.status for x in items], [
+                QueueStatus.COMPLETE,
+                QueueStatus.DELAYED_RELEASE,
+                QueueStatus.DELAYED_RELEASE,
+                QueueStatus.DELAYED_RELEASE,
+                QueueStatus.COMPLETE,
+            ])
+            self.assertGreater(items[1].delay_release, AwareDateTime.now() + datetime.timedelta(seconds=3500))
+            # End the window
+            worker._scheduler._last_issued[(None, 'foo')] -= 3600
+            worker._run_once()
+            self.assertEqual(self.reloaded, [('foo', 0, 0), ('bar', 0, 0), ('foo', 0, 2)])
+            self._release_delayed()
+            for _ in range(0, 4):
+                worker._run_once()
+            self.assertEqual(self.reloaded, [('foo', 0, 0), ('bar', 0, 0), ('foo', 0, 2)])
+            self.assertTrue(all(x.status == QueueStatus.COMPLETE for x in items))
+            self.assertEqual({}, worker._issued)
+
+    @injector.test_case
+    @zr.test_with_config(('erddaputil', 'username'), 'hello')
+    @zr.test_with_config(('erddaputil', 'password'), 'world')
+    @zr.test_with_config(('erddaputil', 'base_url'), 'http://test/api/')
+    def test_erddap_reload_worker_pending_survives_restart(self):
+        with self.mock_web_test():
+            worker = self.worker_controller.build_test_worker(ERDDAPReloadWorker, {'coalesce_window_seconds': 3600})
+            worker.on_start()
+            self.db.create_queue_item(queue_name='erddap_reload', data={'dataset_id': 'foo'})
+            self.db.create_queue_item(queue_name='erddap_reload', data={'dataset_id': 'foo', 'flag': 2})
+            worker._run_once()
+            worker._run_once()
+            self.assertEqual(self.reloaded, [('foo', 0, 0)])
+            # The worker is killed before the window ends and a new one picks up the released item
+            worker = self.worker_controller.build_test_worker(ERDDAPReloadWorker, {'coalesce_window_seconds': 3600})
+            worker.on_start()
+            self._release_delayed()
+            worker._run_once()
+            self.assertEqual(self.reloaded, [('foo', 0, 0), ('foo', 0, 2)])
+            self.assertTrue(all(x.status == QueueStatus.COMPLETE for x in self.db.table(NODBQueueItem)))
+
+    def _release_delayed(self):
+        for item in self.db.table(NODBQueueItem):
+            if item.status == QueueStatus.DELAYED_RELEASE:
+                with item.readonly_access():
+                    item.status = QueueStatus.UNLOCKED
+                    item.delay_release = None
+
+    def test_erddap_reload_worker_error_issues_other_reloads(self):
+        worker = self.worker_controller.build_test_worker(ERDDAPReloadWorker, {'coalesce_window_seconds': 3600})
+        worker.on_start()
+        # foo comes first in the due list
+        worker._scheduler.add('foo')
+        worker._scheduler.add('bar')
+        worker._scheduler.add('baz')
+        reloaded = []
+
+        def _reload(dataset_id, flag, cluster_name):
+            if dataset_id == 'foo':
+                raise ValueError('oh no')
+            reloaded.append(dataset_id)
+
+        with unittest.mock.patch.object(worker.erddap, 'reload_dataset', side_effect=_reload):
+            qi = NODBQueueItem()
+            qi.data = {'dataset_id': 'foo'}
+            with self.assertRaises(ValueError):
+                worker.process_queue_item(qi)
+        self.assertEqual(['bar', 'baz'], sorted(reloaded))
+        self.assertIsNone(worker._scheduler.next_due())
+
+
+
+class TestReloadScheduler(BaseTestCase):
+
+    def test_strongest_flag(self):
+        self.assertIs(ReloadFlag.strongest(ReloadFlag.SOFT, ReloadFlag.HARD), ReloadFlag.HARD)
+        self.assertIs(ReloadFlag.strongest(ReloadFlag.BAD_FILES, ReloadFlag.SOFT), ReloadFlag.BAD_FILES)
+        self.assertIs(ReloadFlag.strongest(ReloadFlag.HARD, ReloadFlag.BAD_FILES), ReloadFlag.HARD)
+
+    def test_one_reload_per_window(self):
+        s = ReloadScheduler(10)
+        s.add('foo')
+        self.assertEqual(s.pop_due(100), [('foo', ReloadFlag.SOFT, None)])
+        s.add('foo', ReloadFlag.BAD_FILES)
+        s.add('foo', ReloadFlag.HARD)
+        s.add('foo', ReloadFlag.SOFT)
+        self.assertEqual(s.pop_due(105), [])
+        self.assertEqual(s.next_due(105), 5)
+        self.assertEqual(s.pop_due(110), [('foo', ReloadFlag.HARD, None)])
+        self.assertIsNone(s.next_due(110))
+        self.assertEqual(len(s), 0)
+
+    def test_clusters_are_separate(self):
+        s = ReloadScheduler(10)
+        s.add('foo', cluster_name='a')
+        s.add('foo', cluster_name='b')
+        self.assertEqual(sorted(x[2] for x in s.pop_due(0)), ['a', 'b'])
+
+    def test_no_window(self):
+        s = ReloadScheduler(0)
+        s.add('foo')
+        self.assertEqual(len(s.pop_due(0)), 1)
+        s.add('foo')
+        self.assertEqual(len(s.pop_due(0)), 1)
+
+    def test_pop_all(self):
+        s = ReloadScheduler(10)
+        s.add('foo')
+        s.pop_due(0)
+        s.add('foo', ReloadFlag.BAD_FILES)
+        self.assertEqual(s.pop_all(), [('foo', ReloadFlag.BAD_FILES, None)])
+        self.assertEqual(len(s), 0)
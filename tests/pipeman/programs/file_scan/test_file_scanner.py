@@ -186,4 +186,113 @@ class TestFileScanTask(BaseTestCase):
                     self.assertEqual(0, len(self.db.table(NODBQueueItem.TABLE_NAME)))
                     self.assertEqual(0, len(self.db._scanned_files))
                 finally:
-                    self.db.note_scanned_file = old
\ No newline at end of file
+                    self.db.note_scanned_file = old
+    def test_scan_in_pages(self):
+        for idx in range(0, 5):
+            (self.temp_dir / f'file{idx}.txt').touch()
+        x: FileScanTask = self.worker_controller.build_test_worker(FileScanTask, {
+            'scan_target': str(self.temp_dir),
+            'workflow_name': 'test',
+            'delay_seconds': 60,
+            'run_on_boot': False,
+            'scan_batch_size': 2,
+        })
+        x.on_start()
+        self.db.note_scanned_file(str(self.temp_dir / 'file3.txt'), None)
+        calls = []
+        old = self.db.bulk_scanned_file_status
+        try:
+            self.db.bulk_scanned_file_status = lambda files: calls.append(len(files)) or old(files)
+            x.scan_files(self.db)
+        finally:
+            self.db.bulk_scanned_file_status = old
+        self.assertEqual([2, 2, 1], calls)
+        self.assertEqual(4, len(self.db.table(NODBQueueItem.TABLE_NAME)))
+        self.assertEqual(5, len(self.db._scanned_files))
+
+    def test_scan_page_falls_back_to_single_files(self):
+        for idx in range(0, 3):
+            (self.temp_dir / f'file{idx}.txt').touch()
+        x: FileScanTask = self.worker_controller.build_test_worker(FileScanTask, {
+            'scan_target': str(self.temp_dir),
+            'workflow_name': 'test',
+            'delay_seconds': 60,
+            'run_on_boot': False,
+        })
+        x.on_start()
+        old = self.db.create_queue_item
+        attempts = []
+
+        def _fail_once(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 2:
+                self.db._scanned_files.clear()
+                self.db.tables[NODBQueueItem.TABLE_NAME] = []
+                raise NODBError('oh no', 998, SqlState.SERIALIZATION_FAILURE.value)
+            return old(*args, **kwargs)
+
+        try:
+            self.db.create_queue_item = _fail_once
+            with self.assertLogs('cnodc.worker.file_scanner', 'WARNING'):
+                x.scan_files(self.db)
+        finally:
+            self.db.create_queue_item = old
+        self.assertEqual(3, len(self.db.table(NODBQueueItem.TABLE_NAME)))
+        self.assertEqual(3, len(self.db._scanned_files))
+
+    def test_scan_with_listing_cache(self):
+        (self.temp_dir / 'scan').mkdir()
+        for idx in range(0, 2):
+            (self.temp_dir / 'scan' / f'file{idx}.txt').touch()
+        cache_file = self.temp_dir / 'listing.json'
+        x: FileScanTask = self.worker_controller.build_test_worker(FileScanTask, {
+            'scan_target': str(self.temp_dir / 'scan'),
+            'workflow_name': 'test',
+            'delay_seconds': 60,
+            'run_on_boot': False,
+            'listing_cache_file': str(cache_file),
+        })
+        x.on_start()
+        x.scan_files(self.db)
+        self.assertEqual(2, len(self.db.table(NODBQueueItem.TABLE_NAME)))
+        self.assertTrue(cache_file.exists())
+        # unchanged files are skipped before the database is checked
+        self.db._scanned_files.clear()
+        x.scan_files(self.db)
+        self.assertEqual(0, len(self.db._scanned_files))
+        (self.temp_dir / 'scan' / 'file2.txt').touch()
+        y: FileScanTask = self.worker_controller.build_test_worker(FileScanTask, {
+            'scan_target': str(self.temp_dir / 'scan'),
+            'workflow_name': 'test',
+            'delay_seconds': 60,
+            'run_on_boot': False,
+            'listing_cache_file': str(cache_file),
+        })
+        y.on_start()
+        y.scan_files(self.db)
+        self.assertEqual(3, len(self.db.table(NODBQueueItem.TABLE_NAME)))
+        self.assertEqual(1, len(self.db._scanned_files))
+        self.assertTrue(self.db._scanned_files[0]['file_path'].endswith('file2.txt'))
+
+    def test_listing_cache_discarded_on_error(self):
+        (self.temp_dir / 'scan').mkdir()
+        (self.temp_dir / 'scan' / 'file0.txt').touch()
+        x: FileScanTask = self.worker_controller.build_test_worker(FileScanTask, {
+            'scan_target': str(self.temp_dir / 'scan'),
+            'workflow_name': 'test',
+            'delay_seconds': 60,
+            'run_on_boot': False,
+            'listing_cache_file': str(self.temp_dir / 'listing.json'),
+        })
+        x.on_start()
+        old_bulk, old_single = self.db.bulk_note_scanned_files, self.db.note_scanned_file
+        try:
+            self.db.bulk_note_scanned_files = functools.partial(raise_exception, ex=NODBError('oh no', 998, SqlState.SERIALIZATION_FAILURE.value))
+            self.db.note_scanned_file = functools.partial(raise_exception, ex=NODBError('oh no', 998, SqlState.SERIALIZATION_FAILURE.value))
+            with self.assertLogs('cnodc.worker.file_scanner', 'WARNING'):
+                x.scan_files(self.db)
+        finally:
+            self.db.bulk_note_scanned_files, self.db.note_scanned_file = old_bulk, old_single
+        self.assertEqual(0, len(self.db.table(NODBQueueItem.TABLE_NAME)))
+        x.scan_files(self.db)
+        self.assertEqual(1, len(self.db.table(NODBQueueItem.TABLE_NAME)))
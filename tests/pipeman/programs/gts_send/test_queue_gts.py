@@ -0,0 +1,81 @@
+from nodb.gts import GTSOutgoingMessage, GTSOutgoingMessageType, GTSOutgoingMessageStatus
+from pipeman.processing.payloads import ObservationPayload, ObservationListPayload, BatchPayload
+from pipeman.programs.gts_send.queue_gts import GTSQueueWorker
+
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestGTSQueueWorker(BaseTestCase):
+
+    def _run(self, payload):
+        return self.worker_controller.test_queue_worker(
+            GTSQueueWorker,
+            {'queue_name': 'gts_queue'},
+            self.worker_controller.payload_to_queue_item(payload, 'gts_queue')
+        )
+
+    def _messages(self) -> list[GTSOutgoingMessage]:
+        return list(self.db.stream_objects(GTSOutgoingMessage))
+
+    def test_single_observation(self):
+        payload = ObservationPayload(obs_uuid='12345', received_date='2015-01-02')
+        payload.set_metadata('gts_info', [
+            {'format': 'BUFR', 'processing_center': 'CWAO'},
+            {'format': 'BUFR', 'message_type': 'CORRECTION'},
+        ])
+        self._run(payload)
+        messages = self._messages()
+        self.assertEqual(len(messages), 2)
+        by_type = {m.message_type: m for m in messages}
+        self.assertEqual(by_type[GTSOutgoingMessageType.New].processing_center, 'CWAO')
+        self.assertEqual(by_type[GTSOutgoingMessageType.Correction].processing_center, '')
+        for m in messages:
+            self.assertEqual(m.obs_uuid, '12345')
+            self.assertEqual(m.obs_received_date.isoformat(), '2015-01-02')
+            self.assertIs(m.status, GTSOutgoingMessageStatus.Queued)
+            self.assertIsNotNone(m.message_id)
+
+    def test_observation_list(self):
+        payload = ObservationListPayload(observations=[
+            {'obs_uuid': '1', 'received_date': '2015-01-02'},
+            {'obs_uuid': '2', 'received_date': '2015-01-02', 'gts_info': {'format': 'TAC'}},
+            {'obs_uuid': '1', 'received_date': '2015-01-02'},
+        ])
+        payload.set_metadata('gts_info', {'format': 'BUFR'})
+        self._run(payload)
+        messages = self._messages()
+        self.assertEqual(
+            sorted((m.obs_uuid, m.message_format) for m in messages),
+            [('1', 'BUFR'), ('2', 'TAC')]
+        )
+
+    def test_duplicates_in_one_item(self):
+        worker = self.worker_controller.build_test_worker(GTSQueueWorker, {})
+        messages = worker.build_messages([
+            ('1', '2015-01-02', [{'format': 'BUFR'}, {'format': 'BUFR', 'message_type': 'NEW'}, {'format': 'BUFR', 'message_type': 'DELAYED'}]),
+            ('1', '2015-01-02', {'format': 'BUFR'}),
+            ('2', '2015-01-02', {'format': 'BUFR'}),
+        ])
+        self.assertEqual(len(messages), 3)
+
+    def test_payload_round_trip(self):
+        payload = ObservationListPayload(observations=[{'obs_uuid': '1', 'received_date': '2015-01-02'}])
+        item = self.worker_controller.payload_to_queue_item(payload, 'gts_queue')
+        copy = ObservationListPayload.from_queue_item(item)
+        self.assertIsInstance(copy, ObservationListPayload)
+        self.assertEqual(copy.observations, [{'obs_uuid': '1', 'received_date': '2015-01-02'}])
+
+    def test_errors(self):
+        worker = self.worker_controller.build_test_worker(GTSQueueWorker, {})
+        with self.assertRaisesCoded('GTS', 1001):
+            worker.build_messages([(None, '2015-01-02', {'format': 'BUFR'})])
+        with self.assertRaisesCoded('GTS', 1002):
+            worker.build_messages([('1', '2015-01-02', None)])
+        with self.assertRaisesCoded('GTS', 1003):
+            worker.build_messages([('1', '2015-01-02', ['BUFR'])])
+        with self.assertRaisesCoded('GTS', 1004):
+            worker.build_messages([('1', '2015-01-02', {'message_type': 'NEW'})])
+        with self.assertRaisesCoded('GTS', 1005):
+            worker.build_messages([('1', '2015-01-02', {'format': 'BUFR', 'message_type': 'FOO'})])
+        with self.assertRaisesCoded('GTS', 1000):
+            worker.process_payload(BatchPayload(batch_uuid='1'))
@@ -0,0 +1,155 @@
+import medsutil.ocproc2 as ocproc2
+from medsutil import geodesy
+from nodb.observations import NODBWorkingRecord
+from pipeman.programs.gtspp.speed_test import GTSPPSpeedTest
+from pipeman.programs.nodb.qc.qc import BaseTestSuite, TestContext, RecordTest, QCTestRunner
+from tests.helpers.base_test_case import BaseTestCase
+from tests.helpers.mock_nodb import DatabaseMock
+
+
+class _PerRecordSpeedTest(BaseTestSuite):
+    """The speed test as it was before it became a batch test, to compare the flags against."""
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            'gtspp_speed_check',
+            '1.0',
+            test_tags=['GTSPP_1.5'],
+            working_sort_by='obs_time_asc',
+            **kwargs
+        )
+
+    _get_top_speed = GTSPPSpeedTest._get_top_speed
+
+    @RecordTest(top_only=True)
+    def test_inter_record_speed(self, record: ocproc2.ParentRecord, context: TestContext):
+        self.precheck_value_in_map(record.metadata, 'CNODCStation', allow_dubious=False)
+        self.precheck_value_in_map(record.coordinates, 'Time', allow_dubious=False)
+        self.precheck_value_in_map(record.coordinates, 'Latitude', allow_dubious=False)
+        self.precheck_value_in_map(record.coordinates, 'Longitude', allow_dubious=False)
+        xx = record.coordinates['Longitude'].to_ufloat()
+        yy = record.coordinates['Latitude'].to_ufloat()
+        tt = record.coordinates['Time'].to_datetime()
+        sid = record.metadata['CNODCStation'].to_string()
+        info = (xx, yy, tt)
+        if 'previous_positions' not in context.batch_context:
+            context.batch_context['previous_positions'] = {}
+        if 'top_speeds' not in context.batch_context:
+            context.batch_context['top_speeds'] = {}
+        try:
+            if sid in context.batch_context['previous_positions']:
+                if sid not in context.batch_context['top_speeds']:
+                    context.batch_context['top_speeds'][sid] = self._get_top_speed(sid)
+                self._run_speed_test(
+                    info,
+                    context.batch_context['previous_positions'][sid],
+                    context.batch_context['top_speeds'][sid],
+                    context
+                )
+        finally:
+            context.batch_context['previous_positions'][sid] = info
+
+    def _run_speed_test(self, xyt2: tuple, xyt1: tuple, top_speed, context):
+        if top_speed is None:
+            return
+        distance = geodesy.haversine((xyt2[1], xyt2[0]), (xyt1[1], xyt1[0]))
+        time = (xyt2[2] - xyt1[2]).total_seconds()
+        with context.two_coordinate_context('Latitude', 'Longitude') as ctx2:
+            self.assert_greater_than('speed_too_fast', distance / time, top_speed, qc_flag=13)
+
+
+class TestGTSPPSpeedTest(BaseTestCase):
+
+    @staticmethod
+    def _profile(station: str | None, time: str | None, lat: float | None, lon: float | None) -> ocproc2.ParentRecord:
+        record = ocproc2.ParentRecord()
+        if station is not None:
+            record.metadata['CNODCStation'] = station
+        if time is not None:
+            record.coordinates['Time'] = time
+        if lat is not None:
+            record.coordinates['Latitude'] = lat
+            record.coordinates['Latitude'].metadata['Units'] = 'degrees_north'
+        if lon is not None:
+            record.coordinates['Longitude'] = lon
+            record.coordinates['Longitude'].metadata['Units'] = 'degrees_east'
+        return record
+
+    def _run_suite(self, suite: BaseTestSuite, profiles: list[tuple]) -> list[tuple]:
+        db = DatabaseMock()
+        runner = QCTestRunner([suite])
+        runner.set_db_instance(db)
+        batch = []
+        for idx, info in enumerate(profiles):
+            wr = NODBWorkingRecord(working_uuid=f'working{idx}')
+            wr.record = self._profile(*info)
+            batch.append(wr)
+        outcomes = {}
+        for wr, record, result, _ in runner.process_batch(batch):
+            outcomes[wr.working_uuid] = (
+                result,
+                record.coordinates.get('Latitude').metadata.best('WorkingQuality', None) if record.coordinates.has_value('Latitude') else None,
+                record.coordinates.get('Longitude').metadata.best('WorkingQuality', None) if record.coordinates.has_value('Longitude') else None,
+            )
+        runner.clear_db_instance(db)
+        return [outcomes[f'working{idx}'] for idx in range(0, len(profiles))]
+
+    def assertSameFlags(self, profiles: list[tuple]) -> list[tuple]:
+        expected = self._run_suite(_PerRecordSpeedTest(), profiles)
+        actual = self._run_suite(GTSPPSpeedTest(), profiles)
+        self.assertEqual(expected, actual)
+        return actual
+
+    def test_single_track(self):
+        # Flags are raised when the speed between two positions is not above the top speed
+        results = self.assertSameFlags([
+            ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+            ('S1', '2015-01-01T00:10:00+00:00', 46.0, -60.0),
+            ('S1', '2015-01-01T06:00:00+00:00', 46.01, -60.01),
+            ('S1', '2015-01-01T06:05:00+00:00', 44.0, -58.0),
+        ])
+        self.assertEqual([x[1] for x in results], [None, None, 13, None])
+
+    def test_interleaved_stations(self):
+        results = self.assertSameFlags([
+            ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+            ('S2', '2015-01-01T00:00:00+00:00', 10.0, 20.0),
+            ('S1', '2015-01-01T01:00:00+00:00', 45.1, -60.0),
+            ('S2', '2015-01-01T00:30:00+00:00', 12.0, 20.0),
+            ('S3', '2015-01-01T00:30:00+00:00', 0.0, 0.0),
+            ('S2', '2015-01-01T02:00:00+00:00', 12.0, 20.0),
+        ])
+        self.assertEqual([x[1] for x in results], [None, None, 13, None, None, 13])
+
+    def test_antimeridian(self):
+        self.assertSameFlags([
+            ('S1', '2015-01-01T00:00:00+00:00', 0.0, 179.9),
+            ('S1', '2015-01-01T00:01:00+00:00', 0.0, -179.9),
+            ('S1', '2015-01-01T01:00:00+00:00', 0.0, 179.9),
+        ])
+
+    def test_missing_values(self):
+        # Records missing any of the values are skipped and don't start or break a track
+        results = self.assertSameFlags([
+            ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+            (None, '2015-01-01T00:05:00+00:00', 80.0, -60.0),
+            ('S1', '2015-01-01T00:10:00+00:00', None, -60.0),
+            ('S1', None, 80.0, 80.0),
+            ('S1', '2015-01-01T00:20:00+00:00', 45.0, None),
+            ('S1', '2015-01-01T01:00:00+00:00', 45.0, -60.0),
+        ])
+        self.assertEqual([x[1] for x in results], [None, None, None, None, None, 13])
+
+    def test_same_time(self):
+        # The per-record test divided by zero here, the batch test doesn't check the pair
+        results = self._run_suite(GTSPPSpeedTest(), [
+            ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+            ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+            ('S1', '2015-01-01T01:00:00+00:00', 45.0, -60.0),
+        ])
+        self.assertEqual([x[1] for x in results], [None, None, 13])
+        with self.assertRaises(ZeroDivisionError):
+            self._run_suite(_PerRecordSpeedTest(), [
+                ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+                ('S1', '2015-01-01T00:00:00+00:00', 45.0, -60.0),
+            ])
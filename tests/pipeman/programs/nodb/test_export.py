@@ -0,0 +1,197 @@
+import datetime
+import unittest
+import unittest.mock
+
+from autoinject import injector
+
+from medsutil.ocproc2 import ParentRecord, ChildRecord, OCProc2Ontology
+from nodb.observations import NODBObservationData, ObservationStatus
+from pipeman.programs.nodb.export import ColumnarSchema, RecordFlattener, NODBColumnarExportTask, ColumnType, pyarrow
+from tests.helpers.base_test_case import BaseTestCase
+
+
+def _build_record() -> ParentRecord:
+    record = ParentRecord()
+    record.coordinates['Time'] = '2015-10-11T00:00:00+00:00'
+    record.coordinates.set('Latitude', 34.12, Units='degree_north', WorkingQuality=1)
+    record.coordinates.set('Longitude', -123.12, Units='degree_east')
+    record.parameters.set('Temperature', 10, Units='degC', Quality=1)
+    rs = record.subrecords.new_recordset('PROFILE')
+    for depth, temp in ((5, 9.5), (10, 8.5)):
+        child = ChildRecord()
+        child.coordinates.set('Depth', depth, Units='m')
+        child.parameters.set('Temperature', temp, Units='degC', Quality=4)
+        rs.records.append(child)
+    return record
+
+
+class TestColumnarSchema(BaseTestCase):
+
+    @injector.inject
+    def test_default_schema(self, ontology: OCProc2Ontology = None):
+        schema = ColumnarSchema(ontology)
+        self.assertIn('Latitude', schema.coordinates)
+        self.assertIn('Temperature', schema.parameters)
+        columns = dict(schema.columns())
+        self.assertEqual(columns['Latitude'], ColumnType.FLOAT)
+        self.assertEqual(columns['Latitude_quality'], ColumnType.QUALITY)
+        self.assertEqual(columns['Latitude_units'], ColumnType.STRING)
+        self.assertEqual(columns['Time'], ColumnType.DATETIME)
+        self.assertEqual(columns['received_date'], ColumnType.DATE)
+
+    @injector.inject
+    def test_limited_schema(self, ontology: OCProc2Ontology = None):
+        schema = ColumnarSchema(ontology, ['Latitude', 'Temperature'])
+        self.assertEqual(schema.coordinates, ['Latitude'])
+        self.assertEqual(schema.parameters, ['Temperature'])
+        self.assertNotIn('Longitude', schema)
+
+
+class TestRecordFlattener(BaseTestCase):
+
+    @injector.inject
+    def test_flatten_profile(self, ontology: OCProc2Ontology = None):
+        flattener = RecordFlattener(ColumnarSchema(ontology, ['Time', 'Latitude', 'Longitude', 'Depth', 'Temperature']))
+        rows = list(flattener.flatten(_build_record(), {'obs_uuid': '12345'}))
+        self.assertEqual(3, len(rows))
+        surface, first, second = rows
+        self.assertEqual(surface['record_path'], '')
+        self.assertEqual(surface['obs_uuid'], '12345')
+        self.assertAlmostEqual(surface['Temperature'], 283.15)
+        self.assertEqual(surface['Temperature_units'], 'K')
+        self.assertEqual(surface['Temperature_quality'], 1)
+        self.assertEqual(surface['Latitude_quality'], 1)
+        self.assertEqual(surface['Longitude_quality'], 0)
+        self.assertSameTime(surface['Time'], '2015-10-11T00:00:00+00:00')
+        self.assertEqual(first['record_path'], 'subrecords/PROFILE/0/0')
+        self.assertEqual(first['obs_uuid'], '12345')
+        self.assertAlmostEqual(first['Latitude'], 34.12)
+        self.assertEqual(first['Depth'], 5)
+        self.assertAlmostEqual(first['Temperature'], 282.65)
+        self.assertEqual(first['Temperature_quality'], 4)
+        self.assertEqual(second['record_path'], 'subrecords/PROFILE/0/1')
+        self.assertEqual(second['Depth'], 10)
+
+    @injector.inject
+    def test_parent_without_parameters(self, ontology: OCProc2Ontology = None):
+        record = _build_record()
+        del record.parameters['Temperature']
+        flattener = RecordFlattener(ColumnarSchema(ontology, ['Latitude', 'Depth', 'Temperature']))
+        rows = list(flattener.flatten(record))
+        self.assertEqual(2, len(rows))
+        self.assertTrue(all(r['record_path'].startswith('subrecords/PROFILE/') for r in rows))
+
+    @injector.inject
+    def test_bad_value(self, ontology: OCProc2Ontology = None):
+        record = ParentRecord()
+        record.parameters.set('Temperature', 'hello', Units='degC')
+        flattener = RecordFlattener(ColumnarSchema(ontology, ['Temperature']))
+        rows = list(flattener.flatten(record))
+        self.assertEqual(1, len(rows))
+        self.assertIsNone(rows[0]['Temperature'])
+        self.assertEqual(rows[0]['Temperature_quality'], 0)
+
+
+class TestColumnarExportTask(BaseTestCase):
+
+    def test_no_output_target(self):
+        x = self.worker_controller.build_test_worker(NODBColumnarExportTask, {})
+        with self.assertRaisesCoded('NODBEXPORT-1002'):
+            x.on_start()
+
+    def test_bad_format(self):
+        x = self.worker_controller.build_test_worker(NODBColumnarExportTask, {
+            'output_target': str(self.temp_dir),
+            'delay_seconds': 86400,
+            'format': 'csv',
+        })
+        with self.assertRaisesCoded('NODBEXPORT-1001'):
+            x.on_start()
+
+    def test_iter_rows_skips_duplicates(self):
+        received = datetime.date(2015, 10, 12)
+        for idx, status in enumerate((ObservationStatus.VERIFIED, ObservationStatus.DUPLICATE)):
+            od = NODBObservationData()
+            od.obs_uuid = f'obs{idx}'
+            od.received_date = received
+            od.status = status
+            od.record = _build_record()
+            self.db.insert_object(od)
+        x: NODBColumnarExportTask = self.worker_controller.build_test_worker(NODBColumnarExportTask, {
+            'output_target': str(self.temp_dir),
+            'delay_seconds': 86400,
+            'elements': ['Latitude', 'Depth', 'Temperature'],
+        })
+        x.on_start()
+        rows = list(x.iter_rows(self.db, received))
+        self.assertEqual(3, len(rows))
+        self.assertTrue(all(r['obs_uuid'] == 'obs0' for r in rows))
+        self.assertTrue(all(r['status'] == 'VERIFIED' for r in rows))
+
+    def test_iter_rows_filters_statuses_in_query(self):
+        x: NODBColumnarExportTask = self.worker_controller.build_test_worker(NODBColumnarExportTask, {
+            'output_target': str(self.temp_dir),
+            'delay_seconds': 86400,
+            'exclude_statuses': ['DUPLICATE', 'DISCARDED'],
+        })
+        x.on_start()
+        with unittest.mock.patch.object(self.db, 'stream_objects', return_value=[]) as stream:
+            self.assertEqual([], list(x.iter_rows(self.db, datetime.date(2015, 10, 12))))
+        self.assertEqual(stream.call_args.kwargs['filters'], {
+            'received_date': datetime.date(2015, 10, 12),
+            'status': (['DISCARDED', 'DUPLICATE'], 'NOT IN', True),
+        })
+
+    @unittest.skipIf(pyarrow is not None, "pyarrow is installed")
+    def test_no_pyarrow(self):
+        received = datetime.date(2015, 10, 12)
+        x: NODBColumnarExportTask = self.worker_controller.build_test_worker(NODBColumnarExportTask, {
+            'output_target': str(self.temp_dir),
+            'delay_seconds': 86400,
+        })
+        x.on_start()
+        with self.assertRaisesCoded('NODBEXPORT-1000'):
+            x.export_received_date(self.db, received)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_export_parquet(self):
+        import pyarrow.parquet
+        received = datetime.date(2015, 10, 12)
+        od = NODBObservationData()
+        od.obs_uuid = 'obs0'
+        od.received_date = received
+        od.status = ObservationStatus.VERIFIED
+        od.record = _build_record()
+        self.db.insert_object(od)
+        x: NODBColumnarExportTask = self.worker_controller.build_test_worker(NODBColumnarExportTask, {
+            'output_target': str(self.temp_dir),
+            'delay_seconds': 86400,
+            'elements': ['Latitude', 'Depth', 'Temperature'],
+        })
+        x.on_start()
+        self.assertTrue(x.export_received_date(self.db, received))
+        table = pyarrow.parquet.read_table(str(self.temp_dir / 'nodb_obs_20151012.parquet'))
+        self.assertEqual(3, table.num_rows)
+        self.assertFalse(x.export_received_date(self.db, received))
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_export_arrow(self):
+        from pyarrow import ipc
+        received = datetime.date(2015, 10, 12)
+        od = NODBObservationData()
+        od.obs_uuid = 'obs0'
+        od.received_date = received
+        od.status = ObservationStatus.VERIFIED
+        od.record = _build_record()
+        self.db.insert_object(od)
+        x: NODBColumnarExportTask = self.worker_controller.build_test_worker(NODBColumnarExportTask, {
+            'output_target': str(self.temp_dir),
+            'delay_seconds': 86400,
+            'format': 'arrow',
+        })
+        x.on_start()
+        self.assertTrue(x.export_received_date(self.db, received))
+        with ipc.open_file(str(self.temp_dir / 'nodb_obs_20151012.arrow')) as reader:
+            table = reader.read_all()
+        self.assertEqual(3, table.num_rows)
+        self.assertEqual(table.column('Depth').to_pylist(), [None, 5.0, 10.0])
@@ -1,15 +1,16 @@
 import datetime
-import unittest
 
 from nodb.observations import NODBWorkingRecord, NODBObservationData, NODBBatch, BatchStatus, NODBObservation
 from medsutil.ocproc2 import ParentRecord
 from pipeman.processing.payloads import BatchPayload
 from pipeman.programs.nodb.finalizer import NODBFinalizeWorker
+from pipeman.programs.gts_send.queue_gts import GTSQueueWorker
+from nodb.gts import GTSOutgoingMessage
+from nodb.queue import NODBQueueItem
 
 from tests.helpers.base_test_case import BaseTestCase
 
 
-@unittest.skip("known to break for now")
 class TestFinalizer(BaseTestCase):
 
     def test_finalizer(self):
@@ -52,3 +53,73 @@ class TestFinalizer(BaseTestCase):
         b: NODBBatch = NODBBatch.find_by_uuid(self.db, '12345')
         self.assertIs(b.status, BatchStatus.COMPLETE)
 
+
+    def test_finalizer_chunks(self):
+        bp = BatchPayload(batch_uuid='12345')
+        batch = NODBBatch()
+        batch.batch_uuid = '12345'
+        batch.status = BatchStatus.NEW
+        self.db.insert_object(batch)
+        for idx in range(0, 5):
+            wr = NODBWorkingRecord()
+            wr.working_uuid = f'working{idx}'
+            wr.received_date = '2015-10-12'
+            wr.source_file_uuid = '123'
+            wr.message_idx = 0
+            wr.record_idx = idx
+            record = ParentRecord()
+            record.coordinates['Time'] = '2015-10-11T00:00:00+00:00'
+            wr.record = record
+            wr.qc_batch_id = '12345'
+            self.db.insert_object(wr)
+        self.worker_controller.test_queue_worker(
+            NODBFinalizeWorker,
+            {'finalize_chunk_size': 2},
+            self.worker_controller.payload_to_queue_item(bp, 'nodb_finalize')
+        )
+        self.assertEqual(5, len(self.db.table(NODBObservationData)))
+        self.assertEqual(0, NODBBatch.count_working_by_uuid(self.db, '12345'))
+        for idx in range(0, 5):
+            self.assertIsNotNone(NODBObservationData.find_by_source_info(self.db, '123', '2015-10-12', 0, idx))
+        b: NODBBatch = NODBBatch.find_by_uuid(self.db, '12345')
+        self.assertIs(b.status, BatchStatus.COMPLETE)
+
+    def test_finalizer_to_gts_queue(self):
+        bp = BatchPayload(batch_uuid='12345')
+        batch = NODBBatch()
+        batch.batch_uuid = '12345'
+        batch.status = BatchStatus.NEW
+        self.db.insert_object(batch)
+        for idx in range(0, 5):
+            wr = NODBWorkingRecord()
+            wr.working_uuid = f'working{idx}'
+            wr.received_date = '2015-10-12'
+            wr.source_file_uuid = '123'
+            wr.message_idx = 0
+            wr.record_idx = idx
+            record = ParentRecord()
+            record.coordinates['Time'] = '2015-10-11T00:00:00+00:00'
+            wr.record = record
+            wr.qc_batch_id = '12345'
+            self.db.insert_object(wr)
+        self.worker_controller.test_queue_worker(
+            NODBFinalizeWorker,
+            {'finalize_chunk_size': 2, 'observation_list_queue': 'gts_queue'},
+            self.worker_controller.payload_to_queue_item(bp, 'nodb_finalize')
+        )
+        self.assertEqual(3, len([x for x in self.db.table(NODBQueueItem) if x.queue_name == 'gts_queue']))
+        while (item := self.db.fetch_next_queue_item('gts_queue')) is not None:
+            self.worker_controller.test_queue_worker(
+                GTSQueueWorker,
+                {'queue_name': 'gts_queue', 'gts_info': {'format': 'BUFR'}},
+                item
+            )
+        messages = list(self.db.stream_objects(GTSOutgoingMessage))
+        self.assertEqual(
+            sorted(m.obs_uuid for m in messages),
+            sorted(obs.obs_uuid for obs in self.db.table(NODBObservation))
+        )
+        self.assertEqual(5, len(messages))
+        self.assertTrue(all(m.message_format == 'BUFR' for m in messages))
+        # List payloads are not a workflow step, so nothing is progressed from them
+        self.assertEqual([], [x for x in self.db.table(NODBQueueItem) if x.queue_name not in ('gts_queue', 'workflow_continue')])
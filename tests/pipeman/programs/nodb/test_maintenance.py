@@ -0,0 +1,50 @@
+import datetime
+
+from medsutil.ocproc2 import ParentRecord
+from nodb.observations import NODBObservation, NODBObservationData
+from pipeman.programs.nodb.maintenance import NODBMaintenanceTask
+from tests.helpers.base_test_case import BaseTestCase
+
+
+class TestMaintenanceTask(BaseTestCase):
+
+    def _add_observation(self, obs_uuid: str, summary_version: int | None = None, with_data: bool = True) -> NODBObservation:
+        obs = NODBObservation()
+        obs.obs_uuid = obs_uuid
+        obs.received_date = datetime.date(2015, 1, 2)
+        obs.summary_version = summary_version
+        self.db.insert_object(obs)
+        if with_data:
+            record = ParentRecord()
+            record.coordinates.set('Depth', 5, Units='m')
+            record.parameters.set('Temperature', 6, Units='K', Quality=1)
+            obs_data = NODBObservationData()
+            obs_data.obs_uuid = obs_uuid
+            obs_data.received_date = obs.received_date
+            obs_data.record = record
+            self.db.insert_object(obs_data)
+        return obs
+
+    def test_backfill_summaries(self):
+        obs1 = self._add_observation('12345')
+        obs2 = self._add_observation('23456', NODBObservation.SUMMARY_VERSION)
+        obs3 = self._add_observation('34567', with_data=False)
+        task: NODBMaintenanceTask = self.worker_controller.build_test_worker(NODBMaintenanceTask, {})
+        self.assertEqual(2, task.backfill_observation_summaries(self.db))
+        self.assertEqual(obs1.summary_version, NODBObservation.SUMMARY_VERSION)
+        self.assertEqual(obs1.level_count, 1)
+        self.assertEqual(obs1.parameter_summary['Temperature']['best'], 1)
+        self.assertIsNone(obs2.level_count)
+        self.assertEqual(obs3.summary_version, NODBObservation.SUMMARY_VERSION)
+        self.assertIsNone(obs3.level_count)
+        self.assertEqual(0, task.backfill_observation_summaries(self.db))
+
+    def test_backfill_batch_size(self):
+        for idx in range(0, 5):
+            self._add_observation(f'1234{idx}')
+        task: NODBMaintenanceTask = self.worker_controller.build_test_worker(NODBMaintenanceTask, {
+            'summary_backfill_batch_size': 2,
+        })
+        self.assertEqual(2, task.backfill_observation_summaries(self.db))
+        self.assertEqual(2, task.backfill_observation_summaries(self.db))
+        self.assertEqual(1, task.backfill_observation_summaries(self.db))
@@ -1,5 +1,6 @@
 import datetime
 import unittest
+import unittest.mock
 
 from nodb.observations import NODBWorkingRecord, NODBObservationData, NODBMission, NODBPlatform
 from pipeman.programs.nodb.record_manager import NODBRecordManager
@@ -219,4 +220,166 @@ class TestRecordManager(BaseTestCase):
         self.assertNotIn('PlatformMissionNumber', record2.metadata)
         self.assertIn('OperatingInstitution', record2.metadata)
         miss2 = NODBMission.find_by_uuid(self.db, '123')
-        self.assertEqual(miss2.get_metadata('PlatformMissionNumber'), 97)
\ No newline at end of file
+        self.assertEqual(miss2.get_metadata('PlatformMissionNumber'), 97)
+
+class TestBulkCompletedEntries(BaseTestCase):
+
+    @staticmethod
+    def _working(message_idx: int, record_idx: int) -> NODBWorkingRecord:
+        record = ocproc2.ParentRecord()
+        record.coordinates['Time'] = '2015-10-11T00:00:00+00:00'
+        record.coordinates.set('Latitude', 34.12, Units='degree_north', WorkingQuality=1)
+        wr = NODBWorkingRecord()
+        wr.working_uuid = f'{message_idx}-{record_idx}'
+        wr.received_date = datetime.date(2015, 10, 12)
+        wr.source_file_uuid = '123'
+        wr.message_idx = message_idx
+        wr.record_idx = record_idx
+        wr.record = record
+        return wr
+
+    def test_finalize_nested(self):
+        record = ocproc2.ParentRecord()
+        record.metadata['Test'] = ocproc2.MultiElement([
+            ocproc2.SingleElement(1, WorkingQuality=3),
+            ocproc2.MultiElement([ocproc2.SingleElement(2, WorkingQuality=4)])
+        ])
+        child = ocproc2.ChildRecord()
+        child.parameters.set('Temperature', 3.4, WorkingQuality=2)
+        grandchild = ocproc2.ChildRecord()
+        grandchild.parameters.set('Temperature', 3.5, WorkingQuality=1)
+        child.subrecords.append_to_record_set('PROFILE', 0, grandchild)
+        record.subrecords.append_to_record_set('PROFILE', 0, child)
+        with NODBRecordManager(self.db) as rm:
+            rm.finalize(record)
+        self.assertEqual(record.metadata['CNODCLevel'].value, 'UNKNOWN')
+        outer = record.metadata['Test'].values()
+        self.assertEqual(outer[0].metadata['Quality'].value, 3)
+        self.assertNotIn('WorkingQuality', outer[0].metadata)
+        self.assertEqual(outer[1].values()[0].metadata['Quality'].value, 4)
+        self.assertEqual(child.parameters['Temperature'].metadata['Quality'].value, 2)
+        self.assertEqual(grandchild.parameters['Temperature'].metadata['Quality'].value, 1)
+        self.assertNotIn('WorkingQuality', grandchild.parameters['Temperature'].metadata)
+
+    def test_create_completed_entries(self):
+        workings = [self._working(0, idx) for idx in range(0, 3)]
+        with NODBRecordManager(self.db) as rm:
+            self.assertEqual(3, rm.create_completed_entries_from_working_records(workings))
+        self.assertEqual(3, len(self.db.table(NODBObservationData)))
+        obs_data = NODBObservationData.find_by_source_info(self.db, '123', '2015-10-12', 0, 1)
+        self.assertIsNotNone(obs_data)
+        self.assertIsNotNone(obs_data.find_observation(self.db))
+        self.assertEqual(obs_data.record.coordinates['Latitude'].metadata['Quality'].value, 1)
+
+    def test_create_completed_entries_skips_existing(self):
+        with NODBRecordManager(self.db) as rm:
+            self.assertEqual(1, rm.create_completed_entries_from_working_records([self._working(0, 0)]))
+            self.assertEqual(1, rm.create_completed_entries_from_working_records([self._working(0, 0), self._working(0, 1), self._working(0, 1)]))
+        self.assertEqual(2, len(self.db.table(NODBObservationData)))
+
+
+class TestWorkingEntries(BaseTestCase):
+
+    def _existing(self, record_idx: int):
+        wr = NODBWorkingRecord()
+        wr.working_uuid = f'existing{record_idx}'
+        wr.received_date = datetime.date(2015, 1, 2)
+        wr.source_file_uuid = '12345'
+        wr.message_idx = 0
+        wr.record_idx = record_idx
+        self.db.insert_object(wr)
+
+    def test_create_working_entries_after_restart(self):
+        self._existing(0)
+        self._existing(1)
+        with NODBRecordManager(self.db) as rm:
+            with unittest.mock.patch.object(self.db, 'stream_raw', wraps=self.db.stream_raw) as stream_raw:
+                results = [
+                    rm.create_working_entry(ocproc2.ParentRecord(), '12345', datetime.date(2015, 1, 2), 0, idx)
+                    for idx in range(0, 4)
+                ]
+                self.assertEqual(1, stream_raw.call_count)
+        self.assertEqual([False, False, True, True], results)
+        self.assertEqual(4, len(self.db.table(NODBWorkingRecord)))
+        self.assertIsNotNone(NODBWorkingRecord.find_by_source_info(self.db, '12345', '2015-01-02', 0, 3))
+
+    def test_working_positions_per_file(self):
+        self._existing(0)
+        with NODBRecordManager(self.db) as rm:
+            self.assertTrue(rm.create_working_entry(ocproc2.ParentRecord(), '67890', datetime.date(2015, 1, 2), 0, 0))
+            self.assertFalse(rm.create_working_entry(ocproc2.ParentRecord(), '12345', datetime.date(2015, 1, 2), 0, 0))
+            self.assertTrue(rm.create_working_entry(ocproc2.ParentRecord(), '12345', datetime.date(2015, 1, 3), 0, 0))
+
+
+class TestReferenceCaching(BaseTestCase):
+
+    def _record(self) -> ocproc2.ParentRecord:
+        record = ocproc2.ParentRecord()
+        record.metadata['CNODCPlatform'] = 'platform1'
+        return record
+
+    def test_platform_shared_between_managers(self):
+        platform = NODBPlatform()
+        platform.platform_uuid = 'platform1'
+        platform.metadata = {}
+        self.db.insert_object(platform)
+        with NODBRecordManager(self.db) as rm:
+            rm._prune_platform_metadata(self._record())
+        with unittest.mock.patch.object(NODBPlatform, 'find_by_uuid', wraps=NODBPlatform.find_by_uuid) as finder:
+            with NODBRecordManager(self.db) as rm:
+                _, obj = rm._get_object_with_cache(self._record(), 'CNODCPlatform', finder)
+            self.assertEqual(0, finder.call_count)
+        self.assertEqual(obj.platform_uuid, 'platform1')
+
+    def test_pruned_metadata_invalidates(self):
+        platform = NODBPlatform()
+        platform.platform_uuid = 'platform1'
+        platform.metadata = {}
+        self.db.insert_object(platform)
+        with NODBRecordManager(self.db) as rm:
+            rm._prune_platform_metadata(self._record())
+            record = self._record()
+            record.metadata['PlatformName'] = 'foo'
+            rm._prune_platform_metadata(record)
+            self.assertNotIn('PlatformName', record.metadata)
+        self.db.commit()
+        with unittest.mock.patch.object(NODBPlatform, 'find_by_uuid', wraps=NODBPlatform.find_by_uuid) as finder:
+            with NODBRecordManager(self.db) as rm:
+                _, obj = rm._get_object_with_cache(self._record(), 'CNODCPlatform', finder)
+            self.assertEqual(1, finder.call_count)
+        self.assertIn('PlatformName', obj.metadata)
+
+    def test_invalidate_after_commit(self):
+        platform = NODBPlatform()
+        platform.platform_uuid = 'platform1'
+        platform.metadata = {}
+        self.db.insert_object(platform)
+        with NODBRecordManager(self.db) as rm:
+            record = self._record()
+            record.metadata['PlatformName'] = 'foo'
+            with unittest.mock.patch.object(rm.reference_cache, 'invalidate') as invalidate:
+                rm._prune_platform_metadata(record)
+                self.assertEqual(0, invalidate.call_count)
+                self.db.commit()
+                invalidate.assert_called_once_with('CNODCPlatform', 'platform1')
+
+    def test_stale_cache_keeps_new_metadata(self):
+        platform = NODBPlatform()
+        platform.platform_uuid = 'platform1'
+        platform.metadata = {}
+        self.db.insert_object(platform)
+        with NODBRecordManager(self.db) as rm:
+            rm._prune_platform_metadata(self._record())
+        # Another process adds metadata after the platform was cached
+        other = NODBPlatform.find_by_uuid(self.db, 'platform1')
+        other.metadata = {'IMONumber': 99, 'BatteryType': 'lithium_ion'}
+        self.db.update_object(other)
+        with NODBRecordManager(self.db) as rm:
+            record = self._record()
+            record.metadata['PlatformName'] = 'foo'
+            record.metadata['IMONumber'] = 99
+            rm._prune_platform_metadata(record)
+            self.assertNotIn('PlatformName', record.metadata)
+            self.assertNotIn('IMONumber', record.metadata)
+        plat = NODBPlatform.find_by_uuid(self.db, 'platform1')
+        self.assertEqual({'IMONumber': 99, 'BatteryType': 'lithium_ion', 'PlatformName': 'foo'}, plat.metadata)